@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+adb直连安卓设备的动作模块
+@module adb_action
+@file adb_action.py
+"""
+
+import os
+import sys
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+from HandLessRobot.lib.actions.base_action import BaseAction
+from HandLessRobot.lib.controls.adb_control import AppDevice, AppElement
+
+
+__MOUDLE__ = 'adb_action'  # 模块名
+__DESCRIPT__ = u'adb直连安卓设备的动作模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.22'  # 发布日期
+
+
+# 一些公共的全局变量
+ADB_FUN_ROUTER = {
+    # 对应用的操作
+    'ADB_GET_RECT_CENTER': AppDevice.center,
+    'GET_ADB_DEVICE': AppDevice.get_app_device
+}
+
+ADB_ATTR_ROUTER = {
+    # 实例对象属性
+    'ADB_DV_ATTR_SIZE': ['size', AppDevice.size],
+    'ADB_DV_ATTR_DESIRED_CAPS': ['desired_caps', AppDevice.desired_caps],
+    'ADB_DV_ATTR_PAGE_SOURCE': ['page_source', AppDevice.page_source],
+    'ADB_DV_ATTR_CURRENT_PACKAGE': ['current_package', AppDevice.current_package],
+    'ADB_DV_ATTR_CURRENT_ACTIVITY': ['current_activity', AppDevice.current_activity],
+    'ADB_EL_ATTR_TEXT': ['text', AppElement.text],
+    'ADB_EL_ATTR_TAG_NAME': ['tag_name', AppElement.tag_name],
+    'ADB_EL_ATTR_IS_SELECTED': ['is_selected', AppElement.is_selected],
+    'ADB_EL_ATTR_IS_ENABLED': ['is_enabled', AppElement.is_enabled],
+    'ADB_EL_ATTR_IS_DISPLAYED': ['is_displayed', AppElement.is_displayed],
+    'ADB_EL_ATTR_LOCATION': ['location', AppElement.location],
+    'ADB_EL_ATTR_SIZE': ['size', AppElement.size],
+    'ADB_EL_ATTR_RECT': ['rect', AppElement.rect],
+
+    # 实例对象函数
+    'ADB_DEVICE_STATE': ['device_state', AppDevice.device_state],
+    'ADB_GET_CLIPBOARD_TEXT': ['get_clipboard_text', AppDevice.get_clipboard_text],
+    'ADB_SET_CLIPBOARD_TEXT': ['set_clipboard_text', AppDevice.set_clipboard_text],
+    'ADB_WAIT_ACTIVITY': ['wait_activity', AppDevice.wait_activity],
+    'ADB_IS_APP_INSTALLED': ['is_app_installed', AppDevice.is_app_installed],
+    'ADB_INSTALL_APP': ['install_app', AppDevice.install_app],
+    'ADB_REMOVE_APP': ['remove_app', AppDevice.remove_app],
+    'ADB_LAUNCH_APP': ['launch_app', AppDevice.launch_app],
+    'ADB_CLOSE_APP': ['close_app', AppDevice.close_app],
+    'ADB_IS_SCREEN_ON': ['is_screen_on', AppDevice.is_screen_on],
+    'ADB_IS_SHOWING_LOCK_SCREEN': ['is_showing_lock_screen', AppDevice.is_showing_lock_screen],
+    'ADB_IS_POWER_ON': ['is_power_on', AppDevice.is_power_on],
+    'ADB_SET_POWER_STAYON': ['set_power_stayon', AppDevice.set_power_stayon],
+    'ADB_SCREENSHOT': ['screenshot', AppDevice.screenshot],
+    'ADB_SCREENSHOT_ELEMENTS': ['screenshot_elements', AppDevice.screenshot_elements],
+    'ADB_PIXEL_COLOR': ['pixel_color', AppDevice.pixel_color],
+    'ADB_PIXEL_MATCHES_COLOR': ['pixel_matches_color', AppDevice.pixel_matches_color],
+    'ADB_PROBE_PIXELS': ['probe_pixels', AppDevice.probe_pixels],
+    'ADB_PROBE_PIXELS_LIST': ['probe_pixels_list', AppDevice.probe_pixels_list],
+    'ADB_LOCATE_ON_SCREEN': ['locate_on_screen', AppDevice.locate_on_screen],
+    'ADB_LOCATE_ALL_ON_SCREEN': ['locate_all_on_screen', AppDevice.locate_all_on_screen],
+    'ADB_LOCATE_ANY_ON_SCREEN': ['locate_any_on_screen', AppDevice.locate_any_on_screen],
+    'ADB_LOCATE_MANY_ON_SCREEN': ['locate_many_on_screen', AppDevice.locate_many_on_screen],
+    'ADB_WAIT_IMAGE': ['wait_image', AppDevice.wait_image],
+    'ADB_WAIT_ANY_IMAGE': ['wait_any_image', AppDevice.wait_any_image],
+    'ADB_SWIPE': ['swipe', AppDevice.swipe],
+    'ADB_SWIPE_UP': ['swipe_up', AppDevice.swipe_up],
+    'ADB_SWIPE_DOWN': ['swipe_down', AppDevice.swipe_down],
+    'ADB_SWIPE_LEFT': ['swipe_left', AppDevice.swipe_left],
+    'ADB_SWIPE_RIGHT': ['swipe_right', AppDevice.swipe_right],
+    'ADB_SWIPE_PLUS': ['swipe_plus', AppDevice.swipe_plus],
+    'ADB_TAP': ['tap', AppDevice.tap],
+    'ADB_TAP_CONTINUITY': ['tap_continuity', AppDevice.tap_continuity],
+    'ADB_LONG_PRESS': ['long_press', AppDevice.long_press],
+    'ADB_PRESS_KEYCODE': ['press_keycode', AppDevice.press_keycode],
+    'ADB_INPUT_TEXT': ['input_text', AppDevice.input_text],
+    'ADB_KEYBOARD_TEXT': ['adb_keyboard_text', AppDevice.adb_keyboard_text],
+    'ADB_KEYBOARD_KEYCODE': ['adb_keyboard_keycode', AppDevice.adb_keyboard_keycode],
+    'ADB_KEYBOARD_CLEAR': ['adb_keyboard_clear', AppDevice.adb_keyboard_clear],
+    'ADB_FIND_ELEMENT': ['find_element', AppDevice.find_element],
+    'ADB_FIND_ELEMENTS': ['find_elements', AppDevice.find_elements],
+    'ADB_FIND_ELEMENT_BY_XPATH': ['find_element_by_xpath', AppDevice.find_element_by_xpath],
+    'ADB_FIND_ELEMENTS_BY_XPATH': ['find_elements_by_xpath', AppDevice.find_elements_by_xpath],
+    'ADB_EL_GET_ATTRIBUTE': ['get_attribute', AppElement.get_attribute],
+    'ADB_EL_SCREENSHOT': ['screenshot', AppElement.screenshot],
+    'ADB_EL_CLICK': ['click', AppElement.click],
+    'ADB_EL_TAP': ['tap', AppElement.tap],
+    'ADB_EL_LONG_PRESS': ['long_press', AppElement.long_press]
+}
+
+
+class AdbAction(BaseAction):
+    """
+    adb直连安卓设备的动作模块
+    """
+    @classmethod
+    def support_action_types(cls) -> list:
+        """
+        返回支持的动作类别列表(主要基于列表区分不同平台及技术兼容的动作)
+
+        @returns {list} - 支持的动作类别列表，例如：
+            ['*'] - 代表支持所有分类
+            ['win32', 'winuia'] - 代表支持win32和winuia两种分类使用
+        """
+        return ['*']
+
+    @classmethod
+    def support_platform(cls) -> dict:
+        """
+        返回支持的平台字典
+        (用于自动生成路由表，默认支持全平台全版本，如需要指定需修改该函数返回值)
+
+        @returns {dict} - 支持的平台字典，key为system，value为ver
+            system='*' - 支持的平台名称(例如Windows、Linux), '*'代表全平台支持
+            ver=None - 支持的版本清单, 例如('7', '10', 'nt') , None代表全版本支持
+        """
+        return {'Android': None}
+
+    #############################
+    # 静态函数通用映射
+    #############################
+    @classmethod
+    def get_common_fun_dict(cls):
+        """
+        获取静态函数通用映射字典
+        (如果需要实现映射，请继承并修改该函数的返回值)
+
+        @returns {dict} - 返回静态函数通用映射字典
+            key - 动作名(action_name), 必须为大写
+            value - 动作对应的执行函数对象
+        """
+        return ADB_FUN_ROUTER
+
+    #############################
+    # 窗口实例对象的通用方法调用
+    #############################
+    @classmethod
+    def get_common_attr_dict(cls):
+        """
+        获取实例对象内部方法及属性映射字典
+        (如果需要实现映射，请继承并修改该函数的返回值)
+
+        @returns {dict} - 返回实例对象内部方法及属性映射字典
+            key - 动作名(action_name), 必须为大写
+            value - [属性或函数名(字符串), 属性或函数对象]
+        """
+        return ADB_ATTR_ROUTER
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -75,8 +75,18 @@ APPIUM_ATTR_ROUTER = {
     'APPIUM_WAIT': ['wait', AppDevice.wait],
     'APPIUM_SET_ORIENTATION': ['set_orientation', AppDevice.set_orientation],
     'APPIUM_SCREENSHOT': ['screenshot', AppDevice.screenshot],
+    'APPIUM_SCREENSHOT_ELEMENTS': ['screenshot_elements', AppDevice.screenshot_elements],
+    'APPIUM_PIXEL_COLOR': ['pixel_color', AppDevice.pixel_color],
+    'APPIUM_PIXEL_MATCHES_COLOR': ['pixel_matches_color', AppDevice.pixel_matches_color],
+    'APPIUM_PROBE_PIXELS': ['probe_pixels', AppDevice.probe_pixels],
+    'APPIUM_PROBE_PIXELS_LIST': ['probe_pixels_list', AppDevice.probe_pixels_list],
+    'APPIUM_SET_SCREENSHOT_SETTINGS': ['set_screenshot_settings', AppDevice.set_screenshot_settings],
     'APPIUM_LOCATE_ON_SCREEN': ['locate_on_screen', AppDevice.locate_on_screen],
     'APPIUM_LOCATE_ALL_ON_SCREEN': ['locate_all_on_screen', AppDevice.locate_all_on_screen],
+    'APPIUM_LOCATE_ANY_ON_SCREEN': ['locate_any_on_screen', AppDevice.locate_any_on_screen],
+    'APPIUM_LOCATE_MANY_ON_SCREEN': ['locate_many_on_screen', AppDevice.locate_many_on_screen],
+    'APPIUM_WAIT_IMAGE': ['wait_image', AppDevice.wait_image],
+    'APPIUM_WAIT_ANY_IMAGE': ['wait_any_image', AppDevice.wait_any_image],
     'APPIUM_SWIPE': ['swipe', AppDevice.swipe],
     'APPIUM_SWIPE_UP': ['swipe_up', AppDevice.swipe_up],
     'APPIUM_SWIPE_DOWN': ['swipe_down', AppDevice.swipe_down],
@@ -23,6 +23,8 @@ sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
 from HandLessRobot.lib.actions.base_action import BaseAction
 from HandLessRobot.lib.controls.windows_control import Screen, Mouse, Keyboard, Clipboard
+from HandLessRobot.lib.controls.image_writer import ImageWriter
+from HandLessRobot.lib.script_tool import ScriptTool
 
 
 __MOUDLE__ = 'common_action'  # 模块名
@@ -43,6 +45,8 @@ COMMON_FUN_ROUTER = {
     'IMAGE_LOCATE_ON_SCREEN': Screen.locate_all_on_screen,
     'IMAGE_LOCATE_CENTER_ON_SCREEN': Screen.locate_center_on_screen,
     'IMAGE_LOCATE_ALL_ON_SCREEN': Screen.locate_all_on_screen,
+    'IMAGE_LOCATE_ANY_ON_SCREEN': Screen.locate_any_on_screen,
+    'IMAGE_LOCATE_MANY_ON_SCREEN': Screen.locate_many_on_screen,
 
     # 鼠标处理
     'MOUSE_POSITION': Mouse.position,
@@ -117,10 +121,7 @@ class CommonAction(BaseAction):
 
         @returns {object} - 返回的变量值
         """
-        if get_run_id in robot_info['vars'].keys():
-            return robot_info['vars'][get_run_id].get(var_name, default_value)
-        else:
-            return default_value
+        return robot_info['vars'].get_var(get_run_id, var_name, default_value=default_value)
 
     @classmethod
     def set_run_variable(cls, robot_info: dict, action_name: str, run_id: str, var_name: str, set_value,
@@ -135,10 +136,7 @@ class CommonAction(BaseAction):
         @param {object} set_value - 要设置的变量值
         @param {str} set_run_id='*' - 机器人运行id
         """
-        if set_run_id not in robot_info['vars'].keys():
-            robot_info['vars'][set_run_id] = dict()
-
-        robot_info['vars'][set_run_id][var_name] = set_value
+        robot_info['vars'].set_var(set_run_id, var_name, set_value)
 
     @classmethod
     def del_run_variable(cls, robot_info: dict, action_name: str, run_id: str, var_name: str,
@@ -177,20 +175,129 @@ class CommonAction(BaseAction):
     # 执行脚本
     #############################
     @classmethod
-    def run_script(cls, robot_info: dict, action_name: str, run_id: str, script_str: str, **kwargs):
+    def run_script(cls, robot_info: dict, action_name: str, run_id: str, script_str: str,
+                   script_vars: dict = None, use_process: bool = False, timeout: float = None, **kwargs):
         """
         运行Python脚本
 
         @param {dict} robot_info - 通用参数，调用时默认传入的机器人信息
         @param {str} action_name - 通用参数，调用时默认传入的动作名
         @param {str} run_id - 运行id
-        @param {str} script_str - 要运行的python脚本
-            注：脚本中可以直接通过robot_info变量访问robot对象
-                如果需要返回值，可以在脚本中改变"_return_val"的值进行返回
+        @param {str} script_str - 要运行的python脚本(编译结果会被缓存, 参考 ScriptTool)
+            注：脚本中可以直接访问当前模块导入的模块及对象(例如 time、datetime、RunTool、Screen、Mouse 等),
+                以及以下变量:
+                robot_info - 机器人信息, robot_info['robot'] 为robot对象
+                action_name - 动作名
+                run_id - 运行id
+                run_vars - 当前run_id的运行变量字典
+                global_vars - 全局运行变量字典
+                kwargs - 调用动作时传入的其他参数字典
+                script_vars传入的变量
+                如果需要返回值，可以在脚本中设置"_return_val"变量的值进行返回
+        @param {dict} script_vars=None - 传入脚本的变量字典
+        @param {bool} use_process=False - 是否在子进程池中运行(适用于计算量大的脚本, 不阻塞其他运行)
+            注：子进程中只能访问run_id及script_vars传入的变量, 变量及返回值需要可以序列化(pickle)
+        @param {float} timeout=None - 子进程运行的等待超时时间, 单位为秒, None代表一直等待
+
+        @returns {object} - 脚本设置的"_return_val"变量值
+        """
+        if use_process:
+            _namespace = {'run_id': run_id}
+            if script_vars is not None:
+                _namespace.update(script_vars)
+            return ScriptTool.run_in_process(script_str, namespace=_namespace, timeout=timeout)
+
+        _namespace = dict(globals())
+        _namespace.update({
+            'robot_info': robot_info,
+            'action_name': action_name,
+            'run_id': run_id,
+            'run_vars': robot_info['vars'].setdefault(run_id, dict()),
+            'global_vars': robot_info['vars']['*'],
+            'kwargs': kwargs
+        })
+        if script_vars is not None:
+            _namespace.update(script_vars)
+
+        return ScriptTool.run(script_str, namespace=_namespace)
+
+    @classmethod
+    def set_script_process_pool(cls, robot_info: dict, action_name: str, run_id: str, workers: int = None,
+                                **kwargs):
+        """
+        设置运行脚本的子进程池
+
+        @param {dict} robot_info - 通用参数，调用时默认传入的机器人信息
+        @param {str} action_name - 通用参数，调用时默认传入的动作名
+        @param {str} run_id - 运行id
+        @param {int} workers=None - 子进程数量, None代表使用cpu核数
+        """
+        ScriptTool.set_process_pool(workers=workers)
+
+    #############################
+    # 截图归档
+    #############################
+    @classmethod
+    def set_screenshot_archive(cls, robot_info: dict, action_name: str, run_id: str,
+                               archive_path: str = None, image_format: str = 'PNG', quality: int = None,
+                               workers: int = 1, queue_size: int = 64, drop_oldest: bool = True,
+                               **kwargs):
+        """
+        设置截图归档参数(替换默认的异步保存对象)
+
+        @param {dict} robot_info - 通用参数，调用时默认传入的机器人信息
+        @param {str} action_name - 通用参数，调用时默认传入的动作名
+        @param {str} run_id - 运行id
+        @param {str} archive_path=None - 截图归档的根目录, 不传代表使用当前工作目录下的 screenshots 目录
+        @param {str} image_format='PNG' - 归档图片格式(PNG/JPEG/WEBP/BMP)
+        @param {int} quality=None - 归档图片质量, JPEG/WEBP为1-100, PNG为压缩级别0-9
+        @param {int} workers=1 - 后台保存线程数量
+        @param {int} queue_size=64 - 待保存图片队列的大小
+        @param {bool} drop_oldest=True - 队列满时是否丢弃最早的图片(不阻塞机器人执行)
+        """
+        ImageWriter.set_default(
+            queue_size=queue_size, workers=workers, drop_oldest=drop_oldest,
+            archive_path=archive_path, image_format=image_format, quality=quality
+        )
+
+    @classmethod
+    def archive_screenshot(cls, robot_info: dict, action_name: str, run_id: str, device=None,
+                           step=None, name: str = None, region=None, **kwargs) -> str:
+        """
+        截图并在后台保存到当前运行id的归档目录
+
+        @param {dict} robot_info - 通用参数，调用时默认传入的机器人信息
+        @param {str} action_name - 通用参数，调用时默认传入的动作名
+        @param {str} run_id - 运行id
+        @param {object} device=None - 要截图的设备对象(adb_control/appium_control的AppDevice),
+            None代表截取当前电脑屏幕
+        @param {str|int} step=None - 步骤标识, 不传代表使用该运行id下的自增序号
+        @param {str} name=None - 图片名
+        @param {tuple} region=None - 截取电脑屏幕时指定的截图区域 (x, y, witdh, height)
+
+        @returns {str} - 归档文件路径
+        """
+        if device is None:
+            _image = Screen.screenshot(region=region)
+        else:
+            _image = device.screenshot()
+
+        return ImageWriter.get_default().archive(_image, run_id, step=step, name=name)
+
+    @classmethod
+    def flush_screenshot_archive(cls, robot_info: dict, action_name: str, run_id: str, **kwargs):
+        """
+        等待后台截图全部保存完成
+
+        @param {dict} robot_info - 通用参数，调用时默认传入的机器人信息
+        @param {str} action_name - 通用参数，调用时默认传入的动作名
+        @param {str} run_id - 运行id
+
+        @returns {dict} - 保存的统计信息, 参考 ImageWriter.stats
         """
-        _return_val = None
-        exec(script_str)
-        return _return_val
+        _writer = ImageWriter.get_default()
+        _writer.flush()
+        return _writer.stats()
 
     #############################
     # 逻辑控制方法
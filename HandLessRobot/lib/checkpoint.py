@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+机器人运行检查点保存模块
+@module checkpoint
+@file checkpoint.py
+"""
+
+import os
+import re
+import sys
+import json
+import abc
+import time
+import sqlite3
+import logging
+import threading
+import traceback
+import urllib.parse
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'checkpoint'  # 模块名
+__DESCRIPT__ = u'机器人运行检查点保存模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.26'  # 发布日期
+
+
+class CheckpointStore(abc.ABC):
+    """
+    检查点存储的基础类, 按运行id保存检查点json字符串
+    """
+
+    @abc.abstractmethod
+    def save(self, run_id: str, json_str: str):
+        """
+        保存检查点(覆盖原检查点)
+
+        @param {str} run_id - 运行id
+        @param {str} json_str - 检查点json字符串
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def load(self, run_id: str) -> dict:
+        """
+        获取检查点
+
+        @param {str} run_id - 运行id
+
+        @returns {dict} - 检查点字典, 不存在返回None
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def remove(self, run_id: str):
+        """
+        删除检查点
+
+        @param {str} run_id - 运行id
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def run_ids(self) -> list:
+        """
+        获取已保存检查点的运行id清单
+
+        @returns {list} - 运行id清单
+        """
+        raise NotImplementedError()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    文件方式的检查点存储, 每个运行id保存为一个json文件
+    注: 文件名为转义后的运行id(参考 urllib.parse.quote), 不同的运行id对应不同的文件, 可从文件名还原运行id
+    """
+
+    def __init__(self, path: str):
+        """
+        构造函数
+
+        @param {str} path - 保存检查点文件的目录, 不存在将自动创建
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def save(self, run_id: str, json_str: str):
+        """
+        保存检查点(先写入临时文件再替换, 避免写入过程中断导致检查点损坏)
+
+        @param {str} run_id - 运行id
+        @param {str} json_str - 检查点json字符串
+        """
+        _file = self._get_file(run_id)
+        _temp_file = '%s.tmp' % _file
+        with open(_temp_file, 'w', encoding='utf-8') as _f:
+            _f.write(json_str)
+        os.replace(_temp_file, _file)
+
+    def load(self, run_id: str) -> dict:
+        """
+        获取检查点
+
+        @param {str} run_id - 运行id
+
+        @returns {dict} - 检查点字典, 不存在返回None
+        """
+        _file = self._get_file(run_id)
+        if not os.path.exists(_file):
+            return None
+
+        with open(_file, 'r', encoding='utf-8') as _f:
+            return json.loads(_f.read())
+
+    def remove(self, run_id: str):
+        """
+        删除检查点
+
+        @param {str} run_id - 运行id
+        """
+        _file = self._get_file(run_id)
+        if os.path.exists(_file):
+            os.remove(_file)
+
+    def run_ids(self) -> list:
+        """
+        获取已保存检查点的运行id清单
+
+        @returns {list} - 运行id清单
+        """
+        return [
+            urllib.parse.unquote(_file[0:-5]) for _file in os.listdir(self.path) if _file.endswith('.json')
+        ]
+
+    def _get_file(self, run_id: str) -> str:
+        """
+        获取运行id对应的检查点文件
+
+        @param {str} run_id - 运行id
+
+        @returns {str} - 检查点文件路径
+        """
+        # 大写字母同样转义, 避免在不区分大小写的文件系统(例如windows)中与小写的运行id对应同一文件
+        _name = re.sub(
+            r'(%[0-9A-F]{2})|[A-Z]',
+            lambda _match: _match.group(1) or '%%%02X' % ord(_match.group(0)),
+            urllib.parse.quote(run_id, safe='')
+        )
+        return os.path.join(self.path, '%s.json' % _name)
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """
+    SQLite数据库方式的检查点存储
+    """
+
+    def __init__(self, db_file: str, table_name: str = 'robot_checkpoint'):
+        """
+        构造函数
+
+        @param {str} db_file - 数据库文件
+        @param {str} table_name='robot_checkpoint' - 保存检查点的表名, 不存在将自动创建
+        """
+        self.db_file = db_file
+        self.table_name = table_name
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS %s (run_id TEXT PRIMARY KEY, update_time REAL, data TEXT)' % table_name
+        )
+        self._conn.commit()
+
+    def save(self, run_id: str, json_str: str):
+        """
+        保存检查点(覆盖原检查点)
+
+        @param {str} run_id - 运行id
+        @param {str} json_str - 检查点json字符串
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO %s (run_id, update_time, data) VALUES (?, ?, ?)' % self.table_name,
+                (run_id, time.time(), json_str)
+            )
+            self._conn.commit()
+
+    def load(self, run_id: str) -> dict:
+        """
+        获取检查点
+
+        @param {str} run_id - 运行id
+
+        @returns {dict} - 检查点字典, 不存在返回None
+        """
+        with self._lock:
+            _row = self._conn.execute(
+                'SELECT data FROM %s WHERE run_id = ?' % self.table_name, (run_id, )
+            ).fetchone()
+
+        return None if _row is None else json.loads(_row[0])
+
+    def remove(self, run_id: str):
+        """
+        删除检查点
+
+        @param {str} run_id - 运行id
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM %s WHERE run_id = ?' % self.table_name, (run_id, ))
+            self._conn.commit()
+
+    def run_ids(self) -> list:
+        """
+        获取已保存检查点的运行id清单
+
+        @returns {list} - 运行id清单
+        """
+        with self._lock:
+            return [
+                _row[0] for _row in self._conn.execute(
+                    'SELECT run_id FROM %s ORDER BY update_time' % self.table_name
+                ).fetchall()
+            ]
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
+
+
+class CheckpointWriter(object):
+    """
+    检查点异步写入对象
+    注: 1、执行步骤时只登记检查点快照, 由后台线程转换为json并写入存储, 不影响步骤的执行速度;
+        2、同一个运行id只写入最后登记的快照, 写入间隔内登记的多个快照只写入一次;
+        3、变量、上下文中无法转换为json的值不保存, 登记快照前应通过 copy_dict/copy_value 复制,
+            避免后台线程转换时变量已被后续步骤修改
+    """
+
+    # 可直接转换为json的简单类型
+    _SIMPLE_TYPES = (str, int, float, bool, type(None))
+
+    def __init__(self, store: CheckpointStore, interval: float = 1.0, logger=None):
+        """
+        构造函数
+
+        @param {CheckpointStore} store - 检查点存储对象
+        @param {float} interval=1.0 - 两次写入的最小间隔时间, 单位为秒
+        @param {Logger} logger=None - 日志对象, 不传入时使用默认日志对象
+        """
+        self.store = store
+        self.interval = interval
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger()
+
+        self._pending = dict()  # 待写入的快照, key为运行id, value为快照字典
+        self._pending_lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._event = threading.Event()
+        self._close_event = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._write_thread_fun, name='Thread-Robot-Checkpoint', daemon=True
+        )
+        self._thread.start()
+
+    #############################
+    # 公共函数
+    #############################
+    def submit(self, run_id: str, snapshot: dict):
+        """
+        登记检查点快照(异步写入)
+
+        @param {str} run_id - 运行id
+        @param {dict} snapshot - 检查点快照字典
+        """
+        with self._pending_lock:
+            self._pending[run_id] = snapshot
+        self._event.set()
+
+    def flush(self):
+        """
+        立即写入所有待写入的快照
+        """
+        with self._write_lock:
+            with self._pending_lock:
+                _pending = self._pending
+                self._pending = dict()
+
+            for _run_id, _snapshot in _pending.items():
+                self.store.save(_run_id, self.to_json(_snapshot))
+
+    def load(self, run_id: str) -> dict:
+        """
+        获取运行id最后的检查点(包括未写入的快照)
+
+        @param {str} run_id - 运行id
+
+        @returns {dict} - 检查点字典, 不存在返回None
+        """
+        self.flush()
+        return self.store.load(run_id)
+
+    def remove(self, run_id: str):
+        """
+        删除运行id的检查点(包括未写入的快照)
+
+        @param {str} run_id - 运行id
+        """
+        with self._write_lock:
+            with self._pending_lock:
+                self._pending.pop(run_id, None)
+
+            self.store.remove(run_id)
+
+    def close(self):
+        """
+        写入所有待写入的快照并结束后台线程
+        """
+        self._closed = True
+        self._close_event.set()
+        self._event.set()
+        self._thread.join()
+        self.flush()
+
+    #############################
+    # 工具函数
+    #############################
+    @classmethod
+    def copy_value(cls, value):
+        """
+        深复制可转换为json的值
+
+        @param {object} value - 要复制的值
+
+        @returns {object} - 复制后的值(元组转换为列表)
+
+        @throws {TypeError} - 值(或其中的元素)无法转换为json时抛出异常
+        """
+        if isinstance(value, cls._SIMPLE_TYPES):
+            return value
+        elif isinstance(value, dict):
+            _dict = dict()
+            for _key, _val in list(value.items()):
+                if not isinstance(_key, cls._SIMPLE_TYPES):
+                    raise TypeError('key type [%s] not support' % type(_key).__name__)
+                _dict[_key] = cls.copy_value(_val)
+            return _dict
+        elif isinstance(value, (list, tuple)):
+            return [cls.copy_value(_val) for _val in list(value)]
+        else:
+            raise TypeError('value type [%s] not support' % type(value).__name__)
+
+    @classmethod
+    def copy_dict(cls, value: dict) -> dict:
+        """
+        深复制字典中可转换为json的值(忽略无法转换的值)
+
+        @param {dict} value - 要复制的字典
+
+        @returns {dict} - 复制后的字典
+        """
+        _dict = dict()
+        for _key, _val in list(value.items()):
+            if type(_key) != str:
+                continue
+            try:
+                _dict[_key] = cls.copy_value(_val)
+            except (TypeError, RuntimeError):
+                # 无法转换, 或复制过程中被其他线程修改(RuntimeError), 以及循环引用(RecursionError)
+                pass
+
+        return _dict
+
+    @classmethod
+    def to_json(cls, snapshot: dict) -> str:
+        """
+        将检查点快照转换为json字符串(忽略无法转换的变量值)
+
+        @param {dict} snapshot - 检查点快照字典
+
+        @returns {str} - json字符串
+        """
+        _data = dict(snapshot)
+        _data['vars'] = cls._filter_dict(snapshot.get('vars', dict()))
+        if not cls._is_serializable(snapshot.get('last_result', None)):
+            _data['last_result'] = None
+
+        _data['pipelines'] = list()
+        for _level in snapshot.get('pipelines', list()):
+            _level = dict(_level)
+            _level['context'] = cls._filter_dict(_level.get('context', dict()))
+            _data['pipelines'].append(_level)
+
+        return json.dumps(_data, ensure_ascii=False)
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _is_serializable(cls, value) -> bool:
+        """
+        判断值是否可以转换为json
+
+        @param {object} value - 要判断的值
+
+        @returns {bool} - 是否可以转换
+        """
+        try:
+            json.dumps(value)
+            return True
+        except (TypeError, ValueError, RuntimeError):
+            return False
+
+    @classmethod
+    def _filter_dict(cls, value: dict) -> dict:
+        """
+        过滤字典中无法转换为json的值
+
+        @param {dict} value - 要过滤的字典
+
+        @returns {dict} - 过滤后的字典
+        """
+        return {
+            _key: _val for _key, _val in list(value.items())
+            if type(_key) == str and cls._is_serializable(_val)
+        }
+
+    def _write_thread_fun(self):
+        """
+        后台写入线程函数
+        """
+        while not self._closed:
+            self._event.wait()
+            self._event.clear()
+            try:
+                self.flush()
+            except:
+                # 写入失败不影响运行, 等待下一次写入
+                self.logger.error('write checkpoint error: %s' % traceback.format_exc())
+
+            # 控制写入间隔, 期间登记的快照合并写入(关闭时不再等待)
+            self._close_event.wait(self.interval)
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -16,13 +16,18 @@ import os
 import sys
 import math
 import time
+import json
+import struct
+import logging
 import datetime
-import pyscreeze
+import subprocess
+import collections
 from io import BytesIO
 from PIL import Image
 import threading
 import base64
 import random
+import numpy as np
 import lxml.etree as ET
 from appium.webdriver.common.mobileby import MobileBy
 from HiveNetLib.base_tools.file_tool import FileTool
@@ -32,6 +37,9 @@ from HiveNetLib.simple_xml import SimpleXml, EnumXmlObjType
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
 from HandLessRobot.lib.controls.appium_control import EnumAndroidKeycode
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame
+from HandLessRobot.lib.controls.frame_cache import FrameCache
+from HandLessRobot.lib.controls.image_writer import ImageWriter, IMAGE_FORMATS
 
 
 __MOUDLE__ = 'adb_control'  # 模块名
@@ -41,6 +49,24 @@ __AUTHOR__ = u'黎慧剑'  # 作者
 __PUBLISH__ = '2021.01.23'  # 发布日期
 
 
+# 设备状态组合脚本的分段标识
+DEVICE_STATE_MARKS = {
+    'size': '__HLR_STATE_SIZE__',
+    'focused_app': '__HLR_STATE_FOCUSED_APP__',
+    'policy': '__HLR_STATE_POLICY__'
+}
+
+# 批量输入脚本每个命令执行结果的标识, 格式为 __HLR_RET_{序号}_{返回码}__
+INPUT_BATCH_RET_MARK = '__HLR_RET_'
+
+# 持久化shell通道每个命令执行完成的标识, 格式为 __HLR_ACK_{序号}_{返回码}__
+SHELL_CHANNEL_ACK_MARK = '__HLR_ACK_'
+
+# adb返回设备断开连接的标识
+ADB_DISCONNECT_FLAGS = (
+    'not found', 'offline', 'unauthorized', 'no devices/emulators found'
+)
+
 class AppElement(object):
     """
     应用元素类
@@ -155,18 +181,28 @@ class AppElement(object):
     #############################
     # 屏幕操作
     #############################
-    def screenshot(self, filename: str = None) -> Image:
+    def screenshot(self, filename: str = None, image_format: str = None, quality: int = None,
+                   async_save: bool = False) -> Image:
         """
         保存元素截图
 
         @param {str} filename=None - 要保存的路径
+        @param {str} image_format=None - 保存的图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 保存的图片质量, 参考 AppDevice.screenshot
+        @param {bool} async_save=False - 是否在后台线程中保存文件(不等待保存完成)
 
         @returns {PIL.Image} - 图片对象
         """
-        _image: Image = self.device.screenshot()
-        _crop_image = _image.crop(self.rect)
+        _crop_image = self.device.screenshot_elements([self])[0]
         if filename is not None:
-            _crop_image.save(filename)
+            if async_save:
+                ImageWriter.get_default().save(
+                    _crop_image, filename, image_format=image_format, quality=quality
+                )
+            else:
+                ImageWriter.write_image(
+                    _crop_image, filename, image_format=image_format, quality=quality
+                )
 
         return _crop_image
 
@@ -323,6 +359,8 @@ class AppDevice(object):
             shell_encoding {str} - shell命令的编码方式, 在使用到命令行工具时使用, 默认为 'utf-8'
             adb_name {str} - adb命令的启动名称, 安卓adb版专用, 默认为 'adb'
             tmp_path {str} - 临时目录, 处理adb资源文件, 安卓adb版专用, 默认为当前工作目录
+            device_state_ttl {float} - 设备状态快照的缓存有效时间, 单位为秒, 默认为 1.0
+            channel_timeout {float} - 通过持久化shell通道执行命令的超时时间, 单位为秒, 默认为 10.0
 
         @returns {AppDevice} - 返回Appium的设备对象
         """
@@ -363,6 +401,114 @@ class AppDevice(object):
             shell_encoding=self.shell_encoding, ignore_error=ignore_error
         )
 
+    def get_shell_channel(self):
+        """
+        获取设备的持久化shell通道(不存在或已断开时自动创建)
+
+        @returns {AdbShellChannel} - shell通道对象
+        """
+        if self._shell_channel is None or not self._shell_channel.is_open:
+            self._shell_channel = AdbShellChannel(self.adb_name, self._desired_caps['deviceName'])
+            self._shell_channel.open()
+
+        return self._shell_channel
+
+    def close_shell_channel(self):
+        """
+        关闭设备的持久化shell通道
+        """
+        if self._shell_channel is not None:
+            self._shell_channel.close()
+            self._shell_channel = None
+
+    def channel_run_inner(self, cmds: list, check_str: str = None) -> list:
+        """
+        通过持久化shell通道流水线执行多个命令
+        注: 所有命令连续发送, 不等待前一个命令完成, 发送完成后再统一检查结果
+
+        @param {list} cmds - 要执行的设备端命令清单
+        @param {str} check_str=None - 用于检查执行成功的字符串, 每个命令的输出必须包含该字符串
+
+        @returns {list} - 每个命令的输出信息清单
+        """
+        _channel = self.get_shell_channel()
+        _seqs = [_channel.send(_cmd, wait=False) for _cmd in cmds]
+
+        _outputs = list()
+        _deadline = time.time() + self.channel_timeout
+        for _i in range(len(_seqs)):
+            _ret = _channel.wait(_seqs[_i], timeout=max(_deadline - time.time(), 0))
+            if _ret is None:
+                # 通道状态已无法确认, 关闭后下次重新建立
+                self.close_shell_channel()
+                raise RuntimeError('exec cmd [%s] timeout' % cmds[_i])
+
+            if check_str is not None and '\n'.join(_ret['output']).find(check_str) < 0:
+                # 放弃等待后续命令的结果, 避免结果在通道中堆积
+                _channel.discard(_seqs[_i + 1:])
+                raise RuntimeError('exec cmd [%s] error: %s' % (cmds[_i], '\n'.join(_ret['output'])))
+
+            _outputs.append(_ret['output'])
+
+        return _outputs
+
+    def input_cmd_inner(self, cmd: str):
+        """
+        内部的输入命令执行
+        注: 如果当前处于批量输入(input_batch)中, 命令将加入批量脚本延后执行, 否则立即执行
+
+        @param {str} cmd - 设备端执行的输入命令, 例如 'input tap 10 10'
+        """
+        if self._input_batch is not None:
+            self._input_batch.append(cmd)
+        else:
+            self.adb_run_inner('shell "%s"' % cmd)
+
+    def _parse_device_state(self, cmd_info: list) -> dict:
+        """
+        解析组合脚本输出的设备状态信息
+
+        @param {list} cmd_info - 组合脚本的输出行
+
+        @returns {dict} - 设备状态字典, 格式参考 device_state
+        """
+        _raw = {'size': [], 'focused_app': [], 'policy': []}
+        _marks = dict([(_v, _k) for _k, _v in DEVICE_STATE_MARKS.items()])
+        _section = None
+        for _line in cmd_info:
+            _line = _line.strip()
+            if _line in _marks.keys():
+                _section = _marks[_line]
+            elif _section is not None and _line != '':
+                _raw[_section].append(_line)
+
+        _state = {
+            'size': None, 'wm_size': None, 'current_package': '', 'current_activity': '',
+            'is_screen_on': False, 'is_showing_lock_screen': False, 'is_power_on': False,
+            'raw': _raw
+        }
+
+        # 屏幕大小, Physical size: 1080x1920, 通过wm size修改过分辨率时还有 Override size: 720x1280
+        _state['size'], _state['wm_size'] = DeviceFacts.parse_wm_size(_raw['size'])
+
+        # 当前应用
+        # mFocusedApp=AppWindowToken{... ActivityRecord{e903df8 u0 com.ss.android.ugc.aweme/.splash.SplashActivity t172}}
+        if len(_raw['focused_app']) > 0:
+            _findstr = 'ActivityRecord{'
+            _line = _raw['focused_app'][0]
+            _temp = _line[_line.find(_findstr) + len(_findstr):].split(' ')
+            if len(_temp) > 2:
+                _state['current_package'] = _temp[2][0: _temp[2].find('/')]
+                _state['current_activity'] = _temp[2][_temp[2].find('/') + 1:].rstrip(',')
+
+        # 电源及屏幕状态
+        _policy = ' '.join(_raw['policy'])
+        _state['is_screen_on'] = _policy.find('mScreenOnEarly=true') >= 0
+        _state['is_showing_lock_screen'] = _policy.find('mShowingLockscreen=true') >= 0
+        _state['is_power_on'] = _policy.find('mAwake=true') >= 0
+
+        return _state
+
     #############################
     # 构造函数及析构函数
     #############################
@@ -380,6 +526,11 @@ class AppDevice(object):
             shell_encoding {str} - shell命令的编码方式, 在使用到命令行工具时使用, 默认为 'utf-8'
             adb_name {str} - adb命令的启动名称, 安卓adb版专用, 默认为 'adb'
             tmp_path {str} - 临时目录, 处理adb资源文件, 安卓adb版专用, 默认为当前工作目录
+            device_state_ttl {float} - 设备状态快照的缓存有效时间, 单位为秒, 默认为 1.0
+            channel_timeout {float} - 通过持久化shell通道执行命令的超时时间, 单位为秒, 默认为 10.0
+            frame_cache_size {int} - 按屏幕画面缓存的图片定位结果数量, 默认为 256, 传0代表不缓存
+            raw_screencap_retry {int} - exec-out screencap 获取失败后, 改用 screenshot 获取的画面数量,
+                之后重新尝试 exec-out screencap, 默认为 20
         """
         self._desired_caps = {}
         self._desired_caps.update(desired_caps)
@@ -395,6 +546,21 @@ class AppDevice(object):
 
         # 缓存字典
         self.cache = dict()
+        self.device_state_ttl = kwargs.get('device_state_ttl', 1.0)
+
+        # 当前正在收集命令的批量输入对象
+        self._input_batch = None
+
+        # 持久化的shell通道
+        self._shell_channel = None
+        self.channel_timeout = kwargs.get('channel_timeout', 10.0)
+
+        # 通过 exec-out screencap 直接获取屏幕原始像素失败后, 剩余改用 screenshot 获取的画面数量
+        self.raw_screencap_retry = kwargs.get('raw_screencap_retry', 20)
+        self._raw_screencap_skip = 0
+
+        # 按屏幕画面缓存的计算结果
+        self.frame_cache = FrameCache(kwargs.get('frame_cache_size', 256))
 
         # 要安装到设备上的文件路径
         self._file_path = os.path.join(
@@ -405,7 +571,8 @@ class AppDevice(object):
         """
         析构函数
         """
-        pass
+        if getattr(self, '_shell_channel', None) is not None:
+            self._shell_channel.close()
 
     def init_device(self):
         """
@@ -442,18 +609,68 @@ class AppDevice(object):
     #############################
     # 实例基础属性
     #############################
+    def device_state(self, ttl: float = None, refresh: bool = False) -> dict:
+        """
+        获取设备状态快照
+        注: 通过一次adb shell执行组合脚本获取所有状态信息, 结果在有效时间内缓存复用
+
+        @param {float} ttl=None - 缓存有效时间, 单位为秒, 不传代表使用实例的 device_state_ttl
+        @param {bool} refresh=False - 是否强制重新获取
+
+        @returns {dict} - 设备状态字典
+            size {tuple[int, int]} - 屏幕物理大小, 获取失败为None
+            wm_size {tuple[int, int]} - 当前显示大小(wm size 设置的大小, 没有设置时为物理大小), 获取失败为None
+                注: 获取到的大小会同步检查 DeviceFacts 中的缓存, 不一致时缓存失效
+            current_package {str} - 当前应用包名, 获取失败为''
+            current_activity {str} - 当前Activity名, 获取失败为''
+            is_screen_on {bool} - 屏幕是否点亮
+            is_showing_lock_screen {bool} - 是否正在显示锁屏界面
+            is_power_on {bool} - 设备是否非休眠状态
+            raw {dict} - 各部分的原始输出行, key为 size/focused_app/policy
+        """
+        _ttl = self.device_state_ttl if ttl is None else ttl
+        _cache = self.cache.get('device_state', None)
+        if not refresh and _cache is not None and (time.time() - _cache[0]) < _ttl:
+            return _cache[1]
+
+        _cmd = 'shell "%s"' % '; '.join([
+            'echo %s' % DEVICE_STATE_MARKS['size'], 'wm size',
+            'echo %s' % DEVICE_STATE_MARKS['focused_app'],
+            'dumpsys window windows | grep mFocusedApp',
+            'echo %s' % DEVICE_STATE_MARKS['policy'],
+            'dumpsys window policy | grep -e mScreenOnEarly= -e mShowingLockscreen= -e mAwake='
+        ])
+        _cmd_info = self.adb_run_inner(_cmd, ignore_error=True)
+        _state = self._parse_device_state(_cmd_info)
+        if _state['size'] is None and len(_state['raw']['focused_app']) == 0:
+            # 一项都没有获取到, 视为命令执行失败
+            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
+
+        if _state['wm_size'] is not None:
+            DeviceFacts.update_size(self._desired_caps['deviceName'], _state['wm_size'])
+
+        self.cache['device_state'] = (time.time(), _state)
+        return _state
+
+    def clear_device_state(self):
+        """
+        清除设备状态快照缓存
+        注: 在执行了会改变设备状态的操作后调用, 下次获取状态时将重新查询
+        """
+        self.cache.pop('device_state', None)
+
     @property
     def size(self) -> tuple:
         """
         获取屏幕大小
+        注: 从设备静态信息登记簿获取, 不会每次执行adb命令
+
         @property {tuple[int, int]}
         """
-        _cmd = 'shell wm size'
-        _cmd_info = self.adb_run_inner(_cmd)
-        if not _cmd_info[0].startswith('Physical size:'):
-            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
-        _size = _cmd_info[0][len('Physical size:'):].strip().split('x')
-        return int(_size[0]), int(_size[1])
+        return DeviceFacts.get_size(
+            self._desired_caps['deviceName'], adb_name=self.adb_name,
+            shell_encoding=self.shell_encoding
+        )
 
     @property
     def desired_caps(self) -> dict:
@@ -498,13 +715,19 @@ class AppDevice(object):
 
         @returns {str} - 获取到的文本，如果没有信息返回空字符串
         """
-        _cmd = 'shell am broadcast -a clipper.get'
-        _cmd_info = self.adb_run_inner(_cmd)
-        _index = _cmd_info[1].find('data="')
+        _cmd = 'am broadcast -a clipper.get'
+        _cmd_info = '\n'.join(self.channel_run_inner([_cmd, ])[0])
+
+        # Broadcast completed: result=-1, data="..."
+        _index = _cmd_info.find('data="')
         if _index < 0:
-            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
-        _data = _cmd_info[1][_index + 6:-1]
-        return _data
+            if _cmd_info.find('Broadcast completed') >= 0:
+                # 剪贴板没有内容
+                return ''
+            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, _cmd_info))
+
+        _data = _cmd_info[_index + 6:].rstrip()
+        return _data[0:-1] if _data.endswith('"') else _data
 
     def set_clipboard_text(self, text: str):
         """
@@ -512,10 +735,10 @@ class AppDevice(object):
 
         @param {str} text - 要设置的文本
         """
-        _cmd = 'shell am broadcast -a clipper.set -e text "%s"' % text
-        _cmd_info = self.adb_run_inner(_cmd)
-        if not _cmd_info[1].endswith('data="Text is copied into clipboard."'):
-            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
+        _cmd = 'am broadcast -a clipper.set -e text %s' % AdbTools.shell_quote(text)
+        self.channel_run_inner(
+            [_cmd, ], check_str='data="Text is copied into clipboard."'
+        )
 
     #############################
     # app操作相关
@@ -527,15 +750,7 @@ class AppDevice(object):
 
         @property {str}
         """
-        _cmd = 'shell dumpsys window windows | %s mFocusedApp' % self.grep_str
-        _cmd_info = self.adb_run_inner(_cmd)
-
-        # mFocusedActivity: ActivityRecord{e903df8 u0 com.ss.android.ugc.aweme/.splash.SplashActivity t172}
-        _findstr = 'ActivityRecord{'
-        _temp = _cmd_info[0][_cmd_info[0].find(_findstr) + len(_findstr):].split(' ')
-        _package = _temp[2][0: _temp[2].find('/')]
-
-        return _package
+        return self.device_state()['current_package']
 
     @property
     def current_activity(self) -> str:
@@ -544,15 +759,7 @@ class AppDevice(object):
 
         @property {str}
         """
-        _cmd = 'shell dumpsys window windows | %s mFocusedApp' % self.grep_str
-        _cmd_info = self.adb_run_inner(_cmd)
-
-        # mFocusedActivity: ActivityRecord{e903df8 u0 com.ss.android.ugc.aweme/.splash.SplashActivity t172}
-        _findstr = 'ActivityRecord{'
-        _temp = _cmd_info[0][_cmd_info[0].find(_findstr) + len(_findstr):].split(' ')
-        _activity = _temp[2][_temp[2].find('/') + 1:].rstrip(',')
-
-        return _activity
+        return self.device_state()['current_activity']
 
     def wait_activity(self, app_activity: str, timeout: float, interval: float = 1) -> bool:
         """
@@ -566,7 +773,7 @@ class AppDevice(object):
         """
         _start = datetime.datetime.now()
         while (datetime.datetime.now() - _start).total_seconds() < timeout:
-            if app_activity == self.current_activity:
+            if app_activity == self.device_state(refresh=True)['current_activity']:
                 return True
 
             # 等待下一次检查
@@ -645,6 +852,7 @@ class AppDevice(object):
             _app_id, _activity
         )
         _cmd_info = self.adb_run_inner(_cmd)
+        self.clear_device_state()
         if len(_cmd_info) >= 2 and _cmd_info[-2].startswith('Error'):
             raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
 
@@ -661,6 +869,7 @@ class AppDevice(object):
 
         _cmd = 'shell am force-stop %s' % _app_id
         self.adb_run_inner(_cmd)
+        self.clear_device_state()
 
     #############################
     # 设备操作
@@ -671,12 +880,7 @@ class AppDevice(object):
 
         @returns {bool} - 返回屏幕是否点亮的状态
         """
-        _cmd = 'shell dumpsys window policy | %s mScreenOnEarly=' % self.grep_str
-        _cmd_info = self.adb_run_inner(_cmd)
-        if len(_cmd_info) > 0 and _cmd_info[0].find('mScreenOnEarly=true') >= 0:
-            return True
-        else:
-            return False
+        return self.device_state()['is_screen_on']
 
     def is_showing_lock_screen(self) -> bool:
         """
@@ -684,12 +888,7 @@ class AppDevice(object):
 
         @returns {bool} - 是否正在锁屏界面
         """
-        _cmd = 'shell dumpsys window policy | %s mShowingLockscreen=' % self.grep_str
-        _cmd_info = self.adb_run_inner(_cmd)
-        if len(_cmd_info) > 0 and _cmd_info[0].find('mShowingLockscreen=true') >= 0:
-            return True
-        else:
-            return False
+        return self.device_state()['is_showing_lock_screen']
 
     def is_power_on(self) -> bool:
         """
@@ -697,12 +896,7 @@ class AppDevice(object):
 
         @returns {bool} - 返回设备是否非休眠
         """
-        _cmd = 'shell dumpsys window policy | %s mAwake=' % self.grep_str
-        _cmd_info = self.adb_run_inner(_cmd)
-        if len(_cmd_info) > 0 and _cmd_info[0].find('mAwake=true') >= 0:
-            return True
-        else:
-            return False
+        return self.device_state()['is_power_on']
 
     def set_power_stayon(self, stay_type: str = 'true'):
         """
@@ -722,11 +916,16 @@ class AppDevice(object):
     # 屏幕操作
     #############################
 
-    def screenshot(self, filename: str = None) -> Image:
+    def screenshot(self, filename: str = None, image_format: str = None, quality: int = None,
+                   async_save: bool = False) -> Image:
         """
         保存屏幕截图
 
         @param {str} filename=None - 要保存的路径
+        @param {str} image_format=None - 保存的图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 保存的图片质量, JPEG/WEBP为1-100, PNG为压缩级别0-9
+        @param {bool} async_save=False - 是否在后台线程中保存文件(不等待保存完成)
+            注: 保存为PNG且不指定质量时直接使用设备生成的文件数据, 不重新编码
 
         @returns {PIL.Image} - 图片对象
         """
@@ -734,21 +933,47 @@ class AppDevice(object):
         _cmd = 'shell uiautomator runtest UiTestTools.jar -c com.snaker.testtools.uiScreenShot'
         self.adb_run_inner(_cmd)
 
+        # 判断是否可以直接将设备文件拉取到目标文件
+        _format = image_format
+        if filename is not None and _format is None:
+            _format = IMAGE_FORMATS.get(os.path.splitext(filename)[1].lower(), 'PNG')
+        _direct = (
+            filename is not None and not async_save and quality is None and _format.upper() == 'PNG'
+        )
+
         # 获取文件
         _filename = filename
-        if filename is None:
+        if not _direct:
             _filename = os.path.join(self.tmp_path, 'uiShot.png')
         _cmd = 'pull /data/local/tmp/uiShot.png %s' % _filename
         self.adb_run_inner(_cmd)
 
         # 加载为对象
         with open(_filename, 'rb') as _f:
-            _image = Image.open(BytesIO(_f.read()))
+            _data = _f.read()
+        _image = Image.open(BytesIO(_data))
 
-        if filename is None:
+        if not _direct:
             # 删除临时文件
             FileTool.remove_file(_filename)
 
+            if filename is not None:
+                # 按要求的格式保存
+                if quality is None and _format.upper() == 'PNG':
+                    _save_obj = _data
+                else:
+                    _image.load()
+                    _save_obj = _image
+
+                if async_save:
+                    ImageWriter.get_default().save(
+                        _save_obj, filename, image_format=_format, quality=quality
+                    )
+                else:
+                    ImageWriter.write_image(
+                        _save_obj, filename, image_format=_format, quality=quality
+                    )
+
         return _image
 
     def locate_on_screen(self, image, minSearchTime: int = 0, **kwargs):
@@ -760,25 +985,15 @@ class AppDevice(object):
         @param {dict} kwargs - 其他执行参数:
             {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
             {int} limit=10000 - 匹配数量限制
-            {int} step=1 - 匹配步骤，支持送1或2，如果为2会跳过细节，大约能提升3倍速度，但有可能匹配不上
             {float} confidence=0.999 - 匹配度
+            {str} engine=None - 使用的匹配引擎(numpy/opencv), 不传代表使用 ImageMatcher 的默认引擎
+            {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
+            {tuple|bool} hint=None - 优先查找的位置 (x, y, width, height), 传True代表使用该图片最后一次找到的位置
+            {int} pyramid=0 - 金字塔匹配的缩小倍数(例如4), 先在缩小的截图中粗匹配再在原图中确认, 0代表不使用
 
         @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 找不到返回None
         """
-        if type(image) == str:
-            _image = Image.open(image)
-        else:
-            _image = image
-
-        start = time.time()
-        while True:
-            try:
-                screenshotIm = self.screenshot()
-                retVal = pyscreeze.locate(_image, screenshotIm, **kwargs)
-                if retVal or time.time() - start > minSearchTime:
-                    return retVal
-            except pyscreeze.ImageNotFoundException:
-                return None
+        return self.wait_image(image, timeout=minSearchTime / 1000.0, **kwargs)
 
     def locate_all_on_screen(self, image, **kwargs):
         """
@@ -788,20 +1003,195 @@ class AppDevice(object):
         @param {dict} kwargs - 其他执行参数:
             {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
             {int} limit=10000 - 匹配数量限制
-            {int} step=1 - 匹配步骤，支持送1或2，如果为2会跳过细节，大约能提升3倍速度，但有可能匹配不上
             {float} confidence=0.999 - 匹配度
+            {str} engine=None - 使用的匹配引擎(numpy/opencv), 不传代表使用 ImageMatcher 的默认引擎
+            {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
 
         @returns {list} - 返回所找到的所有图片的位置
             [(x, y, width, height), ..]
         """
-        if type(image) == str:
-            _image = Image.open(image)
+        return self.locate_inner(self.grab_frame(), 'locate_all', image, **kwargs)
+
+    def locate_any_on_screen(self, images, **kwargs) -> tuple:
+        """
+        只截图一次, 按顺序在屏幕中查找多个图片, 返回第一个找到的图片
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(object, (int, int, int, int))} - 返回 (图片索引或key, 位置(x, y, width, height)),
+            都找不到返回 (None, None)
+        """
+        return self.locate_inner(self.grab_frame(), 'locate_any', images, **kwargs)
+
+    def locate_many_on_screen(self, images, **kwargs):
+        """
+        只截图一次, 在屏幕中定位多个图片的位置
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {list|dict} - 与images对应的位置清单 [(x, y, width, height), ...], 找不到的图片位置为None;
+            images为字典时返回 {key: 位置}
+        """
+        return self.locate_inner(self.grab_frame(), 'locate_many', images, **kwargs)
+
+    def screenshot_elements(self, elements: list, as_array: bool = False,
+                            frame: MatchFrame = None) -> list:
+        """
+        只截取一次屏幕, 从中裁剪出多个元素的截图
+        注: 以数组方式返回时为屏幕画面数组的视图, 不复制数据
+
+        @param {list} elements - 元素清单, 可以为AppElement对象或元素区域(x, y, width, height)
+        @param {bool} as_array=False - 是否返回RGB数组(np.ndarray), 否则返回PIL.Image对象
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表重新截图
+
+        @returns {list} - 与elements对应的元素截图清单
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        _array = _frame.get(False)['array']
+        _ret = list()
+        for _element in elements:
+            _rect = tuple(_element) if isinstance(_element, (tuple, list)) else _element.rect
+            _x, _y, _crop = ImageMatcher.crop(_array, _rect)
+            if as_array:
+                _ret.append(_crop)
+            else:
+                # 同一画面同一区域的截图直接从缓存获取
+                _ret.append(self.frame_cache.memoize(
+                    _frame, 'screenshot_element', _rect, lambda: Image.fromarray(_crop)
+                ))
+
+        return _ret
+
+    def probe_pixels_list(self, probes: list, frame: MatchFrame = None) -> list:
+        """
+        检查屏幕中的像素或小区域颜色是否符合要求, 返回每个条件的检查结果
+        注: 原始像素画面(exec-out screencap)只读取检查涉及的像素, 不转换整个画面
+
+        @param {list} probes - 检查条件清单, 参考 ImageMatcher.probe
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {list} - 与probes对应的检查结果(bool)清单
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        # 降采样哈希不能反映单个像素的变化, 检查结果不使用画面缓存
+        return ImageMatcher.probe(_frame, probes)
+
+    def probe_pixels(self, probes: list, match_all: bool = True, frame: MatchFrame = None) -> bool:
+        """
+        检查屏幕中的像素或小区域颜色是否符合要求(可用于if/loop的判断条件)
+
+        @param {list} probes - 检查条件清单, 参考 ImageMatcher.probe
+            例如: [{'point': (100, 200), 'color': (255, 0, 0), 'tolerance': 10}]
+        @param {bool} match_all=True - True-所有条件均满足才返回True, False-任意一个条件满足即返回True
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {bool} - 检查结果
+        """
+        _ret = self.probe_pixels_list(probes, frame=frame)
+        return all(_ret) if match_all else any(_ret)
+
+    def pixel_matches_color(self, x: int, y: int, color: tuple, tolerance: int = 0,
+                            frame: MatchFrame = None) -> bool:
+        """
+        检查屏幕指定位置的像素颜色是否与指定颜色匹配
+
+        @param {int} x - 屏幕x坐标
+        @param {int} y - 屏幕y坐标
+        @param {tuple} color - 期望的颜色 (r, g, b)
+        @param {int} tolerance=0 - 每个颜色通道允许的误差
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {bool} - 检查结果
+        """
+        return self.probe_pixels_list([(x, y, color, tolerance)], frame=frame)[0]
+
+    def pixel_color(self, x: int, y: int, frame: MatchFrame = None) -> tuple:
+        """
+        获取屏幕指定位置的像素颜色
+
+        @param {int} x - 屏幕x坐标
+        @param {int} y - 屏幕y坐标
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {(int, int, int)} - 返回RGB三色结果, 坐标超出屏幕范围返回None
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        return ImageMatcher.pixel_color(_frame, x, y)
+
+    def grab_frame(self):
+        """
+        获取用于图像匹配的屏幕画面(使用最快的获取方式, 不保存文件)
+        注: 优先通过 exec-out screencap 直接获取原始像素, 获取失败时改用 screenshot 获取,
+            之后的 raw_screencap_retry 个画面继续使用 screenshot, 再重新尝试 exec-out screencap
+
+        @returns {MatchFrame} - 屏幕画面
+        """
+        if self._raw_screencap_skip <= 0:
+            try:
+                return MatchFrame(AdbTools.screencap_raw(
+                    self.adb_name, self._desired_caps['deviceName'], timeout=self.channel_timeout
+                ))
+            except (RuntimeError, subprocess.TimeoutExpired):
+                self._raw_screencap_skip = self.raw_screencap_retry
         else:
-            _image = image
+            self._raw_screencap_skip -= 1
+
+        return MatchFrame(self.screenshot())
+
+    def locate_inner(self, frame: MatchFrame, operation: str, images, **kwargs):
+        """
+        在屏幕画面中执行图片定位(同一画面相同参数的结果直接从缓存获取)
+
+        @param {MatchFrame} frame - 屏幕画面
+        @param {str} operation - ImageMatcher的定位函数名, locate/locate_all/locate_any/locate_many
+        @param {object} images - 要定位的图片或图片清单
+        @param {kwargs} - 定位函数的其他参数
 
-        screenshotIm = self.screenshot()
-        retVal = pyscreeze.locateAll(_image, screenshotIm, **kwargs)
-        return list(retVal)
+        @returns {object} - 定位函数的返回结果
+        """
+        return self.frame_cache.memoize(
+            frame, operation, (images, kwargs),
+            lambda: getattr(ImageMatcher, operation)(images, frame, **kwargs)
+        )
+
+    def wait_image(self, image, timeout: float = 10.0, interval: float = 0.2, **kwargs) -> tuple:
+        """
+        等待指定图片出现在屏幕中
+        注: 屏幕画面没有变化时不重复匹配, 且不会在超时时间之后再截图
+
+        @param {str|PIL.Image} image - 要定位的图片文件路径或图片对象
+        @param {float} timeout=10.0 - 最长等待时间, 单位为秒, 传0代表只查找一次
+        @param {float} interval=0.2 - 每次截图的间隔时间, 单位为秒
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 超时返回None
+        """
+        return ImageMatcher.wait_match(
+            self.grab_frame, lambda frame: self.locate_inner(frame, 'locate', image, **kwargs),
+            timeout, interval=interval
+        )
+
+    def wait_any_image(self, images, timeout: float = 10.0, interval: float = 0.2,
+                       **kwargs) -> tuple:
+        """
+        等待多个图片中任意一个出现在屏幕中
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {float} timeout=10.0 - 最长等待时间, 单位为秒, 传0代表只查找一次
+        @param {float} interval=0.2 - 每次截图的间隔时间, 单位为秒
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(object, (int, int, int, int))} - 返回 (图片索引或key, 位置(x, y, width, height)),
+            超时返回 (None, None)
+        """
+        def _match_fun(frame):
+            _ret = self.locate_inner(frame, 'locate_any', images, **kwargs)
+            return None if _ret[0] is None else _ret
+
+        _ret = ImageMatcher.wait_match(self.grab_frame, _match_fun, timeout, interval=interval)
+        return (None, None) if _ret is None else _ret
 
     #############################
     # 动作 - 滑动
@@ -815,11 +1205,11 @@ class AppDevice(object):
         @param {tuple} end - 滑动结束点的 (x, y) 位置
         @param {int} duration=0 - 滑动经历时长，单位为毫秒
         """
-        _cmd = 'shell input swipe %d %d %d %d%s' % (
+        _cmd = 'input swipe %d %d %d %d%s' % (
             start[0], start[1], end[0], end[1],
             '' if duration == 0 else ' %d' % duration
         )
-        self.adb_run_inner(_cmd)
+        self.input_cmd_inner(_cmd)
 
     def swipe_up(self, x: int = None, y: int = None, swipe_len: int = None, duration: int = 0):
         """
@@ -954,64 +1344,41 @@ class AppDevice(object):
         if y is None:
             y = math.ceil(_h / 2.0)
 
-        _cmd_mode = '%s -s %s shell input tap' % (self.adb_name, self._desired_caps['deviceName'])
-        _cmd_list = list()
-        for i in range(count):
-            _cmd_list.append('%s %d %d' % (_cmd_mode, x, y))
-        _cmd = ' && '.join(_cmd_list)
-        _code, _cmd_info = RunTool.exec_sys_cmd(_cmd, shell_encoding=self.shell_encoding)
-        if _code != 0:
-            raise RuntimeError('exec cmd [%s] error[%d]: %s' % (_cmd, _code, '\n'.join(_cmd_info)))
+        # 多次点击通过批量输入在一次adb调用中完成
+        with self.input_batch():
+            for i in range(count):
+                self.input_cmd_inner('input tap %d %d' % (x, y))
 
     def tap_continuity(self, pos_seed: list, times: float, thread_count: int = 2,
-                       random_sleep: bool = False, sleep_min: float = 0.0, sleep_max: float = 0.5):
+                       random_sleep: bool = False, sleep_min: float = 0.0, sleep_max: float = 0.5,
+                       rate: float = 10.0) -> dict:
         """
         在指定范围随机连续点击
+        注: 按指定频率通过持久化shell通道发送点击命令, 到达时长后停止发送并等待已发送的命令完成
 
         @param {list} pos_seed - 允许点击的位置坐标清单[(x,y), ...], 随机获取
         @param {float} times - 要点击的时长, 单位为秒
-        @param {int} thread_count=2 - 生产点击线程，数量越多点击频率越密集
-        @param {bool} random_sleep=False - 每个线程点击期间是否自动休眠指定时长
-        @param {float} sleep_min=0.0 - 每个线程点击期间自动休眠最小时长, 单位为秒
-        @param {float} sleep_max=0.5 - 每个线程点击期间自动休眠最大时长, 单位为秒
-        """
-        # 参数准备
-        _cmd_mode = 'shell input tap'
-        _seed_len = len(pos_seed)
-
-        # 定义点击线程函数
-        def tap_thread_fun():
-            while True:
-                # 循环处理，自身不结束
-                _pos = pos_seed[random.randint(0, _seed_len - 1)]
-                _cmd = '%s %d %d' % (_cmd_mode, _pos[0], _pos[1])
-                # 不检查结果
-                self.adb_run_inner(_cmd, ignore_error=True)
-                # 看是否休眠
-                if random_sleep:
-                    time.sleep(random.uniform(sleep_min, sleep_max))
-
-        # 启动执行动作
-        _start = datetime.datetime.now()
-        _thread_list = list()
-        for i in range(thread_count):
-            _running_thread = threading.Thread(
-                target=tap_thread_fun,
-                name='Thread-Tap-Running %s' % str(i)
-            )
-            _running_thread.setDaemon(True)
-            _running_thread.start()
+        @param {int} thread_count=2 - 同时在途(已发送未完成)的点击命令数量上限
+        @param {bool} random_sleep=False - 两个点击间是否增加随机休眠时长
+        @param {float} sleep_min=0.0 - 两个点击间增加的随机休眠最小时长, 单位为秒
+        @param {float} sleep_max=0.5 - 两个点击间增加的随机休眠最大时长, 单位为秒
+        @param {float} rate=10.0 - 目标点击频率, 单位为次/秒
 
-            # 添加到列表，用于停止线程
-            _thread_list.append(_running_thread)
+        @returns {dict} - 点击统计信息, 格式参考 TapRateScheduler.run
+        """
+        _channel = self.get_shell_channel()
 
-        # 监控时长
-        while (datetime.datetime.now() - _start).total_seconds() < times:
-            time.sleep(0.01)
+        def _ack_fun(seq, timeout):
+            _ret = _channel.wait(seq, timeout=timeout)
+            return None if _ret is None else _ret['time']
 
-        # 停止线程
-        for _thread in _thread_list:
-            RunTool.stop_thread(_thread)
+        _scheduler = TapRateScheduler(
+            lambda x, y: _channel.send('input tap %d %d' % (x, y), wait=False), _ack_fun,
+            rate=rate, max_in_flight=thread_count,
+            jitter=(sleep_min, sleep_max) if random_sleep else None,
+            alive_fun=lambda: _channel.is_alive, discard_fun=_channel.discard
+        )
+        return _scheduler.run(pos_seed, times)
 
     def long_press(self, x: int = None, y: int = None, duration: int = 1000):
         """
@@ -1051,7 +1418,7 @@ class AppDevice(object):
 
         if len(args) == 0:
             # 只发送一个按键
-            _cmd = 'shell input keyevent %s' % str(_key_code)
+            _cmd = 'input keyevent %s' % str(_key_code)
         else:
             # 发送多个按键
             _key_list = [str(_key_code), ]
@@ -1064,10 +1431,49 @@ class AppDevice(object):
 
                 _key_list.append(str(_key))
 
-            _cmd = 'shell input keyevent %s' % ' '.join(_key_list)
+            _cmd = 'input keyevent %s' % ' '.join(_key_list)
 
-        # 执行发送
-        self.adb_run_inner(_cmd)
+        # 执行发送, 按键可能改变屏幕及应用状态
+        self.input_cmd_inner(_cmd)
+        self.clear_device_state()
+
+    def input_text(self, text: str):
+        """
+        通过adb的 input text 方式输入文本
+        注: 只支持ascii字符, 中文等字符请使用 adb_keyboard_text
+
+        @param {str} text - 要输入的文本
+        """
+        # input text 以 %s 表示空格, 并用单引号避免设备端shell解析特殊字符
+        _text = text.replace(' ', '%s').replace("'", "'\\''")
+        if sys.platform != 'win32':
+            # 整个脚本会放在主机shell的双引号中执行, 需要转义双引号内的特殊字符
+            for _char in ('\\', '"', '$', '`'):
+                _text = _text.replace(_char, '\\' + _char)
+        else:
+            _text = _text.replace('"', '\\"')
+
+        self.input_cmd_inner("input text '%s'" % _text)
+
+    def input_batch(self, interval: float = 0, raise_on_error: bool = True):
+        """
+        获取批量输入对象, 通过with语句使用
+        注: with语句块中的 tap/swipe/long_press/press_keycode/input_text 等输入操作不会立即执行,
+            退出语句块时合并为一个 adb shell 脚本一次执行
+
+        @example
+            with device.input_batch(interval=0.1) as _batch:
+                device.tap(100, 200)
+                device.input_text('hello')
+                device.press_keycode('ENTER')
+            print(_batch.results)
+
+        @param {float} interval=0 - 每个输入命令之间的休眠时长, 单位为秒
+        @param {bool} raise_on_error=True - 有命令执行失败时是否抛出异常
+
+        @returns {AdbInputBatch} - 批量输入对象
+        """
+        return AdbInputBatch(self, interval=interval, raise_on_error=raise_on_error)
 
     def get_default_ime(self) -> str:
         """
@@ -1129,26 +1535,29 @@ class AppDevice(object):
         if not _cmd_info[0].startswith('Input method'):
             raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
 
-    def adb_keyboard_text(self, text: str, use_base64: bool = False):
+    def adb_keyboard_text(self, text: str, use_base64: bool = False, chunk_size: int = 512):
         """
         使用 ADBKeyBoard 输入文本
         参考: https://github.com/senzhk/ADBKeyBoard
         注意: 控制的安卓机必须安装 ADBKeyBoard 并设置为默认输入法
+        注: 通过持久化shell通道发送, 长文本会拆分为多个BASE64分片流水线发送
 
         @param {str} text - 要输入的文本
-        @param {bool} use_base64=False - 是否转换为BASE64格式
-        """
-        _chars = text
-        if use_base64:
-            _charsb64 = str(base64.b64encode(_chars.encode('utf-8')))[1:]
-            _cmd = 'shell am broadcast -a ADB_INPUT_B64 --es msg %s' % _charsb64
+        @param {bool} use_base64=False - 是否转换为BASE64格式, 文本超过chunk_size时固定使用BASE64格式
+        @param {int} chunk_size=512 - 每个分片的最大字节数(BASE64编码前)
+        """
+        _data = text.encode('utf-8')
+        if use_base64 or len(_data) > chunk_size:
+            _cmds = list()
+            for _chunk in AdbTools.split_utf8(text, chunk_size):
+                _cmds.append('am broadcast -a ADB_INPUT_B64 --es msg %s' % str(
+                    base64.b64encode(_chunk), encoding='ascii'
+                ))
         else:
-            _cmd = 'shell am broadcast -a ADB_INPUT_TEXT --es msg \'%s\'' % _chars
+            _cmds = ['am broadcast -a ADB_INPUT_TEXT --es msg %s' % AdbTools.shell_quote(text), ]
 
         # 执行发送
-        _cmd_info = self.adb_run_inner(_cmd)
-        if _cmd_info[1].strip() != 'Broadcast completed: result=0':
-            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
+        self.channel_run_inner(_cmds, check_str='Broadcast completed: result=0')
 
     def adb_keyboard_keycode(self, key_code, *args):
         """
@@ -1298,6 +1707,469 @@ class AppDevice(object):
         )
 
 
+class AdbInputBatch(object):
+    """
+    批量输入对象, 将多个输入命令合并为一个 adb shell 脚本执行
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, device: AppDevice, interval: float = 0, raise_on_error: bool = True):
+        """
+        构造函数
+
+        @param {AppDevice} device - 要执行输入的设备对象
+        @param {float} interval=0 - 每个输入命令之间的休眠时长, 单位为秒
+        @param {bool} raise_on_error=True - 有命令执行失败时是否抛出异常
+        """
+        self.device = device
+        self.interval = interval
+        self.raise_on_error = raise_on_error
+
+        # 待执行的命令清单
+        self.cmds = list()
+
+        # 执行结果清单, 每个结果为一个字典
+        #   cmd {str} - 执行的命令
+        #   code {int} - 命令返回码, 0代表成功, 没有获取到返回码为None
+        #   output {list} - 命令的输出信息
+        self.results = list()
+
+        # 是否嵌套在外层的批量输入中
+        self._is_nested = False
+
+    #############################
+    # with 语句支持
+    #############################
+    def __enter__(self):
+        if self.device._input_batch is not None:
+            # 已在批量输入中, 命令直接加入外层批量对象
+            self._is_nested = True
+            return self.device._input_batch
+
+        self.device._input_batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        if self._is_nested:
+            return False
+
+        self.device._input_batch = None
+        if exc_type is None:
+            self.flush()
+
+        return False
+
+    #############################
+    # 公共函数
+    #############################
+    def append(self, cmd: str):
+        """
+        添加要执行的命令
+
+        @param {str} cmd - 设备端执行的命令
+        """
+        self.cmds.append(cmd)
+
+    def sleep(self, seconds: float):
+        """
+        在命令之间加入休眠
+
+        @param {float} seconds - 休眠时长, 单位为秒
+        """
+        self.cmds.append('sleep %s' % str(seconds))
+
+    def get_script(self) -> str:
+        """
+        获取要执行的组合脚本
+
+        @returns {str} - 设备端执行的shell脚本
+        """
+        # 脚本放在主机shell的双引号中执行, 非windows环境需要转义$避免在主机端被解析
+        _ret_var = '$?' if sys.platform == 'win32' else '\\$?'
+        _script_list = list()
+        for _i in range(len(self.cmds)):
+            if _i > 0 and self.interval > 0:
+                _script_list.append('sleep %s' % str(self.interval))
+
+            _script_list.append(self.cmds[_i])
+            _script_list.append('echo %s%d_%s__' % (INPUT_BATCH_RET_MARK, _i, _ret_var))
+
+        return '; '.join(_script_list)
+
+    def flush(self) -> list:
+        """
+        执行已收集的命令
+
+        @returns {list} - 执行结果清单, 格式参考 results
+        """
+        if len(self.cmds) == 0:
+            return list()
+
+        _cmd = 'shell "%s"' % self.get_script()
+        _cmds = self.cmds
+        self.cmds = list()
+        _cmd_info = self.device.adb_run_inner(_cmd, ignore_error=True)
+        self.device.clear_device_state()
+
+        # 解析每个命令的返回码及输出
+        _results = [{'cmd': _c, 'code': None, 'output': []} for _c in _cmds]
+        _index = 0
+        for _line in _cmd_info:
+            _line = _line.strip()
+            if _line.startswith(INPUT_BATCH_RET_MARK) and _line.endswith('__'):
+                _ret = _line[len(INPUT_BATCH_RET_MARK):-2].split('_')
+                _index = int(_ret[0])
+                _results[_index]['code'] = int(_ret[1])
+                _index += 1
+            elif _line != '' and _index < len(_results):
+                _results[_index]['output'].append(_line)
+
+        self.results.extend(_results)
+
+        # 检查执行结果
+        if self.raise_on_error:
+            for _result in _results:
+                if _result['code'] != 0:
+                    raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
+
+        return _results
+
+
+class AdbShellChannel(object):
+    """
+    持久化的adb shell通道
+    注: 启动一个常驻的 adb shell 进程, 通过标准输入持续发送命令, 避免每个命令都启动adb进程;
+        支持不等待结果连续发送命令(流水线), 再通过序号等待命令完成;
+        通道的输入输出是设备端的数据流, 固定使用utf-8编码(与主机的 SHELL_ENCODING 无关)
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, adb_name: str, device_name: str):
+        """
+        构造函数
+
+        @param {str} adb_name - adb命令名
+        @param {str} device_name - 设备名, 传''代表不使用设备名
+        """
+        self.adb_name = adb_name
+        self.device_name = device_name
+        self.encoding = 'utf-8'
+
+        self._process = None
+        self._read_thread = None
+        self._send_lock = threading.Lock()
+        self._ack_condition = threading.Condition()
+        self._seq = 0
+
+        # 已完成的命令结果, key为命令序号
+        self._acks = dict()
+        # 不再等待结果的命令序号, 结果返回后直接丢弃
+        self._discards = set()
+        # 当前命令已收到的输出
+        self._output = list()
+
+    #############################
+    # 属性
+    #############################
+    @property
+    def is_open(self) -> bool:
+        """
+        通道是否已打开
+        @property {bool}
+        """
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def is_alive(self) -> bool:
+        """
+        通道的输出读取是否正常(读取线程结束代表shell进程已退出, 不会再返回命令结果)
+        @property {bool}
+        """
+        return self._read_thread is not None and self._read_thread.is_alive()
+
+    #############################
+    # 公共函数
+    #############################
+    def open(self):
+        """
+        打开通道
+        """
+        if self.is_open:
+            return
+
+        _cmd = [self.adb_name, ]
+        if self.device_name != '':
+            _cmd.extend(['-s', self.device_name])
+        _cmd.append('shell')
+
+        self._acks.clear()
+        self._discards.clear()
+        self._output = list()
+        self._process = subprocess.Popen(
+            _cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        self._read_thread = threading.Thread(
+            target=self._read_thread_fun, name='Thread-AdbShellChannel-%s' % self.device_name
+        )
+        self._read_thread.setDaemon(True)
+        self._read_thread.start()
+
+    def close(self, timeout: float = 2.0):
+        """
+        关闭通道
+
+        @param {float} timeout=2.0 - 等待shell进程退出的超时时间, 超时将强制结束进程, 单位为秒
+        """
+        if self._process is None:
+            return
+
+        _process = self._process
+        self._process = None
+        try:
+            _process.stdin.write(b'exit\n')
+            _process.stdin.close()
+        except:
+            pass
+
+        try:
+            _process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _process.kill()
+            _process.wait()
+
+        if self._read_thread is not None:
+            self._read_thread.join(timeout=timeout)
+            self._read_thread = None
+
+    def send(self, cmd: str, wait: bool = True, timeout: float = None):
+        """
+        发送命令
+
+        @param {str} cmd - 设备端执行的命令
+        @param {bool} wait=True - 是否等待命令完成
+        @param {float} timeout=None - 等待命令完成的超时时间, 单位为秒, None代表一直等待
+
+        @returns {int|dict} - 不等待时返回命令序号, 可通过 wait 等待结果; 等待时返回执行结果, 格式参考 wait
+        """
+        if not self.is_open:
+            raise RuntimeError('adb shell channel of device [%s] is not open' % self.device_name)
+
+        with self._send_lock:
+            _seq = self._seq
+            self._seq += 1
+            self._process.stdin.write(
+                ('%s; echo %s%d_$?__\n' % (cmd, SHELL_CHANNEL_ACK_MARK, _seq)).encode(self.encoding)
+            )
+            self._process.stdin.flush()
+
+        if not wait:
+            return _seq
+
+        _ret = self.wait(_seq, timeout=timeout)
+        if _ret is None:
+            raise RuntimeError('exec cmd [%s] timeout' % cmd)
+
+        return _ret
+
+    def wait(self, seq: int, timeout: float = None) -> dict:
+        """
+        等待命令完成
+
+        @param {int} seq - 命令序号
+        @param {float} timeout=None - 超时时间, 单位为秒, None代表一直等待
+
+        @returns {dict} - 执行结果, 超时或通道关闭返回None
+            code {int} - 命令返回码
+            output {list} - 命令的输出信息
+            time {float} - 命令完成的时间戳
+        """
+        with self._ack_condition:
+            self._ack_condition.wait_for(
+                lambda: seq in self._acks.keys() or self._read_thread is None or not self._read_thread.is_alive(),
+                timeout=timeout
+            )
+            return self._acks.pop(seq, None)
+
+    def discard(self, seqs: list):
+        """
+        放弃等待命令结果(已返回的结果删除, 未返回的结果返回后直接丢弃)
+
+        @param {list} seqs - 命令序号清单
+        """
+        with self._ack_condition:
+            for _seq in seqs:
+                if self._acks.pop(_seq, None) is None:
+                    self._discards.add(_seq)
+
+    #############################
+    # 内部函数
+    #############################
+    def _read_thread_fun(self):
+        """
+        读取shell输出的线程函数
+        """
+        _process = self._process
+        for _line in iter(_process.stdout.readline, b''):
+            _line = _line.decode(self.encoding, errors='replace').rstrip('\r\n')
+            if _line.startswith(SHELL_CHANNEL_ACK_MARK) and _line.endswith('__'):
+                _ret = _line[len(SHELL_CHANNEL_ACK_MARK):-2].split('_')
+                with self._ack_condition:
+                    _seq = int(_ret[0])
+                    if _seq in self._discards:
+                        self._discards.discard(_seq)
+                    else:
+                        self._acks[_seq] = {
+                            'code': int(_ret[1]), 'output': self._output, 'time': time.time()
+                        }
+                    self._output = list()
+                    self._ack_condition.notify_all()
+            else:
+                self._output.append(_line)
+
+        # 进程已结束, 通知所有等待的调用
+        with self._ack_condition:
+            self._ack_condition.notify_all()
+
+
+class TapRateScheduler(object):
+    """
+    按频率执行连续点击的调度器
+    注: 在调用线程中按目标频率提交点击, 控制在途命令数量, 到达时长后停止提交并等待在途命令完成,
+        不需要通过强制结束线程的方式停止; 通道断开时立即停止, 未确认的点击记为丢失
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, submit_fun, ack_fun, rate: float = 10.0, max_in_flight: int = 2,
+                 jitter: tuple = None, drain_timeout: float = 2.0, alive_fun=None, discard_fun=None):
+        """
+        构造函数
+
+        @param {function} submit_fun - 提交点击的函数, submit_fun(x, y), 返回用于等待完成的句柄
+        @param {function} ack_fun - 等待点击完成的函数, ack_fun(handle, timeout),
+            返回点击完成的时间戳, 超时返回None
+        @param {float} rate=10.0 - 目标点击频率, 单位为次/秒
+        @param {int} max_in_flight=2 - 同时在途的点击数量上限
+        @param {tuple} jitter=None - 每次点击间隔增加的随机时长范围(min, max), 单位为秒
+        @param {float} drain_timeout=2.0 - 停止提交后等待在途点击完成的超时时间, 单位为秒
+        @param {function} alive_fun=None - 检查通道是否正常的函数, alive_fun(), 返回False代表不会再有点击完成,
+            用于区分等待超时和通道断开, None代表不检查
+        @param {function} discard_fun=None - 放弃等待未确认点击的函数, discard_fun(handles), 用于清理未确认点击的结果
+        """
+        self.submit_fun = submit_fun
+        self.ack_fun = ack_fun
+        self.rate = rate
+        self.max_in_flight = max(1, max_in_flight)
+        self.jitter = jitter
+        self.drain_timeout = drain_timeout
+        self.alive_fun = alive_fun
+        self.discard_fun = discard_fun
+
+    #############################
+    # 公共函数
+    #############################
+    def run(self, pos_seed: list, times: float) -> dict:
+        """
+        执行连续点击
+
+        @param {list} pos_seed - 允许点击的位置坐标清单[(x,y), ...], 随机获取
+        @param {float} times - 要点击的时长, 单位为秒
+
+        @returns {dict} - 点击统计信息
+            target_rate {float} - 目标点击频率
+            rate {float} - 实际完成的点击频率
+            sent {int} - 已提交的点击数
+            completed {int} - 已完成的点击数
+            lost {int} - 超时未确认完成的点击数
+            errors {int} - 提交失败的点击数
+            channel_lost {bool} - 是否因通道断开提前停止
+            duration {float} - 执行总时长, 单位为秒
+            latency_avg / latency_min / latency_max / latency_p95 {float} - 提交到完成的延时, 单位为秒
+        """
+        _interval = 1.0 / self.rate
+        _pending = collections.deque()
+        _latencies = list()
+        _sent = 0
+        _errors = 0
+        _channel_lost = False
+
+        _start = time.time()
+        _deadline = _start + times
+        _next = _start
+        while True:
+            _now = time.time()
+            if _now >= _deadline:
+                break
+
+            # 在途数量达到上限, 等待最早的点击完成
+            if len(_pending) >= self.max_in_flight:
+                _ack_time = self.ack_fun(_pending[0][0], _deadline - _now)
+                if _ack_time is not None:
+                    _latencies.append(_ack_time - _pending.popleft()[1])
+                elif self.alive_fun is not None and not self.alive_fun():
+                    # 通道已断开, 不会再有点击完成
+                    _channel_lost = True
+                    break
+                continue
+
+            # 等待下一次点击的时间
+            if _now < _next:
+                time.sleep(min(_next, _deadline) - _now)
+                continue
+
+            _pos = pos_seed[random.randint(0, len(pos_seed) - 1)]
+            try:
+                _pending.append((self.submit_fun(_pos[0], _pos[1]), time.time()))
+                _sent += 1
+            except:
+                _errors += 1
+                if self.alive_fun is not None and not self.alive_fun():
+                    _channel_lost = True
+                    break
+
+            _next += _interval
+            if self.jitter is not None:
+                _next += random.uniform(self.jitter[0], self.jitter[1])
+            if _next < _now - _interval:
+                # 执行出现阻塞, 不补发落后的点击
+                _next = _now
+
+        # 停止提交, 等待在途的点击完成
+        _drain_deadline = time.time() + self.drain_timeout
+        while len(_pending) > 0 and not _channel_lost:
+            _ack_time = self.ack_fun(_pending[0][0], max(_drain_deadline - time.time(), 0))
+            if _ack_time is None:
+                break
+            _latencies.append(_ack_time - _pending.popleft()[1])
+
+        # 放弃等待未确认的点击
+        if len(_pending) > 0 and self.discard_fun is not None:
+            self.discard_fun([_item[0] for _item in _pending])
+
+        # 统计信息
+        _latencies.sort()
+        _count = len(_latencies)
+        return {
+            'target_rate': self.rate,
+            'rate': _count / times if times > 0 else 0.0,
+            'sent': _sent,
+            'completed': _count,
+            'lost': len(_pending),
+            'errors': _errors,
+            'channel_lost': _channel_lost,
+            'duration': time.time() - _start,
+            'latency_avg': sum(_latencies) / _count if _count > 0 else None,
+            'latency_min': _latencies[0] if _count > 0 else None,
+            'latency_max': _latencies[-1] if _count > 0 else None,
+            'latency_p95': _latencies[min(int(_count * 0.95), _count - 1)] if _count > 0 else None
+        }
+
+
 class AdbTools(object):
     """
     Adb命令工具
@@ -1327,11 +2199,90 @@ class AdbTools(object):
             cmd
         )
         _code, _cmd_info = RunTool.exec_sys_cmd(_cmd, shell_encoding=shell_encoding)
+        if _code != 0 and device_name != '':
+            # 设备断开连接, 重连后的设备不一定是原来的设备, 清除缓存的设备信息
+            _info = '\n'.join(_cmd_info)
+            for _flag in ADB_DISCONNECT_FLAGS:
+                if _info.find(_flag) >= 0:
+                    DeviceFacts.invalidate(device_name)
+                    break
+
         if _code != 0 and not ignore_error:
             raise RuntimeError('run sys cmd [%s] error: %s' % (str(_code), '\n'.join(_cmd_info)))
 
         return _cmd_info
 
+    @classmethod
+    def screencap_raw(cls, adb: str, device_name: str, timeout: float = 10.0) -> np.ndarray:
+        """
+        通过 exec-out screencap 直接获取屏幕的原始像素(不经过png编码及文件传输)
+
+        @param {str} adb - 命令标识
+        @param {str} device_name - 设备名, 传''代表不使用设备名
+        @param {float} timeout=10.0 - 超时时间, 单位为秒
+
+        @returns {np.ndarray} - 屏幕画面的RGB数组 (H, W, 3)
+        """
+        _cmd = [adb]
+        if device_name != '':
+            _cmd.extend(['-s', device_name])
+        _cmd.extend(['exec-out', 'screencap'])
+
+        _proc = subprocess.run(
+            _cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+        )
+        _data = _proc.stdout
+        if _proc.returncode != 0 or len(_data) < 12:
+            raise RuntimeError('exec cmd [%s] error: %s' % (
+                ' '.join(_cmd), _proc.stderr.decode('utf-8', errors='ignore')
+            ))
+
+        # 文件头为宽、高、像素格式(Android 9以上增加颜色空间), 像素格式: 1-RGBA, 2-RGBX, 5-BGRA
+        _w, _h, _format = struct.unpack('<III', _data[0:12])
+        _header = len(_data) - _w * _h * 4
+        if _header not in (12, 16) or _format not in (1, 2, 5):
+            raise RuntimeError('unsupported screencap data: width=%d, height=%d, format=%d, size=%d' % (
+                _w, _h, _format, len(_data)
+            ))
+
+        _array = np.frombuffer(_data, dtype=np.uint8, offset=_header).reshape((_h, _w, 4))
+        return _array[:, :, 2::-1] if _format == 5 else _array[:, :, 0:3]
+
+    @classmethod
+    def shell_quote(cls, text: str) -> str:
+        """
+        将文本转换为设备端shell的单引号参数
+
+        @param {str} text - 要转换的文本
+
+        @returns {str} - 可直接作为shell参数的字符串
+        """
+        return "'%s'" % text.replace("'", "'\\''")
+
+    @classmethod
+    def split_utf8(cls, text: str, max_bytes: int) -> list:
+        """
+        按utf-8编码的字节数拆分文本, 保证不会拆开单个字符
+
+        @param {str} text - 要拆分的文本
+        @param {int} max_bytes - 每个分片的最大字节数
+
+        @returns {list} - 拆分后的utf-8字节分片清单
+        """
+        _chunks = list()
+        _chunk = b''
+        for _char in text:
+            _bytes = _char.encode('utf-8')
+            if len(_chunk) + len(_bytes) > max_bytes and len(_chunk) > 0:
+                _chunks.append(_chunk)
+                _chunk = b''
+            _chunk += _bytes
+
+        if len(_chunk) > 0:
+            _chunks.append(_chunk)
+
+        return _chunks
+
     @classmethod
     def adb_file_exists(cls, adb: str, device_name: str, file: str, shell_encoding: str = None) -> bool:
         """
@@ -1356,6 +2307,284 @@ class AdbTools(object):
             return True
 
 
+class DeviceFacts(object):
+    """
+    设备静态信息登记簿(屏幕大小、SDK版本、CPU架构)
+    注: 1、按设备序列号(ro.serialno)缓存, 并持久化到本地文件;
+        2、每个进程首次使用设备时通过一次轻量查询(序列号及开机id)校验缓存, 设备更换或重启后重新获取完整信息,
+            未指定设备名('')时使用查询到的序列号作为缓存的key, 不会将信息登记到空设备名下;
+            获取不到序列号的设备(例如部分模拟器)按设备名缓存在内存中, 不持久化;
+        3、在设备断开连接或通过 wm size 修改了显示分辨率时会自动失效(屏幕旋转不改变 wm size 的结果, 不会失效),
+            也可以通过 invalidate 主动失效
+    """
+    # 缓存的设备信息, key为设备序列号, value为信息字典
+    #   size {list} - 屏幕物理大小 [width, height]
+    #   wm_size {list} - 当前显示大小(wm size 设置的大小, 没有设置时为物理大小) [width, height]
+    #   sdk {int} - 安卓SDK版本号
+    #   abi {str} - CPU架构, 例如 arm64-v8a
+    #   serialno {str} - 设备序列号
+    #   boot_id {str} - 设备开机id, 设备重启后变化
+    #   update_time {float} - 获取信息的时间戳
+    _facts = None
+    _lock = threading.RLock()
+
+    # 获取不到序列号的设备信息(不持久化), key为设备名, value为信息字典
+    _transient = dict()
+
+    # 当前进程已校验的设备, key为设备名, value为缓存的key(设备序列号, 获取不到序列号时为'')
+    _verified = dict()
+
+    # 日志对象, 可以替换为指定的日志对象
+    logger = logging.getLogger()
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _get_file(cls) -> str:
+        """
+        获取持久化文件路径
+        注: 可通过全局变量 DEVICE_FACTS_FILE 指定, 设置为 '' 代表不持久化
+
+        @returns {str} - 文件路径
+        """
+        return RunTool.get_global_var(
+            'DEVICE_FACTS_FILE',
+            default=os.path.join(os.path.expanduser('~'), '.HandLessRobot', 'device_facts.json')
+        )
+
+    @classmethod
+    def _load(cls):
+        """
+        从持久化文件装载信息(只在首次访问时装载)
+        """
+        if cls._facts is not None:
+            return
+
+        cls._facts = dict()
+        _file = cls._get_file()
+        if _file == '' or not os.path.exists(_file):
+            return
+
+        try:
+            with open(_file, 'r', encoding='utf-8') as _f:
+                cls._facts = json.loads(_f.read())
+        except Exception as e:
+            # 文件损坏当作没有缓存处理
+            cls.logger.warning('load device facts file [%s] error: %s' % (_file, str(e)))
+            cls._facts = dict()
+
+    @classmethod
+    def _save(cls):
+        """
+        保存信息到持久化文件
+        """
+        _file = cls._get_file()
+        if _file == '':
+            return
+
+        try:
+            FileTool.create_dir(os.path.dirname(_file), exist_ok=True)
+            _tmp_file = '%s.tmp' % _file
+            with open(_tmp_file, 'w', encoding='utf-8') as _f:
+                _f.write(json.dumps(cls._facts, ensure_ascii=False))
+            os.replace(_tmp_file, _file)
+        except Exception as e:
+            # 持久化失败不影响内存缓存的使用
+            cls.logger.warning('save device facts file [%s] error: %s' % (_file, str(e)))
+
+    @classmethod
+    def _query(cls, device_name: str, adb_name: str = 'adb', shell_encoding: str = None) -> dict:
+        """
+        通过一次adb调用查询设备的静态信息
+
+        @param {str} device_name - 设备名
+        @param {str} adb_name='adb' - adb命令名
+        @param {str} shell_encoding=None - shell的编码
+
+        @returns {dict} - 设备信息字典
+        """
+        _cmd = (
+            'shell "getprop ro.serialno; cat /proc/sys/kernel/random/boot_id; '
+            'getprop ro.product.cpu.abi; getprop ro.build.version.sdk; wm size"'
+        )
+        _cmd_info = AdbTools.adb_run(adb_name, device_name, _cmd, shell_encoding=shell_encoding)
+        _size, _wm_size = cls.parse_wm_size(_cmd_info[4:])
+        if _size is None:
+            raise RuntimeError('exec cmd [%s] error: %s' % (_cmd, '\n'.join(_cmd_info)))
+
+        return {
+            'serialno': _cmd_info[0].strip(),
+            'boot_id': _cmd_info[1].strip(),
+            'abi': _cmd_info[2].strip(),
+            'sdk': int(_cmd_info[3].strip()),
+            'size': list(_size),
+            'wm_size': list(_wm_size),
+            'update_time': time.time()
+        }
+
+    @classmethod
+    def _get_cached(cls, device_name: str, serialno: str) -> dict:
+        """
+        获取缓存的设备信息
+
+        @param {str} device_name - 设备名
+        @param {str} serialno - 设备序列号, ''代表获取不到序列号的设备
+
+        @returns {dict} - 设备信息字典, 没有缓存返回None
+        """
+        if serialno == '':
+            return cls._transient.get(device_name, None)
+
+        return cls._facts.get(serialno, None)
+
+    @classmethod
+    def _query_identity(cls, device_name: str, adb_name: str = 'adb', shell_encoding: str = None) -> tuple:
+        """
+        查询设备的序列号及开机id(用于校验缓存信息)
+
+        @param {str} device_name - 设备名
+        @param {str} adb_name='adb' - adb命令名
+        @param {str} shell_encoding=None - shell的编码
+
+        @returns {tuple[str, str]} - (serialno, boot_id)
+        """
+        _cmd_info = AdbTools.adb_run(
+            adb_name, device_name, 'shell "getprop ro.serialno; cat /proc/sys/kernel/random/boot_id"',
+            shell_encoding=shell_encoding
+        )
+        return _cmd_info[0].strip(), _cmd_info[1].strip()
+
+    #############################
+    # 公共函数
+    #############################
+    @classmethod
+    def parse_wm_size(cls, lines: list) -> tuple:
+        """
+        解析 wm size 命令的输出
+
+        @param {list} lines - 输出行, 例如:
+            Physical size: 1080x1920
+            Override size: 720x1280
+
+        @returns {tuple} - (物理大小, 当前显示大小), 大小格式为 (width, height), 没有设置显示大小时为物理大小,
+            获取不到物理大小时返回 (None, None)
+        """
+        _sizes = dict()
+        for _line in lines:
+            _line = _line.strip()
+            for _name in ('Physical size:', 'Override size:'):
+                if _line.startswith(_name):
+                    _size = _line[len(_name):].strip().split('x')
+                    _sizes[_name] = (int(_size[0]), int(_size[1]))
+
+        _size = _sizes.get('Physical size:', None)
+        if _size is None:
+            return None, None
+
+        return _size, _sizes.get('Override size:', _size)
+
+    @classmethod
+    def get_facts(cls, device_name: str, adb_name: str = 'adb', shell_encoding: str = None,
+                  refresh: bool = False) -> dict:
+        """
+        获取设备静态信息
+
+        @param {str} device_name - 设备名
+        @param {str} adb_name='adb' - adb命令名
+        @param {str} shell_encoding=None - shell的编码
+        @param {bool} refresh=False - 是否强制从设备重新获取
+
+        @returns {dict} - 设备信息字典
+            size {tuple[int, int]} - 屏幕物理大小
+            sdk {int} - 安卓SDK版本号
+            abi {str} - CPU架构
+        """
+        with cls._lock:
+            cls._load()
+            _key = None if refresh else cls._verified.get(device_name, None)
+            _facts = None if _key is None else cls._get_cached(device_name, _key)
+            if _facts is None and not refresh:
+                # 当前进程首次使用, 校验缓存信息是否为同一台设备的同一次开机
+                _serialno, _boot_id = cls._query_identity(
+                    device_name, adb_name=adb_name, shell_encoding=shell_encoding
+                )
+                _facts = cls._get_cached(device_name, _serialno)
+                if _facts is not None and _facts.get('boot_id', None) != _boot_id:
+                    _facts = None
+
+            if _facts is None:
+                _facts = cls._query(device_name, adb_name=adb_name, shell_encoding=shell_encoding)
+                if _facts['serialno'] == '':
+                    # 获取不到序列号, 无法在进程间识别设备, 只按设备名缓存在内存中
+                    cls._transient[device_name] = _facts
+                else:
+                    cls._facts[_facts['serialno']] = _facts
+                    cls._save()
+
+            cls._verified[device_name] = _facts['serialno']
+
+            return {
+                'size': tuple(_facts['size']),
+                'sdk': _facts['sdk'],
+                'abi': _facts['abi']
+            }
+
+    @classmethod
+    def get_size(cls, device_name: str, adb_name: str = 'adb', shell_encoding: str = None) -> tuple:
+        """
+        获取设备屏幕物理大小
+
+        @param {str} device_name - 设备名
+        @param {str} adb_name='adb' - adb命令名
+        @param {str} shell_encoding=None - shell的编码
+
+        @returns {tuple[int, int]} - (width, height)
+        """
+        return cls.get_facts(device_name, adb_name=adb_name, shell_encoding=shell_encoding)['size']
+
+    @classmethod
+    def update_size(cls, device_name: str, size: tuple):
+        """
+        通过其他途径获取到的屏幕大小更新缓存信息
+        注: 如果与缓存的当前显示大小不一致(例如执行了wm size修改分辨率), 将清除该设备的缓存信息
+
+        @param {str} device_name - 设备名
+        @param {tuple} size - 获取到的当前显示大小(参考 parse_wm_size)
+        """
+        with cls._lock:
+            cls._load()
+            _key = cls._verified.get(device_name, None)
+            _facts = None if _key is None else cls._get_cached(device_name, _key)
+            if _facts is not None and tuple(_facts.get('wm_size', _facts['size'])) != tuple(size):
+                cls.invalidate(device_name)
+
+    @classmethod
+    def invalidate(cls, device_name: str = None):
+        """
+        清除设备的缓存信息
+        注: 在修改分辨率、重新连接等事件发生时调用
+
+        @param {str} device_name=None - 设备名, 不传代表清除所有设备
+        """
+        with cls._lock:
+            cls._load()
+            if device_name is None:
+                cls._verified.clear()
+                cls._transient.clear()
+                cls._facts.clear()
+            else:
+                # 重新连接的设备不一定是原来的设备, 下次使用时重新校验
+                _key = cls._verified.pop(device_name, None)
+                if _key == '':
+                    cls._transient.pop(device_name, None)
+                    return
+                if _key is None or cls._facts.pop(_key, None) is None:
+                    return
+
+            cls._save()
+
+
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
     # 打印版本信息
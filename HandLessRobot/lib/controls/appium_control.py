@@ -19,7 +19,6 @@ import math
 import time
 import subprocess
 from enum import Enum
-import pyscreeze
 from io import BytesIO
 from PIL import Image
 from appium import webdriver
@@ -30,6 +29,9 @@ from HiveNetLib.base_tools.file_tool import FileTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame
+from HandLessRobot.lib.controls.frame_cache import FrameCache
+from HandLessRobot.lib.controls.image_writer import ImageWriter, IMAGE_FORMATS
 
 
 __MOUDLE__ = 'appium_control'  # 模块名
@@ -404,17 +406,27 @@ class AppElement(object):
     #############################
     # 屏幕操作
     #############################
-    def screenshot(self, filename: str = None) -> Image:
+    def screenshot(self, filename: str = None, image_format: str = None, quality: int = None,
+                   async_save: bool = False) -> Image:
         """
         保存元素截图
 
         @param {str} filename=None - 要保存的路径
+        @param {str} image_format=None - 保存的图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 保存的图片质量, 参考 AppDevice.screenshot
+        @param {bool} async_save=False - 是否在后台线程中保存文件(不等待保存完成)
 
         @returns {PIL.Image} - 图片对象
         """
         _image = Image.open(BytesIO(self.element.screenshot_as_png))
         if filename is not None:
-            _image.save(filename)
+            _image.load()
+            if async_save:
+                ImageWriter.get_default().save(
+                    _image, filename, image_format=image_format, quality=quality
+                )
+            else:
+                ImageWriter.write_image(_image, filename, image_format=image_format, quality=quality)
 
         return _image
 
@@ -593,6 +605,10 @@ class AppDevice(object):
             shell_encoding {str} - shell命令的编码方式, 在使用到命令行工具时使用, 默认为 'utf-8'
             adb_name {str} - adb命令的启动名称, 安卓adb版专用, 默认为 'adb'
             tmp_path {str} - 临时目录, 处理adb资源文件, 安卓adb版专用, 默认为当前工作目录
+            frame_cache_size {int} - 按屏幕画面缓存的图片定位结果数量, 默认为 256, 传0代表不缓存
+            screenshot_quality {int} - 截图质量, 对应driver配置 screenshotQuality, 参考 set_screenshot_settings
+            mjpeg_scaling_factor {int} - mjpeg截图流的缩放比例, 对应driver配置 mjpegScalingFactor,
+                参考 set_screenshot_settings
         """
         self._appium_server = ''
         self._desired_caps = {}
@@ -607,10 +623,14 @@ class AppDevice(object):
             self.driver = webdriver.Remote(self._appium_server, self._desired_caps)
 
         # 提升参数
-        self.driver.update_settings(
-            {
-                "waitForIdleTimeout": 100
-            }.update(kwargs.get('driver_settings', {}))
+        _settings = {
+            "waitForIdleTimeout": 100
+        }
+        _settings.update(kwargs.get('driver_settings', {}))
+        self.driver.update_settings(_settings)
+        self.set_screenshot_settings(
+            quality=kwargs.get('screenshot_quality', None),
+            scaling_factor=kwargs.get('mjpeg_scaling_factor', None)
         )
 
         # 其他参数
@@ -625,6 +645,9 @@ class AppDevice(object):
         # 缓存字典
         self.cache = dict()
 
+        # 按屏幕画面缓存的计算结果
+        self.frame_cache = FrameCache(kwargs.get('frame_cache_size', 256))
+
     def __del__(self):
         """
         析构函数
@@ -883,17 +906,58 @@ class AppDevice(object):
         """
         self.driver.orientation = show_type
 
-    def screenshot(self, filename: str = None) -> Image:
+    def set_screenshot_settings(self, quality: int = None, scaling_factor: int = None):
+        """
+        设置appium服务端的截图参数
+
+        @param {int} quality=None - 截图质量, 对应 screenshotQuality 配置, None代表不修改
+            注: XCUITest 支持 0-高质量、1-中等质量(JPEG)、2-低质量(JPEG), 质量越低传输越快
+        @param {int} scaling_factor=None - mjpeg截图流的缩放比例(1-100), 对应 mjpegScalingFactor 配置,
+            None代表不修改
+        """
+        _settings = dict()
+        if quality is not None:
+            _settings['screenshotQuality'] = quality
+        if scaling_factor is not None:
+            _settings['mjpegScalingFactor'] = scaling_factor
+
+        if len(_settings) > 0:
+            self.driver.update_settings(_settings)
+
+    def screenshot(self, filename: str = None, image_format: str = None, quality: int = None,
+                   async_save: bool = False) -> Image:
         """
         保存屏幕截图
 
         @param {str} filename=None - 要保存的路径
+        @param {str} image_format=None - 保存的图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 保存的图片质量, JPEG/WEBP为1-100, PNG为压缩级别0-9
+        @param {bool} async_save=False - 是否在后台线程中保存文件(不等待保存完成)
+            注: 服务端返回的数据格式与要保存的格式一致且不指定质量时直接写入返回的数据, 不重新编码
 
         @returns {PIL.Image} - 图片对象
         """
-        _image = Image.open(BytesIO(self.driver.get_screenshot_as_png()))
+        _data = self.driver.get_screenshot_as_png()
+        _image = Image.open(BytesIO(_data))
         if filename is not None:
-            _image.save(filename)
+            _format = image_format
+            if _format is None:
+                _format = IMAGE_FORMATS.get(os.path.splitext(filename)[1].lower(), 'PNG')
+            _format = _format.upper()
+
+            if quality is None and _format == _image.format:
+                _save_obj = _data
+            else:
+                # 在当前线程完成解码, 避免后台线程与调用方同时读取文件数据
+                _image.load()
+                _save_obj = _image
+
+            if async_save:
+                ImageWriter.get_default().save(
+                    _save_obj, filename, image_format=_format, quality=quality
+                )
+            else:
+                ImageWriter.write_image(_save_obj, filename, image_format=_format, quality=quality)
 
         return _image
 
@@ -906,25 +970,15 @@ class AppDevice(object):
         @param {dict} kwargs - 其他执行参数:
             {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
             {int} limit=10000 - 匹配数量限制
-            {int} step=1 - 匹配步骤，支持送1或2，如果为2会跳过细节，大约能提升3倍速度，但有可能匹配不上
             {float} confidence=0.999 - 匹配度
+            {str} engine=None - 使用的匹配引擎(numpy/opencv), 不传代表使用 ImageMatcher 的默认引擎
+            {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
+            {tuple|bool} hint=None - 优先查找的位置 (x, y, width, height), 传True代表使用该图片最后一次找到的位置
+            {int} pyramid=0 - 金字塔匹配的缩小倍数(例如4), 先在缩小的截图中粗匹配再在原图中确认, 0代表不使用
 
         @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 找不到返回None
         """
-        if type(image) == str:
-            _image = Image.open(image)
-        else:
-            _image = image
-
-        start = time.time()
-        while True:
-            try:
-                screenshotIm = self.screenshot()
-                retVal = pyscreeze.locate(_image, screenshotIm, **kwargs)
-                if retVal or time.time() - start > minSearchTime:
-                    return retVal
-            except pyscreeze.ImageNotFoundException:
-                return None
+        return self.wait_image(image, timeout=minSearchTime / 1000.0, **kwargs)
 
     def locate_all_on_screen(self, image, **kwargs):
         """
@@ -934,20 +988,193 @@ class AppDevice(object):
         @param {dict} kwargs - 其他执行参数:
             {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
             {int} limit=10000 - 匹配数量限制
-            {int} step=1 - 匹配步骤，支持送1或2，如果为2会跳过细节，大约能提升3倍速度，但有可能匹配不上
             {float} confidence=0.999 - 匹配度
+            {str} engine=None - 使用的匹配引擎(numpy/opencv), 不传代表使用 ImageMatcher 的默认引擎
+            {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
 
         @returns {list} - 返回所找到的所有图片的位置
             [(x, y, width, height), ..]
         """
-        if type(image) == str:
-            _image = Image.open(image)
-        else:
-            _image = image
+        return self.locate_inner(self.grab_frame(), 'locate_all', image, **kwargs)
+
+    def locate_any_on_screen(self, images, **kwargs) -> tuple:
+        """
+        只截图一次, 按顺序在屏幕中查找多个图片, 返回第一个找到的图片
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(object, (int, int, int, int))} - 返回 (图片索引或key, 位置(x, y, width, height)),
+            都找不到返回 (None, None)
+        """
+        return self.locate_inner(self.grab_frame(), 'locate_any', images, **kwargs)
+
+    def locate_many_on_screen(self, images, **kwargs):
+        """
+        只截图一次, 在屏幕中定位多个图片的位置
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {list|dict} - 与images对应的位置清单 [(x, y, width, height), ...], 找不到的图片位置为None;
+            images为字典时返回 {key: 位置}
+        """
+        return self.locate_inner(self.grab_frame(), 'locate_many', images, **kwargs)
+
+    def screenshot_elements(self, elements: list, as_array: bool = False,
+                            frame: MatchFrame = None) -> list:
+        """
+        只截取一次屏幕, 从中裁剪出多个元素的截图
+        注: 以数组方式返回时为屏幕画面数组的视图, 不复制数据;
+            截图与元素坐标的比例不一致时(例如iOS的高分屏)按屏幕宽度的比例换算元素区域
+
+        @param {list} elements - 元素清单, 可以为AppElement对象或元素区域(x, y, width, height)
+        @param {bool} as_array=False - 是否返回RGB数组(np.ndarray), 否则返回PIL.Image对象
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表重新截图
+
+        @returns {list} - 与elements对应的元素截图清单
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        _array = _frame.get(False)['array']
+        # 截图的像素与元素坐标的比例
+        _scale = self._get_frame_scale(_frame)
+        _ret = list()
+        for _element in elements:
+            _rect = tuple(_element) if isinstance(_element, (tuple, list)) else _element.rect
+            if _scale != 1.0:
+                _rect = tuple([int(round(_val * _scale)) for _val in _rect])
+            _x, _y, _crop = ImageMatcher.crop(_array, _rect)
+            if as_array:
+                _ret.append(_crop)
+            else:
+                # 同一画面同一区域的截图直接从缓存获取
+                _ret.append(self.frame_cache.memoize(
+                    _frame, 'screenshot_element', _rect, lambda: Image.fromarray(_crop)
+                ))
+
+        return _ret
+
+    def probe_pixels_list(self, probes: list, frame: MatchFrame = None) -> list:
+        """
+        检查屏幕中的像素或小区域颜色是否符合要求, 返回每个条件的检查结果
+        注: 截图与屏幕坐标的比例不一致时(例如iOS的高分屏)按屏幕宽度的比例换算坐标
+
+        @param {list} probes - 检查条件清单, 参考 ImageMatcher.probe
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {list} - 与probes对应的检查结果(bool)清单
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        # 降采样哈希不能反映单个像素的变化, 检查结果不使用画面缓存
+        return ImageMatcher.probe(_frame, probes, scale=self._get_frame_scale(_frame))
+
+    def probe_pixels(self, probes: list, match_all: bool = True, frame: MatchFrame = None) -> bool:
+        """
+        检查屏幕中的像素或小区域颜色是否符合要求(可用于if/loop的判断条件)
+
+        @param {list} probes - 检查条件清单, 参考 ImageMatcher.probe
+            例如: [{'point': (100, 200), 'color': (255, 0, 0), 'tolerance': 10}]
+        @param {bool} match_all=True - True-所有条件均满足才返回True, False-任意一个条件满足即返回True
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {bool} - 检查结果
+        """
+        _ret = self.probe_pixels_list(probes, frame=frame)
+        return all(_ret) if match_all else any(_ret)
+
+    def pixel_matches_color(self, x: int, y: int, color: tuple, tolerance: int = 0,
+                            frame: MatchFrame = None) -> bool:
+        """
+        检查屏幕指定位置的像素颜色是否与指定颜色匹配
 
-        screenshotIm = self.screenshot()
-        retVal = pyscreeze.locateAll(_image, screenshotIm, **kwargs)
-        return list(retVal)
+        @param {int} x - 屏幕x坐标
+        @param {int} y - 屏幕y坐标
+        @param {tuple} color - 期望的颜色 (r, g, b)
+        @param {int} tolerance=0 - 每个颜色通道允许的误差
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {bool} - 检查结果
+        """
+        return self.probe_pixels_list([(x, y, color, tolerance)], frame=frame)[0]
+
+    def pixel_color(self, x: int, y: int, frame: MatchFrame = None) -> tuple:
+        """
+        获取屏幕指定位置的像素颜色
+
+        @param {int} x - 屏幕x坐标
+        @param {int} y - 屏幕y坐标
+        @param {MatchFrame} frame=None - 使用的屏幕画面, 不传代表获取最新画面
+
+        @returns {(int, int, int)} - 返回RGB三色结果, 坐标超出屏幕范围返回None
+        """
+        _frame = self.grab_frame() if frame is None else frame
+        _scale = self._get_frame_scale(_frame)
+        if _scale == 1.0:
+            return ImageMatcher.pixel_color(_frame, x, y)
+
+        return ImageMatcher.pixel_color(_frame, int(round(x * _scale)), int(round(y * _scale)))
+
+    def grab_frame(self) -> MatchFrame:
+        """
+        获取用于图像匹配的屏幕画面(不保存文件)
+        注: 画面直接使用服务端返回的数据, 在匹配时才解码为数组(不生成PIL对象), 画面哈希直接基于返回数据计算
+
+        @returns {MatchFrame} - 屏幕画面
+        """
+        return MatchFrame(self.driver.get_screenshot_as_png())
+
+    def locate_inner(self, frame: MatchFrame, operation: str, images, **kwargs):
+        """
+        在屏幕画面中执行图片定位(同一画面相同参数的结果直接从缓存获取)
+
+        @param {MatchFrame} frame - 屏幕画面
+        @param {str} operation - ImageMatcher的定位函数名, locate/locate_all/locate_any/locate_many
+        @param {object} images - 要定位的图片或图片清单
+        @param {kwargs} - 定位函数的其他参数
+
+        @returns {object} - 定位函数的返回结果
+        """
+        return self.frame_cache.memoize(
+            frame, operation, (images, kwargs),
+            lambda: getattr(ImageMatcher, operation)(images, frame, **kwargs)
+        )
+
+    def wait_image(self, image, timeout: float = 10.0, interval: float = 0.2, **kwargs) -> tuple:
+        """
+        等待指定图片出现在屏幕中
+        注: 屏幕画面没有变化时不重复匹配, 且不会在超时时间之后再截图
+
+        @param {str|PIL.Image} image - 要定位的图片文件路径或图片对象
+        @param {float} timeout=10.0 - 最长等待时间, 单位为秒, 传0代表只查找一次
+        @param {float} interval=0.2 - 每次截图的间隔时间, 单位为秒
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 超时返回None
+        """
+        return ImageMatcher.wait_match(
+            self.grab_frame, lambda frame: self.locate_inner(frame, 'locate', image, **kwargs),
+            timeout, interval=interval
+        )
+
+    def wait_any_image(self, images, timeout: float = 10.0, interval: float = 0.2,
+                       **kwargs) -> tuple:
+        """
+        等待多个图片中任意一个出现在屏幕中
+
+        @param {list|dict} images - 要定位的图片文件路径或图片对象清单, 也可以传入字典 {key: 图片}
+        @param {float} timeout=10.0 - 最长等待时间, 单位为秒, 传0代表只查找一次
+        @param {float} interval=0.2 - 每次截图的间隔时间, 单位为秒
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(object, (int, int, int, int))} - 返回 (图片索引或key, 位置(x, y, width, height)),
+            超时返回 (None, None)
+        """
+        def _match_fun(frame):
+            _ret = self.locate_inner(frame, 'locate_any', images, **kwargs)
+            return None if _ret[0] is None else _ret
+
+        _ret = ImageMatcher.wait_match(self.grab_frame, _match_fun, timeout, interval=interval)
+        return (None, None) if _ret is None else _ret
 
     #############################
     # 动作 - 滑动
@@ -1495,6 +1722,20 @@ class AppDevice(object):
     #############################
     # 内部函数
     #############################
+    def _get_frame_scale(self, frame: MatchFrame) -> float:
+        """
+        获取画面像素与屏幕坐标的比例(同一画面只计算一次, 避免每次检查都通过服务端获取屏幕大小)
+
+        @param {MatchFrame} frame - 屏幕画面
+
+        @returns {float} - 比例, 误差在1%以内时返回1.0
+        """
+        if frame.scale is None:
+            _scale = frame.get(False)['array'].shape[1] / self.size[0]
+            frame.scale = 1.0 if abs(_scale - 1.0) <= 0.01 else _scale
+
+        return frame.scale
+
     def _exec_sys_cmd(self, cmd: str, shell_encoding: str = None):
         """
         执行系统命令
@@ -17,17 +17,14 @@ import sys
 import uuid
 import time
 import datetime
-import threading
-import inspect
-import ctypes
 import base64
-import random
 from HiveNetLib.base_tools.file_tool import FileTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir, os.path.pardir)))
 import HandLessRobot.lib.controls.appium_control as appium_control
 from HandLessRobot.lib.controls.appium_control import EnumAndroidKeycode
+from HandLessRobot.lib.controls.adb_control import AdbShellChannel, TapRateScheduler
 
 
 __MOUDLE__ = 'android'  # 模块名
@@ -376,54 +373,39 @@ class AppDevice(appium_control.AppDevice):
             raise RuntimeError('exec cmd [%s] error[%d]: %s' % (_cmd, _code, '\n'.join(_cmd_info)))
 
     def tap_adb_continuity(self, pos_seed: list, times: float, thread_count: int = 2,
-                           random_sleep: bool = False, sleep_min: float = 0.0, sleep_max: float = 0.5):
+                           random_sleep: bool = False, sleep_min: float = 0.0, sleep_max: float = 0.5,
+                           rate: float = 10.0) -> dict:
         """
         在指定范围随机连续点击
+        注: 按指定频率通过持久化的adb shell通道发送点击命令, 到达时长后停止发送并等待已发送的命令完成
 
         @param {list} pos_seed - 允许点击的位置坐标清单[(x,y), ...], 随机获取
         @param {float} times - 要点击的时长, 单位为秒
-        @param {int} thread_count=2 - 生产点击线程，数量越多点击频率越密集
-        @param {bool} random_sleep=False - 每个线程点击期间是否自动休眠指定时长
-        @param {float} sleep_min=0.0 - 每个线程点击期间自动休眠最小时长, 单位为秒
-        @param {float} sleep_max=0.5 - 每个线程点击期间自动休眠最大时长, 单位为秒
-        """
-        # 参数准备
-        _cmd_mode = '%s -s %s shell input tap' % (self.adb_name, self._desired_caps['deviceName'])
-        _seed_len = len(pos_seed)
-
-        # 定义点击线程函数
-        def tap_thread_fun():
-            while True:
-                # 循环处理，自身不结束
-                _pos = pos_seed[random.randint(0, _seed_len - 1)]
-                _cmd = '%s %d %d' % (_cmd_mode, _pos[0], _pos[1])
-                # 不检查结果
-                _code, _cmd_info = self._exec_sys_cmd(_cmd)
-                # 看是否休眠
-                if random_sleep:
-                    time.sleep(random.uniform(sleep_min, sleep_max))
-
-        # 启动执行动作
-        _start = datetime.datetime.now()
-        _thread_list = list()
-        for i in range(thread_count):
-            _running_thread = threading.Thread(
-                target=tap_thread_fun,
-                name='Thread-Tap-Running %s' % str(i)
+        @param {int} thread_count=2 - 同时在途(已发送未完成)的点击命令数量上限
+        @param {bool} random_sleep=False - 两个点击间是否增加随机休眠时长
+        @param {float} sleep_min=0.0 - 两个点击间增加的随机休眠最小时长, 单位为秒
+        @param {float} sleep_max=0.5 - 两个点击间增加的随机休眠最大时长, 单位为秒
+        @param {float} rate=10.0 - 目标点击频率, 单位为次/秒
+
+        @returns {dict} - 点击统计信息, 格式参考 adb_control.TapRateScheduler.run
+        """
+        _channel = AdbShellChannel(self.adb_name, self._desired_caps['deviceName'])
+        _channel.open()
+
+        def _ack_fun(seq, timeout):
+            _ret = _channel.wait(seq, timeout=timeout)
+            return None if _ret is None else _ret['time']
+
+        try:
+            _scheduler = TapRateScheduler(
+                lambda x, y: _channel.send('input tap %d %d' % (x, y), wait=False), _ack_fun,
+                rate=rate, max_in_flight=thread_count,
+                jitter=(sleep_min, sleep_max) if random_sleep else None,
+                alive_fun=lambda: _channel.is_alive, discard_fun=_channel.discard
             )
-            _running_thread.setDaemon(True)
-            _running_thread.start()
-
-            # 添加到列表，用于停止线程
-            _thread_list.append(_running_thread)
-
-        # 监控时长
-        while (datetime.datetime.now() - _start).total_seconds() < times:
-            time.sleep(0.01)
-
-        # 停止线程
-        for _thread in _thread_list:
-            self.stop_thread(_thread)
+            return _scheduler.run(pos_seed, times)
+        finally:
+            _channel.close()
 
     #############################
     # 动作 - 按键
@@ -437,27 +419,6 @@ class AppDevice(appium_control.AppDevice):
         """
         return self.driver.is_ime_active()
 
-    #############################
-    # 内部函数 - 结束线程
-    #############################
-
-    def _async_raise(self, tid, exctype):
-        """raises the exception, performs cleanup if needed"""
-        tid = ctypes.c_long(tid)
-        if not inspect.isclass(exctype):
-            exctype = type(exctype)
-        res = ctypes.pythonapi.PyThreadState_SetAsyncExc(tid, ctypes.py_object(exctype))
-        if res == 0:
-            raise ValueError("invalid thread id")
-        elif res != 1:
-            # """if it returns a number greater than one, you're in trouble,
-            # and you should call it again with exc=NULL to revert the effect"""
-            ctypes.pythonapi.PyThreadState_SetAsyncExc(tid, None)
-            raise SystemError("PyThreadState_SetAsyncExc failed")
-
-    def stop_thread(self, thread):
-        self._async_raise(thread.ident, SystemExit)
-
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+屏幕画面的结果缓存模块
+@module frame_cache
+@file frame_cache.py
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import collections
+import numpy as np
+from PIL import Image
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame
+
+
+__MOUDLE__ = 'frame_cache'  # 模块名
+__DESCRIPT__ = u'屏幕画面的结果缓存模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.23'  # 发布日期
+
+
+class FrameCache(object):
+    """
+    屏幕画面的结果缓存, 供 adb_control、appium_control 及 windows_control.Screen 共用
+    注: 1、按 (画面哈希值, 操作名, 参数) 缓存基于画面计算的结果(例如图片定位结果、元素截图等),
+        屏幕没有变化时重复的查询直接返回缓存的结果;
+        2、缓存按画面完整内容的哈希值(参考 MatchFrame.digest)识别画面, 降采样哈希值(参考 ImageMatcher.frame_hash)
+            会漏掉小范围的变化, 只用于统计画面是否变化;
+        3、参数中的图片文件按 (路径, 修改时间, 文件大小) 识别, 图片数组、图片对象及二进制数据按内容哈希识别,
+            其他不可哈希的对象按对象id识别, 并在缓存结果中保留对象引用, 避免对象释放后id被复用;
+        4、返回的是缓存结果的副本(参考 copy_result), 调用方修改返回结果不影响缓存
+    """
+
+    def __init__(self, max_items: int = 256):
+        """
+        构造函数
+
+        @param {int} max_items=256 - 最多缓存的结果数量, 超过时淘汰最久未使用的结果, 传0代表不缓存
+        """
+        self.max_items = max_items
+        self._items = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.frames = 0
+        self.same_frames = 0
+        self._last_frame_id = None
+        self._last_hash = None
+
+    #############################
+    # 公共函数
+    #############################
+    @classmethod
+    def make_key(cls, params, refs: list = None):
+        """
+        将参数转换为可用于缓存的key
+
+        @param {object} params - 参数, 支持字符串、数字、清单、元组、字典、图片对象及数组的组合
+        @param {list} refs=None - 按对象id识别的对象清单, 传入时将这些对象加入清单(需要与缓存结果一起保留)
+
+        @returns {object} - 可哈希的缓存key
+        """
+        if isinstance(params, dict):
+            return tuple(sorted([(str(_key), cls.make_key(_val, refs)) for _key, _val in params.items()]))
+        elif isinstance(params, (list, tuple)):
+            return tuple([cls.make_key(_val, refs) for _val in params])
+        elif isinstance(params, str):
+            # 图片文件路径需要识别文件的变化
+            _key = ImageMatcher.template_cache.get_key(params, None)
+            return params if _key is None else _key
+        elif isinstance(params, np.ndarray):
+            return (
+                'ndarray', params.shape, params.dtype.str,
+                hashlib.blake2b(np.ascontiguousarray(params).data, digest_size=16).hexdigest()
+            )
+        elif isinstance(params, Image.Image):
+            return (
+                'image', params.mode, params.size,
+                hashlib.blake2b(params.tobytes(), digest_size=16).hexdigest()
+            )
+        elif isinstance(params, (bytes, bytearray)):
+            return ('bytes', len(params), hashlib.blake2b(params, digest_size=16).hexdigest())
+
+        if not isinstance(params, MatchFrame):
+            try:
+                hash(params)
+                return params
+            except TypeError:
+                pass
+
+        # 按对象id识别, 需保留对象引用避免id被复用
+        if refs is not None:
+            refs.append(params)
+        return ('object', id(params))
+
+    @classmethod
+    def copy_result(cls, value):
+        """
+        复制缓存结果中的可变对象
+
+        @param {object} value - 缓存结果, 支持图片对象、数组、清单、元组、字典的组合
+
+        @returns {object} - 复制后的结果, 其他对象直接返回
+        """
+        if isinstance(value, (Image.Image, np.ndarray)):
+            return value.copy()
+        elif isinstance(value, list):
+            return [cls.copy_result(_val) for _val in value]
+        elif isinstance(value, tuple):
+            return tuple([cls.copy_result(_val) for _val in value])
+        elif isinstance(value, dict):
+            return {_key: cls.copy_result(_val) for _key, _val in value.items()}
+
+        return value
+
+    def memoize(self, frame: MatchFrame, operation: str, params, fun):
+        """
+        获取画面的计算结果, 没有缓存时执行计算函数并缓存结果
+
+        @param {MatchFrame} frame - 屏幕画面
+        @param {str} operation - 操作名, 例如 'locate'
+        @param {object} params - 操作参数, 参考 make_key
+        @param {function} fun - 计算函数, 无入参, 返回计算结果
+
+        @returns {object} - 计算结果(缓存结果的副本)
+        """
+        _hash = frame.hash
+        _digest = frame.digest
+        with self._lock:
+            if id(frame) != self._last_frame_id:
+                self._last_frame_id = id(frame)
+                self.frames += 1
+                if _hash == self._last_hash:
+                    self.same_frames += 1
+                self._last_hash = _hash
+
+            _refs = list()
+            _key = (_digest, operation, self.make_key(params, _refs))
+            if _key in self._items.keys():
+                self.hits += 1
+                self._items.move_to_end(_key)
+                return self.copy_result(self._items[_key][1])
+
+            self.misses += 1
+
+        # 计算不需要加锁
+        _ret = fun()
+        if self.max_items > 0:
+            with self._lock:
+                # 缓存结果中保留按对象id识别的对象引用
+                self._items[_key] = (_refs, _ret)
+                while len(self._items) > self.max_items:
+                    self._items.popitem(last=False)
+
+            return self.copy_result(_ret)
+
+        return _ret
+
+    def clear(self):
+        """
+        清空缓存的结果及统计信息
+        """
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.frames = 0
+            self.same_frames = 0
+            self._last_frame_id = None
+            self._last_hash = None
+
+    def stats(self) -> dict:
+        """
+        获取缓存的统计信息
+
+        @returns {dict} - 统计信息
+            count {int} - 当前缓存的结果数量
+            hits {int} - 命中次数
+            misses {int} - 未命中次数
+            hit_rate {float} - 命中率
+            frames {int} - 处理的画面数量
+            same_frames {int} - 与上一个画面相同(屏幕没有变化)的画面数量
+        """
+        with self._lock:
+            _total = self.hits + self.misses
+            return {
+                'count': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / _total if _total > 0 else 0.0,
+                'frames': self.frames,
+                'same_frames': self.same_frames
+            }
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
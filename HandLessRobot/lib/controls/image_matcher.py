@@ -0,0 +1,1277 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+图像模板匹配模块
+@module image_matcher
+@file image_matcher.py
+"""
+
+import os
+import sys
+import time
+import hashlib
+import threading
+import weakref
+import collections
+from io import BytesIO
+import numpy as np
+from PIL import Image
+try:
+    import cv2
+except ImportError:
+    # 没有安装opencv时使用numpy引擎
+    cv2 = None
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'image_matcher'  # 模块名
+__DESCRIPT__ = u'图像模板匹配模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.20'  # 发布日期
+
+
+class NumpyMatchEngine(object):
+    """
+    基于numpy的归一化互相关(TM_CCOEFF_NORMED)匹配引擎
+    注: 窗口统计量通过累加和计算, 互相关在模板较大时通过FFT计算, 模板很小时直接累加
+    """
+
+    # 模板像素数小于等于该值时直接累加计算互相关, 否则使用FFT
+    DIRECT_MAX_PIXELS = 64
+
+    # 窗口方差小于该值(按每像素计)时视为纯色区域, 不参与相关性计算
+    FLAT_VARIANCE = 0.01
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _fast_len(cls, n: int) -> int:
+        """
+        获取不小于n且只包含2、3、5因子的长度(FFT计算较快)
+
+        @param {int} n - 最小长度
+
+        @returns {int} - FFT计算长度
+        """
+        _best = 1
+        while _best < n:
+            _best *= 2
+
+        _p5 = 1
+        while _p5 < _best:
+            _p35 = _p5
+            while _p35 < _best:
+                _len = _p35
+                while _len < n:
+                    _len *= 2
+                _best = min(_best, _len)
+                _p35 *= 3
+            _p5 *= 5
+
+        return _best
+
+    @classmethod
+    def _integral(cls, array: np.ndarray) -> np.ndarray:
+        """
+        计算积分图(左上角补0)
+
+        @param {np.ndarray} array - 要计算的数组, (C, H, W)
+
+        @returns {np.ndarray} - 积分图, 大小为 (C, H+1, W+1)
+        """
+        _ret = np.zeros((array.shape[0], array.shape[1] + 1, array.shape[2] + 1), dtype=np.float64)
+        np.cumsum(array, axis=1, dtype=np.float64, out=_ret[:, 1:, 1:])
+        np.cumsum(_ret[:, 1:, 1:], axis=2, out=_ret[:, 1:, 1:])
+        return _ret
+
+    @classmethod
+    def _box_sum(cls, integral: np.ndarray, h: int, w: int) -> np.ndarray:
+        """
+        通过积分图计算每个窗口的和
+
+        @param {np.ndarray} integral - 积分图, (C, H+1, W+1)
+        @param {int} h - 窗口高度
+        @param {int} w - 窗口宽度
+
+        @returns {np.ndarray} - 每个通道每个窗口的和, 大小为 (C, H-h+1, W-w+1)
+        """
+        _ret = integral[:, h:, w:] - integral[:, :-h, w:]
+        _ret -= integral[:, h:, :-w]
+        _ret += integral[:, :-h, :-w]
+        return _ret
+
+    @classmethod
+    def _correlate(cls, image: np.ndarray, kernel: np.ndarray, fft_cache: dict = None,
+                   image_fft_cache: dict = None) -> np.ndarray:
+        """
+        计算多通道互相关(各通道结果相加), 只返回完整覆盖的区域
+
+        @param {np.ndarray} image - 图像数组 (C, H, W)
+        @param {np.ndarray} kernel - 模板数组 (C, h, w)
+        @param {dict} fft_cache=None - 模板FFT结果的缓存字典, key为FFT计算大小, 不传代表不缓存
+        @param {dict} image_fft_cache=None - 图像FFT结果的缓存字典, key为FFT计算大小, 不传代表不缓存
+
+        @returns {np.ndarray} - 互相关结果, 大小为 (H-h+1, W-w+1)
+        """
+        _H, _W = image.shape[1:3]
+        _h, _w = kernel.shape[1:3]
+        _oh, _ow = _H - _h + 1, _W - _w + 1
+
+        if _h * _w <= cls.DIRECT_MAX_PIXELS:
+            # 模板很小, 直接累加
+            _ret = np.zeros((_oh, _ow), dtype=np.float64)
+            for _c in range(image.shape[0]):
+                for _i in range(_h):
+                    for _j in range(_w):
+                        _ret += kernel[_c, _i, _j] * image[_c, _i:_i + _oh, _j:_j + _ow]
+            return _ret
+
+        # 使用FFT计算循环互相关, 长度不小于图像大小时有效区域不会出现回绕
+        _shape = (cls._fast_len(_H), cls._fast_len(_W))
+        _fk = None if fft_cache is None else fft_cache.get(_shape, None)
+        if _fk is None:
+            _fk = np.conj(np.fft.rfft2(kernel, s=_shape, axes=(1, 2)))
+            if fft_cache is not None:
+                fft_cache[_shape] = _fk
+
+        _fi = None if image_fft_cache is None else image_fft_cache.get(_shape, None)
+        if _fi is None:
+            _fi = np.fft.rfft2(image, s=_shape, axes=(1, 2))
+            if image_fft_cache is not None:
+                image_fft_cache[_shape] = _fi
+
+        _ret = np.fft.irfft2((_fi * _fk).sum(axis=0), s=_shape)
+        return _ret[0:_oh, 0:_ow]
+
+    #############################
+    # 公共函数
+    #############################
+    @classmethod
+    def prepare_template(cls, needle: np.ndarray) -> dict:
+        """
+        预先计算模板的统计量
+
+        @param {np.ndarray} needle - 模板数组, (h, w) 或 (h, w, C)
+
+        @returns {dict} - 模板统计量字典
+            zm {np.ndarray} - 减去均值后按通道排列的模板数组 (C, h, w)
+            mean {np.ndarray} - 各通道的均值 (C, 1, 1)
+            norm2 {float} - 减去均值后的平方和
+            fft {dict} - 按FFT计算大小缓存的模板FFT结果, 在匹配时填充
+        """
+        if needle.ndim == 2:
+            _tpl = needle[np.newaxis, :, :].astype(np.float64)
+        else:
+            _tpl = np.ascontiguousarray(needle.transpose(2, 0, 1), dtype=np.float64)
+
+        _mean = _tpl.mean(axis=(1, 2), keepdims=True)
+        _tpl -= _mean
+        return {
+            'zm': _tpl,
+            'mean': _mean,
+            'norm2': float((_tpl * _tpl).sum()),
+            'fft': dict()
+        }
+
+    @classmethod
+    def prepare_frame(cls, haystack: np.ndarray) -> dict:
+        """
+        预先计算被查找图像的统计量(多个模板查找同一图像时共用)
+
+        @param {np.ndarray} haystack - 图像数组, (H, W) 或 (H, W, C)
+
+        @returns {dict} - 图像统计量字典
+            img {np.ndarray} - 减去均值后按通道排列的图像数组 (C, H, W)
+            mean {np.ndarray} - 各通道的均值 (C, 1, 1)
+            integral {np.ndarray} - 各通道的积分图 (C, H+1, W+1)
+            integral_sq {np.ndarray} - 各通道平方和的积分图 (1, H+1, W+1)
+            fft {dict} - 按FFT计算大小缓存的图像FFT结果, 在匹配时填充
+        """
+        # 转换为按通道排列的数组, 并减去均值提升累加和的计算精度
+        if haystack.ndim == 2:
+            _img = haystack[np.newaxis, :, :].astype(np.float64)
+        else:
+            _img = np.ascontiguousarray(haystack.transpose(2, 0, 1), dtype=np.float64)
+
+        _mean = _img.mean(axis=(1, 2), keepdims=True)
+        _img -= _mean
+        return {
+            'img': _img,
+            'mean': _mean,
+            'integral': cls._integral(_img),
+            # 各通道平方和可以先合并再计算窗口和
+            'integral_sq': cls._integral(np.einsum('chw,chw->hw', _img, _img)[np.newaxis, :, :]),
+            'fft': dict()
+        }
+
+    @classmethod
+    def match_template(cls, haystack: np.ndarray, needle: np.ndarray,
+                       template: dict = None, frame: dict = None) -> np.ndarray:
+        """
+        计算模板在图像每个位置的匹配度
+
+        @param {np.ndarray} haystack - 图像数组, (H, W) 或 (H, W, C)
+        @param {np.ndarray} needle - 模板数组, 通道数必须与图像一致
+        @param {dict} template=None - 模板缓存项(TemplateCache.get 的返回值), 传入时复用预先计算的统计量和FFT结果
+        @param {dict} frame=None - 图像缓存项(MatchFrame.get 的返回值), 传入时复用预先计算的积分图和FFT结果
+
+        @returns {np.ndarray} - 匹配度数组, 大小为 (H-h+1, W-w+1), 取值范围 [-1, 1]
+        """
+        _h, _w = needle.shape[0:2]
+        if _h > haystack.shape[0] or _w > haystack.shape[1]:
+            return np.zeros((0, 0), dtype=np.float64)
+
+        if template is None:
+            _stat = cls.prepare_template(needle)
+            _fft_cache = None
+        else:
+            _stat = template['stat'].get('numpy', None)
+            if _stat is None:
+                _stat = cls.prepare_template(needle)
+                template['stat']['numpy'] = _stat
+            _fft_cache = _stat['fft']
+
+        if frame is None:
+            _frame_stat = cls.prepare_frame(haystack)
+        else:
+            _frame_stat = frame['stat'].get('numpy', None)
+            if _frame_stat is None:
+                _frame_stat = cls.prepare_frame(haystack)
+                frame['stat']['numpy'] = _frame_stat
+
+        _img = _frame_stat['img']
+        _img_mean = _frame_stat['mean']
+        _n = _h * _w
+        _tpl_mean = _stat['mean']
+        _tpl_zm = _stat['zm']
+        _tpl_norm2 = _stat['norm2']
+
+        # 计算窗口的方差
+        _s1 = cls._box_sum(_frame_stat['integral'], _h, _w)
+        _var = cls._box_sum(_frame_stat['integral_sq'], _h, _w)[0]
+        _var -= np.einsum('chw,chw->hw', _s1, _s1) / _n
+        _flat = _var <= cls.FLAT_VARIANCE * _n
+
+        if _tpl_norm2 <= cls.FLAT_VARIANCE * _n:
+            # 纯色模板, 只有纯色且颜色一致的窗口完全匹配
+            _same = np.all(np.abs(_s1 / _n - (_tpl_mean - _img_mean)) < 0.5, axis=0)
+            return (_flat & _same).astype(np.float64)
+
+        _num = cls._correlate(
+            _img, _tpl_zm, fft_cache=_fft_cache,
+            image_fft_cache=None if frame is None else _frame_stat['fft']
+        )
+        _denom = np.sqrt(np.maximum(_var, 0) * _tpl_norm2)
+        _score = np.zeros(_num.shape, dtype=np.float64)
+        np.divide(_num, _denom, out=_score, where=~_flat)
+        return np.clip(_score, -1.0, 1.0, out=_score)
+
+
+class OpenCVMatchEngine(object):
+    """
+    基于opencv的匹配引擎(需安装 opencv-python)
+    """
+
+    @classmethod
+    def match_template(cls, haystack: np.ndarray, needle: np.ndarray,
+                       template: dict = None, frame: dict = None) -> np.ndarray:
+        """
+        计算模板在图像每个位置的匹配度
+
+        @param {np.ndarray} haystack - 图像数组, (H, W) 或 (H, W, C)
+        @param {np.ndarray} needle - 模板数组, 通道数必须与图像一致
+        @param {dict} template=None - 模板缓存项, opencv引擎不使用
+        @param {dict} frame=None - 图像缓存项, opencv引擎不使用
+
+        @returns {np.ndarray} - 匹配度数组, 大小为 (H-h+1, W-w+1), 取值范围 [-1, 1]
+        """
+        if cv2 is None:
+            raise ModuleNotFoundError('opencv is not installed')
+
+        if needle.shape[0] > haystack.shape[0] or needle.shape[1] > haystack.shape[1]:
+            return np.zeros((0, 0), dtype=np.float64)
+
+        _score = cv2.matchTemplate(
+            np.ascontiguousarray(haystack, dtype=np.uint8),
+            np.ascontiguousarray(needle, dtype=np.uint8),
+            cv2.TM_CCOEFF_NORMED
+        )
+        # 纯色模板的计算结果可能为nan或inf
+        return np.nan_to_num(_score, nan=0.0, posinf=1.0, neginf=-1.0)
+
+
+# 支持的匹配引擎, 可通过 ImageMatcher.register_engine 扩展
+MATCH_ENGINES = {
+    'numpy': NumpyMatchEngine,
+    'opencv': OpenCVMatchEngine
+}
+
+
+class TemplateCache(object):
+    """
+    模板图片缓存, 按使用顺序(LRU)及占用字节数淘汰
+    注: 1、文件路径按 (路径, 修改时间, 文件大小) 缓存, 文件修改后自动重新加载;
+        2、内存中的图片对象(PIL.Image/np.ndarray)按对象id缓存, 并通过弱引用确认对象未被回收,
+        因此对象内容被原地修改后不会重新计算, 需调用 remove 清除;
+        3、缓存项中除模板数组外, 还保存各引擎预先计算的统计量(例如numpy引擎的均值、平方和及各FFT大小的结果)
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        """
+        构造函数
+
+        @param {int} max_bytes=128*1024*1024 - 缓存占用的最大字节数, 传0代表不缓存
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    #############################
+    # 公共函数
+    #############################
+    def get_key(self, image, grayscale: bool):
+        """
+        获取图片的缓存key
+
+        @param {str|PIL.Image|np.ndarray} image - 图片文件路径、图片对象或数组
+        @param {bool} grayscale - 是否灰度
+
+        @returns {tuple} - 缓存key, 无法缓存返回None
+        """
+        if type(image) == str:
+            try:
+                _stat = os.stat(image)
+            except OSError:
+                return None
+            return ('file', os.path.abspath(image), _stat.st_mtime_ns, _stat.st_size, grayscale)
+
+        return ('object', id(image), grayscale)
+
+    #############################
+    # 内部函数
+    #############################
+
+    def _get_size(self, item) -> int:
+        """
+        计算缓存项占用的字节数
+
+        @param {object} item - 缓存项(可以为数组、字典、清单)
+
+        @returns {int} - 字节数
+        """
+        if isinstance(item, np.ndarray):
+            return item.nbytes
+        elif isinstance(item, dict):
+            return sum([self._get_size(_val) for _val in item.values()])
+        elif isinstance(item, (list, tuple)):
+            return sum([self._get_size(_val) for _val in item])
+        else:
+            return 0
+
+    def _evict(self):
+        """
+        淘汰最久未使用的缓存项, 直到占用字节数不超过限制
+        """
+        while self.bytes > self.max_bytes and len(self._items) > 0:
+            _key, _entry = self._items.popitem(last=False)
+            self.bytes -= _entry['bytes']
+
+    def get(self, image, grayscale: bool = False) -> dict:
+        """
+        获取模板缓存项, 不存在则加载并加入缓存
+
+        @param {str|PIL.Image|np.ndarray} image - 图片文件路径、图片对象或数组
+        @param {bool} grayscale=False - 是否转换为灰度
+
+        @returns {dict} - 缓存项字典
+            array {np.ndarray} - 转换后的模板数组
+            grayscale {bool} - 是否灰度
+            stat {dict} - 各引擎预先计算的统计量, key为引擎名
+            pyramid {dict} - 缩小后的模板缓存项, key为缩小倍数, 在金字塔匹配时填充
+            bytes {int} - 占用字节数
+        """
+        _key = self.get_key(image, grayscale)
+        with self._lock:
+            _entry = None if _key is None else self._items.get(_key, None)
+            if _entry is not None and (
+                _entry['ref'] is None or _entry['ref']() is image
+            ):
+                self.hits += 1
+                self._items.move_to_end(_key)
+                return _entry
+
+        # 加载图片不需要加锁
+        self.misses += 1
+        _ref = None
+        if _key is not None and _key[0] == 'object':
+            try:
+                _ref = weakref.ref(image)
+            except TypeError:
+                # 不支持弱引用的对象无法确认id是否被复用, 不缓存
+                _key = None
+
+        _entry = {
+            'array': ImageMatcher.to_array(image, grayscale=grayscale),
+            'grayscale': grayscale,
+            'stat': dict(),
+            'pyramid': dict(),
+            'ref': _ref,
+            'bytes': 0
+        }
+        _entry['bytes'] = self._get_size(_entry['array'])
+        if _key is None or self.max_bytes <= 0:
+            return _entry
+
+        _entry['key'] = _key
+        with self._lock:
+            _old = self._items.pop(_key, None)
+            if _old is not None:
+                self.bytes -= _old['bytes']
+            self._items[_key] = _entry
+            self.bytes += _entry['bytes']
+            self._evict()
+
+        return _entry
+
+    def update_size(self, entry: dict):
+        """
+        重新计算缓存项的占用字节数(引擎补充了统计量后调用)
+
+        @param {dict} entry - 缓存项
+        """
+        _size = self._get_size(entry)
+        with self._lock:
+            if self._items.get(entry.get('key', None), None) is entry:
+                self.bytes += _size - entry['bytes']
+                entry['bytes'] = _size
+                self._evict()
+            else:
+                entry['bytes'] = _size
+
+    def remove(self, image):
+        """
+        删除图片的缓存(包括彩色及灰度)
+
+        @param {str|PIL.Image|np.ndarray} image - 图片文件路径、图片对象或数组
+        """
+        with self._lock:
+            for _grayscale in (True, False):
+                _entry = self._items.pop(self.get_key(image, _grayscale), None)
+                if _entry is not None:
+                    self.bytes -= _entry['bytes']
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        获取缓存的统计信息
+
+        @returns {dict} - 统计信息 {'count': 缓存数量, 'bytes': 占用字节数, 'max_bytes': 最大字节数,
+            'hits': 命中次数, 'misses': 未命中次数}
+        """
+        with self._lock:
+            return {
+                'count': len(self._items), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses
+            }
+
+
+class MatchFrame(object):
+    """
+    被查找的图像, 在同一图像中查找多个模板时共用转换后的数组及各引擎预先计算的统计量
+    注: 对象只在一次截图的查找过程中使用, 非线程安全
+    """
+
+    def __init__(self, image, frame_hash: str = None):
+        """
+        构造函数
+
+        @param {str|PIL.Image|np.ndarray|bytes} image - 图片文件路径、图片对象、数组或已编码的图片数据
+        @param {str} frame_hash=None - 已计算好的图像哈希值, 不传代表在使用时计算
+        """
+        self.image = image
+        self._hash = frame_hash
+        self._digest = None
+        self._items = dict()
+
+        # 图像像素与屏幕坐标的比例, 由使用画面的控制对象在首次需要时计算并登记, 同一画面只计算一次
+        self.scale = None
+
+    @property
+    def hash(self) -> str:
+        """
+        图像的降采样哈希值(参考 ImageMatcher.frame_hash)
+
+        @property {str}
+        """
+        if self._hash is None:
+            if isinstance(self.image, (bytes, bytearray)):
+                # 已编码的数据直接计算哈希, 不需要解码
+                self._hash = hashlib.md5(self.image).hexdigest()
+            else:
+                self._hash = ImageMatcher.frame_hash(
+                    self.get(False)['array'] if type(self.image) == str else self.image
+                )
+
+        return self._hash
+
+    @property
+    def digest(self) -> str:
+        """
+        图像完整内容的哈希值
+        注: 降采样哈希值会漏掉小范围的变化, 需要按画面内容缓存结果时(例如 FrameCache)使用该值
+
+        @property {str}
+        """
+        if self._digest is None:
+            if isinstance(self.image, (bytes, bytearray)):
+                _blake = hashlib.blake2b(self.image, digest_size=16)
+            else:
+                if type(self.image) == str:
+                    _array = self.get(False)['array']
+                elif isinstance(self.image, np.ndarray):
+                    _array = self.image
+                else:
+                    _array = np.asarray(self.image)
+                _blake = hashlib.blake2b(str(_array.shape).encode('ascii'), digest_size=16)
+                _blake.update(np.ascontiguousarray(_array).data)
+            self._digest = _blake.hexdigest()
+
+        return self._digest
+
+    def get(self, grayscale: bool = False) -> dict:
+        """
+        获取指定颜色模式的图像缓存项, 不存在则转换生成
+
+        @param {bool} grayscale=False - 是否转换为灰度
+
+        @returns {dict} - 缓存项字典
+            array {np.ndarray} - 转换后的图像数组
+            stat {dict} - 各引擎预先计算的统计量, key为引擎名
+            pyramid {dict} - 缩小后的图像缓存项, key为缩小倍数, 在金字塔匹配时填充
+        """
+        _item = self._items.get(grayscale, None)
+        if _item is None:
+            _item = {
+                'array': ImageMatcher.to_array(self.image, grayscale=grayscale),
+                'stat': dict(),
+                'pyramid': dict()
+            }
+            self._items[grayscale] = _item
+
+        return _item
+
+    def patch(self, region: tuple) -> np.ndarray:
+        """
+        获取图像指定区域的RGB数组
+        注: 原始像素数组(例如 screencap 获取的RGBA画面)及PIL对象只转换指定区域, 不转换整个图像;
+            已编码的数据及图片文件需要先完整解码
+
+        @param {tuple} region - 区域 (x, y, width, height), 超出图像范围的部分自动裁剪
+
+        @returns {np.ndarray} - 区域的RGB数组 (h, w, 3)
+        """
+        _item = self._items.get(False, None)
+        if _item is not None:
+            return ImageMatcher.crop(_item['array'], region)[2]
+
+        if isinstance(self.image, np.ndarray):
+            return ImageMatcher.to_array(ImageMatcher.crop(self.image, region)[2])
+
+        if isinstance(self.image, Image.Image):
+            _w, _h = self.image.size
+            _x0 = min(max(int(region[0]), 0), _w)
+            _y0 = min(max(int(region[1]), 0), _h)
+            _x1 = min(max(int(region[0] + region[2]), _x0), _w)
+            _y1 = min(max(int(region[1] + region[3]), _y0), _h)
+            return np.asarray(self.image.crop((_x0, _y0, _x1, _y1)).convert('RGB'))
+
+        return ImageMatcher.crop(self.get(False)['array'], region)[2]
+
+
+class ImageMatcher(object):
+    """
+    图像定位工具, 供各类设备控件的 locate_on_screen 等函数共用
+    """
+
+    # 默认使用的匹配引擎, 安装了opencv时优先使用opencv
+    default_engine = 'numpy' if cv2 is None else 'opencv'
+
+    # 模板图片缓存, 可通过 set_template_cache_size 调整大小
+    template_cache = TemplateCache()
+
+    # 记录每个模板最后找到的位置, 供 hint=True 时优先查找, 最多记录的模板数量
+    last_locations = collections.OrderedDict()
+    last_locations_size = 1024
+
+    # 金字塔匹配时缩小后的模板最小边长, 小于该值不使用金字塔匹配
+    PYRAMID_MIN_SIZE = 8
+
+    # 金字塔匹配时粗匹配阈值比confidence降低的值(缩小后细节丢失, 匹配度会下降)
+    PYRAMID_SLACK = 0.2
+
+    # 金字塔匹配时每个需返回的结果最多确认的粗匹配候选数量
+    PYRAMID_CANDIDATES = 8
+
+    #############################
+    # 引擎管理
+    #############################
+    @classmethod
+    def register_engine(cls, name: str, engine):
+        """
+        注册匹配引擎
+
+        @param {str} name - 引擎名
+        @param {object} engine - 引擎类, 需实现 match_template(haystack, needle, template=None, frame=None) 函数
+        """
+        MATCH_ENGINES[name] = engine
+
+    @classmethod
+    def set_template_cache_size(cls, max_bytes: int):
+        """
+        设置模板缓存占用的最大字节数
+
+        @param {int} max_bytes - 最大字节数, 传0代表不缓存
+        """
+        with cls.template_cache._lock:
+            cls.template_cache.max_bytes = max_bytes
+            cls.template_cache._evict()
+
+    @classmethod
+    def set_default_engine(cls, name: str):
+        """
+        设置默认使用的匹配引擎
+
+        @param {str} name - 引擎名
+        """
+        if name not in MATCH_ENGINES.keys():
+            raise KeyError('match engine [%s] not found' % name)
+        cls.default_engine = name
+
+    @classmethod
+    def get_engine(cls, name: str = None):
+        """
+        获取匹配引擎
+
+        @param {str} name=None - 引擎名, 不传代表使用默认引擎
+
+        @returns {object} - 引擎类
+        """
+        return MATCH_ENGINES[cls.default_engine if name is None else name]
+
+    #############################
+    # 工具函数
+    #############################
+    @classmethod
+    def to_array(cls, image, grayscale: bool = False) -> np.ndarray:
+        """
+        将图片转换为匹配使用的数组
+
+        @param {str|PIL.Image|np.ndarray|bytes} image - 图片文件路径、图片对象、数组(RGB/RGBA/灰度)
+            或已编码的图片数据(例如截图返回的png数据)
+        @param {bool} grayscale=False - 是否转换为灰度
+
+        @returns {np.ndarray} - uint8数组, 灰度为 (H, W), 彩色为 (H, W, 3)
+        """
+        if isinstance(image, (bytes, bytearray)):
+            if cv2 is not None:
+                # 直接解码为数组, 不经过PIL对象
+                _array = cv2.imdecode(
+                    np.frombuffer(image, dtype=np.uint8),
+                    cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+                )
+                return _array if grayscale else cv2.cvtColor(_array, cv2.COLOR_BGR2RGB)
+
+            image = BytesIO(image)
+
+        if isinstance(image, np.ndarray):
+            _array = image
+            if _array.ndim == 3 and _array.shape[2] == 4:
+                _array = _array[:, :, 0:3]
+
+            if grayscale and _array.ndim == 3:
+                # 与PIL的L模式转换公式一致
+                _array = _array[:, :, 0:3].astype(np.float32) @ np.array(
+                    [0.299, 0.587, 0.114], dtype=np.float32
+                )
+                _array = np.clip(np.rint(_array), 0, 255)
+            elif not grayscale and _array.ndim == 2:
+                _array = np.repeat(_array[:, :, np.newaxis], 3, axis=2)
+
+            return _array.astype(np.uint8, copy=False)
+
+        _image = Image.open(image) if isinstance(image, (str, BytesIO)) else image
+        return np.asarray(_image.convert('L' if grayscale else 'RGB'))
+
+    @classmethod
+    def crop(cls, array: np.ndarray, region: tuple) -> tuple:
+        """
+        截取数组的指定区域(超出范围的部分自动裁剪)
+
+        @param {np.ndarray} array - 图像数组
+        @param {tuple} region - 区域 (x, y, width, height)
+
+        @returns {(int, int, np.ndarray)} - 返回截取区域实际的左上角坐标和截取后的数组 (x, y, array)
+        """
+        _x0 = min(max(int(region[0]), 0), array.shape[1])
+        _y0 = min(max(int(region[1]), 0), array.shape[0])
+        _x1 = min(max(int(region[0] + region[2]), _x0), array.shape[1])
+        _y1 = min(max(int(region[1] + region[3]), _y0), array.shape[0])
+        return _x0, _y0, array[_y0:_y1, _x0:_x1]
+
+    @classmethod
+    def downsample(cls, array: np.ndarray, scale: int) -> np.ndarray:
+        """
+        按块平均的方式缩小图像数组
+
+        @param {np.ndarray} array - 图像数组, (H, W) 或 (H, W, C)
+        @param {int} scale - 缩小倍数
+
+        @returns {np.ndarray} - 缩小后的uint8数组, 大小为 (H // scale, W // scale)
+        """
+        _h, _w = array.shape[0] // scale, array.shape[1] // scale
+        _array = array[0:_h * scale, 0:_w * scale].astype(np.float32).reshape(
+            (_h, scale, _w, scale) + array.shape[2:]
+        ).mean(axis=(1, 3))
+        return np.rint(_array).astype(np.uint8)
+
+    @classmethod
+    def frame_hash(cls, image, step: int = 8) -> str:
+        """
+        计算图像的降采样哈希值, 用于快速判断屏幕内容是否变化
+
+        @param {PIL.Image|np.ndarray} image - 图片对象或数组
+        @param {int} step=8 - 降采样的步长(每隔step个像素取一个点)
+
+        @returns {str} - 哈希值
+        """
+        _array = image if isinstance(image, np.ndarray) else np.asarray(image)
+        _md5 = hashlib.md5(str(_array.shape).encode('ascii'))
+        _md5.update(np.ascontiguousarray(_array[::step, ::step]).tobytes())
+        return _md5.hexdigest()
+
+    @classmethod
+    def get_last_location(cls, needle, grayscale: bool = False) -> tuple:
+        """
+        获取模板最后一次找到的位置
+
+        @param {str|PIL.Image|np.ndarray} needle - 模板图片
+        @param {bool} grayscale=False - 是否灰度检索
+
+        @returns {(int, int, int, int)} - 位置 (x, y, width, height), 没有记录返回None
+        """
+        return cls.last_locations.get(cls.template_cache.get_key(needle, grayscale), None)
+
+    @classmethod
+    def find_peaks(cls, score: np.ndarray, w: int, h: int, confidence: float,
+                   limit: int = 10000) -> list:
+        """
+        从匹配度数组中找出不重叠的匹配位置
+
+        @param {np.ndarray} score - 匹配度数组
+        @param {int} w - 模板宽度
+        @param {int} h - 模板高度
+        @param {float} confidence - 匹配度阈值
+        @param {int} limit=10000 - 最多返回的数量
+
+        @returns {list} - 按匹配度从高到低排列的位置清单 [(x, y, width, height, score), ...]
+        """
+        if score.size == 0:
+            return list()
+
+        # 只保留3x3范围内的局部最大值
+        _mask = score >= confidence
+        if not _mask.any():
+            return list()
+
+        _padded = np.pad(score, 1, mode='constant', constant_values=-np.inf)
+        for _dy in (0, 1, 2):
+            for _dx in (0, 1, 2):
+                if _dy == 1 and _dx == 1:
+                    continue
+                _mask &= score >= _padded[_dy:_dy + score.shape[0], _dx:_dx + score.shape[1]]
+
+        _ys, _xs = np.nonzero(_mask)
+        _scores = score[_ys, _xs]
+        _order = np.argsort(-_scores, kind='stable')
+
+        # 按匹配度从高到低排除重叠的位置
+        _ret = list()
+        _kept = np.zeros((0, 2), dtype=np.int64)
+        for _index in _order:
+            _x, _y = int(_xs[_index]), int(_ys[_index])
+            if _kept.shape[0] > 0 and np.any(
+                (np.abs(_kept[:, 0] - _x) < w) & (np.abs(_kept[:, 1] - _y) < h)
+            ):
+                continue
+
+            _ret.append((_x, _y, w, h, float(_scores[_index])))
+            if len(_ret) >= limit:
+                break
+            _kept = np.vstack((_kept, [[_x, _y]]))
+
+        return _ret
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _match_pyramid(cls, engine, template: dict, haystack: np.ndarray, confidence: float,
+                       limit: int, scale: int, frame: dict = None) -> list:
+        """
+        金字塔匹配: 先在缩小的图像中粗匹配, 再在原图中对候选位置附近进行确认
+
+        @param {object} engine - 匹配引擎
+        @param {dict} template - 模板缓存项
+        @param {np.ndarray} haystack - 被查找的图像数组
+        @param {float} confidence - 匹配度
+        @param {int} limit - 匹配数量限制
+        @param {int} scale - 缩小倍数
+        @param {dict} frame=None - haystack对应的图像缓存项, 传入时共用缩小后的图像
+
+        @returns {list} - 按匹配度从高到低排列的位置清单 [(x, y, width, height, score), ...],
+            模板太小无法使用金字塔匹配时返回None
+        """
+        _h, _w = template['array'].shape[0:2]
+        if min(_h, _w) // scale < cls.PYRAMID_MIN_SIZE:
+            return None
+
+        _coarse = template['pyramid'].get(scale, None)
+        if _coarse is None:
+            _coarse = {
+                'array': cls.downsample(template['array'], scale), 'stat': dict()
+            }
+            template['pyramid'][scale] = _coarse
+
+        _coarse_frame = None if frame is None else frame['pyramid'].get(scale, None)
+        if _coarse_frame is None:
+            _coarse_frame = {'array': cls.downsample(haystack, scale), 'stat': dict()}
+            if frame is not None:
+                frame['pyramid'][scale] = _coarse_frame
+
+        _score = engine.match_template(
+            _coarse_frame['array'], _coarse['array'], template=_coarse, frame=_coarse_frame
+        )
+        # 候选位置之间按模板一半的大小排除重叠, 原图确认时搜索范围覆盖被排除的位置
+        _sw = max(_coarse['array'].shape[1] // 2, 1)
+        _sh = max(_coarse['array'].shape[0] // 2, 1)
+        _candidates = cls.find_peaks(
+            _score, _sw, _sh, confidence - cls.PYRAMID_SLACK, limit=limit * cls.PYRAMID_CANDIDATES
+        )
+
+        # 在原图中确认候选位置, 搜索范围再各扩展2个缩小单位以覆盖缩小时的取整误差
+        _ret = list()
+        for _cx, _cy, _cw, _ch, _cscore in _candidates:
+            _x0, _y0, _window = cls.crop(
+                haystack, (
+                    (_cx - _sw - 2) * scale, (_cy - _sh - 2) * scale,
+                    _w + (2 * _sw + 4) * scale, _h + (2 * _sh + 4) * scale
+                )
+            )
+            _found = cls.find_peaks(
+                engine.match_template(_window, template['array'], template=template),
+                _w, _h, confidence, limit=1
+            )
+            if len(_found) > 0:
+                _ret.append((_x0 + _found[0][0], _y0 + _found[0][1], _w, _h, _found[0][4]))
+
+        # 排除不同候选确认到的重叠位置
+        _ret.sort(key=lambda _item: -_item[4])
+        _kept = list()
+        for _item in _ret:
+            if len(_kept) >= limit:
+                break
+            if not any(
+                abs(_item[0] - _k[0]) < _w and abs(_item[1] - _k[1]) < _h for _k in _kept
+            ):
+                _kept.append(_item)
+
+        return _kept
+
+    #############################
+    # 图像定位
+    #############################
+    @classmethod
+    def match_all(cls, needle, haystack, grayscale: bool = False, confidence: float = 0.999,
+                  limit: int = 10000, engine: str = None, region: tuple = None,
+                  pyramid: int = 0, **kwargs) -> list:
+        """
+        在图像中查找模板的所有匹配位置(包含匹配度)
+
+        @param {str|PIL.Image|np.ndarray} needle - 要查找的模板图片
+        @param {str|PIL.Image|np.ndarray|MatchFrame} haystack - 被查找的图像, 传入MatchFrame可在多次查找中共用图像的预处理结果
+        @param {bool} grayscale=False - 是否转换图片为灰度检索
+        @param {float} confidence=0.999 - 匹配度
+        @param {int} limit=10000 - 匹配数量限制
+        @param {str} engine=None - 使用的匹配引擎, 不传代表使用默认引擎
+        @param {tuple} region=None - 只在指定区域内查找 (x, y, width, height), 返回的位置仍为整个图像的坐标
+        @param {int} pyramid=0 - 金字塔匹配的缩小倍数(例如4), 0代表不使用
+            注: 先在缩小后的图像中找出候选位置, 再在原图中确认, 匹配度仍按原图计算;
+            候选位置均确认失败时会在原图中完整查找一次, 因此适用于查找单个位置(locate)的场景;
+            存在多个满足匹配度的相似位置时, 返回的不一定是匹配度最高的位置
+        @param {kwargs} - 兼容pyscreeze的参数, 例如step, 不使用
+
+        @returns {list} - 按匹配度从高到低排列的位置清单 [(x, y, width, height, score), ...]
+        """
+        _template = cls.template_cache.get(needle, grayscale=grayscale)
+        _needle = _template['array']
+        _frame = (haystack if isinstance(haystack, MatchFrame) else MatchFrame(haystack)).get(grayscale)
+        _haystack = _frame['array']
+        _engine = cls.get_engine(engine)
+        _x0, _y0 = 0, 0
+        if region is not None:
+            # 指定区域时无法共用整个图像的统计量
+            _x0, _y0, _haystack = cls.crop(_haystack, region)
+            _frame = None
+
+        _ret = None
+        if pyramid is not None and pyramid > 1:
+            _ret = cls._match_pyramid(
+                _engine, _template, _haystack, confidence, limit, pyramid, frame=_frame
+            )
+
+        if not _ret:
+            _score = _engine.match_template(_haystack, _needle, template=_template, frame=_frame)
+            _ret = cls.find_peaks(
+                _score, _needle.shape[1], _needle.shape[0], confidence, limit=limit
+            )
+
+        cls.template_cache.update_size(_template)
+        if _x0 != 0 or _y0 != 0:
+            _ret = [(_item[0] + _x0, _item[1] + _y0, _item[2], _item[3], _item[4]) for _item in _ret]
+
+        if len(_ret) > 0:
+            # 记录最后找到的位置
+            _key = cls.template_cache.get_key(needle, grayscale)
+            if _key is not None:
+                cls.last_locations[_key] = _ret[0][0:4]
+                cls.last_locations.move_to_end(_key)
+                while len(cls.last_locations) > cls.last_locations_size:
+                    cls.last_locations.popitem(last=False)
+
+        return _ret
+
+    @classmethod
+    def locate(cls, needle, haystack, grayscale: bool = False, confidence: float = 0.999,
+               engine: str = None, region: tuple = None, hint=None, hint_margin: int = 20,
+               pyramid: int = 0, **kwargs) -> tuple:
+        """
+        在图像中定位模板的位置(匹配度最高的位置)
+
+        @param {str|PIL.Image|np.ndarray} needle - 要查找的模板图片
+        @param {str|PIL.Image|np.ndarray|MatchFrame} haystack - 被查找的图像
+        @param {bool} grayscale=False - 是否转换图片为灰度检索
+        @param {float} confidence=0.999 - 匹配度
+        @param {str} engine=None - 使用的匹配引擎, 不传代表使用默认引擎
+        @param {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
+        @param {tuple|bool} hint=None - 优先查找的位置 (x, y, width, height), 传True代表使用该模板最后一次找到的位置
+            注: 先在提示位置(向四周扩展hint_margin)内查找, 找不到再按region/pyramid参数正常查找;
+            提示位置内找到满足匹配度的位置即返回, 不保证是整个图像中匹配度最高的位置
+        @param {int} hint_margin=20 - 提示位置向四周扩展的像素数
+        @param {int} pyramid=0 - 金字塔匹配的缩小倍数(例如4), 0代表不使用, 参考 match_all
+        @param {kwargs} - 兼容pyscreeze的参数, 例如limit/step, 不使用
+
+        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 找不到返回None
+        """
+        # 图像只转换一次
+        _haystack = haystack if isinstance(haystack, MatchFrame) else MatchFrame(haystack)
+        if hint is True:
+            hint = cls.get_last_location(needle, grayscale=grayscale)
+
+        if hint is not None:
+            _x0, _y0 = hint[0] - hint_margin, hint[1] - hint_margin
+            _x1, _y1 = hint[0] + hint[2] + hint_margin, hint[1] + hint[3] + hint_margin
+            if region is not None:
+                _x0, _y0 = max(_x0, region[0]), max(_y0, region[1])
+                _x1, _y1 = min(_x1, region[0] + region[2]), min(_y1, region[1] + region[3])
+
+            if _x1 > _x0 and _y1 > _y0:
+                _ret = cls.match_all(
+                    needle, _haystack, grayscale=grayscale, confidence=confidence, limit=1,
+                    engine=engine, region=(_x0, _y0, _x1 - _x0, _y1 - _y0)
+                )
+                if len(_ret) > 0:
+                    return _ret[0][0:4]
+
+        _ret = cls.match_all(
+            needle, _haystack, grayscale=grayscale, confidence=confidence, limit=1, engine=engine,
+            region=region, pyramid=pyramid
+        )
+        return None if len(_ret) == 0 else _ret[0][0:4]
+
+    @classmethod
+    def locate_all(cls, needle, haystack, grayscale: bool = False, confidence: float = 0.999,
+                   limit: int = 10000, engine: str = None, region: tuple = None, **kwargs) -> list:
+        """
+        在图像中定位模板的所有位置
+
+        @param {str|PIL.Image|np.ndarray} needle - 要查找的模板图片
+        @param {str|PIL.Image|np.ndarray} haystack - 被查找的图像
+        @param {bool} grayscale=False - 是否转换图片为灰度检索
+        @param {float} confidence=0.999 - 匹配度
+        @param {int} limit=10000 - 匹配数量限制
+        @param {str} engine=None - 使用的匹配引擎, 不传代表使用默认引擎
+        @param {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
+        @param {kwargs} - 兼容pyscreeze的参数, 例如step, 不使用
+
+        @returns {list} - 按从上到下、从左到右排列的位置清单 [(x, y, width, height), ...]
+        """
+        _ret = cls.match_all(
+            needle, haystack, grayscale=grayscale, confidence=confidence, limit=limit, engine=engine,
+            region=region
+        )
+        return sorted([_item[0:4] for _item in _ret], key=lambda _item: (_item[1], _item[0]))
+
+    @classmethod
+    def locate_many(cls, needles, haystack, grayscale: bool = False, confidence: float = 0.999,
+                    engine: str = None, **kwargs):
+        """
+        在同一图像中定位多个模板的位置(共用图像的预处理结果)
+
+        @param {list|dict} needles - 要查找的模板图片清单, 也可以传入字典 {key: 模板图片}
+        @param {str|PIL.Image|np.ndarray|MatchFrame} haystack - 被查找的图像
+        @param {bool} grayscale=False - 是否转换图片为灰度检索
+        @param {float} confidence=0.999 - 匹配度
+        @param {str} engine=None - 使用的匹配引擎, 不传代表使用默认引擎
+        @param {kwargs} - 其他 locate 支持的参数, 例如 region/hint/pyramid
+
+        @returns {list|dict} - 与needles对应的位置清单 [(x, y, width, height), ...], 找不到的模板位置为None;
+            needles为字典时返回 {key: 位置}
+        """
+        _frame = haystack if isinstance(haystack, MatchFrame) else MatchFrame(haystack)
+        if isinstance(needles, dict):
+            return {
+                _key: cls.locate(
+                    _needle, _frame, grayscale=grayscale, confidence=confidence, engine=engine, **kwargs
+                ) for _key, _needle in needles.items()
+            }
+
+        return [
+            cls.locate(
+                _needle, _frame, grayscale=grayscale, confidence=confidence, engine=engine, **kwargs
+            ) for _needle in needles
+        ]
+
+    @classmethod
+    def locate_any(cls, needles, haystack, grayscale: bool = False, confidence: float = 0.999,
+                   engine: str = None, **kwargs) -> tuple:
+        """
+        按顺序在同一图像中查找多个模板, 返回第一个找到的模板
+
+        @param {list|dict} needles - 要查找的模板图片清单, 也可以传入字典 {key: 模板图片}
+        @param {str|PIL.Image|np.ndarray|MatchFrame} haystack - 被查找的图像
+        @param {bool} grayscale=False - 是否转换图片为灰度检索
+        @param {float} confidence=0.999 - 匹配度
+        @param {str} engine=None - 使用的匹配引擎, 不传代表使用默认引擎
+        @param {kwargs} - 其他 locate 支持的参数, 例如 region/hint/pyramid
+
+        @returns {(object, (int, int, int, int))} - 返回 (模板索引或key, 位置), 都找不到返回 (None, None)
+        """
+        _frame = haystack if isinstance(haystack, MatchFrame) else MatchFrame(haystack)
+        _items = needles.items() if isinstance(needles, dict) else enumerate(needles)
+        for _key, _needle in _items:
+            _box = cls.locate(
+                _needle, _frame, grayscale=grayscale, confidence=confidence, engine=engine, **kwargs
+            )
+            if _box is not None:
+                return _key, _box
+
+        return None, None
+
+    #############################
+    # 像素检查
+    #############################
+    @classmethod
+    def pixel_color(cls, image, x: int, y: int) -> tuple:
+        """
+        获取图像指定位置的像素颜色
+
+        @param {str|PIL.Image|np.ndarray|bytes|MatchFrame} image - 图像
+        @param {int} x - x坐标
+        @param {int} y - y坐标
+
+        @returns {(int, int, int)} - 返回RGB三色结果, 坐标超出图像范围返回None
+        """
+        _frame = image if isinstance(image, MatchFrame) else MatchFrame(image)
+        _patch = _frame.patch((x, y, 1, 1))
+        if _patch.size == 0:
+            return None
+
+        return tuple([int(_val) for _val in _patch[0, 0]])
+
+    @classmethod
+    def probe(cls, image, probes: list, scale: float = 1.0) -> list:
+        """
+        检查图像中的像素或小区域颜色是否符合要求(不进行模板匹配, 只读取检查涉及的像素)
+
+        @param {str|PIL.Image|np.ndarray|bytes|MatchFrame} image - 图像
+        @param {list} probes - 检查条件清单, 每个条件为字典:
+            point {tuple} - 像素坐标 (x, y), 与region二选一
+            region {tuple} - 区域 (x, y, width, height)
+            color {tuple} - 期望的颜色 (r, g, b)
+            tolerance {int} - 每个颜色通道允许的误差, 默认为0
+            ratio {float} - 区域中符合颜色的像素比例下限, 默认为1.0
+            mean {bool} - 是否按区域的平均颜色判断, 默认为False
+            not {bool} - 是否对检查结果取反, 默认为False
+            注: 也可以直接传入元组 (x, y, color) 或 (x, y, color, tolerance) 代表像素条件
+        @param {float} scale=1.0 - 图像像素与条件坐标的比例(例如iOS高分屏截图为2.0)
+
+        @returns {list} - 与probes对应的检查结果(bool)清单, 区域完全超出图像范围时结果为False
+        """
+        _frame = image if isinstance(image, MatchFrame) else MatchFrame(image)
+        _ret = list()
+        for _probe in probes:
+            if isinstance(_probe, (tuple, list)):
+                _probe = {
+                    'point': _probe[0:2], 'color': _probe[2],
+                    'tolerance': _probe[3] if len(_probe) > 3 else 0
+                }
+
+            if 'region' in _probe.keys():
+                _region = tuple(_probe['region'])
+            else:
+                _region = (_probe['point'][0], _probe['point'][1], 1, 1)
+
+            if scale != 1.0:
+                _region = (
+                    int(round(_region[0] * scale)), int(round(_region[1] * scale)),
+                    max(1, int(round(_region[2] * scale))), max(1, int(round(_region[3] * scale)))
+                )
+
+            _patch = _frame.patch(_region)
+            if _patch.size == 0:
+                _ret.append(False)
+                continue
+
+            _color = np.array(_probe['color'][0:3], dtype=np.int16)
+            _tolerance = _probe.get('tolerance', 0)
+            if _probe.get('mean', False):
+                _diff = np.abs(_patch.reshape(-1, 3).mean(axis=0) - _color)
+                _match = bool(np.all(_diff <= _tolerance))
+            else:
+                _diff = np.abs(_patch.astype(np.int16) - _color).max(axis=2)
+                _match = bool(
+                    np.count_nonzero(_diff <= _tolerance) >= _probe.get('ratio', 1.0) * _diff.size
+                )
+
+            _ret.append(_match != _probe.get('not', False))
+
+        return _ret
+
+    #############################
+    # 等待图像出现
+    #############################
+    @classmethod
+    def wait_match(cls, grab_fun, match_fun, timeout: float, interval: float = 0.2,
+                   max_interval: float = 0.5):
+        """
+        循环获取图像并匹配, 直到匹配成功或超时
+        注: 1、图像的降采样哈希值与上一次相同时不重复匹配, 并将等待间隔逐步加倍(不超过max_interval);
+            2、截止时间按单调时钟计算, 不会在截止时间之后再获取图像, 等待过程中不占用CPU
+
+        @param {function} grab_fun - 获取图像的函数, 无入参, 返回 PIL.Image、np.ndarray 或 MatchFrame
+        @param {function} match_fun - 匹配函数, 入参为 MatchFrame 对象, 返回匹配结果, 匹配失败返回None
+        @param {float} timeout - 最长等待时间, 单位为秒, 传0代表只匹配一次
+        @param {float} interval=0.2 - 每次获取图像的间隔时间, 单位为秒
+        @param {float} max_interval=0.5 - 图像未变化时最长的间隔时间, 单位为秒
+
+        @returns {object} - 返回匹配结果, 超时返回None
+        """
+        _deadline = time.monotonic() + timeout
+        _last_hash = None
+        _sleep = interval
+        while True:
+            _frame = grab_fun()
+            if not isinstance(_frame, MatchFrame):
+                _frame = MatchFrame(_frame)
+
+            _hash = _frame.hash
+            if _hash != _last_hash:
+                _last_hash = _hash
+                _sleep = interval
+                _ret = match_fun(_frame)
+                if _ret is not None:
+                    return _ret
+            else:
+                # 图像没有变化, 逐步延长等待时间
+                _sleep = min(_sleep * 2, max(interval, max_interval))
+
+            _remain = _deadline - time.monotonic()
+            if _remain <= 0:
+                return None
+
+            time.sleep(min(_sleep, _remain))
+
+    @classmethod
+    def wait_locate(cls, needle, grab_fun, timeout: float, interval: float = 0.2,
+                    max_interval: float = 0.5, **kwargs) -> tuple:
+        """
+        等待模板出现在图像中
+
+        @param {str|PIL.Image|np.ndarray} needle - 要查找的模板图片
+        @param {function} grab_fun - 获取图像的函数, 无入参, 返回 PIL.Image、np.ndarray 或 MatchFrame
+        @param {float} timeout - 最长等待时间, 单位为秒, 传0代表只匹配一次
+        @param {float} interval=0.2 - 每次获取图像的间隔时间, 单位为秒
+        @param {float} max_interval=0.5 - 图像未变化时最长的间隔时间, 单位为秒
+        @param {kwargs} - 其他 locate 支持的参数
+
+        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 超时返回None
+        """
+        return cls.wait_match(
+            grab_fun, lambda frame: cls.locate(needle, frame, **kwargs),
+            timeout, interval=interval, max_interval=max_interval
+        )
+
+    @classmethod
+    def wait_locate_any(cls, needles, grab_fun, timeout: float, interval: float = 0.2,
+                        max_interval: float = 0.5, **kwargs) -> tuple:
+        """
+        等待多个模板中任意一个出现在图像中
+
+        @param {list|dict} needles - 要查找的模板图片清单, 也可以传入字典 {key: 模板图片}
+        @param {function} grab_fun - 获取图像的函数, 无入参, 返回 PIL.Image、np.ndarray 或 MatchFrame
+        @param {float} timeout - 最长等待时间, 单位为秒, 传0代表只匹配一次
+        @param {float} interval=0.2 - 每次获取图像的间隔时间, 单位为秒
+        @param {float} max_interval=0.5 - 图像未变化时最长的间隔时间, 单位为秒
+        @param {kwargs} - 其他 locate 支持的参数
+
+        @returns {(object, (int, int, int, int))} - 返回 (模板索引或key, 位置), 超时返回 (None, None)
+        """
+        def _match_fun(frame):
+            _ret = cls.locate_any(needles, frame, **kwargs)
+            return None if _ret[0] is None else _ret
+
+        _ret = cls.wait_match(
+            grab_fun, _match_fun, timeout, interval=interval, max_interval=max_interval
+        )
+        return (None, None) if _ret is None else _ret
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+图片保存模块
+@module image_writer
+@file image_writer.py
+"""
+
+import os
+import re
+import sys
+import queue
+import atexit
+import weakref
+import logging
+import threading
+import traceback
+import numpy as np
+from PIL import Image
+from HiveNetLib.base_tools.file_tool import FileTool
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'image_writer'  # 模块名
+__DESCRIPT__ = u'图片保存模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.24'  # 发布日期
+
+
+# 文件扩展名对应的图片格式
+IMAGE_FORMATS = {
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.webp': 'WEBP',
+    '.bmp': 'BMP'
+}
+
+
+class ImageWriter(object):
+    """
+    图片保存工具, 支持在后台线程池中异步保存图片, 以及按运行id/步骤归档截图
+    注: 1、归档文件的路径为 archive_path/run_id/步骤名[_图片名].扩展名;
+        2、进程退出时会等待所有保存对象队列中的图片保存完成, 不会丢失已放入队列的图片
+    """
+
+    # 默认的异步保存对象
+    _default = None
+    _default_lock = threading.RLock()
+
+    # 已启动后台线程的保存对象, 进程退出时等待保存完成
+    _instances = weakref.WeakSet()
+
+    def __init__(self, queue_size: int = 64, workers: int = 1, drop_oldest: bool = False,
+                 archive_path: str = None, image_format: str = 'PNG', quality: int = None,
+                 logger=None):
+        """
+        构造函数
+
+        @param {int} queue_size=64 - 待保存图片队列的大小
+        @param {int} workers=1 - 后台保存线程数量
+        @param {bool} drop_oldest=False - 队列满时的处理方式, True-丢弃最早放入的图片, False-保存操作等待
+        @param {str} archive_path=None - 截图归档的根目录, 不传代表使用当前工作目录下的 screenshots 目录
+        @param {str} image_format='PNG' - 归档图片的默认格式(PNG/JPEG/WEBP/BMP)
+        @param {int} quality=None - 归档图片的默认质量, 参考 write_image
+        @param {Logger} logger=None - 日志对象
+        """
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger()
+
+        self.workers = max(1, workers)
+        self.drop_oldest = drop_oldest
+        self.archive_path = archive_path
+        if self.archive_path is None:
+            self.archive_path = os.path.join(os.getcwd(), 'screenshots')
+        self.image_format = image_format
+        self.quality = quality
+
+        self.saved = 0
+        self.errors = 0
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._threads = list()
+        self._lock = threading.RLock()
+        self._run_steps = dict()  # 未指定步骤时每个运行id的自增序号
+
+    #############################
+    # 静态函数
+    #############################
+    @classmethod
+    def get_default(cls):
+        """
+        获取默认的异步保存对象
+
+        @returns {ImageWriter} - 保存对象
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = ImageWriter()
+
+        return cls._default
+
+    @classmethod
+    def set_default(cls, **kwargs):
+        """
+        重新设置默认的异步保存对象
+        注: 原保存对象队列中的图片会继续在原有线程中保存
+
+        @param {dict} kwargs - 保存对象的构造参数, 参考 ImageWriter.__init__
+
+        @returns {ImageWriter} - 新的保存对象
+        """
+        with cls._default_lock:
+            cls._default = ImageWriter(**kwargs)
+
+        return cls._default
+
+    @classmethod
+    def write_image(cls, image, filename: str, image_format: str = None, quality: int = None):
+        """
+        将图片保存到文件(同步方式)
+
+        @param {PIL.Image|np.ndarray|bytes} image - 图片对象、RGB数组或已编码的图片数据(直接写入文件)
+        @param {str} filename - 要保存的文件
+        @param {str} image_format=None - 图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 图片质量, JPEG/WEBP为1-100, PNG为压缩级别0-9, 不传代表使用默认值
+        """
+        _path = os.path.split(filename)[0]
+        if _path != '':
+            FileTool.create_dir(_path, exist_ok=True)
+
+        if isinstance(image, (bytes, bytearray)):
+            # 已编码的数据, 不需要重新编码
+            with open(filename, 'wb') as _f:
+                _f.write(image)
+            return
+
+        _image = Image.fromarray(image) if isinstance(image, np.ndarray) else image
+        _format = image_format
+        if _format is None:
+            _format = IMAGE_FORMATS.get(os.path.splitext(filename)[1].lower(), 'PNG')
+        _format = _format.upper()
+
+        _options = dict()
+        if _format == 'JPEG':
+            if _image.mode not in ('RGB', 'L'):
+                _image = _image.convert('RGB')
+            if quality is not None:
+                _options['quality'] = quality
+        elif _format == 'WEBP':
+            if quality is not None:
+                _options['quality'] = quality
+        elif _format == 'PNG':
+            if quality is not None:
+                _options['compress_level'] = quality
+
+        _image.save(filename, format=_format, **_options)
+
+    #############################
+    # 公共函数
+    #############################
+    def save(self, image, filename: str, image_format: str = None, quality: int = None):
+        """
+        将图片放入队列, 由后台线程保存到文件
+
+        @param {PIL.Image|np.ndarray|bytes} image - 图片对象、RGB数组或已编码的图片数据
+            注: 传入数组时在后台线程中直接使用, 调用方不应再修改数组的内容
+        @param {str} filename - 要保存的文件
+        @param {str} image_format=None - 图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 图片质量, 参考 write_image
+        """
+        self._start_thread()
+        _item = (image, filename, image_format, quality)
+        if not self.drop_oldest:
+            self._queue.put(_item)
+            return
+
+        # 队列满时丢弃最早放入的图片, 不阻塞调用方
+        while True:
+            try:
+                self._queue.put_nowait(_item)
+                return
+            except queue.Full:
+                try:
+                    _drop = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+
+                self._queue.task_done()
+                with self._lock:
+                    self.dropped += 1
+                self.logger.warning('image writer queue full, drop image [%s]' % _drop[1])
+
+    def get_archive_file(self, run_id: str, step=None, name: str = None,
+                         image_format: str = None) -> str:
+        """
+        获取截图归档的文件路径
+
+        @param {str} run_id - 运行id, 作为归档子目录
+        @param {str|int} step=None - 步骤标识(例如step_id或步骤序号), 不传代表使用该运行id下的自增序号
+        @param {str} name=None - 图片名, 添加在步骤标识之后
+        @param {str} image_format=None - 图片格式, 不传代表使用默认格式
+
+        @returns {str} - 归档文件路径
+        """
+        _run_id = '*' if run_id is None else str(run_id)
+        _step = step
+        if _step is None:
+            with self._lock:
+                _step = self._run_steps.get(_run_id, 0) + 1
+                self._run_steps[_run_id] = _step
+
+        if isinstance(_step, int):
+            _step = '%05d' % _step
+
+        _name = str(_step) if name is None else '%s_%s' % (str(_step), name)
+        _format = (self.image_format if image_format is None else image_format).upper()
+        _ext = '.png'
+        for _key, _val in IMAGE_FORMATS.items():
+            if _val == _format:
+                _ext = _key
+                break
+
+        return os.path.join(
+            self.archive_path, self._safe_name(_run_id), self._safe_name(_name) + _ext
+        )
+
+    def archive(self, image, run_id: str, step=None, name: str = None, image_format: str = None,
+                quality: int = None) -> str:
+        """
+        将截图异步保存到运行id对应的归档目录
+
+        @param {PIL.Image|np.ndarray|bytes} image - 图片对象、RGB数组或已编码的图片数据
+        @param {str} run_id - 运行id
+        @param {str|int} step=None - 步骤标识, 参考 get_archive_file
+        @param {str} name=None - 图片名
+        @param {str} image_format=None - 图片格式, 不传代表使用默认格式
+        @param {int} quality=None - 图片质量, 不传代表使用默认质量(只在使用默认格式时生效, 不同格式的质量含义不同)
+
+        @returns {str} - 归档文件路径
+        """
+        _format = (self.image_format if image_format is None else image_format).upper()
+        _filename = self.get_archive_file(run_id, step=step, name=name, image_format=_format)
+        _quality = quality
+        if _quality is None and _format == self.image_format.upper():
+            _quality = self.quality
+        self.save(image, _filename, image_format=_format, quality=_quality)
+        return _filename
+
+    def flush(self):
+        """
+        等待队列中的图片全部保存完成
+        """
+        self._queue.join()
+
+    def stats(self) -> dict:
+        """
+        获取保存的统计信息
+
+        @returns {dict} - 统计信息
+            saved {int} - 已保存的图片数量
+            errors {int} - 保存失败的图片数量
+            dropped {int} - 因队列满被丢弃的图片数量
+            pending {int} - 队列中等待保存的图片数量
+        """
+        return {
+            'saved': self.saved,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'pending': self._queue.qsize()
+        }
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _flush_all(cls):
+        """
+        等待所有保存对象的队列保存完成(进程退出时执行)
+        """
+        for _writer in list(cls._instances):
+            _writer.flush()
+
+    @classmethod
+    def _safe_name(cls, name: str) -> str:
+        """
+        将字符串转换为可用于文件名的字符串
+
+        @param {str} name - 原字符串
+
+        @returns {str} - 替换非法字符后的字符串
+        """
+        return re.sub(r'[\\/:*?"<>|\s]', '_', name)
+
+    def _start_thread(self):
+        """
+        启动后台保存线程
+        """
+        with self._lock:
+            ImageWriter._instances.add(self)
+            self._threads = [_thread for _thread in self._threads if _thread.is_alive()]
+            while len(self._threads) < self.workers:
+                _thread = threading.Thread(
+                    target=self._write_thread_fun,
+                    name='ImageWriterThread-%d' % len(self._threads), daemon=True
+                )
+                _thread.start()
+                self._threads.append(_thread)
+
+    def _write_thread_fun(self):
+        """
+        后台保存线程函数
+        """
+        while True:
+            _image, _filename, _format, _quality = self._queue.get()
+            try:
+                self.write_image(_image, _filename, image_format=_format, quality=_quality)
+                with self._lock:
+                    self.saved += 1
+            except:
+                with self._lock:
+                    self.errors += 1
+                self.logger.error(
+                    'save image [%s] error: %s' % (_filename, traceback.format_exc())
+                )
+            finally:
+                self._queue.task_done()
+
+
+# 进程退出时保存队列中的图片(后台线程为守护线程, 退出时不会等待)
+atexit.register(ImageWriter._flush_all)
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
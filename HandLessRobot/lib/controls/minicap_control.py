@@ -24,7 +24,7 @@ from HiveNetLib.base_tools.run_tool import RunTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
-from HandLessRobot.lib.controls.adb_control import AdbTools
+from HandLessRobot.lib.controls.adb_control import AdbTools, DeviceFacts
 
 
 __MOUDLE__ = 'minicap_control'  # 模块名
@@ -58,12 +58,9 @@ class MiniCapServer(object):
         @param {str} shell_encoding=None - shell的编码
         """
         # 检查sdk版本和cpu架构
-        _cpu = AdbTools.adb_run(
-            adb_name, device_name, 'shell getprop ro.product.cpu.abi', shell_encoding=shell_encoding
-        )[0]
-        _sdk = AdbTools.adb_run(
-            adb_name, device_name, 'shell getprop ro.build.version.sdk', shell_encoding=shell_encoding
-        )[0]
+        _facts = DeviceFacts.get_facts(device_name, adb_name=adb_name, shell_encoding=shell_encoding)
+        _cpu = _facts['abi']
+        _sdk = _facts['sdk']
 
         # sdk小于16的版本要用nopie版本
         _minicap_file = 'minicap' if int(_sdk) >= 16 else 'minicap-nopie'
@@ -100,6 +97,7 @@ class MiniCapServer(object):
                       shell_encoding: str = None) -> tuple:
         """
         获取设备屏幕大小
+        注: 从设备静态信息登记簿获取, 只有首次使用设备时才执行adb命令
 
         @param {str} device_name - 设备名
         @param {str} adb_name='adb' - adb命令名
@@ -107,12 +105,7 @@ class MiniCapServer(object):
 
         @returns {tuple} - 设备屏幕大小，width, height
         """
-        _cmd_info = AdbTools.adb_run(
-            adb_name, device_name, 'shell wm size',
-            shell_encoding=shell_encoding
-        )
-        _size_str = _cmd_info[0].split(':')[1].strip().split('x')
-        return int(_size_str[0]), int(_size_str[1])
+        return DeviceFacts.get_size(device_name, adb_name=adb_name, shell_encoding=shell_encoding)
 
     def get_show_size(self, real_size: tuple, show_size: tuple) -> tuple:
         """
@@ -283,10 +276,9 @@ class MiniCapServer(object):
         # 执行处理
         try:
             # 获取设备minicap版本
-            _sdk = AdbTools.adb_run(
-                self.adb_name, device_name, 'shell getprop ro.build.version.sdk',
-                shell_encoding=self.shell_encoding
-            )[0]
+            _sdk = DeviceFacts.get_facts(
+                device_name, adb_name=self.adb_name, shell_encoding=self.shell_encoding
+            )['sdk']
             self.devices[device_name]['minicap_file'] = 'minicap' if int(
                 _sdk) >= 16 else 'minicap-nopie'
 
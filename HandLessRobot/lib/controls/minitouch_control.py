@@ -15,18 +15,16 @@
 import os
 import sys
 import math
-import random
 import socket
 import threading
 import logging
 import time
-import datetime
 import traceback
 from HiveNetLib.base_tools.run_tool import RunTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
-from HandLessRobot.lib.controls.adb_control import AdbTools
+from HandLessRobot.lib.controls.adb_control import AdbTools, DeviceFacts, TapRateScheduler
 
 
 __MOUDLE__ = 'minitouch_control'  # 模块名
@@ -145,12 +143,9 @@ class MiniTouchServer(object):
         @param {str} shell_encoding=None - shell的编码
         """
         # 检查sdk版本和cpu架构
-        _cpu = AdbTools.adb_run(
-            adb_name, device_name, 'shell getprop ro.product.cpu.abi', shell_encoding=shell_encoding
-        )[0]
-        _sdk = AdbTools.adb_run(
-            adb_name, device_name, 'shell getprop ro.build.version.sdk', shell_encoding=shell_encoding
-        )[0]
+        _facts = DeviceFacts.get_facts(device_name, adb_name=adb_name, shell_encoding=shell_encoding)
+        _cpu = _facts['abi']
+        _sdk = _facts['sdk']
 
         # sdk小于16的版本要用nopie版本
         _minitouch_file = 'minitouch' if int(_sdk) >= 16 else 'minitouch-nopie'
@@ -283,61 +278,33 @@ class MiniTouchServer(object):
 
     def tap_continuity(self, devices: list, pos_seed: list, times: float, thread_count: int = 2,
                        random_sleep: bool = False, sleep_min: float = 0.0, sleep_max: float = 0.5,
-                       pressure: int = 50):
+                       pressure: int = 50, rate: float = 20.0) -> dict:
         """
         在指定范围随机连续点击
+        注: 按指定频率通过已建立的minitouch连接发送点击, 到达时长后停止
 
         @param {list} devices - 设备清单
         @param {list} pos_seed - 允许点击的位置坐标清单[(x,y), ...], 随机获取
         @param {float} times - 要点击的时长, 单位为秒
-        @param {bool} random_sleep=False - 两个点击间是否自动休眠指定时长
-        @param {float} sleep_min=0.0 - 两个点击间自动休眠最小时长, 单位为秒
-        @param {float} sleep_max=0.5 - 两个点击间自动休眠最大时长, 单位为秒
+        @param {int} thread_count=2 - 兼容参数, minitouch为同步发送, 不再使用
+        @param {bool} random_sleep=False - 两个点击间是否增加随机休眠时长
+        @param {float} sleep_min=0.0 - 两个点击间增加的随机休眠最小时长, 单位为秒
+        @param {float} sleep_max=0.5 - 两个点击间增加的随机休眠最大时长, 单位为秒
         @param {int} pressure=50 - 按下的压力
-        """
-        # 从第一个设备获取设备信息
-        _conn = self.devices[devices[0]]['connection']
-        _pressure = min(pressure, int(_conn.max_pressure))
-
-        # 参数准备
-        _seed_len = len(pos_seed)
-
-        # 定义点击线程函数
-        def tap_thread_fun(device_name):
-            while True:
-                # 循环处理，自身不结束
-                _pos = pos_seed[random.randint(0, _seed_len - 1)]
-                self.tap(
-                    [device_name, ], x=_pos[0], y=_pos[1], count=1, duration=10,
-                    pressure=_pressure
-                )
-
-                # 看是否休眠
-                if random_sleep:
-                    time.sleep(random.uniform(sleep_min, sleep_max))
+        @param {float} rate=20.0 - 目标点击频率, 单位为次/秒
 
-        # 启动执行动作
-        _start = datetime.datetime.now()
-        _thread_list = list()
-        for _device_name in devices:
-            _running_thread = threading.Thread(
-                target=tap_thread_fun,
-                name='Thread-Tap-Running-%s' % _device_name,
-                args=(_device_name, )
-            )
-            _running_thread.setDaemon(True)
-            _running_thread.start()
-
-            # 添加到列表，用于停止线程
-            _thread_list.append(_running_thread)
-
-        # 监控时长
-        while (datetime.datetime.now() - _start).total_seconds() < times:
-            time.sleep(0.01)
+        @returns {dict} - 点击统计信息, 格式参考 adb_control.TapRateScheduler.run
+        """
+        def _submit_fun(x, y):
+            # 同步发送到所有设备, 返回完成时间作为句柄
+            self.tap(devices, x=x, y=y, count=1, duration=10, pressure=pressure)
+            return time.time()
 
-        # 停止线程
-        for _thread in _thread_list:
-            RunTool.stop_thread(_thread)
+        _scheduler = TapRateScheduler(
+            _submit_fun, lambda handle, timeout: handle, rate=rate, max_in_flight=1,
+            jitter=(sleep_min, sleep_max) if random_sleep else None
+        )
+        return _scheduler.run(pos_seed, times)
 
     def long_press(self, devices: list, x: int = None, y: int = None,
                    duration: int = 1000, pressure: int = 50):
@@ -615,10 +582,9 @@ class MiniTouchServer(object):
         # 执行处理
         try:
             # 获取设备minitouch版本
-            _sdk = AdbTools.adb_run(
-                self.adb_name, device_name, 'shell getprop ro.build.version.sdk',
-                shell_encoding=self.shell_encoding
-            )[0]
+            _sdk = DeviceFacts.get_facts(
+                device_name, adb_name=self.adb_name, shell_encoding=self.shell_encoding
+            )['sdk']
             self.devices[device_name]['minitouch_file'] = 'minitouch' if int(
                 _sdk) >= 16 else 'minitouch-nopie'
 
@@ -16,11 +16,12 @@ import os
 import sys
 import pyautogui
 import pyperclip
-from PIL import Image
-from HiveNetLib.base_tools.file_tool import FileTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir, os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame
+from HandLessRobot.lib.controls.frame_cache import FrameCache
+from HandLessRobot.lib.controls.image_writer import ImageWriter
 
 
 __MOUDLE__ = 'windows_control'  # 模块名
@@ -34,6 +35,10 @@ class Screen(object):
     """
     获取屏幕信息
     """
+
+    # 按屏幕画面缓存的计算结果
+    frame_cache = FrameCache()
+
     @classmethod
     def size(cls) -> tuple:
         """
@@ -80,18 +85,32 @@ class Screen(object):
         return pyautogui.pixel(_x, _y)
 
     @classmethod
-    def screenshot(cls, image_save_file=None, region=None):
+    def screenshot(cls, image_save_file=None, region=None, image_format: str = None,
+                   quality: int = None, async_save: bool = False):
         """
         屏幕截图
 
         @param {str} image_save_file=None - 截图保存路径和文件名, None代表不保存文件
         @param {tuple} region=None - 指定截图区域 (x, y, witdh, height), None代表全屏
             例如: (0, 0, 300, 200)
+        @param {str} image_format=None - 保存的图片格式(PNG/JPEG/WEBP/BMP), 不传代表按文件扩展名确定
+        @param {int} quality=None - 保存的图片质量, JPEG/WEBP为1-100, PNG为压缩级别0-9
+        @param {bool} async_save=False - 是否在后台线程中保存文件(不等待保存完成)
 
         @returns {PIL.Image} - 返回屏幕截图的图片对象
         """
-        FileTool.create_dir(os.path.split(image_save_file)[0], exist_ok=True)
-        return pyautogui.screenshot(imageFilename=image_save_file, region=region)
+        _image = pyautogui.screenshot(region=region)
+        if image_save_file is not None:
+            if async_save:
+                ImageWriter.get_default().save(
+                    _image, image_save_file, image_format=image_format, quality=quality
+                )
+            else:
+                ImageWriter.write_image(
+                    _image, image_save_file, image_format=image_format, quality=quality
+                )
+
+        return _image
 
     @classmethod
     def locate_on_screen(cls, image, grayscale=False, **kwargs):
@@ -101,17 +120,15 @@ class Screen(object):
         @param {str|PIL.Image} image - 要定位的图片文件路径或图片对象
         @param {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
         @param {dict} kwargs - 其他执行参数:
-            {int} limit=10000 - 匹配数量限制
-            {int} step=1 - 匹配步骤，支持送1或2，如果为2会跳过细节，大约能提升3倍速度，但有可能匹配不上
             {float} confidence=0.999 - 匹配度
+            {str} engine=None - 使用的匹配引擎(numpy/opencv), 不传代表使用 ImageMatcher 的默认引擎
+            {tuple} region=None - 只在指定区域内查找 (x, y, width, height)
+            {tuple|bool} hint=None - 优先查找的位置 (x, y, width, height), 传True代表使用该图片最后一次找到的位置
+            {int} pyramid=0 - 金字塔匹配的缩小倍数(例如4), 先在缩小的截图中粗匹配再在原图中确认, 0代表不使用
 
-        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height)
+        @returns {(int, int, int, int)} - 返回图片的位置(x, y, width, height), 找不到返回None
         """
-        if type(image) == str:
-            _image = Image.open(image)
-        else:
-            _image = image
-        return pyautogui.locateOnScreen(_image, grayscale=grayscale, **kwargs)
+        return cls.locate_inner(cls.grab_frame(), 'locate', image, grayscale=grayscale, **kwargs)
 
     @classmethod
     def locate_center_on_screen(cls, image, grayscale=False):
@@ -121,9 +138,10 @@ class Screen(object):
         @param {str} image - 要定位的图片文件
         @param {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
 
-        @returns {(int, int)} - 返回图片的中心位置(x, y)
+        @returns {(int, int)} - 返回图片的中心位置(x, y), 找不到返回None
         """
-        return pyautogui.locateCenterOnScreen(image, grayscale=grayscale)
+        _box = cls.locate_on_screen(image, grayscale=grayscale)
+        return None if _box is None else cls.center(_box)
 
     @classmethod
     def locate_all_on_screen(cls, image, grayscale=False):
@@ -136,7 +154,65 @@ class Screen(object):
         @returns {list} - 返回所找到的所有图片的位置
             [(x, y, width, height), ..]
         """
-        return list(pyautogui.locateAllOnScreen(image, grayscale=grayscale))
+        return cls.locate_inner(cls.grab_frame(), 'locate_all', image, grayscale=grayscale)
+
+    @classmethod
+    def locate_any_on_screen(cls, images, grayscale=False, **kwargs):
+        """
+        只截图一次, 按顺序在屏幕中查找多个图片, 返回第一个找到的图片
+
+        @param {list|dict} images - 要定位的图片文件清单, 也可以传入字典 {key: 图片}
+        @param {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {(object, (int, int, int, int))} - 返回 (图片索引或key, 位置(x, y, width, height)),
+            都找不到返回 (None, None)
+        """
+        return cls.locate_inner(
+            cls.grab_frame(), 'locate_any', images, grayscale=grayscale, **kwargs
+        )
+
+    @classmethod
+    def locate_many_on_screen(cls, images, grayscale=False, **kwargs):
+        """
+        只截图一次, 在屏幕中定位多个图片的位置
+
+        @param {list|dict} images - 要定位的图片文件清单, 也可以传入字典 {key: 图片}
+        @param {bool} grayscale=False - 是否转换图片为灰度检索(提升30%速度)
+        @param {dict} kwargs - 其他执行参数, 参考 locate_on_screen
+
+        @returns {list|dict} - 与images对应的位置清单 [(x, y, width, height), ...], 找不到的图片位置为None;
+            images为字典时返回 {key: 位置}
+        """
+        return cls.locate_inner(
+            cls.grab_frame(), 'locate_many', images, grayscale=grayscale, **kwargs
+        )
+
+    @classmethod
+    def grab_frame(cls) -> MatchFrame:
+        """
+        获取用于图像匹配的屏幕画面(不保存文件)
+
+        @returns {MatchFrame} - 屏幕画面
+        """
+        return MatchFrame(cls.screenshot())
+
+    @classmethod
+    def locate_inner(cls, frame: MatchFrame, operation: str, images, **kwargs):
+        """
+        在屏幕画面中执行图片定位(同一画面相同参数的结果直接从缓存获取)
+
+        @param {MatchFrame} frame - 屏幕画面
+        @param {str} operation - ImageMatcher的定位函数名, locate/locate_all/locate_any/locate_many
+        @param {object} images - 要定位的图片或图片清单
+        @param {kwargs} - 定位函数的其他参数
+
+        @returns {object} - 定位函数的返回结果
+        """
+        return cls.frame_cache.memoize(
+            frame, operation, (images, kwargs),
+            lambda: getattr(ImageMatcher, operation)(images, frame, **kwargs)
+        )
 
 
 class Mouse(object):
@@ -14,11 +14,14 @@
 
 import os
 import sys
+import copy
 import time
+import threading
 import datetime
+import concurrent.futures
 from HiveNetLib.base_tools.run_tool import RunTool
 from HiveNetLib.formula import FormulaTool, StructFormulaKeywordPara, StructFormula
-from HiveNetLib.pipeline import PipelineProcesser, Tools, SubPipeLineProcesser
+from HiveNetLib.pipeline import Pipeline, PipelineProcesser, Tools, SubPipeLineProcesser
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
@@ -31,6 +34,157 @@ __AUTHOR__ = u'黎慧剑'  # 作者
 __PUBLISH__ = '2020.11.06'  # 发布日期
 
 
+class ParallelCancelledError(RuntimeError):
+    """
+    parallel块结束(超时或其他分支失败)后, 未完成的分支在执行下一个动作前抛出的取消异常
+    """
+    pass
+
+
+class RobotPipeline(Pipeline):
+    """
+    机器人执行管道(支持限制执行追踪信息的大小)
+    注: 原生管道的 trace_list 会登记每个执行过的节点(包括每次循环), 长时间循环运行时内存会持续增长,
+        可以通过 trace_mode 指定追踪信息的保留方式:
+        full - 保留全部追踪信息(原生管道的处理方式)
+        ring - 每个管道只保留最后 trace_size 条追踪信息
+        counters - 只保留最后一条追踪信息, 并按节点统计执行次数(参考 trace_counters)
+        只保留最后的追踪信息不影响 Robot.last_status_msg 等函数的使用;
+        支持节点执行完成的检查点通知(checkpoint_fun), 以及通过 restore_run 从检查点恢复运行状态
+    """
+
+    TRACE_MODES = ('full', 'ring', 'counters')
+
+    def __init__(self, name: str, pipeline_config, trace_mode: str = 'full', trace_size: int = 100,
+                 checkpoint_fun=None, **kwargs):
+        """
+        构造函数
+
+        @param {str} name - 管道名称
+        @param {str|dict} pipeline_config - 管道配置(参考 Pipeline)
+        @param {str} trace_mode='full' - 执行追踪信息的保留方式, full/ring/counters
+        @param {int} trace_size=100 - ring方式每个管道保留的追踪信息数量
+        @param {function} checkpoint_fun=None - 节点执行完成且存在下一个节点时的检查点通知函数，格式如下：
+            fun(pipeline, run_id, node_id, next_node_id, output)
+                pipeline {RobotPipeline} - 管道对象
+                run_id {str} - 运行id
+                node_id {str} - 执行完成的节点id
+                next_node_id {str} - 下一个执行节点id
+                output {object} - 节点执行输出结果
+        @param {kwargs} - 其他管道参数(参考 Pipeline)
+        """
+        if trace_mode not in self.TRACE_MODES:
+            raise RuntimeError('trace mode [%s] not support!' % trace_mode)
+
+        self.trace_mode = trace_mode
+        self.trace_size = max(trace_size, 1)
+        self.checkpoint_fun = checkpoint_fun
+        super().__init__(name, pipeline_config, **kwargs)
+
+    #############################
+    # 管道状态查询
+    #############################
+    def trace_counters(self, run_id: str = None) -> dict:
+        """
+        获取按节点统计的执行次数(只有counters方式才会统计)
+
+        @param {str} run_id=None - 管道运行id
+
+        @returns {dict} - 执行次数统计字典, key为节点id, value为 {节点状态: 执行次数}
+        """
+        _run_id, _run_cache = self._get_run_cache(run_id)
+        if _run_cache is None:
+            raise RuntimeError("Run id not exists!")
+
+        return _run_cache.get('trace_counters', dict())
+
+    #############################
+    # 处理函数
+    #############################
+    def start(self, input_data=None, context: dict = None, run_id: str = None, is_step_by_step: bool = False):
+        """
+        执行管道(从第一个节点开始执行), 参考 Pipeline.start
+        """
+        if self.trace_mode == 'counters' and run_id is not None:
+            # 重新执行时清除上一次的统计
+            _run_id, _run_cache = self._get_run_cache(run_id)
+            if _run_cache is not None and _run_cache['status'] not in ('R', 'P'):
+                _run_cache.pop('trace_counters', None)
+
+        return super().start(
+            input_data=input_data, context=context, run_id=run_id, is_step_by_step=is_step_by_step
+        )
+
+    def restore_run(self, run_id: str, node_id: str, context: dict, input_data, sub_pipeline=None):
+        """
+        恢复运行状态为指定节点暂停(通过resume从该节点继续执行)
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 继续执行的节点id
+        @param {dict} context - 上下文
+        @param {object} input_data - 节点的输入数据
+        @param {RobotPipeline} sub_pipeline=None - 节点为子管道时, 已恢复运行状态的子管道对象
+        """
+        _run_id, _run_cache = self._get_run_cache(run_id)
+        if _run_cache is not None and _run_cache['status'] == 'R':
+            raise RuntimeError('Pipeline [%s] run id [%s] is running!' % (self.name, run_id))
+
+        _run_cache = {
+            'status': 'P',
+            'context': copy.deepcopy(context),
+            'current_input': input_data,
+            'current_process_info': dict(),
+            'output': None,
+            'thread_running': False,
+            'is_step_by_step': False,
+            'trace_list': list(),
+            'node_id': node_id,
+            'node_status': 'I',
+            'node_status_msg': '',
+            'running_sub_node_id': node_id if sub_pipeline is not None else '',
+            'is_resume': sub_pipeline is not None,
+            'run_to_end': False
+        }
+        if sub_pipeline is not None:
+            self.running_sub_pipeline[run_id] = sub_pipeline
+        else:
+            self.running_sub_pipeline.pop(run_id, None)
+
+        self._cache[run_id] = _run_cache
+        self._status_locks[run_id] = threading.Lock()
+        self._change_last_run_id(run_id)
+
+    #############################
+    # 内部函数
+    #############################
+    def _run_router(self, run_id: str, node_id: str, output=None, status: str = 'S', status_msg: str = 'success') -> str:
+        """
+        执行路由判断(登记追踪信息后按trace_mode清理), 参考 Pipeline._run_router
+        """
+        _next_id = super()._run_router(
+            run_id, node_id, output=output, status=status, status_msg=status_msg
+        )
+        if self.checkpoint_fun is not None and _next_id not in (None, ''):
+            self.checkpoint_fun(self, run_id, node_id, _next_id, output)
+
+        if self.trace_mode == 'full':
+            return _next_id
+
+        _run_id, _run_cache = self._get_run_cache(run_id)
+        _trace_list = _run_cache['trace_list']
+        if self.trace_mode == 'ring':
+            _keep_size = self.trace_size
+        else:
+            _counters = _run_cache.setdefault('trace_counters', dict()).setdefault(node_id, dict())
+            _counters[status] = _counters.get(status, 0) + 1
+            _keep_size = 1
+
+        if len(_trace_list) > _keep_size:
+            del _trace_list[0: len(_trace_list) - _keep_size]
+
+        return _next_id
+
+
 class RobotActionRun(PipelineProcesser):
     """
     机器人动作run命令执行处理器
@@ -142,6 +296,21 @@ class RobotActionRun(PipelineProcesser):
             robot {HandLessRobot.robot.Robot} - 执行管道的机器人实例对象
             last_result {object} - 上一个动作执行的结果
         """
+        _action_config = context.pop('action_config')
+        cls.run_action(input_data, run_id, _action_config)
+        return input_data
+
+    @classmethod
+    def run_action(cls, input_data: dict, run_id: str, action_config: dict):
+        """
+        按动作执行配置执行动作, 并更新上一执行结果
+
+        @param {dict} input_data - 固定为一个字典, 参考 execute
+        @param {str} run_id - 当前管道的运行id
+        @param {dict} action_config - 动作执行配置, 参考 execute 的 action_config 参数
+
+        @returns {object} - 动作执行结果
+        """
         # 处理执行参数
         _formula_obj: FormulaTool = RunTool.get_global_var('ROBOT_ACTION_RUN_FORMULA')
         _formula_kwargs = {
@@ -150,7 +319,7 @@ class RobotActionRun(PipelineProcesser):
             'fixed_run_id': "run_id"
         }
 
-        _action_config = context.pop('action_config')
+        _action_config = action_config
         _action_name = _action_config['action_name'].upper()
 
         _instance_obj = _action_config.get('instance_obj', None)
@@ -189,7 +358,7 @@ class RobotActionRun(PipelineProcesser):
             # 不是控制动作才变更上一执行结果
             input_data['last_result'] = _result
 
-        return input_data
+        return _result
 
     #############################
     # 内部静态函数 - 公式处理函数
@@ -252,6 +421,10 @@ class RobotActionControl(PipelineProcesser):
     """
     机器人动作控制命令执行处理器
     """
+
+    # 当前线程执行的parallel分支的取消标志(cancel属性为threading.Event)
+    _parallel_local = threading.local()
+
     @classmethod
     def processer_name(cls) -> str:
         """
@@ -284,9 +457,12 @@ class RobotActionControl(PipelineProcesser):
                         endif - if条件判断结尾节点，不做任何处理
                         if - 条件判断，如果True执行下一个节点，False执行else块或结束块
                         loop - 循环，如果True继续循环，False跳过循环
+                        parallel - 并行执行块内的步骤(每个run/predef步骤为一个分支)，完成后跳转到块结束节点
+                        endparallel - 并行块结尾节点，不做任何处理
 
-                    goto命令所需参数
+                    goto/end命令所需参数
                         goto_step_id {str} - 要跳转到的步骤标识名
+                        goto_node_id {str} - 要跳转到的节点id(装载时由步骤标识名转换)
 
                     break/continue/endloop命令所需参数:
                         loop_node_id {str} - 循环开始节点id
@@ -308,6 +484,20 @@ class RobotActionControl(PipelineProcesser):
                         save_to_var {str} - 要保存到变量的变量名
                         save_run_id {str} - 与save_to_var配套使用，保存到的变量使用范围，不传默认为run_id, 可以用变量获取标签替代
 
+                    parallel命令所需参数:
+                        branches {list} - 块内的分支步骤配置清单
+                        end_node_id {str} - 块结束所在节点
+                        join {str} - 等待方式，默认为'all'
+                            all - 等待所有分支成功，任一分支失败即抛出异常，结果为按分支顺序的结果清单
+                            any - 等待第一个完成的分支，该分支失败则抛出异常，结果为该分支的结果
+                            first_success - 等待第一个成功的分支，全部分支失败才抛出异常，结果为该分支的结果
+                        timeout {float} - 超时时间，单位为秒，默认为0代表不超时，超时抛出 TimeoutError 异常
+                        max_workers {int} - 最大并行线程数，默认为分支数量
+                        注：块结束(包括超时或分支失败)时通知未完成的分支取消, 分支在执行下一个动作前停止,
+                            并等待分支正在执行的动作完成后才跳转, 避免跳转后分支仍在操作设备或保存变量
+                        save_to_var {str} - 并行结果要保存到的变量名
+                        save_run_id {str} - 与save_to_var配套使用，保存到的变量使用范围，不传默认为run_id
+
                     prompt命令所需参数：
                         prompt_router {str} - 命令对应的路由字典对应的json字符串, key为命令字符串, value为要跳转到的step_id
                         prompt_para {str} - 扩展参数对应的json字符串，格式如："{'over_time': 0.0, 'over_time_step_id': None, 'sleep_time': 500}"
@@ -337,14 +527,18 @@ class RobotActionControl(PipelineProcesser):
         _cmd = _control_config['control_name'].lower()
 
         # 先处理简单命令
-        if _cmd in ('null', 'endif'):
+        if _cmd in ('null', 'endif', 'endparallel'):
             # 不做任何处理
             pass
+        elif _cmd == 'parallel':
+            # 并行执行块内的步骤, 完成后跳转到块结束节点
+            cls.run_parallel(input_data, context, run_id, _control_config)
+            context['goto_node_id'] = _control_config['end_node_id']
         elif _cmd == 'goto':
             # 跳转到指定位置
-            context['goto_node_name'] = _control_config['goto_step_id']
+            context['goto_node_id'] = _control_config['goto_node_id']
         elif _cmd == 'end':
-            context['goto_node_name'] = '{$END_NODE$}'
+            context['goto_node_id'] = _control_config['goto_node_id']
         elif _cmd == 'break':
             context['loop_break'] = True
             context['goto_node_id'] = _control_config['loop_node_id']
@@ -473,6 +667,147 @@ class RobotActionControl(PipelineProcesser):
         # 控制命令不改变输入输出
         return input_data
 
+    @classmethod
+    def run_parallel(cls, input_data: dict, context: dict, run_id: str, control_config: dict):
+        """
+        在线程池中并行执行parallel块的分支
+
+        @param {dict} input_data - 固定为一个字典, 参考 execute
+        @param {dict} context - 传递上下文
+        @param {str} run_id - 当前管道的运行id
+        @param {dict} control_config - parallel命令的配置, 参考 execute
+
+        @returns {object} - 并行执行结果, 参考 execute 中的 join 参数
+
+        @throws {TimeoutError} - 执行超时抛出异常(等待未完成分支正在执行的动作完成后抛出)
+        """
+        _branches = control_config.get('branches', list())
+        _join = control_config.get('join', 'all').lower()
+        _timeout = float(control_config.get('timeout', 0))
+        _timeout = None if _timeout <= 0 else _timeout
+
+        _result = None
+        if len(_branches) > 0:
+            _cancel = threading.Event()
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(len(_branches), control_config.get('max_workers', None) or len(_branches)),
+                thread_name_prefix='RobotParallel'
+            )
+            _futures = list()
+            try:
+                for _branch in _branches:
+                    _futures.append(_executor.submit(
+                        cls._run_parallel_branch, input_data, context, run_id, _branch, _cancel
+                    ))
+
+                if _join == 'all':
+                    _done, _not_done = concurrent.futures.wait(
+                        _futures, timeout=_timeout, return_when=concurrent.futures.FIRST_EXCEPTION
+                    )
+                    for _future in _futures:
+                        if _future in _done and _future.exception() is not None:
+                            raise _future.exception()
+
+                    if len(_not_done) > 0:
+                        raise TimeoutError('parallel block timeout [%s] seconds!' % str(_timeout))
+                    _result = [_future.result() for _future in _futures]
+                elif _join == 'any':
+                    _done, _ = concurrent.futures.wait(
+                        _futures, timeout=_timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    if len(_done) == 0:
+                        raise TimeoutError('parallel block timeout [%s] seconds!' % str(_timeout))
+                    _result = [_future for _future in _futures if _future in _done][0].result()
+                elif _join == 'first_success':
+                    _errors = list()
+                    try:
+                        for _future in concurrent.futures.as_completed(_futures, timeout=_timeout):
+                            if _future.exception() is None:
+                                _result = _future.result()
+                                break
+                            _errors.append(str(_future.exception()))
+                    except concurrent.futures.TimeoutError:
+                        raise TimeoutError('parallel block timeout [%s] seconds!' % str(_timeout))
+
+                    if len(_errors) == len(_futures):
+                        raise RuntimeError('all parallel branches failed: %s' % '; '.join(_errors))
+                else:
+                    raise RuntimeError('Not supported parallel join [%s]!' % _join)
+            finally:
+                # 未开始的分支直接取消(shutdown的cancel_futures参数需要python3.9, 因此逐个取消),
+                # 正在执行的分支在下一个动作前停止; 等待分支正在执行的动作完成, 避免跳转后分支仍在操作设备或保存变量
+                _cancel.set()
+                for _future in _futures:
+                    _future.cancel()
+                _executor.shutdown(wait=True)
+
+        # 保存结果
+        _save_to_var = control_config.get('save_to_var', None)
+        if _save_to_var is not None and _save_to_var != '':
+            _save_run_id = control_config.get('save_run_id', run_id)
+            if _save_run_id == '':
+                _save_run_id = run_id
+            input_data['robot'].robot_info['vars'].setdefault(_save_run_id, dict())[_save_to_var] = _result
+
+        return _result
+
+    @classmethod
+    def get_parallel_cancel(cls):
+        """
+        获取当前线程执行的parallel分支的取消标志
+
+        @returns {threading.Event} - 取消标志, 不在parallel分支中执行时返回None
+        """
+        return getattr(cls._parallel_local, 'cancel', None)
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _run_parallel_branch(cls, input_data: dict, context: dict, run_id: str, branch: dict,
+                             cancel: threading.Event):
+        """
+        执行parallel块的单个分支(在线程池中执行)
+
+        @param {dict} input_data - 固定为一个字典, 参考 execute
+        @param {dict} context - 传递上下文
+        @param {str} run_id - 当前管道的运行id
+        @param {dict} branch - 分支的步骤配置, cmd为run或predef
+        @param {threading.Event} cancel - 分支的取消标志, predef分支在执行每个动作前检查
+
+        @returns {object} - 分支执行结果, predef分支为子模块最后的执行结果
+        """
+        if cancel.is_set():
+            raise ParallelCancelledError('parallel branch cancelled!')
+
+        # 每个分支使用独立的输入数据, 避免分支之间相互覆盖上一执行结果
+        _robot = input_data['robot']
+        _input_data = {
+            'robot': _robot,
+            'last_result': input_data.get('last_result', None)
+        }
+        if branch.get('cmd', 'run').lower() == 'run':
+            return RobotActionRun.run_action(_input_data, run_id, branch)
+
+        # 子预定义模块使用编译后的函数执行, 不共用管道对象的运行状态
+        cls._parallel_local.cancel = cancel
+        try:
+            _status, _output, _status_msg = _robot.compile_predef(branch['predef_name']).execute(
+                _robot, _input_data, run_id, context
+            )
+        finally:
+            cls._parallel_local.cancel = None
+
+        if _status != 'S':
+            raise RuntimeError('parallel predef [%s] error: %s' % (branch['predef_name'], _status_msg))
+
+        _result = _output['last_result']
+        if branch.get('save_to_var', '') != '':
+            _save_run_id = branch.get('save_run_id', run_id)
+            _robot.robot_info['vars'].setdefault(_save_run_id, dict())[branch['save_to_var']] = _result
+
+        return _result
+
 
 class RobotPredefRun(SubPipeLineProcesser):
     """
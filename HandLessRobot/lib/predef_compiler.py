@@ -0,0 +1,833 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+预定义模块编译器(将步骤配置编译为python函数)
+@module predef_compiler
+@file predef_compiler.py
+"""
+
+import os
+import sys
+import copy
+import threading
+import traceback
+from HiveNetLib.base_tools.run_tool import RunTool
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+import HandLessRobot.lib.pipeline_plugin as pipeline_plugin
+
+
+__MOUDLE__ = 'predef_compiler'  # 模块名
+__DESCRIPT__ = u'预定义模块编译器'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.25'  # 发布日期
+
+
+# 编译器支持的命令
+COMPILE_SUPPORT_CMDS = (
+    'run', 'null', 'end', 'goto', 'if', 'else', 'endif', 'loop', 'endloop', 'break', 'continue',
+    'predef', 'parallel', 'endparallel'
+)
+
+
+class PredefRunError(RuntimeError):
+    """
+    子预定义模块执行失败的异常, 携带子模块的状态描述
+    """
+
+    def __init__(self, status_msg: str):
+        """
+        构造函数
+
+        @param {str} status_msg - 子模块失败节点的状态描述
+        """
+        super().__init__(status_msg)
+        self.status_msg = status_msg
+
+
+class PredefGotoEnd(Exception):
+    """
+    执行end命令时用于跳出结构化代码的内部异常
+    """
+    pass
+
+
+class CompiledPredef(object):
+    """
+    编译后的预定义模块
+    """
+
+    def __init__(self, predef_name: str, source: str, fun, hooks: bool = False):
+        """
+        构造函数
+
+        @param {str} predef_name - 预定义模块名
+        @param {str} source - 生成的python代码
+        @param {function} fun - 编译后的执行函数, fun(robot, input_data, run_id, context)
+        @param {bool} hooks=False - 是否包含节点运行通知的调用
+        """
+        self.predef_name = predef_name
+        self.source = source
+        self.fun = fun
+        self.hooks = hooks
+
+    def execute(self, robot, input_data: dict, run_id: str, context: dict = None) -> tuple:
+        """
+        执行编译后的预定义模块
+
+        @param {HandLessRobot.robot.Robot} robot - 机器人实例对象
+        @param {dict} input_data - 输入数据, 固定为 {'robot': robot, 'last_result': None}
+        @param {str} run_id - 运行id
+        @param {dict} context=None - 上下文, 执行时使用其复制对象
+
+        @returns {str, object, str} - 返回 status, output, status_msg
+            status {str} - 'S' - 成功，'E' - 出现异常
+            output {object} - 成功时为 input_data, 异常时为None
+            status_msg {str} - 状态描述, 异常时为异常信息
+        """
+        return self.fun(
+            robot, input_data, run_id, {} if context is None else copy.deepcopy(context)
+        )
+
+
+class PredefCompiler(object):
+    """
+    预定义模块编译器, 将步骤配置编译为具有真实控制结构的python函数
+    注: 1、动作函数在编译时解析, 变量获取标签在编译时转换为python表达式;
+        2、没有goto命令及exception_to参数的模块编译为结构化代码(if/while), 否则编译为按节点跳转的分派代码;
+        3、执行结果(状态、变量、动作调用顺序及节点通知)与管道方式执行一致, 不支持逐步执行及prompt命令;
+        4、作为parallel分支执行时, 每个动作执行前检查分支的取消标志(参考 RobotActionControl.run_parallel)
+    """
+
+    # 变量获取标签转换结果的缓存, key为公式字符串, value为python表达式
+    _FORMULA_CACHE = dict()
+    _FORMULA_CACHE_LOCK = threading.RLock()
+
+    # 转换变量获取标签的参数, 与管道处理器保持一致
+    FORMULA_KWARGS = {
+        'robot': "input_data['robot']",
+        'fixed_last': "input_data.get('last_result', None)",
+        'fixed_run_id': "run_id"
+    }
+
+    #############################
+    # 公共函数
+    #############################
+    @classmethod
+    def formula_to_expr(cls, formula_str: str) -> str:
+        """
+        将带变量获取标签的字符串转换为python表达式
+
+        @param {str} formula_str - 带变量获取标签的字符串, 例如 "{$var=name$} > 0"
+
+        @returns {str} - 转换后的python表达式
+        """
+        with cls._FORMULA_CACHE_LOCK:
+            _expr = cls._FORMULA_CACHE.get(formula_str, None)
+
+        if _expr is None:
+            _formula_obj = RunTool.get_global_var('ROBOT_ACTION_RUN_FORMULA')
+            if _formula_obj is None:
+                pipeline_plugin.RobotActionRun.initialize()
+                _formula_obj = RunTool.get_global_var('ROBOT_ACTION_RUN_FORMULA')
+
+            _expr = _formula_obj.run_formula_as_string(
+                formula_str, **cls.FORMULA_KWARGS
+            ).formula_value
+            with cls._FORMULA_CACHE_LOCK:
+                cls._FORMULA_CACHE[formula_str] = _expr
+
+        return _expr
+
+    @classmethod
+    def check_support(cls, config: dict):
+        """
+        检查步骤配置是否支持编译
+
+        @param {dict} config - 预定义模块的步骤配置
+
+        @throws {NotImplementedError} - 存在不支持的命令时抛出异常
+        """
+        for _step in config['steps']:
+            _cmd = _step.get('cmd', 'run').lower()
+            if _cmd not in COMPILE_SUPPORT_CMDS:
+                raise NotImplementedError('Predef compiler not support cmd [%s]!' % _cmd)
+
+    @classmethod
+    def compile(cls, robot, config: dict, hooks: bool = False) -> CompiledPredef:
+        """
+        编译预定义模块
+
+        @param {HandLessRobot.robot.Robot} robot - 机器人实例对象(用于解析动作函数)
+        @param {dict} config - 预定义模块的步骤配置
+        @param {bool} hooks=False - 是否生成节点运行通知的调用(robot.running_notify_fun/end_running_notify_fun)
+
+        @returns {CompiledPredef} - 编译后的预定义模块
+
+        @throws {NotImplementedError} - 存在不支持的命令时抛出异常
+        @throws {RuntimeError} - 块嵌套配置错误时抛出异常
+        """
+        cls.check_support(config)
+        _generator = PredefCodeGenerator(robot, config, hooks=hooks)
+        _source = _generator.generate()
+
+        _namespace = dict(vars(pipeline_plugin))
+        _namespace.update(_generator.namespace)
+        exec(compile(_source, '<predef:%s>' % config['predef_name'], 'exec'), _namespace)
+
+        return CompiledPredef(
+            config['predef_name'], _source, _namespace['_predef_fun'], hooks=hooks
+        )
+
+    #############################
+    # 生成代码调用的运行时函数
+    #############################
+    @classmethod
+    def status_msg(cls, error: BaseException) -> str:
+        """
+        获取异常对应的节点状态描述
+
+        @param {BaseException} error - 异常对象
+
+        @returns {str} - 状态描述
+        """
+        if isinstance(error, PredefRunError):
+            return error.status_msg
+
+        return traceback.format_exc()
+
+    @classmethod
+    def run_sub_predef(cls, robot, predef_name: str, input_data: dict, run_id: str,
+                       context: dict) -> tuple:
+        """
+        执行子预定义模块, 无法编译的模块使用管道方式执行
+
+        @param {HandLessRobot.robot.Robot} robot - 机器人实例对象
+        @param {str} predef_name - 子预定义模块名
+        @param {dict} input_data - 输入数据
+        @param {str} run_id - 运行id
+        @param {dict} context - 上下文
+
+        @returns {str, object, str} - 返回 status, output, status_msg
+        """
+        _pipeline = robot.robot_info['predef_pipeline'][predef_name]
+        try:
+            _compiled = robot.compile_predef(predef_name)
+        except NotImplementedError:
+            _compiled = None
+
+        if _compiled is not None:
+            return _compiled.execute(robot, input_data, run_id, context)
+
+        _, _status, _output = _pipeline.start(input_data=input_data, context=context, run_id=run_id)
+        _msg = _pipeline.current_node_status_msg(run_id=run_id)
+        _pipeline.remove(run_id=run_id)
+        return _status, _output, _msg
+
+
+class PredefCodeGenerator(object):
+    """
+    预定义模块的代码生成器(每次编译使用一个实例)
+    """
+
+    def __init__(self, robot, config: dict, hooks: bool = False):
+        """
+        构造函数
+
+        @param {HandLessRobot.robot.Robot} robot - 机器人实例对象
+        @param {dict} config - 预定义模块的步骤配置
+        @param {bool} hooks=False - 是否生成节点运行通知的调用
+        """
+        self.robot = robot
+        self.config = config
+        self.steps = config['steps']
+        self.hooks = hooks
+        self.end_id = len(self.steps) + 1
+
+        # 通过管道配置转换检查块嵌套, 并获取块的开始/结束节点
+        self.pipeline_config = robot.json_to_pipeline_config(config)
+
+        # 生成代码使用的命名空间
+        self.namespace = {
+            '_PREDEF_NAME': config['predef_name'],
+            '_NAMES': {
+                int(_id): _node.get('name', '') for _id, _node in self.pipeline_config.items()
+            },
+            '_RESERVED': RunTool.get_global_var('RESERVED_CONTROL_ACTION_NAME'),
+            '_PredefGotoEnd': PredefGotoEnd,
+            '_PredefRunError': PredefRunError,
+            '_status_msg': PredefCompiler.status_msg,
+            '_run_sub': PredefCompiler.run_sub_predef
+        }
+        self._lines = list()
+        self._const_index = 0
+
+    #############################
+    # 公共函数
+    #############################
+    def generate(self) -> str:
+        """
+        生成代码
+
+        @returns {str} - 生成的python代码, 执行后在命名空间中定义 _predef_fun 函数
+        """
+        _structured = True
+        for _step in self.steps:
+            if _step.get('cmd', 'run').lower() == 'goto' or _step.get('exception_to', '') != '':
+                _structured = False
+                break
+
+        if _structured:
+            self._generate_structured()
+        else:
+            self._generate_dispatch()
+
+        return '\n'.join(self._lines) + '\n'
+
+    #############################
+    # 结构化代码
+    #############################
+    def _generate_structured(self):
+        """
+        生成结构化代码(if/while)
+        """
+        _tree, _ = self._parse_block(0, ())
+        self._emit(0, 'def _predef_fun(robot, input_data, run_id, context):')
+        self._emit(1, 'robot_info = robot.robot_info')
+        self._emit(1, '_cancel = RobotActionControl.get_parallel_cancel()')
+        if self.hooks:
+            self._emit(1, '_rn = robot.running_notify_fun')
+            self._emit(1, '_en = robot.end_running_notify_fun')
+            self._emit(1, '_node = 1')
+
+        self._emit(1, 'try:')
+        self._emit(2, 'try:')
+        self._emit_block(3, _tree)
+        self._emit(2, 'except _PredefGotoEnd:')
+        self._emit(3, 'pass')
+        self._emit_notify_node(2, self.end_id)
+        self._emit(1, 'except:')
+        self._emit(2, '_msg = _status_msg(sys.exc_info()[1])')
+        if self.hooks:
+            self._emit(2, 'if _en is not None:')
+            self._emit(3, "_en(robot, run_id, _PREDEF_NAME, _node, _NAMES[_node], 'E', _msg)")
+        self._emit(2, "return 'E', None, _msg")
+        self._emit(1, "return 'S', input_data, 'success'")
+
+    def _parse_block(self, index: int, stop_cmds: tuple) -> tuple:
+        """
+        将步骤清单解析为块结构
+
+        @param {int} index - 开始解析的步骤下标
+        @param {tuple} stop_cmds - 结束当前块的命令
+
+        @returns {list, int} - 返回 (块内元素清单, 结束命令所在下标)
+            块内元素为: ('step', 下标) / ('if', 下标, 真分支, else下标, 假分支, endif下标)
+                / ('loop', 下标, 循环体, endloop下标) / ('parallel', 下标, endparallel下标)
+        """
+        _items = list()
+        _i = index
+        while _i < len(self.steps):
+            _cmd = self.steps[_i].get('cmd', 'run').lower()
+            if _cmd in stop_cmds:
+                return _items, _i
+
+            if _cmd == 'if':
+                _true, _j = self._parse_block(_i + 1, ('else', 'endif'))
+                _else_index = None
+                _false = list()
+                if self.steps[_j].get('cmd', 'run').lower() == 'else':
+                    _else_index = _j
+                    _false, _j = self._parse_block(_j + 1, ('endif', ))
+                _items.append(('if', _i, _true, _else_index, _false, _j))
+                _i = _j + 1
+            elif _cmd == 'loop':
+                _body, _j = self._parse_block(_i + 1, ('endloop', ))
+                _items.append(('loop', _i, _body, _j))
+                _i = _j + 1
+            elif _cmd == 'parallel':
+                # 块内的分支由parallel节点执行
+                _j = int(self._control_config(_i + 1)['end_node_id']) - 1
+                _items.append(('parallel', _i, _j))
+                _i = _j + 1
+            else:
+                _items.append(('step', _i))
+                _i += 1
+
+        return _items, _i
+
+    def _emit_block(self, indent: int, items: list):
+        """
+        生成块内元素的代码
+
+        @param {int} indent - 缩进级别
+        @param {list} items - 块内元素清单
+        """
+        _count = len(self._lines)
+        for _item in items:
+            if _item[0] == 'if':
+                self._emit_if(indent, _item)
+            elif _item[0] == 'loop':
+                self._emit_loop(indent, _item)
+            elif _item[0] == 'parallel':
+                self._emit_comment(indent, _item[1])
+                self._emit_notify_start(indent, _item[1] + 1)
+                self._emit_parallel(indent, _item[1] + 1)
+                self._emit_notify_end(indent, _item[1] + 1)
+                self._emit_notify_node(indent, _item[2] + 1)
+            else:
+                self._emit_step(indent, _item[1])
+
+        if len(self._lines) == _count:
+            self._emit(indent, 'pass')
+
+    def _emit_if(self, indent: int, item: tuple):
+        """
+        生成if块代码
+
+        @param {int} indent - 缩进级别
+        @param {tuple} item - ('if', 下标, 真分支, else下标, 假分支, endif下标)
+        """
+        _, _index, _true, _else_index, _false, _end_index = item
+        _node_id = _index + 1
+        self._emit_comment(indent, _index)
+        self._emit_notify_start(indent, _node_id)
+        self._emit_control_action(indent, self.steps[_index])
+        self._emit(indent, '_cond = %s' % self._expr(self.steps[_index]['condition']))
+        self._emit_notify_end(indent, _node_id)
+        self._emit(indent, 'if _cond:')
+        self._emit_block(indent + 1, _true)
+        if _else_index is not None:
+            # 真分支执行到else节点后跳过endif
+            self._emit_notify_node(indent + 1, _else_index + 1)
+            self._emit(indent, 'else:')
+            self._emit_block(indent + 1, _false)
+            self._emit_notify_node(indent + 1, _end_index + 1)
+        else:
+            # 没有else时只有真分支会执行到endif节点
+            self._emit_notify_node(indent + 1, _end_index + 1)
+
+    def _emit_loop(self, indent: int, item: tuple):
+        """
+        生成loop块代码
+
+        @param {int} indent - 缩进级别
+        @param {tuple} item - ('loop', 下标, 循环体, endloop下标)
+        """
+        _, _index, _body, _end_index = item
+        _node_id = _index + 1
+        self._emit_comment(indent, _index)
+        self._emit(indent, 'while True:')
+        self._emit_notify_start(indent + 1, _node_id)
+        self._emit_control_action(indent + 1, self.steps[_index])
+        self._emit(indent + 1, 'if not (%s):' % self._expr(self.steps[_index]['condition']))
+        self._emit_notify_end(indent + 2, _node_id)
+        self._emit(indent + 2, 'break')
+        self._emit_notify_end(indent + 1, _node_id)
+        self._emit_block(indent + 1, _body)
+        self._emit_notify_node(indent + 1, _end_index + 1)
+
+    def _emit_step(self, indent: int, index: int):
+        """
+        生成非块命令的代码
+
+        @param {int} indent - 缩进级别
+        @param {int} index - 步骤下标
+        """
+        _step = self.steps[index]
+        _cmd = _step.get('cmd', 'run').lower()
+        _node_id = index + 1
+        self._emit_comment(indent, index)
+        if _cmd == 'run':
+            self._emit_notify_start(indent, _node_id)
+            self._emit_cancel_check(indent)
+            self._emit_run_action(indent, _step)
+            self._emit_notify_end(indent, _node_id)
+        elif _cmd == 'predef':
+            self._emit_notify_start(indent, _node_id)
+            self._emit_cancel_check(indent)
+            self._emit_sub_predef(indent, _step)
+            self._emit_notify_end(indent, _node_id)
+        elif _cmd == 'end':
+            self._emit_notify_node(indent, _node_id)
+            self._emit(indent, 'raise _PredefGotoEnd()')
+        elif _cmd == 'break':
+            # 执行break后会回到loop节点(只执行通知)再结束循环
+            _loop_id = int(self._control_config(_node_id)['loop_node_id'])
+            self._emit_notify_node(indent, _node_id)
+            self._emit_notify_node(indent, _loop_id)
+            self._emit(indent, 'break')
+        elif _cmd == 'continue':
+            self._emit_notify_node(indent, _node_id)
+            self._emit(indent, 'continue')
+        else:
+            # null
+            self._emit_notify_node(indent, _node_id)
+
+    #############################
+    # 分派代码
+    #############################
+    def _generate_dispatch(self):
+        """
+        生成按节点跳转的分派代码(支持goto及exception_to)
+        """
+        _nodes = list()
+        _exceptions = dict()
+        for _index in range(len(self.steps)):
+            _node_id = _index + 1
+            self._emit_node_fun(_index)
+            _nodes.append('%d: _node_%d' % (_node_id, _node_id))
+            _router_para = self.pipeline_config[str(_node_id)].get('exception_router_para', None)
+            if _router_para is not None:
+                _exceptions[_node_id] = int(_router_para['goto_node_id'])
+
+        # 结束节点
+        self._emit(0, 'def _node_%d(robot, robot_info, input_data, run_id, context):' % self.end_id)
+        self._emit(1, 'return None')
+        self._emit(0, '')
+        _nodes.append('%d: _node_%d' % (self.end_id, self.end_id))
+
+        self._emit(0, '_NODES = {%s}' % ', '.join(_nodes))
+        self.namespace['_EXCEPTION_TO'] = _exceptions
+        self._emit(0, '')
+        self._emit(0, 'def _predef_fun(robot, input_data, run_id, context):')
+        self._emit(1, 'robot_info = robot.robot_info')
+        self._emit(1, '_cancel = RobotActionControl.get_parallel_cancel()')
+        if self.hooks:
+            self._emit(1, '_rn = robot.running_notify_fun')
+            self._emit(1, '_en = robot.end_running_notify_fun')
+        self._emit(1, '_pc = 1')
+        self._emit(1, 'while _pc is not None:')
+        if self.hooks:
+            self._emit(2, 'if _rn is not None:')
+            self._emit(3, '_rn(robot, run_id, _PREDEF_NAME, _pc, _NAMES[_pc])')
+        # 取消不按exception_to跳转, 直接结束
+        self._emit(2, 'if _cancel is not None and _cancel.is_set():')
+        self._emit(3, "return 'E', None, 'parallel branch cancelled!'")
+        self._emit(2, 'try:')
+        self._emit(3, '_next = _NODES[_pc](robot, robot_info, input_data, run_id, context)')
+        self._emit(2, 'except:')
+        self._emit(3, '_msg = _status_msg(sys.exc_info()[1])')
+        if self.hooks:
+            self._emit(3, 'if _en is not None:')
+            self._emit(4, "_en(robot, run_id, _PREDEF_NAME, _pc, _NAMES[_pc], 'E', _msg)")
+        self._emit(3, '_next = _EXCEPTION_TO.get(_pc, None)')
+        self._emit(3, 'if _next is None:')
+        self._emit(4, "return 'E', None, _msg")
+        if self.hooks:
+            self._emit(2, 'else:')
+            self._emit(3, 'if _en is not None:')
+            self._emit(4, "_en(robot, run_id, _PREDEF_NAME, _pc, _NAMES[_pc], 'S', 'success')")
+        self._emit(2, '_pc = _next')
+        self._emit(1, "return 'S', input_data, 'success'")
+
+    def _emit_node_fun(self, index: int):
+        """
+        生成单个节点的执行函数, 函数返回下一个节点id, None代表执行结束
+
+        @param {int} index - 步骤下标
+        """
+        _step = self.steps[index]
+        _cmd = _step.get('cmd', 'run').lower()
+        _node_id = index + 1
+        _next = _node_id + 1
+        self._emit_comment(0, index)
+        self._emit(0, 'def _node_%d(robot, robot_info, input_data, run_id, context):' % _node_id)
+        if _cmd == 'run':
+            self._emit_run_action(1, _step)
+            self._emit(1, 'return %d' % _next)
+        elif _cmd == 'predef':
+            self._emit_sub_predef(1, _step)
+            self._emit(1, 'return %d' % _next)
+        elif _cmd == 'end':
+            self._emit(1, 'return %d' % self.end_id)
+        elif _cmd == 'goto':
+            self._emit(1, 'return %s' % self._control_config(_node_id)['goto_node_id'])
+        elif _cmd == 'break':
+            self._emit(1, "context['loop_break'] = True")
+            self._emit(1, 'return %s' % self._control_config(_node_id)['loop_node_id'])
+        elif _cmd in ('continue', 'endloop'):
+            self._emit(1, 'return %s' % self._control_config(_node_id)['loop_node_id'])
+        elif _cmd == 'else':
+            self._emit(1, 'return %d' % (int(self._control_config(_node_id)['end_node_id']) + 1))
+        elif _cmd == 'parallel':
+            self._emit_parallel(1, _node_id)
+            self._emit(1, 'return %s' % self._control_config(_node_id)['end_node_id'])
+        elif _cmd in ('if', 'loop'):
+            _config = self._control_config(_node_id)
+            _end_next = int(_config['end_node_id']) + 1
+            if _cmd == 'loop':
+                self._emit(1, "if context.pop('loop_break', False):")
+                self._emit(2, 'return %d' % _end_next)
+            self._emit_control_action(1, _step)
+            self._emit(1, 'if %s:' % self._expr(_step['condition']))
+            self._emit(2, 'return %d' % _next)
+            if _cmd == 'if' and _config.get('else_node_id', None) is not None:
+                self._emit(1, 'return %d' % (int(_config['else_node_id']) + 1))
+            else:
+                self._emit(1, 'return %d' % _end_next)
+        else:
+            # null/endif/endparallel
+            self._emit(1, 'return %d' % _next)
+
+        self._emit(0, '')
+
+    #############################
+    # 动作调用代码
+    #############################
+    def _emit_run_action(self, indent: int, step: dict):
+        """
+        生成run命令的动作调用代码(与 RobotActionRun 处理器一致)
+
+        @param {int} indent - 缩进级别
+        @param {dict} step - 步骤配置
+        """
+        _paras = list()
+        for _key in ('instance_obj', 'call_para_args', 'call_para_kwargs'):
+            _val = step.get(_key, None)
+            _paras.append(self._expr(_val) if type(_val) == str else self._const(_val))
+
+        _save_run_id = repr(step['save_run_id']) if 'save_run_id' in step.keys() else 'run_id'
+        _action_name = step['action_name'].upper()
+        self._emit_call(
+            indent, _action_name, '_result', _paras, step.get('save_to_var', None), _save_run_id
+        )
+
+        # 不是控制动作才变更上一执行结果
+        if _action_name not in self.namespace['_RESERVED']['*']:
+            self._emit(indent, "if %r not in _RESERVED.get(run_id, ()):" % _action_name)
+            self._emit(indent + 1, "input_data['last_result'] = _result")
+
+    def _emit_control_action(self, indent: int, step: dict):
+        """
+        生成if/loop命令的动作调用代码(与 RobotActionControl 处理器一致), 结果保存在 run_action 变量
+
+        @param {int} indent - 缩进级别
+        @param {dict} step - 步骤配置
+        """
+        self._emit(indent, 'run_action = None')
+        if step.get('action_name', '') == '':
+            return
+
+        _paras = list()
+        for _key in ('instance_obj', 'call_para_args', 'call_para_kwargs'):
+            _val = step.get(_key, None)
+            _paras.append(self._expr(_val) if type(_val) == str and _val != '' else 'None')
+
+        _save_to_var = step.get('save_to_var', None)
+        if _save_to_var == '':
+            _save_to_var = None
+        _save_run_id = step.get('save_run_id', None)
+        _save_run_id = 'run_id' if _save_run_id in (None, '') else repr(_save_run_id)
+        self._emit_call(
+            indent, step['action_name'].upper(), 'run_action', _paras, _save_to_var, _save_run_id
+        )
+
+    def _emit_call(self, indent: int, action_name: str, result_var: str, paras: list,
+                   save_to_var, save_run_id: str):
+        """
+        生成动作函数调用代码(与 Robot.call_action 一致, 动作函数在编译时解析)
+
+        @param {int} indent - 缩进级别
+        @param {str} action_name - 动作名(大写)
+        @param {str} result_var - 保存结果的变量名
+        @param {list} paras - [实例对象表达式, 位置参数表达式, key-value参数表达式]
+        @param {str} save_to_var - 结果要保存到的变量名, None代表不保存
+        @param {str} save_run_id - 保存变量的运行id表达式
+        """
+        self._emit(indent, '_i = %s' % paras[0])
+        self._emit(indent, '_a = %s' % paras[1])
+        self._emit(indent, '_k = %s' % paras[2])
+        try:
+            _action_dict = self.robot.get_action_dict(action_name)
+        except ModuleNotFoundError:
+            _action_dict = None
+
+        if _action_dict is None:
+            # 编译时找不到动作, 执行时按原方式调用(抛出同样的异常)
+            self._emit(indent, '%s = robot.call_action(%r, instance_obj=_i, run_id=run_id, '
+                       'call_para_args=_a, call_para_kwargs=_k, save_to_var=%r, save_run_id=%s)' % (
+                           result_var, action_name, save_to_var, save_run_id
+                       ))
+            return
+
+        _fun_name = self._const(_action_dict['fun'])
+        _pre = '%s(robot_info, %r, run_id' % (_fun_name, action_name)
+        _no_para = '%s)' % _pre
+        _para = '%s, *([] if _a is None else _a), **({} if _k is None else _k))' % _pre
+        if _action_dict['instance_class'] != '' and paras[0] != 'None':
+            # 有实例对象时传入实例对象
+            _no_para = '%s, _i) if _i is not None else %s)' % (_pre, _pre)
+            _para = '%s, _i, *([] if _a is None else _a), **({} if _k is None else _k)) ' \
+                'if _i is not None else %s' % (_pre, _para)
+
+        if paras[1] == 'None' and paras[2] == 'None':
+            self._emit(indent, '%s = %s' % (result_var, _no_para))
+        else:
+            self._emit(indent, 'if _a is None and _k is None:')
+            self._emit(indent + 1, '%s = %s' % (result_var, _no_para))
+            self._emit(indent, 'else:')
+            self._emit(indent + 1, '%s = %s' % (result_var, _para))
+
+        if save_to_var is not None:
+            self._emit(indent, "robot_info['vars'].setdefault(%s, dict())[%r] = %s" % (
+                save_run_id, save_to_var, result_var
+            ))
+
+    def _emit_parallel(self, indent: int, node_id: int):
+        """
+        生成执行parallel块的代码(与 RobotActionControl 处理器一致)
+
+        @param {int} indent - 缩进级别
+        @param {int} node_id - parallel节点id
+        """
+        self._emit(indent, 'RobotActionControl.run_parallel(input_data, context, run_id, %s)' % (
+            self._const(self._control_config(node_id))
+        ))
+
+    def _emit_sub_predef(self, indent: int, step: dict):
+        """
+        生成执行子预定义模块的代码
+
+        @param {int} indent - 缩进级别
+        @param {dict} step - 步骤配置
+        """
+        self._emit(indent, '_st, _out, _msg = _run_sub(robot, %r, input_data, run_id, context)' % (
+            step['predef_name']
+        ))
+        self._emit(indent, "if _st != 'S':")
+        self._emit(indent + 1, 'raise _PredefRunError(_msg)')
+
+    def _emit_cancel_check(self, indent: int):
+        """
+        生成检查parallel分支取消标志的代码(在parallel分支中执行时, 块结束后不再执行后续动作)
+
+        @param {int} indent - 缩进级别
+        """
+        self._emit(indent, 'if _cancel is not None and _cancel.is_set():')
+        self._emit(indent + 1, "raise ParallelCancelledError('parallel branch cancelled!')")
+
+    #############################
+    # 节点通知代码
+    #############################
+    def _emit_notify_start(self, indent: int, node_id: int):
+        """
+        生成节点开始运行的通知代码
+
+        @param {int} indent - 缩进级别
+        @param {int} node_id - 节点id
+        """
+        if self.hooks:
+            self._emit(indent, '_node = %d' % node_id)
+            self._emit(indent, 'if _rn is not None:')
+            self._emit(indent + 1, '_rn(robot, run_id, _PREDEF_NAME, %d, %r)' % (
+                node_id, self.namespace['_NAMES'][node_id]
+            ))
+
+    def _emit_notify_end(self, indent: int, node_id: int):
+        """
+        生成节点运行成功的通知代码
+
+        @param {int} indent - 缩进级别
+        @param {int} node_id - 节点id
+        """
+        if self.hooks:
+            self._emit(indent, 'if _en is not None:')
+            self._emit(indent + 1, "_en(robot, run_id, _PREDEF_NAME, %d, %r, 'S', 'success')" % (
+                node_id, self.namespace['_NAMES'][node_id]
+            ))
+
+    def _emit_notify_node(self, indent: int, node_id: int):
+        """
+        生成只做跳转的节点(例如endif/endloop/else)的开始及结束通知代码
+
+        @param {int} indent - 缩进级别
+        @param {int} node_id - 节点id
+        """
+        self._emit_notify_start(indent, node_id)
+        self._emit_notify_end(indent, node_id)
+
+    #############################
+    # 内部函数
+    #############################
+    def _emit(self, indent: int, line: str):
+        """
+        添加一行代码
+
+        @param {int} indent - 缩进级别
+        @param {str} line - 代码
+        """
+        self._lines.append('    ' * indent + line)
+
+    def _emit_comment(self, indent: int, index: int):
+        """
+        添加步骤说明注释
+
+        @param {int} indent - 缩进级别
+        @param {int} index - 步骤下标
+        """
+        _step = self.steps[index]
+        _comment = '# [%d] %s %s %s' % (
+            index + 1, _step.get('cmd', 'run').lower(), _step.get('step_id', ''),
+            str(_step.get('remark', '')).replace('\n', ' ')
+        )
+        self._emit(indent, _comment.rstrip())
+
+    def _expr(self, formula_str: str) -> str:
+        """
+        将变量获取标签字符串转换为可嵌入代码的python表达式
+
+        @param {str} formula_str - 带变量获取标签的字符串
+
+        @returns {str} - 表达式代码, 语法错误的表达式在执行时通过eval抛出同样的异常
+        """
+        _expr = PredefCompiler.formula_to_expr(formula_str)
+        try:
+            compile(_expr, '<formula>', 'eval')
+        except SyntaxError:
+            return 'eval(%r)' % _expr
+
+        return '(%s)' % _expr
+
+    def _const(self, value) -> str:
+        """
+        将常量放入命名空间
+
+        @param {object} value - 常量值
+
+        @returns {str} - 命名空间中的变量名
+        """
+        if value is None:
+            return 'None'
+
+        self._const_index += 1
+        _name = '_c%d' % self._const_index
+        self.namespace[_name] = value
+        return _name
+
+    def _control_config(self, node_id: int) -> dict:
+        """
+        获取控制节点转换后的控制参数
+
+        @param {int} node_id - 节点id
+
+        @returns {dict} - 控制参数
+        """
+        return self.pipeline_config[str(node_id)]['context']['control_config']
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+python脚本执行工具
+@module script_tool
+@file script_tool.py
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import collections
+import concurrent.futures
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'script_tool'  # 模块名
+__DESCRIPT__ = u'python脚本执行工具'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.26'  # 发布日期
+
+
+class ScriptTool(object):
+    """
+    python脚本执行工具
+    注: 1、编译后的脚本按源码哈希值缓存(LRU), 循环中重复执行的脚本不需要重新编译;
+        2、脚本在独立的命名空间中执行, 通过命名空间中的 _return_val 变量返回值;
+        3、计算量大的脚本可以在子进程池中执行, 不阻塞其他运行
+    """
+
+    # 编译后的脚本缓存, key为源码哈希值, value为code对象
+    _CODE_CACHE = collections.OrderedDict()
+    _CODE_CACHE_SIZE = 256
+    _CODE_CACHE_LOCK = threading.RLock()
+
+    # 子进程池
+    _PROCESS_POOL = None
+    _PROCESS_POOL_WORKERS = None
+    _PROCESS_POOL_LOCK = threading.RLock()
+
+    #############################
+    # 公共函数
+    #############################
+    @classmethod
+    def set_cache_size(cls, size: int):
+        """
+        设置编译脚本的缓存数量
+
+        @param {int} size - 最多缓存的脚本数量, 传0代表不缓存
+        """
+        with cls._CODE_CACHE_LOCK:
+            cls._CODE_CACHE_SIZE = size
+            while len(cls._CODE_CACHE) > max(size, 0):
+                cls._CODE_CACHE.popitem(last=False)
+
+    @classmethod
+    def compile_script(cls, script_str: str):
+        """
+        获取编译后的脚本(优先从缓存获取)
+
+        @param {str} script_str - python脚本
+
+        @returns {code} - 编译后的code对象
+        """
+        _key = hashlib.sha1(script_str.encode('utf-8')).hexdigest()
+        with cls._CODE_CACHE_LOCK:
+            _code = cls._CODE_CACHE.get(_key, None)
+            if _code is not None:
+                cls._CODE_CACHE.move_to_end(_key)
+                return _code
+
+        _code = compile(script_str, '<script:%s>' % _key[0:8], 'exec')
+        if cls._CODE_CACHE_SIZE > 0:
+            with cls._CODE_CACHE_LOCK:
+                cls._CODE_CACHE[_key] = _code
+                while len(cls._CODE_CACHE) > cls._CODE_CACHE_SIZE:
+                    cls._CODE_CACHE.popitem(last=False)
+
+        return _code
+
+    @classmethod
+    def run(cls, script_str: str, namespace: dict = None):
+        """
+        在指定命名空间中执行脚本
+
+        @param {str} script_str - python脚本
+        @param {dict} namespace=None - 脚本执行的命名空间(作为脚本的全局变量), 执行后包含脚本设置的变量
+
+        @returns {object} - 脚本执行后命名空间中 _return_val 变量的值
+        """
+        _namespace = dict() if namespace is None else namespace
+        _namespace.setdefault('_return_val', None)
+        exec(cls.compile_script(script_str), _namespace)
+        return _namespace['_return_val']
+
+    @classmethod
+    def set_process_pool(cls, workers: int = None):
+        """
+        设置执行脚本的子进程池(原进程池在已提交的脚本完成后关闭)
+
+        @param {int} workers=None - 子进程数量, None代表使用cpu核数
+        """
+        with cls._PROCESS_POOL_LOCK:
+            if cls._PROCESS_POOL is not None:
+                cls._PROCESS_POOL.shutdown(wait=False)
+            cls._PROCESS_POOL = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            cls._PROCESS_POOL_WORKERS = workers
+
+    @classmethod
+    def run_in_process(cls, script_str: str, namespace: dict = None, timeout: float = None):
+        """
+        在子进程池中执行脚本(当前线程等待执行结果)
+        注: 等待超时时, 未开始执行的脚本会被取消; 已开始执行的脚本无法中止, 会在子进程中继续执行到结束,
+            此时使用新的子进程池执行后续的脚本(原进程池在脚本完成后关闭), 避免超时的脚本占用子进程
+
+        @param {str} script_str - python脚本
+        @param {dict} namespace=None - 脚本执行的命名空间, 需要可以序列化(pickle)传递到子进程
+        @param {float} timeout=None - 等待超时时间, 单位为秒, None代表一直等待
+
+        @returns {object} - 脚本执行后命名空间中 _return_val 变量的值(需要可以序列化传递回当前进程)
+
+        @throws {TimeoutError} - 等待超时抛出异常
+        """
+        with cls._PROCESS_POOL_LOCK:
+            if cls._PROCESS_POOL is None:
+                cls.set_process_pool()
+            _pool = cls._PROCESS_POOL
+
+        _future = _pool.submit(_run_script_in_process, script_str, namespace)
+        try:
+            return _future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            if not _future.cancel():
+                # 脚本已在执行, 更换子进程池
+                with cls._PROCESS_POOL_LOCK:
+                    if cls._PROCESS_POOL is _pool:
+                        cls.set_process_pool(cls._PROCESS_POOL_WORKERS)
+            raise TimeoutError('run script in process timeout [%s] seconds!' % str(timeout))
+
+
+def _run_script_in_process(script_str: str, namespace: dict):
+    """
+    子进程中执行脚本的函数(子进程中同样使用编译脚本缓存)
+
+    @param {str} script_str - python脚本
+    @param {dict} namespace - 脚本执行的命名空间
+
+    @returns {object} - 脚本的返回值
+    """
+    return ScriptTool.run(script_str, namespace=namespace)
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
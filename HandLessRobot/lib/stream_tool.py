@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+机器人批量数据流处理工具
+@module stream_tool
+@file stream_tool.py
+"""
+
+import os
+import sys
+import csv
+import json
+import sqlite3
+import threading
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'stream_tool'  # 模块名
+__DESCRIPT__ = u'机器人批量数据流处理工具'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.26'  # 发布日期
+
+
+class StreamTool(object):
+    """
+    数据流读取工具, 按需逐条读取记录, 不将整个文件装载到内存
+    """
+
+    @classmethod
+    def read_csv(cls, file: str, encoding: str = 'utf-8', **kwargs):
+        """
+        逐行读取csv文件(第一行为标题行)
+
+        @param {str} file - csv文件
+        @param {str} encoding='utf-8' - 文件编码
+        @param {kwargs} - csv.DictReader的其他参数, 例如delimiter
+
+        @returns {generator} - 记录生成器, 每条记录为 {标题: 值} 的字典
+        """
+        with open(file, 'r', encoding=encoding, newline='') as _f:
+            for _row in csv.DictReader(_f, **kwargs):
+                yield _row
+
+    @classmethod
+    def read_jsonl(cls, file: str, encoding: str = 'utf-8'):
+        """
+        逐行读取jsonl文件(每行一个json对象, 忽略空行)
+
+        @param {str} file - jsonl文件
+        @param {str} encoding='utf-8' - 文件编码
+
+        @returns {generator} - 记录生成器
+        """
+        with open(file, 'r', encoding=encoding) as _f:
+            for _line in _f:
+                _line = _line.strip()
+                if _line != '':
+                    yield json.loads(_line)
+
+    @classmethod
+    def read_json_array(cls, file: str, encoding: str = 'utf-8', chunk_size: int = 65536):
+        """
+        逐个读取json文件顶层数组中的元素(按块读取并解析, 不将整个文件装载到内存)
+
+        @param {str} file - json文件, 内容为 [记录, 记录, ...]
+        @param {str} encoding='utf-8' - 文件编码
+        @param {int} chunk_size=65536 - 每次读取的字符数
+
+        @returns {generator} - 记录生成器
+
+        @throws {RuntimeError} - 文件内容不是json数组时抛出异常
+        """
+        _decoder = json.JSONDecoder()
+        with open(file, 'r', encoding=encoding) as _f:
+            _buf = ''
+            _eof = False
+            _expect = '['  # [ - 数组开始, first - 第一个元素或数组结束, value - 元素, , - 分隔符或数组结束
+            while True:
+                _buf = _buf.lstrip()
+                _need_more = _buf == ''
+                if not _need_more:
+                    if _expect == '[':
+                        if _buf[0] != '[':
+                            raise RuntimeError('json file [%s] is not an array!' % file)
+                        _buf = _buf[1:]
+                        _expect = 'first'
+                        continue
+                    elif _expect in ('first', ',') and _buf[0] == ']':
+                        return
+                    elif _expect == ',':
+                        if _buf[0] != ',':
+                            raise RuntimeError('json file [%s] format error: %s' % (file, _buf[0:20]))
+                        _buf = _buf[1:]
+                        _expect = 'value'
+                        continue
+
+                    try:
+                        _record, _end = _decoder.raw_decode(_buf)
+                        # 元素之后没有读取到分隔符时, 元素可能未读取完整(例如数字 1.5 只读取了 1.), 需要继续读取确认
+                        _rest = _buf[_end:].lstrip()
+                        _need_more = not _eof and (_rest == '' or _rest[0] not in ',]')
+                    except json.JSONDecodeError:
+                        if _eof:
+                            raise RuntimeError('json file [%s] format error: %s' % (file, _buf[0:20]))
+                        _need_more = True
+
+                    if not _need_more:
+                        yield _record
+                        _buf = _buf[_end:]
+                        _expect = ','
+                        continue
+
+                # 读取更多内容
+                if _eof:
+                    raise RuntimeError('json file [%s] format error: unexpected end of file' % file)
+                _chunk = _f.read(chunk_size)
+                if _chunk == '':
+                    _eof = True
+                else:
+                    _buf += _chunk
+
+    @classmethod
+    def get_source(cls, source):
+        """
+        获取记录来源的迭代对象
+
+        @param {str|iterable} source - 记录来源, 文件路径按扩展名处理, 其他直接作为迭代对象
+            .csv - 第一行为标题行的csv文件, 参考 read_csv
+            .jsonl - 每行一个json对象的文件, 参考 read_jsonl
+            .json - 内容为json数组的文件, 参考 read_json_array
+
+        @returns {iterable} - 记录迭代对象
+        """
+        if not isinstance(source, str):
+            return source
+
+        _ext = os.path.splitext(source)[1].lower()
+        if _ext == '.csv':
+            return cls.read_csv(source)
+        elif _ext == '.jsonl':
+            return cls.read_jsonl(source)
+        elif _ext == '.json':
+            return cls.read_json_array(source)
+        else:
+            raise RuntimeError('Not support source file type [%s]!' % source)
+
+    @classmethod
+    def get_sink(cls, sink):
+        """
+        获取结果输出对象
+
+        @param {str|object} sink - 结果输出, 文件路径按扩展名创建(.jsonl - JsonlResultSink, .db/.sqlite - SqliteResultSink),
+            其他直接作为输出对象(需实现write函数)
+
+        @returns {object, bool} - 输出对象, 是否新创建的对象(新创建的对象使用完需要关闭)
+        """
+        if not isinstance(sink, str):
+            return sink, False
+
+        _ext = os.path.splitext(sink)[1].lower()
+        if _ext == '.jsonl':
+            return JsonlResultSink(sink), True
+        elif _ext in ('.db', '.sqlite', '.sqlite3'):
+            return SqliteResultSink(sink), True
+        else:
+            raise RuntimeError('Not support sink file type [%s]!' % sink)
+
+
+class JsonlResultSink(object):
+    """
+    将处理结果逐行写入jsonl文件
+    """
+
+    def __init__(self, file: str, encoding: str = 'utf-8', append: bool = True):
+        """
+        构造函数
+
+        @param {str} file - jsonl文件
+        @param {str} encoding='utf-8' - 文件编码
+        @param {bool} append=True - 是否追加到已有文件
+        """
+        self._lock = threading.RLock()
+        self._file = open(file, 'a' if append else 'w', encoding=encoding)
+
+    def write(self, result: dict):
+        """
+        写入一条处理结果(无法转换为json的值按字符串写入)
+
+        @param {dict} result - 处理结果字典
+        """
+        _line = json.dumps(result, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(_line + '\n')
+            self._file.flush()
+
+    def close(self):
+        """
+        关闭文件
+        """
+        with self._lock:
+            self._file.close()
+
+
+class SqliteResultSink(object):
+    """
+    将处理结果写入SQLite数据库表
+    """
+
+    def __init__(self, db_file: str, table_name: str = 'robot_stream_result', commit_size: int = 100):
+        """
+        构造函数
+
+        @param {str} db_file - 数据库文件
+        @param {str} table_name='robot_stream_result' - 结果表名, 不存在将自动创建
+        @param {int} commit_size=100 - 每写入多少条结果提交一次
+        """
+        self.table_name = table_name
+        self.commit_size = commit_size
+        self._lock = threading.RLock()
+        self._uncommit = 0
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS %s (run_id TEXT, idx INTEGER, status TEXT, status_msg TEXT, '
+            'last_result TEXT)' % table_name
+        )
+        self._conn.commit()
+
+    def write(self, result: dict):
+        """
+        写入一条处理结果(last_result转换为json字符串保存)
+
+        @param {dict} result - 处理结果字典
+        """
+        _values = (
+            result['run_id'], result['index'], result['status'], result['status_msg'],
+            json.dumps(result['last_result'], ensure_ascii=False, default=str)
+        )
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO %s (run_id, idx, status, status_msg, last_result) VALUES (?, ?, ?, ?, ?)' %
+                self.table_name, _values
+            )
+            self._uncommit += 1
+            if self._uncommit >= self.commit_size:
+                self._conn.commit()
+                self._uncommit = 0
+
+    def close(self):
+        """
+        提交未提交的结果并关闭数据库连接
+        """
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+机器人运行变量存储模块
+@module var_store
+@file var_store.py
+"""
+
+import os
+import sys
+import time
+import threading
+import collections
+import numpy as np
+from PIL import Image
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+__MOUDLE__ = 'var_store'  # 模块名
+__DESCRIPT__ = u'机器人运行变量存储模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.02.26'  # 发布日期
+
+
+class RunVarStore(dict):
+    """
+    按运行id区分作用域的运行变量存储(即 robot_info['vars'])
+    注: 1、本身为 {run_id: {var_name: value}} 格式的字典, 变量获取标签及编译后的代码直接按字典方式访问;
+        2、作用域的生命周期与运行绑定: 通过 begin_run/end_run 登记运行的开始和结束(支持同一run_id嵌套运行),
+            运行结束的作用域保留供查询, 超过保留数量、超时(ttl)或超过内存上限(max_bytes)时按结束顺序淘汰;
+        3、全局作用域 '*'、正在运行的作用域及未登记运行的作用域(例如通过save_run_id指定的共享作用域)不会被淘汰
+    """
+
+    def __init__(self, keep_finished: int = 128, ttl: float = None, max_bytes: int = None):
+        """
+        构造函数
+
+        @param {int} keep_finished=128 - 最多保留的已结束运行作用域数量, None代表不限制
+        @param {float} ttl=None - 已结束运行作用域的保留时间, 单位为秒, None代表不限制
+        @param {int} max_bytes=None - 已结束运行作用域的变量占用内存上限(估算值), 单位为字节, None代表不限制
+        """
+        super().__init__()
+        self['*'] = dict()  # 全局运行变量
+        self.keep_finished = keep_finished
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.evicted = 0  # 已淘汰的作用域数量
+        self._lock = threading.RLock()
+        self._active = dict()  # 正在运行的作用域, key为run_id, value为嵌套运行次数
+        self._finished = collections.OrderedDict()  # 已结束的作用域, key为run_id, value为(结束时间, 占用字节数)
+        self._finished_bytes = 0
+
+    #############################
+    # 作用域生命周期
+    #############################
+    def begin_run(self, run_id: str):
+        """
+        登记运行开始(作用域不存在时创建)
+
+        @param {str} run_id - 运行id
+        """
+        with self._lock:
+            _finished = self._finished.pop(run_id, None)
+            if _finished is not None:
+                self._finished_bytes -= _finished[1]
+            self._active[run_id] = self._active.get(run_id, 0) + 1
+            self.setdefault(run_id, dict())
+
+    def end_run(self, run_id: str):
+        """
+        登记运行结束, 全部嵌套运行结束后作用域转为已结束状态, 并按设置淘汰已结束的作用域
+
+        @param {str} run_id - 运行id
+        """
+        with self._lock:
+            _count = self._active.get(run_id, 0) - 1
+            if _count > 0:
+                self._active[run_id] = _count
+                return
+
+            self._active.pop(run_id, None)
+            if run_id != '*' and run_id in self.keys():
+                _bytes = self.sizeof(self[run_id]) if self.max_bytes is not None else 0
+                self._finished[run_id] = (time.time(), _bytes)
+                self._finished_bytes += _bytes
+
+            self.evict()
+
+    def is_active(self, run_id: str) -> bool:
+        """
+        判断运行是否正在进行
+
+        @param {str} run_id - 运行id
+
+        @returns {bool} - 是否正在运行
+        """
+        return run_id in self._active.keys()
+
+    def evict(self):
+        """
+        按保留数量、超时时间及内存上限淘汰已结束的作用域
+        """
+        with self._lock:
+            _now = time.time()
+            while len(self._finished) > 0:
+                _run_id, (_end_time, _bytes) = next(iter(self._finished.items()))
+                if not (
+                    (self.keep_finished is not None and len(self._finished) > self.keep_finished)
+                    or (self.ttl is not None and _now - _end_time > self.ttl)
+                    or (self.max_bytes is not None and self._finished_bytes > self.max_bytes)
+                ):
+                    break
+
+                self._finished.popitem(last=False)
+                self._finished_bytes -= _bytes
+                self.pop(_run_id, None)
+                self.evicted += 1
+
+    def stats(self) -> dict:
+        """
+        获取变量存储的统计信息
+
+        @returns {dict} - 统计信息
+            scopes {int} - 作用域数量
+            active {int} - 正在运行的作用域数量
+            finished {int} - 已结束保留的作用域数量
+            finished_bytes {int} - 已结束作用域占用的内存(估算值, 未设置max_bytes时为0)
+            evicted {int} - 已淘汰的作用域数量
+        """
+        with self._lock:
+            return {
+                'scopes': len(self),
+                'active': len(self._active),
+                'finished': len(self._finished),
+                'finished_bytes': self._finished_bytes,
+                'evicted': self.evicted
+            }
+
+    #############################
+    # 变量访问
+    #############################
+    def get_var(self, run_id: str, var_name: str, default_value=None):
+        """
+        获取变量值
+
+        @param {str} run_id - 作用域的运行id
+        @param {str} var_name - 变量名
+        @param {object} default_value=None - 找不到变量时的默认值
+
+        @returns {object} - 变量值
+        """
+        _scope = self.get(run_id, None)
+        if _scope is None:
+            return default_value
+
+        return _scope.get(var_name, default_value)
+
+    def set_var(self, run_id: str, var_name: str, value):
+        """
+        设置变量值(作用域不存在时创建)
+
+        @param {str} run_id - 作用域的运行id
+        @param {str} var_name - 变量名
+        @param {object} value - 变量值
+        """
+        _scope = self.get(run_id, None)
+        if _scope is None:
+            _scope = self.setdefault(run_id, dict())
+
+        _scope[var_name] = value
+
+    #############################
+    # 工具函数
+    #############################
+    @classmethod
+    def sizeof(cls, value, depth: int = 3) -> int:
+        """
+        估算变量占用的内存大小
+
+        @param {object} value - 变量值
+        @param {int} depth=3 - 容器类型递归计算的层数
+
+        @returns {int} - 占用的字节数(估算值)
+        """
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        elif isinstance(value, Image.Image):
+            return value.width * value.height * len(value.getbands())
+
+        _size = sys.getsizeof(value)
+        if depth > 0:
+            if isinstance(value, dict):
+                for _key, _val in value.items():
+                    _size += cls.sizeof(_key, depth - 1) + cls.sizeof(_val, depth - 1)
+            elif isinstance(value, (list, tuple, set)):
+                for _val in value:
+                    _size += cls.sizeof(_val, depth - 1)
+
+        return _size
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
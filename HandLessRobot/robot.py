@@ -14,10 +14,17 @@
 import os
 import sys
 import uuid
+import time
 import platform
 import inspect
 import json
 import copy
+import types
+import hashlib
+import threading
+import traceback
+import collections
+import concurrent.futures
 from HiveNetLib.simple_log import Logger
 from HiveNetLib.base_tools.run_tool import RunTool
 from HiveNetLib.base_tools.import_tool import ImportTool
@@ -27,7 +34,11 @@ from HiveNetLib.pipeline_router import GoToNode
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HandLessRobot.lib.actions.base_action import BaseAction
-from HandLessRobot.lib.pipeline_plugin import RobotActionRun, RobotActionControl, RobotPredefRun
+from HandLessRobot.lib.pipeline_plugin import RobotPipeline, RobotActionRun, RobotActionControl, RobotPredefRun
+from HandLessRobot.lib.predef_compiler import PredefCompiler, CompiledPredef
+from HandLessRobot.lib.var_store import RunVarStore
+from HandLessRobot.lib.checkpoint import CheckpointStore, CheckpointWriter
+from HandLessRobot.lib.stream_tool import StreamTool
 
 
 __MOUDLE__ = 'process'  # 模块名
@@ -145,6 +156,7 @@ class RunEnvironment(object):
         run_pipeline - 直接执行的管道对象
         run_config - 直接执行的配置信息
         vars - 登记机器人执行过程中的临时变量，其中 '*' 放置全局变量，也可以放置只在某一个run_id下才能使用的变量
+            (RunVarStore对象, 运行结束后run_id下的变量按保留数量、超时及内存上限自动清理, 参考 lib.var_store)
 
     """
 
@@ -459,18 +471,151 @@ class Robot(object):
     """
     机器人主控模块
     """
+
+    # 步骤配置转换后的管道配置缓存, key为步骤配置的内容哈希值, value为(管道配置, 不可变的步骤配置)
+    _PIPELINE_CONFIG_CACHE = collections.OrderedDict()
+    _PIPELINE_CONFIG_CACHE_SIZE = 256
+    _PIPELINE_CONFIG_CACHE_LOCK = threading.RLock()
+
     #############################
     # 静态工具函数
     #############################
     @classmethod
-    def json_to_pipeline_config(cls, config: dict) -> dict:
+    def config_hash(cls, config: dict) -> str:
+        """
+        计算步骤配置的内容哈希值(与字典的键顺序无关)
+        注: 配置中包含无法转换为json的对象时(例如直接传入的函数、对象参数), 无法按内容识别, 返回None
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+
+        @returns {str} - 哈希值, 无法计算返回None
+        """
+        try:
+            _str = json.dumps(
+                [config.get('predef_name', ''), config['steps']], sort_keys=True, ensure_ascii=False
+            )
+        except (TypeError, ValueError):
+            return None
+
+        return hashlib.sha1(_str.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def freeze_config(cls, config):
+        """
+        将配置转换为不可变对象(字典转换为只读字典, 清单转换为元组), 供多次执行共享使用
+
+        @param {object} config - 配置
+
+        @returns {object} - 不可变的配置
+        """
+        if isinstance(config, (dict, types.MappingProxyType)):
+            return types.MappingProxyType(
+                {_key: cls.freeze_config(_val) for _key, _val in config.items()}
+            )
+        elif isinstance(config, (list, tuple)):
+            return tuple([cls.freeze_config(_val) for _val in config])
+        else:
+            return config
+
+    @classmethod
+    def thaw_config(cls, config):
+        """
+        将不可变的配置(参考 freeze_config)转换为普通的字典及清单(可以转换为json)
+
+        @param {object} config - 不可变的配置
+
+        @returns {object} - 转换后的配置(新的对象)
+        """
+        if isinstance(config, (dict, types.MappingProxyType)):
+            return {_key: cls.thaw_config(_val) for _key, _val in config.items()}
+        elif isinstance(config, (list, tuple)):
+            return [cls.thaw_config(_val) for _val in config]
+        else:
+            return config
+
+    @classmethod
+    def get_pipeline_config(cls, config: dict) -> tuple:
+        """
+        获取步骤配置转换后的管道配置(相同内容的配置只转换一次)
+        注: 返回的管道配置为共享对象, 不应修改; 无法计算配置哈希值时(参考 config_hash)每次重新转换, 不缓存
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+
+        @returns {(str, dict, MappingProxyType)} - 返回 (配置哈希值, 管道配置, 不可变的步骤配置), 配置哈希值可能为None
+        """
+        _key = cls.config_hash(config)
+        if _key is None:
+            return None, cls.json_to_pipeline_config(config), cls.freeze_config(config)
+
+        with cls._PIPELINE_CONFIG_CACHE_LOCK:
+            _item = cls._PIPELINE_CONFIG_CACHE.get(_key, None)
+            if _item is not None:
+                cls._PIPELINE_CONFIG_CACHE.move_to_end(_key)
+                return _key, _item[0], _item[1]
+
+        _item = (cls.json_to_pipeline_config(config), cls.freeze_config(config))
+        with cls._PIPELINE_CONFIG_CACHE_LOCK:
+            cls._PIPELINE_CONFIG_CACHE[_key] = _item
+            while len(cls._PIPELINE_CONFIG_CACHE) > cls._PIPELINE_CONFIG_CACHE_SIZE:
+                cls._PIPELINE_CONFIG_CACHE.popitem(last=False)
+
+        return _key, _item[0], _item[1]
+
+    @classmethod
+    def get_step_index(cls, config: dict) -> dict:
+        """
+        获取步骤标识名对应节点id的索引
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+
+        @returns {dict} - 步骤标识名索引, key为step_id, value为节点id(字符串)
+            注: 同名时取第一个步骤, 标准结束节点的名称为 '{$END_NODE$}'
+        """
+        _step_index = dict()
+        _steps = config['steps']
+        for _i in range(len(_steps)):
+            _step_id = _steps[_i].get('step_id', '')
+            if _step_id != '' and _step_id not in _step_index.keys():
+                _step_index[_step_id] = str(_i + 1)
+
+        _step_index.setdefault('{$END_NODE$}', str(len(_steps) + 1))
+        return _step_index
+
+    @classmethod
+    def inline_predef_config(cls, config: dict, predef_configs: dict) -> dict:
+        """
+        将步骤配置中执行预定义模块的步骤(cmd为predef)展开为子模块的步骤
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+        @param {dict} predef_configs - 可展开的预定义模块配置字典, key为predef_name, value为步骤配置
+
+        @returns {dict} - 展开后的步骤配置(新的字典)
+            注: 1、predef步骤替换为保留原step_id的null步骤, 后面紧跟子模块的步骤;
+                2、子模块的step_id及跳转目标加上作用域前缀 '作用域.', 作用域为predef步骤的step_id,
+                    没有设置时为 '子模块名@展开位置';
+                3、子模块的end命令转换为跳转到展开块末尾的goto命令, 没有设置exception_to的子模块步骤继承predef步骤的设置;
+                4、递归调用的模块、predef_configs中没有的模块、带prompt命令的模块及parallel块内的predef步骤不展开
+        """
+        _config = copy.deepcopy(config)
+        _config['steps'] = cls._inline_predef_steps(
+            config['steps'], predef_configs, [config.get('predef_name', '')]
+        )
+        return _config
+
+    @classmethod
+    def json_to_pipeline_config(cls, config: dict, inline_predef_configs: dict = None) -> dict:
         """
         JSON格式的步骤配置转换为管道执行配置字典
 
         @param {dict} config - 机器人执行步骤JSON配置字典
+        @param {dict} inline_predef_configs=None - 展开模式, 传入可展开的预定义模块配置字典(参考 inline_predef_config),
+            None代表不展开
 
         @returns {dict} - 转换后的pipeline执行配置字典
         """
+        if inline_predef_configs is not None:
+            config = cls.inline_predef_config(config, inline_predef_configs)
+
         _pipeline_config = dict()
 
         # 获取step数组并遍历处理
@@ -478,12 +623,40 @@ class Robot(object):
 
         _pipe_id = 1  # pipeline的顺序号
         _stack = list()  # if/loop块处理的堆栈
+        _end_node_id = str(len(_steps) + 1)  # 标准结束节点的id
+
+        # 步骤标识名索引, key为step_id, value为节点id, 同名时取第一个(与GoToNode路由按名称查找一致)
+        _step_index = cls.get_step_index(config)
+
+        # parallel块内的节点id(分支在线程池中执行, 不能作为跳转目标)
+        _parallel_nodes = set()
+        _in_parallel = False
+        for _i in range(len(_steps)):
+            _cmd = _steps[_i].get('cmd', 'run').lower()
+            if _cmd in ('parallel', 'endparallel'):
+                _in_parallel = _cmd == 'parallel'
+            elif _in_parallel:
+                _parallel_nodes.add(str(_i + 1))
 
         for _i in range(len(_steps)):
             _step = _steps[_i]
             _cmd = _step.get('cmd', 'run').lower()
             _node_id = str(_pipe_id)
 
+            if len(_stack) > 0 and _stack[-1][1] == 'parallel' and _cmd != 'endparallel':
+                # 并行块内只支持执行动作及预定义模块, 每个步骤为一个分支
+                if _cmd not in ('run', 'predef', 'null'):
+                    raise RuntimeError('cmd %s not support in parallel block!' % _cmd)
+                if _step.get('exception_to', '') != '':
+                    raise RuntimeError(
+                        'config error: exception_to of step [%d] not support in parallel block, '
+                        'use exception_to of parallel step!' % _pipe_id
+                    )
+                if _cmd != 'null':
+                    _pipeline_config[_stack[-1][0]]['context']['control_config']['branches'].append(
+                        copy.deepcopy(_step)
+                    )
+
             # 复制配置字典
             _config: dict = copy.deepcopy(_step)
             _config.pop('step_id', None)
@@ -520,7 +693,7 @@ class Robot(object):
                 }
 
                 # 支持跳转的动作，增加跳转路由器
-                if _cmd in ('if', 'else', 'goto', 'end', 'loop', 'endloop', 'break', 'continue', 'prompt'):
+                if _cmd in ('if', 'else', 'goto', 'end', 'loop', 'endloop', 'break', 'continue', 'prompt', 'parallel'):
                     _pipeline_config[_node_id]['router'] = 'GoToNode'
                     if _cmd == 'prompt':
                         # 需特殊指定 GoToNode 的参数
@@ -528,9 +701,26 @@ class Robot(object):
                             'default_to_next': True
                         }
 
-                if _cmd in ('if', 'loop'):
+                if _cmd == 'goto':
+                    # 转换为节点id, 执行时无需按名称查找
+                    _goto_node_id = _step_index.get(_step.get('goto_step_id', ''), None)
+                    if _goto_node_id is None:
+                        raise RuntimeError('config error: goto_step_id [%s] of step [%d] not found!' % (
+                            _step.get('goto_step_id', ''), _pipe_id
+                        ))
+                    if _goto_node_id in _parallel_nodes:
+                        raise RuntimeError('config error: goto_step_id [%s] of step [%d] in parallel block!' % (
+                            _step['goto_step_id'], _pipe_id
+                        ))
+                    _config['goto_node_id'] = _goto_node_id
+                elif _cmd == 'end':
+                    _config['goto_node_id'] = _end_node_id
+
+                if _cmd in ('if', 'loop', 'parallel'):
                     # 将开始位置放入堆栈
                     _stack.append([_node_id, _cmd])
+                    if _cmd == 'parallel':
+                        _config['branches'] = list()
                 elif _cmd == 'else':
                     # else情况，让if标签的配置知道当前节点位置
                     _last_index = len(_stack) - 1
@@ -556,6 +746,13 @@ class Robot(object):
                     if _stack[_last_index][1] != 'loop':
                         raise RuntimeError('cmd %s must in loop block!' % _cmd)
                     _pipeline_config[_node_id]['context']['control_config']['loop_node_id'] = _stack[_last_index][0]
+                elif _cmd == 'endparallel':
+                    # endparallel情况，让parallel标签的配置知道当前节点位置
+                    _last_cmd = _stack.pop(len(_stack) - 1) if len(_stack) > 0 else [None, None]
+                    if _last_cmd[1] != 'parallel':
+                        raise RuntimeError('cmd endparallel must in parallel block!')
+                    _pipeline_config[_last_cmd[0]
+                                     ]['context']['control_config']['end_node_id'] = _node_id
                 elif _cmd == 'endloop':
                     # endloop情况，让loop标签的配置知道当前节点位置
                     _last_cmd = _stack.pop(len(_stack) - 1)
@@ -567,9 +764,18 @@ class Robot(object):
 
             # 异常跳转
             if _step.get('exception_to', '') != '':
+                _exception_node_id = _step_index.get(_step['exception_to'], None)
+                if _exception_node_id is None:
+                    raise RuntimeError('config error: exception_to [%s] of step [%d] not found!' % (
+                        _step['exception_to'], _pipe_id
+                    ))
+                if _exception_node_id in _parallel_nodes:
+                    raise RuntimeError('config error: exception_to [%s] of step [%d] in parallel block!' % (
+                        _step['exception_to'], _pipe_id
+                    ))
                 _pipeline_config[_node_id]['exception_router'] = 'GoToNode'
                 _pipeline_config[_node_id]['exception_router_para'] = {
-                    'goto_node_name': _step['exception_to']
+                    'goto_node_id': _exception_node_id
                 }
 
             # 管道节点id加1
@@ -577,7 +783,7 @@ class Robot(object):
 
         # 检查块嵌套是否配置错误
         if len(_stack) > 0:
-            raise RuntimeError('config error: if/loop block with not end node!')
+            raise RuntimeError('config error: if/loop/parallel block with not end node!')
 
         # 增加标准的结束节点
         _pipeline_config[str(_pipe_id)] = {
@@ -595,7 +801,7 @@ class Robot(object):
     #############################
     # 工具函数
     #############################
-    def load_predef_by_config(self, config: dict):
+    def load_predef_by_config(self, config: dict, inline: bool = None):
         """
         通过配置字典装载预定义模块
 
@@ -645,6 +851,13 @@ class Robot(object):
                 endloop - 结束循环位置
                 predef - 执行预定义模板
                     可用参数：predef_name
+                parallel - 并行执行块内的步骤, 块内每个run/predef步骤为一个分支(不支持其他命令), 分支的save_to_var分别保存
+                    可用参数：join/timeout/max_workers/save_to_var/save_run_id/exception_to
+                    注：join为等待方式(all/any/first_success), timeout为超时秒数(0为不超时), 参考 RobotActionControl;
+                        predef分支使用编译后的函数执行(参考 compile_predef); 出现异常按parallel步骤的exception_to跳转,
+                        块内步骤不支持exception_to, 块内步骤也不能作为goto/exception_to的跳转目标;
+                        块结束(超时或分支失败)时未完成的分支在下一个动作前停止, 等待分支正在执行的动作完成后才跳转
+                endparallel - 结束并行块位置
                 prompt - 提示获取输入，根据输入跳转到对应步骤
                     可用参数：prompt_router/prompt_para/action_name/instance_obj/call_para_args/call_para_kwargs/save_to_var/save_run_id
                     注：prompt命令的 action_name 应指定的是通知输入命令提示的动作，比如打开提示窗口
@@ -655,12 +868,21 @@ class Robot(object):
                 '{$fixed=now$}' - 获取当前时间
                 '{$var=var_name$}' 或 {$var=var_name,run_id$} - 获取执行过程保存的变量
                 '{$local=var_name$}' - 获取执行过程中可以访问到的变量
+        @param {bool} inline=None - 是否将已装载的子预定义模块展开到当前模块中执行(参考 inline_predef_config), None代表按机器人的设置
+            注: 展开后子模块与调用模块共用一个管道对象, 没有子管道的创建开销; 登记的模块配置为展开后的配置,
+                子模块重新装载后需要重新装载调用模块才会生效
 
         """
-        # 生成管道对象
+        # 展开子预定义模块
+        if (self.inline_predef if inline is None else inline):
+            config = self.inline_predef_config(config, self.robot_info['predef_config'])
+
+        # 生成管道对象(转换时检查跳转目标), 并预先解析所有动作
         _pipeline_config = self.json_to_pipeline_config(config)
-        _pipeline = Pipeline(
-            config['predef_name'], _pipeline_config,
+        self.resolve_actions(config)
+        _pipeline = RobotPipeline(
+            config['predef_name'], _pipeline_config, trace_mode=self.trace_mode, trace_size=self.trace_size,
+            checkpoint_fun=None if self._checkpoint_writer is None else self._checkpoint_fun,
             running_notify_fun=None if self.running_notify_fun is None else self._running_notify_fun,
             end_running_notify_fun=None if self.end_running_notify_fun is None else self._end_running_notify_fun,
             logger=self.logger
@@ -669,6 +891,7 @@ class Robot(object):
         # 装载到机器人
         self.robot_info['predef_pipeline'][config['predef_name']] = _pipeline
         self.robot_info['predef_config'][config['predef_name']] = copy.deepcopy(config)
+        self.robot_info['compiled_predef'].pop(config['predef_name'], None)
 
     def load_predef_by_file(self, file: str, encoding: str = 'utf-8'):
         """
@@ -709,14 +932,11 @@ class Robot(object):
         @param {str} run_id - 执行id，优先用这个获取run执行的配置, 如果要获取预定义模块，可以传None
 
         @returns {dict} - 执行配置
+            注: run执行登记的是共享的只读配置, 返回的是转换后的普通字典
         """
-        _config = None
-        # 优先使用run_id获取
-        if run_id is not None:
-            _config = self.robot_info['run_config'].get(run_id, None)
-
-        if _config is None:
-            _config = self.robot_info['predef_config'][predef_name]
+        _config = self._get_config(predef_name, run_id)
+        if isinstance(_config, types.MappingProxyType):
+            _config = self.thaw_config(_config)
 
         return _config
 
@@ -730,12 +950,14 @@ class Robot(object):
 
         returns {dict} - 执行配置信息
         """
-        _config = self.get_config(predef_name, run_id)
+        _config = self._get_config(predef_name, run_id)
         _step_count = len(_config['steps'])
 
         _para = dict()
         if node_id <= _step_count:
             _para = _config['steps'][node_id - 1]
+            if isinstance(_para, types.MappingProxyType):
+                _para = self.thaw_config(_para)
         elif node_id == _step_count + 1:
             # 是最后一个结算点，固定返回
             _para = {
@@ -873,6 +1095,26 @@ class Robot(object):
         # 返回结果
         return _list
 
+    def trace_counters(self, predef_name: str, run_id: str) -> dict:
+        """
+        获取按步骤统计的执行次数(只有trace_mode为counters时才会统计, 只统计当前运行管道)
+
+        @param {str} predef_name - 预定义模块名，如果是使用run执行的，可以传''
+        @param {str} run_id - 执行id，优先用这个获取run执行的配置
+
+        @returns {dict} - 执行次数统计字典, key为节点顺序id, value为 {步骤执行状态: 执行次数}
+        """
+        _pipeline: RobotPipeline = None
+        # 优先使用run_id获取
+        _pipeline = self.robot_info['run_pipeline'].get(run_id, None)
+
+        if _pipeline is None:
+            _pipeline = self.robot_info['predef_pipeline'][predef_name]
+
+        return {
+            int(_node_id): dict(_counter) for _node_id, _counter in _pipeline.trace_counters(run_id=run_id).items()
+        }
+
     #############################
     # 构造函数
     #############################
@@ -880,7 +1122,10 @@ class Robot(object):
     def __init__(self, robot_id: str = None, use_action_types=None, ignore_version=False, init_modules: list = None,
                  init_class: list = None, init_action_path: str = None,
                  running_notify_fun=None, end_running_notify_fun=None,
-                 system=None, release=None,
+                 system=None, release=None, run_cache_size: int = 64, inline_predef: bool = False,
+                 var_keep_finished: int = 128, var_ttl: float = None, var_max_bytes: int = None,
+                 trace_mode: str = 'full', trace_size: int = 100,
+                 checkpoint_store: CheckpointStore = None, checkpoint_interval: float = 1.0,
                  logger: Logger = None, **kwargs):
         """
         构造函数（创建一个机器人）
@@ -910,6 +1155,20 @@ class Robot(object):
                 status_msg {str} 状态描述，当异常时送入异常信息
         @param {str} system=None - 支持外部传入系统类型（针对移动端应用测试需要在PC执行脚本的情况）
         @param {str} release=None - 当传入system时使用
+        @param {int} run_cache_size=64 - run执行时缓存的管道对象数量(按步骤配置的内容区分), 传0代表不缓存
+        @param {bool} inline_predef=False - 装载预定义模块时是否默认展开已装载的子预定义模块(参考 load_predef_by_config)
+        @param {int} var_keep_finished=128 - 运行结束后保留运行变量的运行id数量, None代表不限制(参考 RunVarStore)
+        @param {float} var_ttl=None - 运行结束后运行变量的保留时间, 单位为秒, None代表不限制
+        @param {int} var_max_bytes=None - 已结束运行的运行变量占用内存上限(估算值), 单位为字节, None代表不限制
+        @param {str} trace_mode='full' - 管道执行追踪信息的保留方式(参考 RobotPipeline)
+            full - 保留全部追踪信息; ring - 每个管道只保留最后trace_size条; counters - 只保留最后一条并按节点统计执行次数
+            注: 长时间循环运行的场景建议使用ring或counters方式, 避免追踪信息占用的内存持续增长
+        @param {int} trace_size=100 - ring方式每个管道保留的追踪信息数量
+        @param {CheckpointStore} checkpoint_store=None - 运行检查点的存储对象(FileCheckpointStore/SqliteCheckpointStore),
+            None代表不保存检查点; 设置后run_predef(管道执行方式)在步骤完成后异步保存检查点, 可通过
+            resume_from_checkpoint 从最后保存的步骤继续执行
+        @param {float} checkpoint_interval=1.0 - 两次获取及写入检查点的最小间隔时间, 单位为秒
+            注: 间隔内完成的步骤不获取检查点快照, 运行暂停或异常结束时再按最后完成的步骤获取快照
         @param {Logger} logger=None - 日志对象
         """
         self.robot_id = robot_id
@@ -943,6 +1202,33 @@ class Robot(object):
         # 日志对象
         self.logger = logger
 
+        # run执行的管道对象缓存, key为步骤配置的内容哈希值, value为管道对象
+        self.run_cache_size = run_cache_size
+        self._run_pipeline_cache = collections.OrderedDict()
+        self._run_pipeline_cache_lock = threading.RLock()
+        # 正在使用缓存管道对象的执行, 值为(配置哈希值, run_id), 同一run_id的嵌套或并发执行使用新的管道对象
+        self._run_pipeline_using = set()
+
+        # 装载预定义模块时是否展开子模块
+        self.inline_predef = inline_predef
+
+        # 管道执行追踪信息的保留方式
+        if trace_mode not in RobotPipeline.TRACE_MODES:
+            raise RuntimeError('trace mode [%s] not support!' % trace_mode)
+        self.trace_mode = trace_mode
+        self.trace_size = trace_size
+
+        # 运行检查点, _checkpoint_runs 登记要保存检查点的运行, key为run_id, value为预定义模块名
+        # _checkpoint_time 登记每个运行最后获取快照的时间, _checkpoint_deferred 登记间隔内未获取快照的最后完成步骤
+        self._checkpoint_writer = None
+        if checkpoint_store is not None:
+            self._checkpoint_writer = CheckpointWriter(
+                checkpoint_store, interval=checkpoint_interval, logger=self.logger
+            )
+        self._checkpoint_runs = dict()
+        self._checkpoint_time = dict()
+        self._checkpoint_deferred = dict()
+
         # 机器人信息
         self.robot_info = {
             'robot': self,
@@ -950,11 +1236,12 @@ class Robot(object):
             'use_action_types': use_action_types,
             'predef_pipeline': dict(),
             'predef_config': dict(),
+            'compiled_predef': dict(),
             'run_pipeline': dict(),
             'run_config': dict(),
-            'vars': {
-                '*': {},  # 全局运行变量
-            }
+            'vars': RunVarStore(
+                keep_finished=var_keep_finished, ttl=var_ttl, max_bytes=var_max_bytes
+            )  # 运行变量, 已包含全局运行变量 '*'
         }
 
         # 加入全局变量
@@ -976,6 +1263,61 @@ class Robot(object):
     #############################
     # 公共函数 - 动作处理
     #############################
+    def get_action_dict(self, action_name: str) -> dict:
+        """
+        获取动作名匹配的动作配置字典
+
+        @param {str} action_name - 动作名(不区分大小写)
+
+        @returns {dict} - 动作配置字典, 参考 RunEnvironment.get_match_action
+
+        @throws {ModuleNotFoundError} - 找不到匹配的动作时抛出异常
+        """
+        _action_name = action_name.upper()
+        _action_dict = self._action_cache.get(_action_name, None)
+        if _action_dict is None:
+            _action_dict = RunEnvironment.get_match_action(
+                _action_name, robot_id=self.robot_id,
+                use_action_types=self.robot_info['use_action_types'],
+                ignore_version=self.ignore_version,
+                system=self.system, release=self.release
+            )
+            # 存入缓存
+            self._action_cache[_action_name] = _action_dict
+
+        return _action_dict
+
+    def resolve_actions(self, config: dict) -> dict:
+        """
+        解析步骤配置中使用的所有动作(结果存入动作缓存, 执行时无需再查找路由)
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+
+        @returns {dict} - 解析到的动作配置字典, key为动作名(大写), value为动作配置字典
+
+        @throws {RuntimeError} - 存在当前平台及动作类别下找不到的动作时抛出异常(列出所有找不到的动作)
+        """
+        _actions = dict()
+        _not_found = list()
+        _steps = config['steps']
+        for _i in range(len(_steps)):
+            _action_name = _steps[_i].get('action_name', '')
+            if _steps[_i].get('cmd', 'run').lower() not in ('run', 'if', 'loop', 'prompt') or _action_name == '':
+                continue
+
+            _action_name = _action_name.upper()
+            try:
+                _actions[_action_name] = self.get_action_dict(_action_name)
+            except ModuleNotFoundError:
+                _not_found.append('[%d]%s' % (_i + 1, _action_name))
+
+        if len(_not_found) > 0:
+            raise RuntimeError('config error: predef [%s] action name not found: %s' % (
+                config.get('predef_name', ''), ', '.join(_not_found)
+            ))
+
+        return _actions
+
     def call_action(self, action_name: str, instance_obj: object = None, run_id: str = None, call_para_args: list = None,
                     call_para_kwargs: dict = None, save_to_var: str = None, save_run_id: str = '*', **kwargs):
         """
@@ -995,19 +1337,8 @@ class Robot(object):
         @returns {object} - 返回执行结果
         """
         # 获取函数
-        _action_dict = None
         _action_name = action_name.upper()
-        if _action_name in self._action_cache.keys():
-            _action_dict = self._action_cache[_action_name]
-        else:
-            _action_dict = RunEnvironment.get_match_action(
-                _action_name, robot_id=self.robot_id,
-                use_action_types=self.robot_info['use_action_types'],
-                ignore_version=self.ignore_version,
-                system=self.system, release=self.release
-            )
-            # 存入缓存
-            self._action_cache[_action_name] = _action_dict
+        _action_dict = self.get_action_dict(_action_name)
 
         # 调用函数
         _fun = _action_dict['fun']
@@ -1034,17 +1365,15 @@ class Robot(object):
 
         # 保存或返回
         if save_to_var is not None:
-            if save_run_id not in self.robot_info['vars'].keys():
-                self.robot_info['vars'][save_run_id] = dict()
-
-            self.robot_info['vars'][save_run_id][save_to_var] = _result
+            self.robot_info['vars'].set_var(save_run_id, save_to_var, _result)
 
         return _result
 
     #############################
     # 公共函数 - 脚本处理
     #############################
-    def run_predef(self, predef_name: str, run_id: str = None, context: dict = None, is_step_by_step: bool = False):
+    def run_predef(self, predef_name: str, run_id: str = None, context: dict = None, is_step_by_step: bool = False,
+                   compiled: bool = False):
         """
         运行预定义模块
 
@@ -1052,6 +1381,8 @@ class Robot(object):
         @param {str} run_id=None - 运行id
         @param {dict} context=None - 嵌套执行时传入上一个步骤的context
         @param {bool} is_step_by_step=Fasle - 是否逐步执行模式
+        @param {bool} compiled=False - 是否使用编译后的python函数执行(参考 compile_predef)
+            注: 编译执行不记录管道运行状态(current_step等函数不可用, 也不保存检查点), 逐步执行模式或无法编译的模块使用管道执行
 
         @returns {str, str, object} - 返回 run_id, status, output
         """
@@ -1066,10 +1397,59 @@ class Robot(object):
         }
         _context = context if context is not None else {}
 
+        if compiled and not is_step_by_step:
+            try:
+                _compiled = self.compile_predef(predef_name)
+            except NotImplementedError:
+                _compiled = None
+
+            if _compiled is not None:
+                self.robot_info['vars'].begin_run(_run_id)
+                try:
+                    _status, _output, _ = _compiled.execute(self, _input_data, _run_id, _context)
+                finally:
+                    self.robot_info['vars'].end_run(_run_id)
+
+                return _run_id, _status, _output
+
         # 执行管道
-        return _pipeline.start(
-            input_data=_input_data, context=_context, run_id=_run_id, is_step_by_step=is_step_by_step
-        )
+        self.robot_info['vars'].begin_run(_run_id)
+        if self._checkpoint_writer is not None and context is None:
+            # 只对最外层的运行保存检查点
+            self._checkpoint_runs[_run_id] = predef_name
+
+        _status = 'E'
+        try:
+            _run_id, _status, _output = _pipeline.start(
+                input_data=_input_data, context=_context, run_id=_run_id, is_step_by_step=is_step_by_step
+            )
+            return _run_id, _status, _output
+        finally:
+            self._end_run(_run_id, _status)
+
+    def compile_predef(self, predef_name: str, force: bool = False) -> CompiledPredef:
+        """
+        将预定义模块编译为python函数
+
+        @param {str} predef_name - 预定义模块名
+        @param {bool} force=False - 是否强制重新编译
+
+        @returns {CompiledPredef} - 编译后的预定义模块(重新装载模块前会一直缓存)
+
+        @throws {NotImplementedError} - 模块中有不支持编译的命令(例如prompt)时抛出异常
+        """
+        _config = self.robot_info['predef_config'].get(predef_name, None)
+        if _config is None:
+            raise RuntimeError('Predef name not exists [%s]!' % predef_name)
+
+        # 通知函数变化后需要重新编译
+        _hooks = self.running_notify_fun is not None or self.end_running_notify_fun is not None
+        _compiled = self.robot_info['compiled_predef'].get(predef_name, None)
+        if force or _compiled is None or _compiled.hooks != _hooks:
+            _compiled = PredefCompiler.compile(self, _config, hooks=_hooks)
+            self.robot_info['compiled_predef'][predef_name] = _compiled
+
+        return _compiled
 
     def pause_predef(self, predef_name: str, run_id: str):
         """
@@ -1099,12 +1479,140 @@ class Robot(object):
             raise RuntimeError('Predef name not exists [%s]!' % predef_name)
 
         # 恢复管道执行
-        return _pipeline.resume(run_id=run_id, run_to_end=run_to_end)
+        _vars: RunVarStore = self.robot_info['vars']
+        if not _vars.is_active(run_id):
+            _vars.begin_run(run_id)
+
+        _status = 'E'
+        try:
+            _run_id, _status, _output = _pipeline.resume(run_id=run_id, run_to_end=run_to_end)
+            return _run_id, _status, _output
+        finally:
+            self._end_run(run_id, _status)
+
+    def resume_from_checkpoint(self, run_id: str):
+        """
+        从保存的检查点恢复执行预定义模块(从最后完成步骤的下一个步骤继续执行)
+        注: 恢复检查点中的运行变量、上一步执行结果及各层管道的上下文(包括循环状态), 无法转换为json的值不会恢复;
+            对应的预定义模块需要已重新装载
+
+        @param {str} run_id - 运行id
+
+        @returns {str, str, object} - 返回 run_id, status, output
+        """
+        if self._checkpoint_writer is None:
+            raise RuntimeError('Robot checkpoint store not set!')
+
+        _checkpoint = self._checkpoint_writer.load(run_id)
+        if _checkpoint is None:
+            raise RuntimeError('Checkpoint of run id [%s] not exists!' % run_id)
+
+        # 从最内层的子管道开始恢复运行状态
+        _input_data = {
+            'robot': self,
+            'last_result': _checkpoint['last_result']
+        }
+        _sub_pipeline = None
+        for _level in reversed(_checkpoint['pipelines']):
+            _pipeline: RobotPipeline = self.robot_info['predef_pipeline'].get(_level['predef_name'], None)
+            if _pipeline is None:
+                raise RuntimeError('Predef name not exists [%s]!' % _level['predef_name'])
+
+            _pipeline.restore_run(
+                run_id, _level['node_id'], _level['context'], _input_data, sub_pipeline=_sub_pipeline
+            )
+            _sub_pipeline = _pipeline
+
+        # 恢复运行变量
+        _vars: RunVarStore = self.robot_info['vars']
+        _vars.begin_run(run_id)
+        _vars[run_id].update(_checkpoint['vars'])
+        self._checkpoint_runs[run_id] = _checkpoint['predef_name']
+
+        _status = 'E'
+        try:
+            _run_id, _status, _output = _sub_pipeline.resume(run_id=run_id)
+            return _run_id, _status, _output
+        finally:
+            self._end_run(run_id, _status)
+
+    def run_predef_stream(self, predef_name: str, iterable, concurrency: int = 1, on_result=None, sink=None,
+                          record_var: str = 'record', run_id_prefix: str = None, compiled: bool = False) -> dict:
+        """
+        按数据流逐条记录执行预定义模块
+        注: 记录按需逐条获取, 最多同时执行concurrency个运行, 结果逐条输出后即释放, 内存占用与数据量无关;
+            每条记录使用独立的运行id, 运行结束后清除管道中该运行的状态信息
+
+        @param {str} predef_name - 预定义模块名
+        @param {str|iterable} iterable - 记录来源, 可以为csv/jsonl/json文件路径或任意迭代对象(例如生成器), 参考 StreamTool.get_source
+        @param {int} concurrency=1 - 最多同时执行的运行数量
+        @param {function} on_result=None - 每条记录执行完成的通知函数(按完成顺序通知)，格式如下：
+            fun(robot, record, result)
+                robot {Robot} - 机器人实例对象
+                record {object} - 记录
+                result {dict} - 执行结果, 包括 index(记录序号,从0开始)/run_id/status/status_msg/last_result
+        @param {str|object} sink=None - 执行结果输出, 可以为jsonl/SQLite数据库文件路径或带write(result)函数的对象,
+            参考 StreamTool.get_sink
+        @param {str} record_var='record' - 记录保存的运行变量名, 如果记录为字典, 字典的每个值也按key保存为运行变量
+        @param {str} run_id_prefix=None - 运行id前缀, 每条记录的运行id为 '前缀-记录序号', None代表自动生成前缀
+        @param {bool} compiled=False - 是否使用编译后的python函数执行(参考 run_predef)
+
+        @returns {dict} - 执行统计 {'total': 记录数, 'success': 成功数, 'failed': 失败数}
+        """
+        if predef_name not in self.robot_info['predef_pipeline'].keys():
+            raise RuntimeError('Predef name not exists [%s]!' % predef_name)
+
+        _prefix = run_id_prefix if run_id_prefix is not None else str(uuid.uuid1())
+        _iter = iter(StreamTool.get_source(iterable))
+        _sink, _close_sink = (None, False) if sink is None else StreamTool.get_sink(sink)
+        _stat = {'total': 0, 'success': 0, 'failed': 0}
+        _running = dict()  # 正在执行的运行, key为future, value为记录
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(concurrency, 1), thread_name_prefix='RobotStream'
+        )
+        try:
+            _is_end = False
+            while not _is_end or len(_running) > 0:
+                # 补充执行的记录, 保持最多concurrency个运行
+                while not _is_end and len(_running) < max(concurrency, 1):
+                    try:
+                        _record = next(_iter)
+                    except StopIteration:
+                        _is_end = True
+                        break
+
+                    _future = _executor.submit(
+                        self._run_stream_record, predef_name, _stat['total'], '%s-%d' % (_prefix, _stat['total']),
+                        _record, record_var, compiled
+                    )
+                    _running[_future] = _record
+                    _stat['total'] += 1
+
+                if len(_running) == 0:
+                    break
+
+                # 等待运行完成并输出结果
+                _done, _ = concurrent.futures.wait(_running.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+                for _future in _done:
+                    _record = _running.pop(_future)
+                    _result = _future.result()
+                    _stat['success' if _result['status'] == 'S' else 'failed'] += 1
+                    if _sink is not None:
+                        _sink.write(_result)
+                    if on_result is not None:
+                        on_result(self, _record, _result)
+        finally:
+            _executor.shutdown(wait=True)
+            if _close_sink:
+                _sink.close()
+
+        return _stat
 
     def run(self, config: dict, run_id: str = None, input_data: object = None, context: dict = None):
         """
         按步骤配置运行机器人
         （一次性执行，不支持重跑，推荐使用run_predef）
+        注: 相同内容的步骤配置共用转换后的管道配置及管道对象, 执行期间 run_config 中登记的是共享的只读配置
 
         @param {dict} config - 机器人执行步骤JSON配置字典
         @param {str} run_id=None - 运行id, 嵌套执行时传入上一个步骤的run_id
@@ -1123,18 +1631,16 @@ class Robot(object):
             }
         _context = context if context is not None else {}
 
-        # 生成管道对象
-        _pipeline_config = self.json_to_pipeline_config(config)
-        _pipeline = Pipeline(
-            config['predef_name'], _pipeline_config,
-            running_notify_fun=None if self.running_notify_fun is None else self._running_notify_fun,
-            end_running_notify_fun=None if self.end_running_notify_fun is None else self._end_running_notify_fun,
-            logger=self.logger
-        )
+        # 获取管道对象
+        _pipeline, _config, _using = self._get_run_pipeline(config, _run_id)
 
-        # 添加执行临时信息
+        # 添加执行临时信息(同一run_id嵌套执行时, 结束后恢复外层执行的信息)
+        _outer = (
+            self.robot_info['run_pipeline'].get(_run_id, None), self.robot_info['run_config'].get(_run_id, None)
+        )
         self.robot_info['run_pipeline'][_run_id] = _pipeline
-        self.robot_info['run_config'][_run_id] = copy.deepcopy(config)
+        self.robot_info['run_config'][_run_id] = _config
+        self.robot_info['vars'].begin_run(_run_id)
 
         try:
             return _pipeline.start(
@@ -1142,12 +1648,314 @@ class Robot(object):
             )
         finally:
             # 移除执行临时信息
-            self.robot_info['run_pipeline'].pop(_run_id, None)
-            self.robot_info['run_config'].pop(_run_id, None)
+            if _outer[0] is None:
+                self.robot_info['run_pipeline'].pop(_run_id, None)
+                self.robot_info['run_config'].pop(_run_id, None)
+            else:
+                self.robot_info['run_pipeline'][_run_id] = _outer[0]
+                self.robot_info['run_config'][_run_id] = _outer[1]
+            self.robot_info['vars'].end_run(_run_id)
+            if _using is not None:
+                with self._run_pipeline_cache_lock:
+                    self._run_pipeline_using.discard(_using)
+
+            # 清除管道对象中该次执行的信息, 管道对象可以继续给其他执行使用
+            _pipeline.running_sub_pipeline.pop(_run_id, None)
+            if _pipeline.status(run_id=_run_id) != 'R':
+                _pipeline.remove(run_id=_run_id)
 
     #############################
     # 私有函数
     #############################
+    def _get_config(self, predef_name: str, run_id: str):
+        """
+        获取登记的执行配置(参考 get_config)
+
+        @param {str} predef_name - 预定义模块名
+        @param {str} run_id - 执行id
+
+        @returns {dict|MappingProxyType} - 登记的执行配置, run执行为共享的只读配置
+        """
+        _config = None
+        # 优先使用run_id获取
+        if run_id is not None:
+            _config = self.robot_info['run_config'].get(run_id, None)
+
+        if _config is None:
+            _config = self.robot_info['predef_config'][predef_name]
+
+        return _config
+
+    def _end_run(self, run_id: str, status: str):
+        """
+        预定义模块运行返回后的处理(运行结束时结束变量作用域及处理检查点)
+
+        @param {str} run_id - 运行id
+        @param {str} status - 运行状态
+        """
+        if status in ('R', 'P'):
+            # 运行未结束(暂停或异步执行)时保留变量作用域及检查点, 暂停时获取间隔内未获取的快照
+            if status == 'P':
+                self._capture_deferred_checkpoint(run_id)
+            return
+
+        if status != 'S':
+            # 异常结束时保留检查点用于恢复执行
+            self._capture_deferred_checkpoint(run_id)
+
+        self.robot_info['vars'].end_run(run_id)
+        self._checkpoint_time.pop(run_id, None)
+        self._checkpoint_deferred.pop(run_id, None)
+        if self._checkpoint_runs.pop(run_id, None) is not None and status == 'S':
+            # 执行成功后无需再保留检查点
+            self._checkpoint_writer.remove(run_id)
+
+    def _run_stream_record(self, predef_name: str, index: int, run_id: str, record, record_var: str,
+                           compiled: bool) -> dict:
+        """
+        执行数据流的一条记录(参考 run_predef_stream)
+
+        @param {str} predef_name - 预定义模块名
+        @param {int} index - 记录序号
+        @param {str} run_id - 运行id
+        @param {object} record - 记录
+        @param {str} record_var - 记录保存的运行变量名
+        @param {bool} compiled - 是否使用编译后的python函数执行
+
+        @returns {dict} - 执行结果, 包括 index/run_id/status/status_msg/last_result
+        """
+        _vars: RunVarStore = self.robot_info['vars']
+        if isinstance(record, dict):
+            for _key, _value in record.items():
+                _vars.set_var(run_id, _key, _value)
+        _vars.set_var(run_id, record_var, record)
+
+        _result = {'index': index, 'run_id': run_id, 'status': 'E', 'status_msg': '', 'last_result': None}
+        try:
+            _, _result['status'], _output = self.run_predef(predef_name, run_id=run_id, compiled=compiled)
+            if _output is not None:
+                _result['last_result'] = _output['last_result']
+        except Exception:
+            _result['status_msg'] = traceback.format_exc()
+        finally:
+            # 清除管道中该运行的状态信息(包括异常结束时未清除的子管道)
+            _pipeline: RobotPipeline = self.robot_info['predef_pipeline'][predef_name]
+            while _pipeline is not None:
+                try:
+                    if _result['status_msg'] == '':
+                        _result['status_msg'] = _pipeline.current_node_status_msg(run_id=run_id)
+                    _pipeline.remove(run_id=run_id)
+                except RuntimeError:
+                    # 编译执行的情况没有管道运行信息
+                    pass
+                _pipeline = _pipeline.running_sub_pipeline.pop(run_id, None)
+
+        return _result
+
+    def _checkpoint_fun(self, pipeline: RobotPipeline, run_id: str, node_id: str, next_node_id: str, output):
+        """
+        节点执行完成的检查点通知函数, 登记各层管道的运行状态快照(异步写入)
+        注: 距上次获取快照不足检查点间隔时只记录完成的节点, 不复制变量, 运行暂停或异常结束时再获取快照
+
+        @param {RobotPipeline} pipeline - 执行完成节点的管道对象
+        @param {str} run_id - 运行id
+        @param {str} node_id - 执行完成的节点id
+        @param {str} next_node_id - 下一个执行节点id
+        @param {object} output - 节点执行输出结果
+        """
+        if run_id not in self._checkpoint_runs.keys():
+            return
+
+        _now = time.time()
+        if _now - self._checkpoint_time.get(run_id, 0) < self._checkpoint_writer.interval:
+            self._checkpoint_deferred[run_id] = (pipeline, next_node_id, output)
+            return
+
+        self._checkpoint_time[run_id] = _now
+        self._checkpoint_deferred.pop(run_id, None)
+        self._capture_checkpoint(pipeline, run_id, next_node_id, output)
+
+    def _capture_deferred_checkpoint(self, run_id: str):
+        """
+        获取间隔内未获取快照的最后完成步骤的检查点快照(运行暂停或异常结束时调用)
+
+        @param {str} run_id - 运行id
+        """
+        _deferred = self._checkpoint_deferred.pop(run_id, None)
+        if _deferred is None or run_id not in self._checkpoint_runs.keys():
+            return
+
+        self._checkpoint_time[run_id] = time.time()
+        try:
+            self._capture_checkpoint(_deferred[0], run_id, _deferred[1], _deferred[2])
+        except Exception:
+            # 管道运行信息已清除, 保留上一个检查点
+            self._checkpoint_writer.logger.error(
+                'Capture checkpoint of run id [%s] error: %s' % (run_id, traceback.format_exc())
+            )
+
+    def _capture_checkpoint(self, pipeline: RobotPipeline, run_id: str, next_node_id: str, output):
+        """
+        获取各层管道的运行状态快照并登记(异步写入)
+
+        @param {RobotPipeline} pipeline - 执行完成节点的管道对象
+        @param {str} run_id - 运行id
+        @param {str} next_node_id - 下一个执行节点id
+        @param {object} output - 节点执行输出结果
+        """
+        _predef_name = self._checkpoint_runs.get(run_id, None)
+        if _predef_name is None:
+            return
+
+        # 从最外层管道开始登记当前执行节点, 执行完成节点的管道登记下一个节点
+        _levels = list()
+        _pipeline: RobotPipeline = self.robot_info['predef_pipeline'][_predef_name]
+        while _pipeline is not pipeline:
+            _levels.append({
+                'predef_name': _pipeline.name,
+                'node_id': _pipeline.current_node_id(run_id=run_id),
+                'context': CheckpointWriter.copy_dict(_pipeline.context(run_id=run_id))
+            })
+            _pipeline = _pipeline.running_sub_pipeline.get(run_id, None)
+            if _pipeline is None:
+                # 不是该运行的管道
+                return
+
+        _levels.append({
+            'predef_name': pipeline.name,
+            'node_id': next_node_id,
+            'context': CheckpointWriter.copy_dict(pipeline.context(run_id=run_id))
+        })
+
+        # 登记时复制快照, 避免后台线程写入时变量已被后续步骤修改
+        _last_result = output.get('last_result', None) if isinstance(output, dict) else None
+        try:
+            _last_result = CheckpointWriter.copy_value(_last_result)
+        except (TypeError, RuntimeError):
+            _last_result = None
+
+        self._checkpoint_writer.submit(run_id, {
+            'run_id': run_id,
+            'robot_id': self.robot_id,
+            'predef_name': _predef_name,
+            'pipelines': _levels,
+            'last_result': _last_result,
+            'vars': CheckpointWriter.copy_dict(self.robot_info['vars'].get(run_id, dict()))
+        })
+
+    @classmethod
+    def _inline_predef_steps(cls, steps: list, predef_configs: dict, predef_stack: list) -> list:
+        """
+        展开步骤清单中的predef步骤(参考 inline_predef_config)
+
+        @param {list} steps - 步骤清单
+        @param {dict} predef_configs - 可展开的预定义模块配置字典
+        @param {list} predef_stack - 正在展开的模块名清单(用于判断递归调用)
+
+        @returns {list} - 展开后的步骤清单
+        """
+        _steps = list()
+        _in_parallel = False
+        for _step in steps:
+            _predef_name = _step.get('predef_name', '')
+            _sub_config = predef_configs.get(_predef_name, None)
+            if _step.get('cmd', 'run').lower() in ('parallel', 'endparallel'):
+                _in_parallel = _step['cmd'].lower() == 'parallel'
+
+            if _step.get('cmd', 'run').lower() != 'predef' or _sub_config is None or _predef_name in predef_stack \
+                    or _in_parallel \
+                    or 'prompt' in [_sub.get('cmd', 'run').lower() for _sub in _sub_config['steps']]:
+                _steps.append(copy.deepcopy(_step))
+                continue
+
+            # 保留原步骤位置, 让跳转到predef步骤的配置继续有效
+            _scope = _step.get('step_id', '')
+            if _scope == '':
+                _scope = '%s@%d' % (_predef_name, len(_steps) + 1)
+            _steps.append({
+                'step_id': _step.get('step_id', ''), 'cmd': 'null',
+                'remark': 'inline predef [%s]' % _predef_name
+            })
+
+            # 先展开子模块自身的predef步骤, 再加上作用域
+            _end_step_id = '%s.{$END_NODE$}' % _scope
+            _has_end = False
+            _exception_to = _step.get('exception_to', '')
+            for _sub in cls._inline_predef_steps(
+                _sub_config['steps'], predef_configs, predef_stack + [_predef_name]
+            ):
+                if _sub.get('step_id', '') != '':
+                    _sub['step_id'] = '%s.%s' % (_scope, _sub['step_id'])
+
+                _cmd = _sub.get('cmd', 'run').lower()
+                if _cmd == 'goto':
+                    _sub['goto_step_id'] = '%s.%s' % (_scope, _sub.get('goto_step_id', ''))
+                elif _cmd == 'end':
+                    # 子模块的end只结束子模块
+                    _sub['cmd'] = 'goto'
+                    _sub['goto_step_id'] = _end_step_id
+                    _has_end = True
+
+                if _sub.get('exception_to', '') != '':
+                    _sub['exception_to'] = '%s.%s' % (_scope, _sub['exception_to'])
+                elif _exception_to != '':
+                    _sub['exception_to'] = _exception_to
+
+                _steps.append(_sub)
+
+            if _has_end:
+                _steps.append({'step_id': _end_step_id, 'cmd': 'null'})
+
+        return _steps
+
+    def _get_run_pipeline(self, config: dict, run_id: str) -> tuple:
+        """
+        获取run执行使用的管道对象(相同内容的步骤配置共用同一个管道对象)
+        注: 管道对象按run_id区分每次执行的状态, 不同run_id可以共用;
+            缓存的管道对象正在执行同一run_id时(嵌套或并发执行), 使用新的管道对象(不缓存);
+            无法计算配置哈希值时(参考 config_hash)使用新的管道对象(不缓存)
+
+        @param {dict} config - 机器人执行步骤JSON配置字典
+        @param {str} run_id - 运行id
+
+        @returns {(Pipeline, MappingProxyType, tuple)} - 返回 (管道对象, 不可变的步骤配置, 使用登记)
+            使用登记为 (配置哈希值, run_id), 执行结束后需从 _run_pipeline_using 中删除, 使用新的管道对象时为None
+        """
+        _key, _pipeline_config, _config = self.get_pipeline_config(config)
+        _using = None if _key is None else (_key, run_id)
+        with self._run_pipeline_cache_lock:
+            if _using is None or _using in self._run_pipeline_using:
+                _using = None
+            else:
+                _pipeline = self._run_pipeline_cache.get(_key, None)
+                if _pipeline is not None:
+                    self._run_pipeline_cache.move_to_end(_key)
+                    self._run_pipeline_using.add(_using)
+                    return _pipeline, _config, _using
+
+        self.resolve_actions(config)
+        _pipeline = RobotPipeline(
+            config['predef_name'], _pipeline_config, trace_mode=self.trace_mode, trace_size=self.trace_size,
+            running_notify_fun=None if self.running_notify_fun is None else self._running_notify_fun,
+            end_running_notify_fun=None if self.end_running_notify_fun is None else self._end_running_notify_fun,
+            logger=self.logger
+        )
+
+        if self.run_cache_size > 0 and _using is not None:
+            with self._run_pipeline_cache_lock:
+                if _using in self._run_pipeline_using:
+                    # 创建期间同一run_id的其他执行已缓存并使用管道对象
+                    _using = None
+                else:
+                    self._run_pipeline_cache[_key] = _pipeline
+                    self._run_pipeline_using.add(_using)
+                    while len(self._run_pipeline_cache) > self.run_cache_size:
+                        self._run_pipeline_cache.popitem(last=False)
+        else:
+            _using = None
+
+        return _pipeline, _config, _using
+
     def _running_notify_fun(self, name: str, run_id: str, node_id: str, node_name: str, pipeline: Pipeline):
         """
         节点执行开始的管道通知函数，将管道执行信息转换为机器人执行步骤的执行信息
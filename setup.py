@@ -27,7 +27,7 @@ DEPENDENCIES = [
     'psutil',
     'uiautomation',
     'pyperclip',
-    'pyscreeze',
+    'numpy',
     'prompt-toolkit>=2.0.0',
     'Appium-Python-Client'
 ]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+图像匹配引擎性能测试
+@module benchmark_image_matcher
+@file benchmark_image_matcher.py
+"""
+
+import sys
+import os
+import time
+import random
+import numpy as np
+from PIL import Image, ImageDraw
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MATCH_ENGINES, cv2
+
+
+def make_screenshot(seed: int, size: tuple = (1080, 2400)) -> Image:
+    """
+    生成模拟手机界面的截图(纯色背景、卡片、按钮、图标和文字)
+
+    @param {int} seed - 随机种子
+    @param {tuple} size=(1080, 2400) - 截图大小
+
+    @returns {PIL.Image} - 截图对象
+    """
+    _rand = random.Random(seed)
+    _image = Image.new('RGB', size, (245, 245, 245))
+    _draw = ImageDraw.Draw(_image)
+
+    # 状态栏和标题栏
+    _draw.rectangle((0, 0, size[0], 80), fill=(30, 30, 30))
+    _draw.rectangle((0, 80, size[0], 240), fill=(_rand.randint(0, 255), 120, 200))
+
+    # 列表卡片
+    _y = 280
+    while _y < size[1] - 200:
+        _h = _rand.randint(120, 320)
+        _draw.rounded_rectangle((30, _y, size[0] - 30, _y + _h), radius=20, fill=(255, 255, 255))
+        # 图标
+        _color = tuple([_rand.randint(0, 255) for _i in range(3)])
+        _draw.ellipse((60, _y + 20, 160, _y + 120), fill=_color)
+        # 文字
+        for _line in range(_rand.randint(1, 4)):
+            _draw.text(
+                (190, _y + 25 + _line * 28),
+                ''.join([chr(_rand.randint(65, 122)) for _i in range(_rand.randint(10, 40))]),
+                fill=(40, 40, 40)
+            )
+        # 按钮
+        _draw.rounded_rectangle(
+            (size[0] - 260, _y + _h - 80, size[0] - 60, _y + _h - 20), radius=10,
+            fill=(_rand.randint(0, 100), _rand.randint(100, 200), 255)
+        )
+        _y += _h + 30
+
+    # 底部导航栏
+    _draw.rectangle((0, size[1] - 160, size[0], size[1]), fill=(250, 250, 250))
+    for _i in range(4):
+        _draw.rectangle(
+            (90 + _i * 250, size[1] - 130, 170 + _i * 250, size[1] - 50),
+            fill=tuple([_rand.randint(0, 255) for _j in range(3)])
+        )
+
+    # 加入少量噪声, 模拟压缩和抗锯齿带来的细节
+    _array = np.asarray(_image).astype(np.int16)
+    _noise = np.random.default_rng(seed).integers(-2, 3, size=_array.shape)
+    return Image.fromarray(np.clip(_array + _noise, 0, 255).astype(np.uint8))
+
+
+def make_needles(screenshot: Image, seed: int, sizes: tuple = (50, 100, 200)) -> list:
+    """
+    从截图中截取要查找的模板
+
+    @param {PIL.Image} screenshot - 截图
+    @param {int} seed - 随机种子
+    @param {tuple} sizes=(50, 100, 200) - 模板大小清单
+
+    @returns {list} - [(needle, (x, y)), ...]
+    """
+    _rand = random.Random(seed)
+    _needles = list()
+    for _size in sizes:
+        _x = _rand.randint(0, screenshot.size[0] - _size)
+        _y = _rand.randint(300, screenshot.size[1] - _size - 200)
+        _needles.append((screenshot.crop((_x, _y, _x + _size, _y + _size)), (_x, _y)))
+
+    return _needles
+
+
+def run_benchmark(engines: list, screen_count: int = 3, repeat: int = 2, locate_kwargs: dict = None):
+    """
+    执行性能测试并打印结果
+
+    @param {list} engines - 要测试的引擎清单
+    @param {int} screen_count=3 - 测试的截图数量
+    @param {int} repeat=2 - 每个模板重复查找次数
+    @param {dict} locate_kwargs=None - 传给 ImageMatcher.locate 的其他参数, 例如 {'pyramid': 4}
+    """
+    _kwargs = dict() if locate_kwargs is None else locate_kwargs
+    print('locate kwargs: %s' % str(_kwargs))
+    print('%-8s %-9s %-6s %10s %8s' % ('engine', 'grayscale', 'needle', 'avg(ms)', 'found'))
+    for _engine in engines:
+        for _grayscale in (True, False):
+            _stat = dict()
+            for _seed in range(screen_count):
+                _screenshot = make_screenshot(_seed)
+                for _needle, _pos in make_needles(_screenshot, _seed):
+                    _key = _needle.size[0]
+                    _stat.setdefault(_key, [0.0, 0, 0])
+                    for _i in range(repeat):
+                        _start = time.perf_counter()
+                        _box = ImageMatcher.locate(
+                            _needle, _screenshot, grayscale=_grayscale, confidence=0.95,
+                            engine=_engine, **_kwargs
+                        )
+                        _stat[_key][0] += time.perf_counter() - _start
+                        _stat[_key][1] += 1
+                        if _box is not None and _box[0:2] == _pos:
+                            _stat[_key][2] += 1
+
+            for _key in sorted(_stat.keys()):
+                print('%-8s %-9s %-6s %10.1f %5d/%-3d' % (
+                    _engine, str(_grayscale), '%dpx' % _key,
+                    _stat[_key][0] * 1000 / _stat[_key][1], _stat[_key][2], _stat[_key][1]
+                ))
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 测试的引擎, opencv只有在安装后才测试
+    _engines = [_name for _name in MATCH_ENGINES.keys() if _name != 'opencv' or cv2 is not None]
+    run_benchmark(_engines)
+    # 金字塔匹配及按最后找到的位置优先查找
+    run_benchmark(_engines, locate_kwargs={'pyramid': 4})
+    run_benchmark(_engines, locate_kwargs={'hint': True})
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+预定义模块测试共用的动作
+@module record_action
+@file record_action.py
+"""
+
+import sys
+import os
+import time
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.actions.base_action import BaseAction
+
+
+# 测试用例共用的子预定义模块
+SUB_CONFIG = {
+    'predef_name': 'sub',
+    'steps': [
+        {'cmd': 'run', 'action_name': 'rec_add', 'call_para_kwargs': "{'val': 10}"},
+        {'cmd': 'if', 'condition': '{$var=cnt$} > 100'},
+        {'cmd': 'end'},
+        {'cmd': 'endif'},
+        {'cmd': 'run', 'action_name': 'rec_echo', 'call_para_args': "[{$fixed=last$}]"}
+    ]
+}
+
+
+# 动作调用记录, key为run_id, value为 [(动作名, 参数), ...]
+CALL_LOG = dict()
+
+
+class RecordAction(BaseAction):
+    """
+    记录调用过程的测试动作
+    """
+
+    @classmethod
+    def rec_add(cls, robot_info: dict, action_name: str, run_id: str, val: int = 1, **kwargs):
+        """
+        累加运行变量cnt
+
+        @param {int} val=1 - 累加值
+
+        @returns {int} - 累加后的值
+        """
+        CALL_LOG.setdefault(run_id, list()).append((action_name, val))
+        _vars = robot_info['vars'].setdefault(run_id, dict())
+        _vars['cnt'] = _vars.get('cnt', 0) + val
+        return _vars['cnt']
+
+    @classmethod
+    def rec_echo(cls, robot_info: dict, action_name: str, run_id: str, *args, **kwargs):
+        """
+        返回传入的参数
+
+        @returns {list} - [args, kwargs]
+        """
+        CALL_LOG.setdefault(run_id, list()).append((action_name, args, kwargs))
+        return [list(args), kwargs]
+
+    @classmethod
+    def rec_fail(cls, robot_info: dict, action_name: str, run_id: str, **kwargs):
+        """
+        抛出异常
+        """
+        CALL_LOG.setdefault(run_id, list()).append((action_name, ))
+        raise RuntimeError('rec_fail')
+
+    @classmethod
+    def rec_sleep(cls, robot_info: dict, action_name: str, run_id: str, seconds: float = 0.01, **kwargs):
+        """
+        等待一段时间
+
+        @param {float} seconds=0.01 - 等待时间, 单位为秒
+        """
+        time.sleep(seconds)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import json
+import types
+import shutil
+import subprocess
+import tempfile
+import unittest
+import numpy as np
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetLib.base_tools.run_tool import RunTool
+try:
+    from HandLessRobot.lib.controls.adb_control import AppDevice, AdbTools, TapRateScheduler, DeviceFacts, \
+        DEVICE_STATE_MARKS
+except ImportError:
+    # 未安装appium等依赖时跳过测试
+    TapRateScheduler = None
+
+
+class FakeTapChannel(object):
+    """
+    模拟点击通道, 提交的点击按指定延时完成
+    """
+
+    def __init__(self, delay: float = 0.0, fail_every: int = 0, alive: bool = True):
+        """
+        构造函数
+
+        @param {float} delay=0.0 - 点击完成的延时, 单位为秒, None代表永远不完成
+        @param {int} fail_every=0 - 每提交多少次点击失败一次, 0代表不失败
+        @param {bool} alive=True - 通道是否正常
+        """
+        self.delay = delay
+        self.fail_every = fail_every
+        self.alive = alive
+        self.taps = list()
+        self.discarded = list()
+        self.seq = 0
+
+    def submit(self, x: int, y: int) -> int:
+        self.seq += 1
+        if self.fail_every > 0 and self.seq % self.fail_every == 0:
+            raise RuntimeError('submit error')
+        self.taps.append((self.seq, x, y, time.time()))
+        return self.seq
+
+    def ack(self, seq: int, timeout: float):
+        _submit_time = [_tap[3] for _tap in self.taps if _tap[0] == seq][0]
+        if self.delay is None or not self.alive:
+            time.sleep(min(timeout, 0.05))
+            return None
+
+        _wait = _submit_time + self.delay - time.time()
+        if _wait > timeout:
+            time.sleep(timeout)
+            return None
+        if _wait > 0:
+            time.sleep(_wait)
+        return _submit_time + self.delay
+
+    def discard(self, seqs: list):
+        self.discarded.extend(seqs)
+
+
+class FakeDevice(object):
+    """
+    模拟设备的静态信息查询
+    """
+
+    def __init__(self, serialno: str = 'S1', boot_id: str = 'B1', wm_size: str = None):
+        self.serialno = serialno
+        self.boot_id = boot_id
+        self.wm_size = wm_size
+        self.queries = 0
+        self.identities = 0
+
+    def query(self, device_name: str, adb_name: str = 'adb', shell_encoding: str = None) -> dict:
+        self.queries += 1
+        _lines = ['Physical size: 1080x1920']
+        if self.wm_size is not None:
+            _lines.append('Override size: %s' % self.wm_size)
+        _size, _wm_size = DeviceFacts.parse_wm_size(_lines)
+        return {
+            'serialno': self.serialno, 'boot_id': self.boot_id, 'abi': 'x86', 'sdk': 29,
+            'size': list(_size), 'wm_size': list(_wm_size), 'update_time': time.time()
+        }
+
+    def query_identity(self, device_name: str, adb_name: str = 'adb', shell_encoding: str = None) -> tuple:
+        self.identities += 1
+        return self.serialno, self.boot_id
+
+
+@unittest.skipUnless(TapRateScheduler is not None, 'adb_control dependencies are not installed')
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _set_device(self, device: FakeDevice, reset: bool = False):
+        """
+        设置DeviceFacts查询的模拟设备
+
+        @param {FakeDevice} device - 模拟设备
+        @param {bool} reset=False - 是否清除内存中的缓存(模拟新的进程)
+        """
+        _orig = (DeviceFacts.__dict__['_query'], DeviceFacts.__dict__['_query_identity'])
+        DeviceFacts._query = classmethod(lambda cls, *args, **kwargs: device.query(*args, **kwargs))
+        DeviceFacts._query_identity = classmethod(
+            lambda cls, *args, **kwargs: device.query_identity(*args, **kwargs)
+        )
+        self.addCleanup(setattr, DeviceFacts, '_query', _orig[0])
+        self.addCleanup(setattr, DeviceFacts, '_query_identity', _orig[1])
+        if reset:
+            DeviceFacts._facts = None
+            DeviceFacts._verified.clear()
+            DeviceFacts._transient.clear()
+
+    def test_device_facts(self):
+        _file = os.path.join(self.path, 'facts.json')
+        RunTool.set_global_var('DEVICE_FACTS_FILE', _file)
+        self.addCleanup(RunTool.set_global_var, 'DEVICE_FACTS_FILE', '')
+
+        # 首次获取后持久化, 新的进程校验序列号及开机id后直接使用
+        _device = FakeDevice()
+        self._set_device(_device, reset=True)
+        self.assertEqual(DeviceFacts.get_facts('d1'), {'size': (1080, 1920), 'sdk': 29, 'abi': 'x86'})
+        DeviceFacts.get_size('d1')
+        self.assertEqual((_device.queries, _device.identities), (1, 1))
+        with open(_file, 'r', encoding='utf-8') as _f:
+            self.assertEqual(list(json.loads(_f.read()).keys()), ['S1'])
+
+        self._set_device(_device, reset=True)
+        DeviceFacts.get_facts('d1')
+        self.assertEqual((_device.queries, _device.identities), (1, 2))
+
+        # 设备重启后重新获取
+        _device.boot_id = 'B2'
+        self._set_device(_device, reset=True)
+        DeviceFacts.get_facts('d1')
+        self.assertEqual(_device.queries, 2)
+
+        # 显示大小变化时失效, 物理大小不变
+        DeviceFacts.update_size('d1', (1080, 1920))
+        DeviceFacts.get_facts('d1')
+        self.assertEqual(_device.queries, 2)
+        _device.wm_size = '720x1280'
+        DeviceFacts.update_size('d1', (720, 1280))
+        self.assertEqual(DeviceFacts.get_size('d1'), (1080, 1920))
+        self.assertEqual(_device.queries, 3)
+        DeviceFacts.update_size('d1', (720, 1280))
+        DeviceFacts.get_facts('d1')
+        self.assertEqual(_device.queries, 3)
+
+        # 获取不到序列号时按设备名缓存在内存中, 不持久化
+        _device = FakeDevice(serialno='')
+        self._set_device(_device)
+        self.assertEqual(DeviceFacts.get_size('emu'), (1080, 1920))
+        DeviceFacts.get_size('emu')
+        self.assertEqual(_device.queries, 1)
+        with open(_file, 'r', encoding='utf-8') as _f:
+            self.assertEqual(list(json.loads(_f.read()).keys()), ['S1'])
+        DeviceFacts.invalidate('emu')
+        DeviceFacts.get_size('emu')
+        self.assertEqual(_device.queries, 2)
+
+        self._set_device(_device, reset=True)
+        DeviceFacts.get_size('emu')
+        self.assertEqual(_device.queries, 3)
+
+    def test_grab_frame(self):
+        # exec-out screencap 失败后改用 screenshot 获取指定数量的画面, 之后重新尝试
+        _results = ['raw', 'error', 'timeout', 'raw']
+        _calls = list()
+
+        def _screencap_raw(cls, adb, device_name, timeout=10.0):
+            _ret = _results.pop(0) if len(_results) > 0 else 'raw'
+            _calls.append(_ret)
+            if _ret == 'error':
+                raise RuntimeError('screencap error')
+            elif _ret == 'timeout':
+                raise subprocess.TimeoutExpired('screencap', timeout)
+            return np.zeros((2, 2, 3), dtype=np.uint8)
+
+        _orig = AdbTools.__dict__['screencap_raw']
+        AdbTools.screencap_raw = classmethod(_screencap_raw)
+        self.addCleanup(setattr, AdbTools, 'screencap_raw', _orig)
+
+        _device = types.SimpleNamespace(
+            adb_name='adb', _desired_caps={'deviceName': 'd1'}, channel_timeout=1.0,
+            raw_screencap_retry=2, _raw_screencap_skip=0,
+            screenshot=lambda: np.ones((2, 2, 3), dtype=np.uint8)
+        )
+        _sources = list()
+        for _i in range(9):
+            _frame = AppDevice.grab_frame(_device)
+            _sources.append('raw' if _frame.image.sum() == 0 else 'shot')
+
+        self.assertEqual(_sources, ['raw', 'shot', 'shot', 'shot', 'shot', 'shot', 'shot', 'raw', 'raw'])
+        self.assertEqual(_calls, ['raw', 'error', 'timeout', 'raw', 'raw'])
+
+    def test_parse_device_state(self):
+        _size, _app, _policy = [DEVICE_STATE_MARKS[_key] for _key in ('size', 'focused_app', 'policy')]
+        _focused = (
+            '  mFocusedApp=AppWindowToken{7d1f2 token=Token{3c0b ActivityRecord{e903df8 u0 '
+            'com.ss.android.ugc.aweme/.splash.SplashActivity t172}}}'
+        )
+        _default = {
+            'size': None, 'wm_size': None, 'current_package': '', 'current_activity': '',
+            'is_screen_on': False, 'is_showing_lock_screen': False, 'is_power_on': False
+        }
+        for _lines, _expect in (
+            # 完整输出
+            ([_size, 'Physical size: 1080x1920', _app, _focused, _policy,
+              'mScreenOnEarly=true mAwake=true', 'mShowingLockscreen=false'],
+             {'size': (1080, 1920), 'wm_size': (1080, 1920), 'current_package': 'com.ss.android.ugc.aweme',
+              'current_activity': '.splash.SplashActivity', 'is_screen_on': True, 'is_power_on': True}),
+            # 修改过分辨率, 行尾带\r及空行, 锁屏
+            ([_size + '\r', 'Physical size: 1080x1920\r', 'Override size: 720x1280\r', '', _app, '', _policy,
+              'mShowingLockscreen=true\r', 'mAwake=false mScreenOnEarly=true'],
+             {'size': (1080, 1920), 'wm_size': (720, 1280), 'is_screen_on': True, 'is_showing_lock_screen': True}),
+            # 各段均没有输出
+            ([_size, _app, _policy], {}),
+            ([], {}),
+            # 分段标识前的输出忽略, 焦点应用格式无法识别
+            (['Physical size: 1x1', _app, 'mFocusedApp=null', _size, 'error'], {}),
+            # 焦点应用在Activity名后直接结束
+            ([_app, 'mFocusedApp=ActivityRecord{e903df8 u0 com.android.settings/.Settings,'],
+             {'current_package': 'com.android.settings', 'current_activity': '.Settings'})
+        ):
+            _state = AppDevice._parse_device_state(None, _lines)
+            _raw = _state.pop('raw')
+            self.assertEqual(_state, dict(_default, **_expect), _lines)
+            self.assertEqual(set(_raw.keys()), {'size', 'focused_app', 'policy'})
+
+    def test_shell_quote(self):
+        for _text, _expect in (
+            ('abc', "'abc'"),
+            ('', "''"),
+            ("it's", "'it'\\''s'"),
+            ("''", "''\\'''\\'''"),
+            ('a b;$HOME `ls` "x" \\n', "'a b;$HOME `ls` \"x\" \\n'"),
+            ('中文\n换行', "'中文\n换行'")
+        ):
+            self.assertEqual(AdbTools.shell_quote(_text), _expect, _text)
+
+        # 经过shell解析后还原为原始文本
+        if os.name == 'posix':
+            for _text in ("it's", 'a b;$HOME `ls` "x" \\n', "'''", '中文\n换行', '*'):
+                _ret = subprocess.run(
+                    'printf %%s %s' % AdbTools.shell_quote(_text), shell=True, stdout=subprocess.PIPE
+                )
+                self.assertEqual(_ret.stdout.decode('utf-8'), _text)
+
+    def test_split_utf8(self):
+        for _text, _max_bytes, _expect in (
+            ('abcdef', 4, [b'abcd', b'ef']),
+            ('abcd', 4, [b'abcd']),
+            ('', 4, []),
+            ('中文字', 4, ['中'.encode('utf-8'), '文'.encode('utf-8'), '字'.encode('utf-8')]),
+            ('中文字', 6, ['中文'.encode('utf-8'), '字'.encode('utf-8')]),
+            ('a中b', 4, ['a中'.encode('utf-8'), b'b']),
+            # 单个字符超过上限时单独作为一个分片
+            ('😀a', 2, ['😀'.encode('utf-8'), b'a'])
+        ):
+            _chunks = AdbTools.split_utf8(_text, _max_bytes)
+            self.assertEqual(_chunks, _expect, _text)
+            self.assertEqual(b''.join(_chunks).decode('utf-8'), _text)
+            for _chunk in _chunks:
+                _chunk.decode('utf-8')
+
+    def test_parse_wm_size(self):
+        for _lines, _expect in (
+            (['Physical size: 1080x1920'], ((1080, 1920), (1080, 1920))),
+            (['Physical size: 1080x1920', 'Override size: 720x1280'], ((1080, 1920), (720, 1280))),
+            ([' Override size: 720x1280 ', ' Physical size: 1440x2560\r'], ((1440, 2560), (720, 1280))),
+            (['Override size: 720x1280'], (None, None)),
+            ([], (None, None))
+        ):
+            self.assertEqual(DeviceFacts.parse_wm_size(_lines), _expect, _lines)
+
+    def test_tap_rate(self):
+        # 按目标频率提交点击, 点击位置从清单中获取
+        _channel = FakeTapChannel(delay=0.01)
+        _seed = [(1, 2), (3, 4)]
+        _stat = TapRateScheduler(_channel.submit, _channel.ack, rate=20.0, max_in_flight=2).run(_seed, 1.0)
+        self.assertTrue(17 <= _stat['sent'] <= 21, _stat)
+        self.assertEqual(_stat['completed'], _stat['sent'])
+        self.assertEqual((_stat['lost'], _stat['errors'], _stat['channel_lost']), (0, 0, False))
+        self.assertTrue(_stat['latency_min'] <= _stat['latency_p95'] <= _stat['latency_max'])
+        self.assertAlmostEqual(_stat['latency_avg'], 0.01, places=3)
+        for _tap in _channel.taps:
+            self.assertIn((_tap[1], _tap[2]), _seed)
+
+    def test_in_flight(self):
+        # 点击未完成时在途数量不超过上限, 结束时放弃等待未确认的点击
+        for _max_in_flight in (1, 3):
+            _channel = FakeTapChannel(delay=None)
+            _stat = TapRateScheduler(
+                _channel.submit, _channel.ack, rate=50.0, max_in_flight=_max_in_flight, drain_timeout=0.1,
+                discard_fun=_channel.discard
+            ).run([(0, 0)], 0.5)
+            self.assertEqual(_stat['sent'], _max_in_flight)
+            self.assertEqual(_stat['lost'], _max_in_flight)
+            self.assertEqual(_stat['completed'], 0)
+            self.assertIsNone(_stat['latency_avg'])
+            self.assertEqual(_channel.discarded, list(range(1, _max_in_flight + 1)))
+
+        # 点击慢于目标频率时, 实际频率受在途数量限制
+        _channel = FakeTapChannel(delay=0.2)
+        _stat = TapRateScheduler(_channel.submit, _channel.ack, rate=50.0, max_in_flight=2).run([(0, 0)], 1.0)
+        self.assertTrue(8 <= _stat['sent'] <= 12, _stat)
+        self.assertEqual(_stat['lost'], 0)
+
+    def test_channel_lost(self):
+        # 通道断开时立即停止, 不等待剩余时长
+        _channel = FakeTapChannel(alive=False)
+        _stat = TapRateScheduler(
+            _channel.submit, _channel.ack, rate=50.0, max_in_flight=2,
+            alive_fun=lambda: _channel.alive, discard_fun=_channel.discard
+        ).run([(0, 0)], 5.0)
+        self.assertTrue(_stat['channel_lost'])
+        self.assertLess(_stat['duration'], 1.0)
+        self.assertEqual(_stat['lost'], 2)
+        self.assertEqual(_channel.discarded, [1, 2])
+
+        # 不检查通道时按超时处理, 到达时长后结束
+        _channel = FakeTapChannel(alive=False)
+        _stat = TapRateScheduler(_channel.submit, _channel.ack, rate=50.0, max_in_flight=2,
+                                 drain_timeout=0.1).run([(0, 0)], 0.3)
+        self.assertFalse(_stat['channel_lost'])
+        self.assertGreaterEqual(_stat['duration'], 0.3)
+
+    def test_submit_error(self):
+        # 提交失败计入错误数, 不影响后续点击
+        _channel = FakeTapChannel(delay=0.0, fail_every=3)
+        _stat = TapRateScheduler(_channel.submit, _channel.ack, rate=30.0).run([(0, 0)], 0.5)
+        self.assertGreater(_stat['errors'], 0)
+        self.assertEqual(_stat['sent'] + _stat['errors'], _channel.seq)
+        self.assertEqual(_stat['completed'], _stat['sent'])
+
+        # 提交失败且通道断开时停止
+        _channel = FakeTapChannel(fail_every=1, alive=False)
+        _stat = TapRateScheduler(_channel.submit, _channel.ack, alive_fun=lambda: _channel.alive).run(
+            [(0, 0)], 5.0
+        )
+        self.assertEqual((_stat['sent'], _stat['errors'], _stat['channel_lost']), (0, 1, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
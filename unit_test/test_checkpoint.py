@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from HandLessRobot.lib.actions.base_action import BaseAction
+from HandLessRobot.lib.checkpoint import CheckpointStore, CheckpointWriter, FileCheckpointStore, SqliteCheckpointStore
+
+
+# 设置为True时 ckpt_crash 动作抛出异常, 模拟运行中断
+CRASH = {'on': False}
+
+
+class CheckpointAction(BaseAction):
+    """
+    检查点测试动作
+    """
+
+    @classmethod
+    def ckpt_add(cls, robot_info: dict, action_name: str, run_id: str, val: int = 1, **kwargs):
+        """
+        累加运行变量cnt
+        """
+        _vars = robot_info['vars'].setdefault(run_id, dict())
+        _vars['cnt'] = _vars.get('cnt', 0) + val
+        return _vars['cnt']
+
+    @classmethod
+    def ckpt_crash(cls, robot_info: dict, action_name: str, run_id: str, **kwargs):
+        """
+        模拟中断
+        """
+        if CRASH['on'] and robot_info['vars'][run_id]['cnt'] > 20:
+            raise RuntimeError('device disconnect')
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _get_robot(self, store, interval: float = 0.01) -> Robot:
+        _robot = Robot('test_checkpoint', init_class=[CheckpointAction], checkpoint_store=store,
+                       checkpoint_interval=interval)
+        _robot.load_predef_by_config({
+            'predef_name': 'sub',
+            'steps': [
+                {'action_name': 'ckpt_add', 'call_para_args': '[10]'},
+                {'action_name': 'ckpt_crash'},
+                {'action_name': 'ckpt_add'}
+            ]
+        })
+        _robot.load_predef_by_config({
+            'predef_name': 'main',
+            'steps': [
+                {'action_name': 'ckpt_add'},
+                {'cmd': 'loop', 'condition': '{$var=cnt$} < 40'},
+                {'cmd': 'predef', 'predef_name': 'sub'},
+                {'cmd': 'endloop'},
+                {'action_name': 'ckpt_add', 'call_para_args': '[100]'}
+            ]
+        })
+        return _robot
+
+    def test_resume(self):
+        for _store in (FileCheckpointStore(self.path), SqliteCheckpointStore(os.path.join(self.path, 'ckpt.db'))):
+            # 中断运行
+            CRASH['on'] = True
+            _robot = self._get_robot(_store)
+            _, _status, _ = _robot.run_predef('main', run_id='ckpt')
+            self.assertEqual(_status, 'E')
+            self.assertEqual(_robot.robot_info['vars']['ckpt']['cnt'], 22)
+            _robot._checkpoint_writer.close()
+
+            # 新的机器人从检查点恢复, 结果与不中断一致
+            CRASH['on'] = False
+            _robot = self._get_robot(_store)
+            _, _status, _output = _robot.resume_from_checkpoint('ckpt')
+            self.assertEqual(_status, 'S')
+            self.assertEqual(_output['last_result'], 145)
+            self.assertEqual(_store.run_ids(), [])
+
+    def test_interval(self):
+        # 检查点间隔内不获取快照, 异常结束时按最后完成的步骤获取快照
+        _store = FileCheckpointStore(self.path)
+        CRASH['on'] = True
+        _robot = self._get_robot(_store, interval=60)
+        _submits = list()
+        _submit = _robot._checkpoint_writer.submit
+
+        def _spy(run_id, snapshot):
+            _submits.append(snapshot)
+            _submit(run_id, snapshot)
+
+        _robot._checkpoint_writer.submit = _spy
+        _, _status, _ = _robot.run_predef('main', run_id='ckpt')
+        self.assertEqual(_status, 'E')
+        self.assertEqual(len(_submits), 2)
+        self.assertEqual(_submits[-1]['vars']['cnt'], 22)
+        self.assertEqual(_robot._checkpoint_deferred, dict())
+        _robot._checkpoint_writer.close()
+
+        CRASH['on'] = False
+        _robot = self._get_robot(_store, interval=60)
+        _, _status, _output = _robot.resume_from_checkpoint('ckpt')
+        self.assertEqual(_status, 'S')
+        self.assertEqual(_output['last_result'], 145)
+        self.assertEqual(_robot._checkpoint_time, dict())
+
+    def test_file_store(self):
+        # 不同的运行id对应不同的文件, 可从文件名还原运行id
+        _store = FileCheckpointStore(self.path)
+        _run_ids = ['a/b', 'a_b', 'A_b', 'a%2Fb', '运行 1', '..']
+        for _run_id in _run_ids:
+            _store.save(_run_id, '{"run_id": "%s"}' % _run_id)
+
+        self.assertEqual(len(os.listdir(self.path)), len(_run_ids))
+        self.assertEqual(sorted(_store.run_ids()), sorted(_run_ids))
+        for _run_id in _run_ids:
+            self.assertEqual(_store.load(_run_id), {'run_id': _run_id})
+
+        _store.remove('a/b')
+        self.assertIsNone(_store.load('a/b'))
+        self.assertEqual(_store.load('a_b'), {'run_id': 'a_b'})
+
+    def test_snapshot(self):
+        # 登记时深复制可转换为json的值, 之后修改原变量不影响快照
+        _vars = {'a': [1, {'b': 2}], 'c': (3, 4), 'obj': object(), 5: 'int key', 'd': {'e': object()}}
+        _copy = CheckpointWriter.copy_dict(_vars)
+        self.assertEqual(_copy, {'a': [1, {'b': 2}], 'c': [3, 4]})
+        _vars['a'][1]['b'] = 20
+        self.assertEqual(_copy['a'][1]['b'], 2)
+
+        # 循环引用的值不保存
+        _loop = list()
+        _loop.append(_loop)
+        self.assertEqual(CheckpointWriter.copy_dict({'loop': _loop}), dict())
+
+        # 存储基础类为抽象类
+        with self.assertRaises(TypeError):
+            CheckpointStore()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame
+from HandLessRobot.lib.controls.frame_cache import FrameCache
+
+
+def make_noise(seed: int, size: tuple) -> np.ndarray:
+    """
+    生成随机噪点图像
+
+    @param {int} seed - 随机种子
+    @param {tuple} size - 图像大小 (width, height)
+
+    @returns {np.ndarray} - RGB数组
+    """
+    return np.random.RandomState(seed).randint(0, 256, (size[1], size[0], 3)).astype(np.uint8)
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def count_fun(self, ret):
+        """
+        返回计算函数, 记录执行次数
+        """
+        def _fun():
+            self.calls += 1
+            return ret
+
+        return _fun
+
+    def test_memoize(self):
+        # 相同内容的画面直接返回缓存结果, 并统计画面是否变化
+        _cache = FrameCache()
+        _array = make_noise(1, (64, 48))
+        for _frame in (MatchFrame(_array), MatchFrame(_array.copy()), MatchFrame(Image.fromarray(_array))):
+            self.assertEqual(_cache.memoize(_frame, 'op', (1, 2), self.count_fun('r')), 'r')
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(_cache.stats(), {
+            'count': 1, 'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'frames': 3, 'same_frames': 2
+        })
+
+        # 操作名或参数不同时重新计算
+        _frame = MatchFrame(_array)
+        _cache.memoize(_frame, 'op', (1, 3), self.count_fun('r'))
+        _cache.memoize(_frame, 'op2', (1, 2), self.count_fun('r'))
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(_cache.stats()['frames'], 4)
+
+        # 已编码的数据按内容识别
+        _data = b'\x89PNG fake data'
+        _cache.memoize(MatchFrame(_data), 'op', None, self.count_fun('r'))
+        _cache.memoize(MatchFrame(bytes(bytearray(_data))), 'op', None, self.count_fun('r'))
+        self.assertEqual(self.calls, 4)
+
+        _cache.clear()
+        self.assertEqual(_cache.stats(), {
+            'count': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'frames': 0, 'same_frames': 0
+        })
+
+    def test_small_change(self):
+        # 小范围的变化降采样哈希值不变, 但不能返回旧画面的结果
+        _array = make_noise(2, (64, 48))
+        _changed = _array.copy()
+        _changed[9:15, 9:15] = 255 - _changed[9:15, 9:15]
+        self.assertEqual(ImageMatcher.frame_hash(_array), ImageMatcher.frame_hash(_changed))
+        self.assertNotEqual(MatchFrame(_array).digest, MatchFrame(_changed).digest)
+
+        _cache = FrameCache()
+        _region = (8, 8, 8, 8)
+        _ret = [
+            _cache.memoize(
+                _frame, 'crop', _region, lambda: Image.fromarray(ImageMatcher.crop(_frame.get()['array'], _region)[2])
+            )
+            for _frame in (MatchFrame(_array), MatchFrame(_changed))
+        ]
+        self.assertEqual(np.asarray(_ret[1]).tolist(), _changed[8:16, 8:16].tolist())
+        self.assertEqual(_cache.stats()['misses'], 2)
+        self.assertEqual(_cache.stats()['same_frames'], 1)
+
+        # 定位结果按完整内容缓存
+        _needle = _changed[9:15, 9:15].copy()
+        _kwargs = {'confidence': 0.99, 'engine': 'numpy'}
+        for _frame, _box in ((MatchFrame(_changed), (9, 9, 6, 6)), (MatchFrame(_array), None)):
+            self.assertEqual(
+                _cache.memoize(_frame, 'locate', (_needle, _kwargs),
+                               lambda: ImageMatcher.locate(_needle, _frame, **_kwargs)),
+                _box
+            )
+
+    def test_copy(self):
+        # 返回缓存结果的副本, 修改返回结果不影响缓存
+        _cache = FrameCache()
+        _frame = MatchFrame(make_noise(3, (32, 32)))
+        _image = Image.new('RGB', (4, 4), (1, 2, 3))
+        _boxes = [(1, 2, 3, 4)]
+        _ret = _cache.memoize(_frame, 'image', None, lambda: _image)
+        self.assertIsNot(_ret, _image)
+        _ret.putpixel((0, 0), (255, 255, 255))
+        _ret = _cache.memoize(_frame, 'image', None, lambda: _image)
+        self.assertEqual(_ret.getpixel((0, 0)), (1, 2, 3))
+
+        _ret = _cache.memoize(_frame, 'boxes', None, lambda: _boxes)
+        _ret.append((0, 0, 0, 0))
+        self.assertEqual(_cache.memoize(_frame, 'boxes', None, lambda: None), [(1, 2, 3, 4)])
+
+        _ret = _cache.memoize(_frame, 'many', None, lambda: {'a': [(1, 1, 1, 1)], 'b': None})
+        _ret['a'].clear()
+        self.assertEqual(_cache.memoize(_frame, 'many', None, lambda: None), {'a': [(1, 1, 1, 1)], 'b': None})
+
+        _array = np.zeros((2, 2), dtype=np.uint8)
+        _cache.memoize(_frame, 'array', None, lambda: _array)[0, 0] = 9
+        self.assertEqual(_cache.memoize(_frame, 'array', None, lambda: None).tolist(), [[0, 0], [0, 0]])
+
+    def test_evict(self):
+        # 超过数量上限时淘汰最久未使用的结果
+        _cache = FrameCache(max_items=2)
+        _frame = MatchFrame(make_noise(4, (16, 16)))
+        for _op in ('a', 'b', 'a', 'c'):
+            _cache.memoize(_frame, _op, None, self.count_fun(_op))
+        self.assertEqual(self.calls, 3)
+        _cache.memoize(_frame, 'a', None, self.count_fun('a'))
+        _cache.memoize(_frame, 'b', None, self.count_fun('b'))
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(_cache.stats()['count'], 2)
+
+        # 不缓存
+        _cache = FrameCache(max_items=0)
+        for _i in range(2):
+            self.assertEqual(_cache.memoize(_frame, 'a', None, self.count_fun('a')), 'a')
+        self.assertEqual(self.calls, 6)
+        self.assertEqual(_cache.stats()['count'], 0)
+
+    def test_make_key(self):
+        # 数组、图片对象按内容识别, 字典不区分顺序
+        _a = make_noise(5, (8, 8))
+        self.assertEqual(FrameCache.make_key(_a), FrameCache.make_key(_a.copy()))
+        self.assertNotEqual(FrameCache.make_key(_a), FrameCache.make_key(_a[:, :4]))
+        self.assertEqual(FrameCache.make_key(Image.fromarray(_a)), FrameCache.make_key(Image.fromarray(_a.copy())))
+        self.assertEqual(
+            FrameCache.make_key({'x': [1, _a], 'y': b'ab'}), FrameCache.make_key({'y': b'ab', 'x': (1, _a)})
+        )
+
+        # 图片文件变化后key不同
+        _file = os.path.join(self.path, 'tpl.png')
+        Image.fromarray(_a).save(_file)
+        _key = FrameCache.make_key(_file)
+        self.assertEqual(FrameCache.make_key(_file), _key)
+        Image.fromarray(make_noise(6, (8, 9))).save(_file)
+        _mtime = time.time() + 10
+        os.utime(_file, (_mtime, _mtime))
+        self.assertNotEqual(FrameCache.make_key(_file), _key)
+        self.assertEqual(FrameCache.make_key('text'), 'text')
+
+        # 不可哈希的对象按对象id识别, 并保留对象引用
+        _obj = {1}
+        _refs = list()
+        self.assertEqual(FrameCache.make_key([_obj], _refs), (('object', id(_obj)), ))
+        self.assertIs(_refs[0], _obj)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+import numpy as np
+from PIL import Image
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.controls.image_matcher import ImageMatcher, MatchFrame, NumpyMatchEngine, \
+    OpenCVMatchEngine, TemplateCache, cv2
+
+
+def make_noise(seed: int, size: tuple) -> np.ndarray:
+    """
+    生成随机噪点图像
+
+    @param {int} seed - 随机种子
+    @param {tuple} size - 图像大小 (width, height)
+
+    @returns {np.ndarray} - RGB数组
+    """
+    return np.random.RandomState(seed).randint(0, 256, (size[1], size[0], 3)).astype(np.uint8)
+
+
+def make_frame(seed: int, size: tuple = (320, 240)) -> np.ndarray:
+    """
+    生成平滑的随机图像(缩小后仍保留主要特征, 可用于金字塔匹配)
+
+    @param {int} seed - 随机种子
+    @param {tuple} size=(320, 240) - 图像大小 (width, height)
+
+    @returns {np.ndarray} - RGB数组
+    """
+    _small = make_noise(seed, (size[0] // 8, size[1] // 8))
+    return np.asarray(Image.fromarray(_small).resize(size, Image.BILINEAR))
+
+
+def reference_ncc(haystack: np.ndarray, needle: np.ndarray) -> np.ndarray:
+    """
+    逐个位置计算归一化相关系数(与opencv的TM_CCOEFF_NORMED定义一致)
+
+    @param {np.ndarray} haystack - 图像数组
+    @param {np.ndarray} needle - 模板数组
+
+    @returns {np.ndarray} - 匹配度数组
+    """
+    _h, _w = needle.shape[0:2]
+    # 彩色图像按通道分别去除均值
+    _tpl = needle.astype(np.float64)
+    _tpl = _tpl - _tpl.mean(axis=(0, 1))
+    _score = np.zeros((haystack.shape[0] - _h + 1, haystack.shape[1] - _w + 1))
+    for _y in range(_score.shape[0]):
+        for _x in range(_score.shape[1]):
+            _win = haystack[_y:_y + _h, _x:_x + _w].astype(np.float64)
+            _win = _win - _win.mean(axis=(0, 1))
+            _score[_y, _x] = (_win * _tpl).sum() / np.sqrt((_win * _win).sum() * (_tpl * _tpl).sum())
+
+    return _score
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        ImageMatcher.last_locations.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_ncc(self):
+        # numpy引擎的匹配度与定义一致, 最高匹配位置为模板截取的位置
+        _haystack = make_noise(1, (60, 40))
+        for _grayscale in (False, True):
+            _frame = ImageMatcher.to_array(_haystack, grayscale=_grayscale)
+            _needle = _frame[12:24, 30:46]
+            _score = NumpyMatchEngine.match_template(_frame, _needle)
+            _ref = reference_ncc(_frame, _needle)
+            self.assertEqual(_score.shape, _ref.shape)
+            np.testing.assert_allclose(_score, _ref, atol=1e-6)
+            self.assertEqual(np.unravel_index(np.argmax(_score), _score.shape), (12, 30))
+
+    @unittest.skipUnless(cv2 is not None, 'opencv is not installed')
+    def test_opencv_parity(self):
+        # numpy引擎与opencv引擎的匹配度及位置一致
+        _frame = make_frame(2)
+        _needle = _frame[100:140, 50:98]
+        _score = NumpyMatchEngine.match_template(_frame, _needle)
+        _cv_score = OpenCVMatchEngine.match_template(_frame, _needle)
+        np.testing.assert_allclose(_score, _cv_score, atol=1e-3)
+        for _engine in ('numpy', 'opencv'):
+            self.assertEqual(
+                ImageMatcher.locate(_needle, _frame, confidence=0.99, engine=_engine), (50, 100, 48, 40)
+            )
+
+    def test_threshold(self):
+        # 模板与图像有差异时, 按匹配度阈值判断是否找到
+        _frame = make_noise(3, (80, 60)).copy()
+        _needle = make_noise(4, (16, 12))
+        _noise = np.random.RandomState(5).randint(-20, 21, _needle.shape)
+        _frame[20:32, 40:56] = np.clip(_needle.astype(np.int64) + _noise, 0, 255).astype(np.uint8)
+
+        _score = ImageMatcher.match_all(_needle, _frame, confidence=0.5, engine='numpy')[0][4]
+        self.assertTrue(0.8 < _score < 0.999)
+        self.assertIsNone(ImageMatcher.locate(_needle, _frame, confidence=0.999, engine='numpy'))
+        self.assertEqual(
+            ImageMatcher.locate(_needle, _frame, confidence=_score - 0.01, engine='numpy'), (40, 20, 16, 12)
+        )
+
+        # 纯色模板只匹配颜色一致的纯色区域
+        _frame[0:10, 0:10] = 100
+        _flat = np.full((5, 5, 3), 100, dtype=np.uint8)
+        self.assertEqual(ImageMatcher.locate_all(_flat, _frame, engine='numpy', limit=1), [(0, 0, 5, 5)])
+        self.assertIsNone(ImageMatcher.locate(_flat + 1, _frame, engine='numpy'))
+
+    def test_locate_all(self):
+        # 多个位置按从上到下、从左到右返回, 相邻位置不重复返回
+        _frame = make_noise(6, (120, 90)).copy()
+        _needle = make_noise(7, (10, 8))
+        for _x, _y in ((70, 5), (10, 40), (90, 60)):
+            _frame[_y:_y + 8, _x:_x + 10] = _needle
+
+        self.assertEqual(
+            ImageMatcher.locate_all(_needle, _frame, confidence=0.99, engine='numpy'),
+            [(70, 5, 10, 8), (10, 40, 10, 8), (90, 60, 10, 8)]
+        )
+        self.assertEqual(
+            len(ImageMatcher.locate_all(_needle, _frame, confidence=0.99, limit=2, engine='numpy')), 2
+        )
+
+        # 非极大值抑制: 重叠范围内只保留匹配度最高的位置
+        _score = np.zeros((30, 30))
+        _score[5, 5] = 1.0
+        _score[5, 6] = 0.99
+        _score[7, 8] = 0.95
+        _score[20, 20] = 0.98
+        self.assertEqual(
+            ImageMatcher.find_peaks(_score, 4, 4, 0.9),
+            [(5, 5, 4, 4, 1.0), (20, 20, 4, 4, 0.98)]
+        )
+        self.assertEqual(ImageMatcher.find_peaks(_score, 4, 4, 0.999), [(5, 5, 4, 4, 1.0)])
+
+    def test_template_cache(self):
+        # 按使用顺序及占用字节数淘汰
+        _cache = TemplateCache(max_bytes=700)
+        _a, _b, _c = [make_noise(_seed, (10, 10)) for _seed in (10, 11, 12)]
+        _cache.get(_a)
+        _cache.get(_b)
+        self.assertIs(_cache.get(_a)['array'], _a)
+        _cache.get(_c)
+        self.assertEqual(_cache.stats(), {'count': 2, 'bytes': 600, 'max_bytes': 700, 'hits': 1, 'misses': 3})
+        _cache.get(_a)
+        _cache.get(_b)
+        self.assertEqual(_cache.stats()['misses'], 4)
+
+        # 补充统计量后重新计算占用字节数, 超过限制时淘汰
+        _entry = _cache.get(_b)
+        _entry['stat']['test'] = {'data': np.zeros(200, dtype=np.uint8)}
+        _cache.update_size(_entry)
+        self.assertEqual(_entry['bytes'], 500)
+        self.assertEqual(_cache.stats()['count'], 1)
+        self.assertEqual(_cache.stats()['bytes'], 500)
+
+        # 文件修改后重新加载
+        _cache = TemplateCache()
+        _file = os.path.join(self.path, 'tpl.png')
+        Image.fromarray(_a).save(_file)
+        self.assertEqual(_cache.get(_file)['array'].tolist(), _a.tolist())
+        self.assertEqual(_cache.get(_file)['array'].tolist(), _a.tolist())
+        Image.fromarray(make_noise(13, (12, 10))).save(_file)
+        _mtime = time.time() + 10
+        os.utime(_file, (_mtime, _mtime))
+        self.assertEqual(_cache.get(_file)['array'].shape, (10, 12, 3))
+        self.assertEqual(_cache.stats()['hits'], 1)
+        self.assertEqual(_cache.stats()['misses'], 2)
+
+        # 不缓存
+        _cache = TemplateCache(max_bytes=0)
+        _cache.get(_a)
+        self.assertEqual(_cache.stats()['count'], 0)
+
+    def test_region_hint_pyramid(self):
+        # 指定区域、提示位置及金字塔匹配的结果与完整查找一致
+        _frame = make_frame(20)
+        _needle = _frame[77:117, 123:171].copy()
+        _box = (123, 77, 48, 40)
+        _kwargs = {'confidence': 0.99, 'engine': 'numpy'}
+        self.assertEqual(ImageMatcher.locate(_needle, _frame, **_kwargs), _box)
+        self.assertEqual(ImageMatcher.get_last_location(_needle), _box)
+        self.assertEqual(ImageMatcher.locate(_needle, _frame, region=(100, 60, 100, 80), **_kwargs), _box)
+        self.assertIsNone(ImageMatcher.locate(_needle, _frame, region=(0, 0, 100, 100), **_kwargs))
+        self.assertEqual(ImageMatcher.locate(_needle, _frame, hint=True, **_kwargs), _box)
+        # 提示位置找不到时按正常方式查找
+        self.assertEqual(ImageMatcher.locate(_needle, _frame, hint=(0, 0, 48, 40), **_kwargs), _box)
+        for _pyramid in (2, 4):
+            self.assertEqual(ImageMatcher.locate(_needle, _frame, pyramid=_pyramid, **_kwargs), _box)
+
+        # 共用MatchFrame时结果不变
+        _match_frame = MatchFrame(_frame)
+        for _pyramid in (0, 4, 4):
+            self.assertEqual(ImageMatcher.locate(_needle, _match_frame, pyramid=_pyramid, **_kwargs), _box)
+
+    def test_locate_many(self):
+        # 同一图像中查找多个模板
+        _frame = make_frame(30)
+        _n1 = _frame[10:42, 20:60].copy()
+        _n2 = _frame[150:182, 200:260].copy()
+        _missing = make_noise(31, (40, 32))
+        _kwargs = {'confidence': 0.99, 'engine': 'numpy'}
+        self.assertEqual(
+            ImageMatcher.locate_many([_n1, _missing, _n2], _frame, **_kwargs),
+            [(20, 10, 40, 32), None, (200, 150, 60, 32)]
+        )
+        self.assertEqual(
+            ImageMatcher.locate_many({'a': _n1, 'b': _missing}, _frame, **_kwargs),
+            {'a': (20, 10, 40, 32), 'b': None}
+        )
+        self.assertEqual(
+            ImageMatcher.locate_any([_missing, _n2, _n1], _frame, **_kwargs), (1, (200, 150, 60, 32))
+        )
+        self.assertEqual(ImageMatcher.locate_any({'m': _missing, 'a': _n1}, _frame, **_kwargs),
+                         ('a', (20, 10, 40, 32)))
+        self.assertEqual(ImageMatcher.locate_any([_missing], _frame, **_kwargs), (None, None))
+
+    def test_patch(self):
+        # 各种类型的图像截取区域结果一致, 超出范围的部分自动裁剪
+        _rgb = make_noise(40, (12, 8))
+        _rgba = np.concatenate([_rgb, np.full((8, 12, 1), 128, dtype=np.uint8)], axis=2)
+        _file = os.path.join(self.path, 'frame.png')
+        Image.fromarray(_rgb).save(_file)
+        _buf = BytesIO()
+        Image.fromarray(_rgb).save(_buf, format='PNG')
+        _cached = MatchFrame(_rgb)
+        _cached.get(False)
+        _images = [
+            _rgb, _rgba, Image.fromarray(_rgb), Image.fromarray(_rgba), _buf.getvalue(), _file, _cached,
+            np.ascontiguousarray(_rgb[:, :, 0])
+        ]
+        for _region, _expect in (
+            ((2, 3, 4, 2), (slice(3, 5), slice(2, 6))),
+            ((0, 0, 12, 8), (slice(0, 8), slice(0, 12))),
+            ((-2, -1, 4, 3), (slice(0, 2), slice(0, 2))),
+            ((10, 6, 5, 5), (slice(6, 8), slice(10, 12))),
+            ((2.7, 1.2, 3, 2), (slice(1, 3), slice(2, 5))),
+            ((12, 0, 3, 3), (slice(0, 3), slice(12, 12))),
+            ((3, -5, 2, 2), (slice(0, 0), slice(3, 5)))
+        ):
+            for _i, _image in enumerate(_images):
+                _frame = _image if isinstance(_image, MatchFrame) else MatchFrame(_image)
+                _patch = _frame.patch(_region)
+                _ref = _rgb[_expect] if _i < 7 else np.repeat(_rgb[:, :, 0:1], 3, axis=2)[_expect]
+                self.assertEqual(_patch.shape, _ref.shape, (_region, _i))
+                self.assertEqual(_patch.tolist(), _ref.tolist(), (_region, _i))
+
+        # 原始像素数组及图片对象只转换截取的区域, 不转换整个图像
+        for _image in (_rgba, Image.fromarray(_rgba)):
+            _frame = MatchFrame(_image)
+            _frame.patch((0, 0, 2, 2))
+            self.assertEqual(_frame._items, dict())
+        self.assertEqual(ImageMatcher.pixel_color(_rgba, 3, 2), tuple(_rgb[2, 3].tolist()))
+        self.assertIsNone(ImageMatcher.pixel_color(_rgb, 12, 0))
+        self.assertIsNone(ImageMatcher.pixel_color(_rgb, -1, 0))
+
+    def test_probe(self):
+        # 左半部分红色, 右半部分蓝色, (1, 1)为绿色, 右下角4x4区域中3/4为白色
+        _image = np.zeros((10, 20, 3), dtype=np.uint8)
+        _image[:, 0:10] = (255, 0, 0)
+        _image[:, 10:20] = (0, 0, 255)
+        _image[1, 1] = (0, 255, 0)
+        _image[6:10, 16:20] = (255, 255, 255)
+        _image[9, 16:20] = (0, 0, 0)
+        _red, _blue, _white = (255, 0, 0), (0, 0, 255), (255, 255, 255)
+        for _probe, _expect in (
+            ((0, 0, _red), True),
+            ((1, 1, _red), False),
+            ((1, 1, (0, 250, 5)), False),
+            ((1, 1, (0, 250, 5), 5), True),
+            ((15, 2, _blue), True),
+            ([15, 2, _blue], True),
+            ((20, 0, _blue), False),
+            ({'point': (-1, 0), 'color': _red}, False),
+            ({'point': (1, 1), 'color': _red, 'not': True}, True),
+            ({'point': (0, 0), 'color': _red, 'not': True}, False),
+            ({'region': (0, 0, 10, 10), 'color': _red}, False),
+            ({'region': (0, 0, 10, 10), 'color': _red, 'ratio': 0.99}, True),
+            ({'region': (0, 0, 10, 10), 'color': _red, 'ratio': 1.0}, False),
+            ({'region': (5, 0, 10, 5), 'color': _red, 'ratio': 0.5}, True),
+            ({'region': (5, 0, 10, 5), 'color': _red, 'ratio': 0.6}, False),
+            ({'region': (16, 6, 4, 4), 'color': _white, 'ratio': 0.75}, True),
+            ({'region': (16, 6, 4, 4), 'color': _white, 'ratio': 0.8}, False),
+            ({'region': (16, 6, 4, 4), 'color': (191, 191, 191), 'mean': True, 'tolerance': 1}, True),
+            ({'region': (16, 6, 4, 4), 'color': _white, 'mean': True, 'tolerance': 10}, False),
+            ({'region': (18, 8, 10, 10), 'color': _white, 'ratio': 0.5}, True),
+            ({'region': (30, 30, 5, 5), 'color': _white, 'ratio': 0.0}, False),
+            ({'region': (30, 30, 5, 5), 'color': _white, 'not': True}, False)
+        ):
+            self.assertEqual(ImageMatcher.probe(_image, [_probe]), [_expect], _probe)
+
+        # 多个条件共用同一图像, 按比例换算坐标
+        _frame = MatchFrame(Image.fromarray(_image))
+        self.assertEqual(
+            ImageMatcher.probe(_frame, [(1, 2, _red), (7, 1, _blue), (8, 3, _white), (10, 0, _blue)], scale=2.0),
+            [True, True, True, False]
+        )
+        self.assertEqual(
+            ImageMatcher.probe(_frame, [{'region': (8, 3, 2, 2), 'color': _white, 'ratio': 0.75}], scale=2.0),
+            [True]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+from PIL import Image
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.controls.image_writer import ImageWriter
+
+
+class BlockWriter(ImageWriter):
+    """
+    保存前等待放行的保存对象, 用于模拟队列积压
+    """
+    release = threading.Event()
+
+    @classmethod
+    def write_image(cls, image, filename: str, image_format: str = None, quality: int = None):
+        cls.release.wait()
+        ImageWriter.write_image(image, filename, image_format=image_format, quality=quality)
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_archive(self):
+        _writer = ImageWriter(archive_path=self.path, image_format='JPEG', quality=80)
+        _image = np.zeros((20, 30, 3), dtype=np.uint8)
+        _files = [
+            _writer.archive(_image, 'run 1'),
+            _writer.archive(_image, 'run 1', name='a/b'),
+            _writer.archive(_image, 'run 1', step='login', image_format='PNG'),
+            _writer.archive(b'raw', 'run2', step=3, image_format='WEBP')
+        ]
+        _writer.flush()
+        self.assertEqual(
+            [os.path.relpath(_file, self.path) for _file in _files],
+            [os.path.join('run_1', '00001.jpg'), os.path.join('run_1', '00002_a_b.jpg'),
+             os.path.join('run_1', 'login.png'), os.path.join('run2', '00003.webp')]
+        )
+        with Image.open(_files[0]) as _img:
+            self.assertEqual((_img.format, _img.size), ('JPEG', (30, 20)))
+        self.assertEqual(_writer.stats(), {'saved': 4, 'errors': 0, 'dropped': 0, 'pending': 0})
+
+    def test_drop_oldest(self):
+        # 队列满时丢弃最早的图片, 不阻塞调用方
+        BlockWriter.release.clear()
+        _writer = BlockWriter(queue_size=2, drop_oldest=True)
+        for _i in range(6):
+            _writer.save(b'%d' % _i, os.path.join(self.path, '%d.bin' % _i))
+
+        self.assertGreaterEqual(_writer.stats()['dropped'], 3)
+        BlockWriter.release.set()
+        _writer.flush()
+        _stats = _writer.stats()
+        self.assertEqual(_stats['saved'] + _stats['dropped'], 6)
+        self.assertEqual((_stats['errors'], _stats['pending']), (0, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.path, '5.bin')))
+        self.assertEqual(len(os.listdir(self.path)), _stats['saved'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from record_action import CALL_LOG, SUB_CONFIG, RecordAction
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.notify = dict()
+        self.robot = Robot(
+            'test_compiler', init_class=[RecordAction],
+            running_notify_fun=self._running_notify, end_running_notify_fun=self._end_running_notify
+        )
+        self.robot.load_predef_by_config(SUB_CONFIG)
+
+    def _running_notify(self, robot, run_id, predef_name, node_id, step_id):
+        self.notify.setdefault(run_id, list()).append((predef_name, node_id, step_id))
+
+    def _end_running_notify(self, robot, run_id, predef_name, node_id, step_id, status, status_msg):
+        self.notify.setdefault(run_id, list()).append((predef_name, node_id, step_id, status))
+
+    def _compare(self, config: dict, ordered: bool = True):
+        """
+        分别使用管道及编译方式执行, 比较执行结果
+
+        @param {bool} ordered=True - 动作调用顺序是否确定(并行执行时为False)
+        """
+        self.robot.load_predef_by_config(config)
+        _name = config['predef_name']
+        _result = dict()
+        for _mode in ('pipeline', 'compiled'):
+            _run_id = '%s_%s' % (_name, _mode)
+            _, _status, _output = self.robot.run_predef(
+                _name, run_id=_run_id, compiled=(_mode == 'compiled')
+            )
+            _result[_mode] = {
+                'status': _status,
+                'last_result': None if _output is None else _output['last_result'],
+                'vars': self.robot.robot_info['vars'].get(_run_id, None),
+                'calls': CALL_LOG.get(_run_id, None) if ordered else sorted(CALL_LOG[_run_id], key=str),
+                'notify': self.notify.get(_run_id, None)
+            }
+
+        self.assertEqual(_result['pipeline'], _result['compiled'], msg=_name)
+        return _result['compiled']
+
+    def test_if_loop(self):
+        _ret = self._compare({
+            'predef_name': 'if_loop',
+            'steps': [
+                {'step_id': 'start', 'action_name': 'rec_add', 'save_to_var': 'first'},
+                {'cmd': 'loop', 'action_name': 'rec_add', 'condition': '{$local=run_action$} < 6'},
+                {'cmd': 'if', 'condition': '{$var=cnt$} == 3'},
+                {'cmd': 'null'},
+                {'cmd': 'else'},
+                {'action_name': 'rec_echo', 'call_para_args': "[{$var=cnt$}, len({$fixed=run_id$})]"},
+                {'cmd': 'endif'},
+                {'cmd': 'if', 'condition': '{$var=cnt$} >= 4'},
+                {'cmd': 'null'},
+                {'cmd': 'endif'},
+                {'cmd': 'loop', 'condition': 'True'},
+                {'cmd': 'break'},
+                {'cmd': 'endloop'},
+                {'cmd': 'continue'},
+                {'cmd': 'endloop'},
+                {'cmd': 'predef', 'predef_name': 'sub'},
+                {'action_name': 'rec_echo', 'call_para_kwargs': "{'last': {$fixed=last$}}",
+                 'save_to_var': 'echo', 'save_run_id': '*'}
+            ]
+        })
+        self.assertEqual(_ret['status'], 'S')
+        self.assertEqual(_ret['vars']['cnt'], 16)
+
+    def test_goto_exception(self):
+        _ret = self._compare({
+            'predef_name': 'goto_exception',
+            'steps': [
+                {'action_name': 'rec_add'},
+                {'step_id': 'fail', 'action_name': 'rec_fail', 'exception_to': 'handle'},
+                {'cmd': 'end'},
+                {'step_id': 'handle', 'action_name': 'rec_add', 'call_para_args': '[2]'},
+                {'cmd': 'if', 'condition': '{$var=cnt$} < 5'},
+                {'cmd': 'goto', 'goto_step_id': 'fail'},
+                {'cmd': 'endif'},
+                {'cmd': 'predef', 'predef_name': 'sub'}
+            ]
+        })
+        self.assertEqual(_ret['status'], 'S')
+        self.assertEqual(_ret['vars']['cnt'], 15)
+
+    def test_error(self):
+        _ret = self._compare({
+            'predef_name': 'error',
+            'steps': [
+                {'action_name': 'rec_add', 'save_to_var': 'x'},
+                {'cmd': 'if', 'condition': '{$var=not_exists$} > 0'},
+                {'cmd': 'endif'},
+                {'action_name': 'rec_add'}
+            ]
+        })
+        self.assertEqual(_ret['status'], 'E')
+
+    def test_parallel(self):
+        _ret = self._compare({
+            'predef_name': 'parallel',
+            'steps': [
+                {'cmd': 'parallel', 'save_to_var': 'all'},
+                {'action_name': 'rec_echo', 'call_para_args': '[1]', 'save_to_var': 'e1'},
+                {'cmd': 'predef', 'predef_name': 'sub', 'save_to_var': 'sub'},
+                {'action_name': 'rec_echo', 'call_para_kwargs': "{'k': 2}"},
+                {'cmd': 'endparallel'},
+                {'cmd': 'parallel', 'join': 'first_success', 'save_to_var': 'first'},
+                {'action_name': 'rec_fail'},
+                {'action_name': 'rec_echo', 'call_para_args': '[3]'},
+                {'cmd': 'endparallel'},
+                {'cmd': 'parallel', 'timeout': 10, 'exception_to': 'handle'},
+                {'action_name': 'rec_fail'},
+                {'cmd': 'endparallel'},
+                {'cmd': 'end'},
+                {'step_id': 'handle', 'action_name': 'rec_add', 'call_para_args': '[5]'}
+            ]
+        }, ordered=False)
+        self.assertEqual(_ret['status'], 'S')
+        self.assertEqual(_ret['vars']['all'], [[[1], {}], [[10], {}], [[], {'k': 2}]])
+        self.assertEqual(_ret['vars']['e1'], [[1], {}])
+        self.assertEqual(_ret['vars']['sub'], [[10], {}])
+        self.assertEqual(_ret['vars']['first'], [[3], {}])
+        self.assertEqual(_ret['vars']['cnt'], 15)
+
+    def test_parallel_cancel(self):
+        # 分支失败后其他分支在下一个动作前停止, 跳转前已等待分支结束
+        self.robot.load_predef_by_config({
+            'predef_name': 'slow',
+            'steps': [
+                {'action_name': 'rec_add'},
+                {'cmd': 'loop', 'condition': '{$var=cnt$} < 200'},
+                {'action_name': 'rec_sleep', 'call_para_args': '[0.02]'},
+                {'action_name': 'rec_add'},
+                {'cmd': 'endloop'}
+            ]
+        })
+        self.robot.load_predef_by_config({
+            'predef_name': 'fail_later',
+            'steps': [
+                {'action_name': 'rec_sleep', 'call_para_args': '[0.2]'},
+                {'action_name': 'rec_fail'}
+            ]
+        })
+        # 分支使用编译后的函数执行, 先完成编译避免影响分支的执行时间
+        self.robot.compile_predef('slow')
+        self.robot.compile_predef('fail_later')
+        self.robot.load_predef_by_config({
+            'predef_name': 'cancel',
+            'steps': [
+                {'cmd': 'parallel', 'exception_to': 'handle'},
+                {'cmd': 'predef', 'predef_name': 'slow'},
+                {'cmd': 'predef', 'predef_name': 'fail_later'},
+                {'cmd': 'endparallel'},
+                {'step_id': 'handle', 'action_name': 'rec_echo', 'call_para_args': '[{$var=cnt$}]',
+                 'save_to_var': 'seen'}
+            ]
+        })
+        for _compiled in (False, True):
+            _run_id = 'cancel_%s' % str(_compiled)
+            _, _status, _ = self.robot.run_predef('cancel', run_id=_run_id, compiled=_compiled)
+            self.assertEqual(_status, 'S')
+            _vars = self.robot.robot_info['vars'][_run_id]
+            self.assertLess(_vars['cnt'], 20)
+            time.sleep(0.1)
+            self.assertEqual(_vars['seen'], [[_vars['cnt']], {}])
+
+
+if __name__ == '__main__':
+    unittest.main()
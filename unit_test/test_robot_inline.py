@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from record_action import CALL_LOG, SUB_CONFIG, RecordAction
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.robot = Robot('test_inline', init_class=[RecordAction])
+        self.robot.load_predef_by_config(SUB_CONFIG)
+
+    def test_inline(self):
+        # 展开子模块执行与子管道执行结果一致
+        self.robot.load_predef_by_config({
+            'predef_name': 'sub_fail',
+            'steps': [
+                {'step_id': 'add', 'action_name': 'rec_add'},
+                {'cmd': 'if', 'condition': '{$var=cnt$} > 3'},
+                {'action_name': 'rec_fail', 'exception_to': 'ok'},
+                {'cmd': 'endif'},
+                {'step_id': 'ok', 'action_name': 'rec_add', 'call_para_args': '[2]'},
+                {'cmd': 'if', 'condition': '{$var=cnt$} > 20'},
+                {'cmd': 'end'},
+                {'cmd': 'endif'},
+                {'action_name': 'rec_echo'}
+            ]
+        })
+        _steps = [
+            {'step_id': 'call', 'cmd': 'predef', 'predef_name': 'sub'},
+            {'cmd': 'predef', 'predef_name': 'sub_fail'},
+            {'cmd': 'if', 'condition': '{$var=cnt$} < 20'},
+            {'cmd': 'goto', 'goto_step_id': 'call'},
+            {'cmd': 'endif'},
+            {'step_id': 'ok', 'action_name': 'rec_echo', 'call_para_args': '[{$var=cnt$}]'}
+        ]
+        _result = dict()
+        for _name, _inline in (('outer', False), ('outer_inline', True)):
+            self.robot.load_predef_by_config({'predef_name': _name, 'steps': _steps}, inline=_inline)
+            _, _status, _output = self.robot.run_predef(_name, run_id=_name)
+            _result[_name] = (_status, _output['last_result'], self.robot.robot_info['vars'][_name],
+                              CALL_LOG[_name])
+
+        self.assertEqual(_result['outer'], _result['outer_inline'])
+        self.assertEqual(_result['outer'][2]['cnt'], 26)
+        self.assertNotIn(
+            'predef', [_step.get('cmd') for _step in self.robot.robot_info['predef_config']['outer_inline']['steps']]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
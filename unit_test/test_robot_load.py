@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from record_action import SUB_CONFIG, RecordAction
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.robot = Robot('test_load', init_class=[RecordAction])
+        self.robot.load_predef_by_config(SUB_CONFIG)
+
+    def test_load_check(self):
+        # 装载时检查跳转目标及动作名
+        for _steps in (
+            [{'cmd': 'goto', 'goto_step_id': 'not_exists'}],
+            [{'action_name': 'rec_add', 'exception_to': 'not_exists'}],
+            [{'action_name': 'rec_not_exists'}],
+            # parallel块内步骤不支持exception_to, 也不能作为跳转目标
+            [{'cmd': 'parallel'}, {'action_name': 'rec_add', 'exception_to': 'end'}, {'cmd': 'endparallel'},
+             {'step_id': 'end', 'action_name': 'rec_add'}],
+            [{'cmd': 'goto', 'goto_step_id': 'in'}, {'cmd': 'parallel'},
+             {'step_id': 'in', 'action_name': 'rec_add'}, {'cmd': 'endparallel'}],
+            [{'action_name': 'rec_add', 'exception_to': 'in'}, {'cmd': 'parallel'},
+             {'step_id': 'in', 'action_name': 'rec_add'}, {'cmd': 'endparallel'}]
+        ):
+            with self.assertRaises(RuntimeError):
+                self.robot.load_predef_by_config({'predef_name': 'check', 'steps': _steps})
+
+
+if __name__ == '__main__':
+    unittest.main()
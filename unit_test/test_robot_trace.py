@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from record_action import SUB_CONFIG, RecordAction
+
+
+class Test(unittest.TestCase):
+    def test_trace_mode(self):
+        # 限制追踪信息后, last_status_msg 与保留全部追踪信息的结果一致
+        _config = {
+            'predef_name': 'trace',
+            'steps': [
+                {'action_name': 'rec_add'},
+                {'cmd': 'loop', 'condition': '{$var=cnt$} < 40'},
+                {'cmd': 'predef', 'predef_name': 'sub'},
+                {'cmd': 'endloop'},
+                {'cmd': 'predef', 'predef_name': 'sub'}
+            ]
+        }
+        _result = dict()
+        for _mode in ('full', 'ring', 'counters'):
+            _robot = Robot('test_trace_%s' % _mode, init_class=[RecordAction], trace_mode=_mode, trace_size=3)
+            _robot.load_predef_by_config(SUB_CONFIG)
+            _robot.load_predef_by_config(_config)
+            self.assertEqual(_robot.run_predef('trace', run_id='trace')[1], 'S')
+            _result[_mode] = (
+                _robot.last_status_msg('trace', 'trace'),
+                len(_robot.robot_info['predef_pipeline']['trace'].trace_list(run_id='trace'))
+            )
+            if _mode == 'counters':
+                self.assertEqual(_robot.trace_counters('trace', 'trace')[3], {'S': 4})
+
+        self.assertEqual(_result['full'][0], _result['ring'][0])
+        self.assertEqual(_result['full'][0], _result['counters'][0])
+        self.assertEqual([_result[_mode][1] for _mode in ('ring', 'counters')], [3, 1])
+
+    def test_trace_bounded(self):
+        # 长时间循环执行过程中, 管道及子管道的追踪信息数量不超过限制
+        _config = {
+            'predef_name': 'trace',
+            'steps': [
+                {'action_name': 'rec_add'},
+                {'cmd': 'loop', 'condition': '{$var=cnt$} < 100'},
+                {'cmd': 'predef', 'predef_name': 'sub'},
+                {'cmd': 'endloop'}
+            ]
+        }
+        _max = dict()
+        for _mode, _limit in (('full', None), ('ring', 3), ('counters', 1)):
+            _lens = {'trace': 0, 'sub': 0}
+            _max[_mode] = _lens
+
+            def _notify(robot, run_id, predef_name, node_id, step_id):
+                # 每个节点开始执行时检查追踪信息的数量
+                _pipeline = robot.robot_info['predef_pipeline']['trace']
+                _trace = _pipeline.trace_list(run_id=run_id)
+                _lens['trace'] = max(_lens['trace'], len(_trace))
+                if len(_trace) > 0:
+                    # 每条追踪信息登记后都会检查一次, 只需检查最后一条
+                    _lens['sub'] = max(_lens['sub'], len(_trace[-1]['sub_trace_list']))
+                _sub = _pipeline.running_sub_pipeline.get(run_id, None)
+                if _sub is not None:
+                    _lens['sub'] = max(_lens['sub'], len(_sub.trace_list(run_id=run_id)))
+
+            _robot = Robot(
+                'test_trace_%s' % _mode, init_class=[RecordAction], trace_mode=_mode, trace_size=3,
+                running_notify_fun=_notify
+            )
+            _robot.load_predef_by_config(SUB_CONFIG)
+            _robot.load_predef_by_config(_config)
+            self.assertEqual(_robot.run_predef('trace', run_id='trace')[1], 'S')
+            if _limit is not None:
+                self.assertLessEqual(_lens['trace'], _limit, msg=_mode)
+                self.assertLessEqual(_lens['sub'], _limit, msg=_mode)
+
+        # 保留全部追踪信息时随循环次数增长(每种方式循环10次)
+        self.assertGreater(_max['full']['trace'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
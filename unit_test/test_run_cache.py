@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import json
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from HandLessRobot.lib.actions.base_action import BaseAction
+
+
+# 嵌套执行的步骤配置
+NEST_CONFIG = {
+    'predef_name': 'nest',
+    'steps': [
+        {'step_id': 'nest', 'action_name': 'cache_nest', 'call_para_args': '[3]'},
+        {'action_name': 'cache_nest', 'call_para_args': '[0]'}
+    ]
+}
+
+
+class CacheAction(BaseAction):
+    """
+    测试run执行管道缓存的动作
+    """
+
+    @classmethod
+    def cache_nest(cls, robot_info: dict, action_name: str, run_id: str, max_depth: int = 0, **kwargs):
+        """
+        使用同一run_id嵌套执行NEST_CONFIG, 并记录执行时获取到的配置
+
+        @param {int} max_depth=0 - 最大嵌套层数
+
+        @returns {int} - 当前执行次数
+        """
+        _robot = robot_info['robot']
+        _vars = robot_info['vars'].setdefault(run_id, dict())
+        _vars['cnt'] = _vars.get('cnt', 0) + 1
+        _vars['depth'] = _vars.get('depth', 0) + 1
+        if _vars['depth'] < max_depth:
+            _robot.run(NEST_CONFIG, run_id=run_id)
+
+        # 嵌套执行结束后仍可以获取到当前执行的配置, 且可以转换为json
+        _vars.setdefault('configs', list()).append(json.dumps(_robot.get_config('', run_id)))
+        _vars.setdefault('steps', list()).append(json.dumps(_robot.get_step_para('', run_id, 1)))
+        return _vars['cnt']
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.robot = Robot('test_run_cache', init_class=[CacheAction])
+
+    def test_share(self):
+        # 相同内容的配置共用管道对象, 执行结束后清除执行信息
+        _config = {'predef_name': 'share', 'steps': [{'action_name': 'cache_nest'}]}
+        for _run_id in ('r1', 'r2'):
+            _, _status, _output = self.robot.run(_config, run_id=_run_id)
+            self.assertEqual(_status, 'S')
+            self.assertEqual(_output['last_result'], 1)
+
+        self.assertEqual(len(self.robot._run_pipeline_cache), 1)
+        _pipeline = next(iter(self.robot._run_pipeline_cache.values()))
+        for _run_id in ('r1', 'r2'):
+            with self.assertRaises(RuntimeError):
+                _pipeline.status(run_id=_run_id)
+
+        self.assertEqual(self.robot._run_pipeline_using, set())
+        self.assertEqual(self.robot.robot_info['run_pipeline'], dict())
+        self.assertEqual(self.robot.robot_info['run_config'], dict())
+
+    def test_not_json(self):
+        # 配置中包含无法转换为json的对象时不缓存, 避免字符串形式相同的对象共用缓存
+        class _Remark(object):
+            def __init__(self, val):
+                self.val = val
+
+            def __str__(self):
+                return 'remark'
+
+        _configs = [
+            {'predef_name': 'not_json', 'steps': [{'cmd': 'null', 'remark': _Remark(_i)}]}
+            for _i in range(2)
+        ]
+        self.assertIsNone(Robot.config_hash(_configs[0]))
+        for _config in _configs:
+            _key, _, _frozen = Robot.get_pipeline_config(_config)
+            self.assertIsNone(_key)
+            self.assertIs(_frozen['steps'][0]['remark'], _config['steps'][0]['remark'])
+
+            _, _status, _ = self.robot.run(_config, run_id='r1')
+            self.assertEqual(_status, 'S')
+
+        self.assertEqual(len(self.robot._run_pipeline_cache), 0)
+        self.assertEqual(self.robot._run_pipeline_using, set())
+
+    def test_nest(self):
+        # 同一run_id嵌套执行使用新的管道对象, 不影响外层执行
+        _, _status, _output = self.robot.run(NEST_CONFIG, run_id='nest')
+        self.assertEqual(_status, 'S')
+        self.assertEqual(_output['last_result'], 6)
+
+        _vars = self.robot.robot_info['vars']['nest']
+        self.assertEqual(_vars['cnt'], 6)
+        self.assertEqual(len(_vars['configs']), 6)
+        for _config in _vars['configs']:
+            self.assertEqual(json.loads(_config), NEST_CONFIG)
+        for _step in _vars['steps']:
+            self.assertEqual(json.loads(_step), NEST_CONFIG['steps'][0])
+
+        self.assertEqual(len(self.robot._run_pipeline_cache), 1)
+        self.assertEqual(self.robot._run_pipeline_using, set())
+        self.assertEqual(self.robot.robot_info['run_pipeline'], dict())
+        self.assertEqual(self.robot.robot_info['run_config'], dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.script_tool import ScriptTool
+
+
+class Test(unittest.TestCase):
+
+    def test_run(self):
+        _script = "run_vars['cnt'] = run_vars.get('cnt', 0) + step\n_return_val = run_vars['cnt']"
+        _vars = dict()
+        for _i in range(3):
+            _ret = ScriptTool.run(_script, namespace={'run_vars': _vars, 'step': 2})
+
+        self.assertEqual(_ret, 6)
+        self.assertIs(ScriptTool.compile_script(_script), ScriptTool.compile_script(_script))
+        self.assertIsNone(ScriptTool.run('_a = 1'))
+
+    def test_run_in_process(self):
+        _ret = ScriptTool.run_in_process(
+            "_return_val = [run_id, sum(range(n))]", namespace={'run_id': 'r1', 'n': 100}, timeout=60
+        )
+        self.assertEqual(_ret, ['r1', 4950])
+
+    def test_run_in_process_timeout(self):
+        # 超时的脚本无法中止, 后续脚本使用新的子进程池执行, 不被超时的脚本阻塞
+        ScriptTool.set_process_pool(1)
+        try:
+            _pool = ScriptTool._PROCESS_POOL
+            with self.assertRaises(TimeoutError):
+                ScriptTool.run_in_process("import time\ntime.sleep(5)", timeout=2)
+            self.assertIsNot(ScriptTool._PROCESS_POOL, _pool)
+            self.assertEqual(ScriptTool._PROCESS_POOL_WORKERS, 1)
+
+            _start = time.time()
+            self.assertEqual(ScriptTool.run_in_process("_return_val = 1", timeout=2), 1)
+            self.assertLess(time.time() - _start, 2)
+        finally:
+            ScriptTool.set_process_pool()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import json
+import sqlite3
+import shutil
+import tempfile
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.robot import Robot
+from HandLessRobot.lib.actions.base_action import BaseAction
+from HandLessRobot.lib.stream_tool import StreamTool
+
+
+class StreamAction(BaseAction):
+    """
+    数据流测试动作
+    """
+
+    @classmethod
+    def stream_double(cls, robot_info: dict, action_name: str, run_id: str, val, **kwargs):
+        """
+        返回值的两倍, 值为负数时抛出异常
+        """
+        if int(val) < 0:
+            raise RuntimeError('negative value')
+        return int(val) * 2
+
+
+class Test(unittest.TestCase):
+    # 每个用例的开始和结束执行
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.robot = Robot('test_stream', init_class=[StreamAction])
+        self.robot.load_predef_by_config({
+            'predef_name': 'double',
+            'steps': [
+                {'action_name': 'stream_double', 'call_para_args': '[{$var=val$}]'}
+            ]
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_stream(self):
+        # jsonl文件来源, 结果输出到SQLite
+        _source = os.path.join(self.path, 'source.jsonl')
+        with open(_source, 'w', encoding='utf-8') as _f:
+            for _val in (1, 2, -3, 4, 5, 6, 7):
+                _f.write(json.dumps({'val': _val}) + '\n')
+
+        _results = dict()
+        _sink = os.path.join(self.path, 'result.db')
+        _stat = self.robot.run_predef_stream(
+            'double', _source, concurrency=3, sink=_sink, run_id_prefix='s',
+            on_result=lambda robot, record, result: _results.__setitem__(record['val'], result['last_result'])
+        )
+        self.assertEqual(_stat, {'total': 7, 'success': 6, 'failed': 1})
+        self.assertEqual(_results, {1: 2, 2: 4, -3: None, 4: 8, 5: 10, 6: 12, 7: 14})
+        self.assertEqual(len(self.robot.robot_info['predef_pipeline']['double']._cache), 0)
+
+        _conn = sqlite3.connect(_sink)
+        _rows = _conn.execute('SELECT run_id, status FROM robot_stream_result ORDER BY idx').fetchall()
+        _conn.close()
+        self.assertEqual(len(_rows), 7)
+        self.assertEqual(_rows[2], ('s-2', 'E'))
+
+        # 生成器来源, 编译执行, 结果输出到jsonl
+        _sink = os.path.join(self.path, 'result.jsonl')
+        _stat = self.robot.run_predef_stream(
+            'double', ({'val': _i} for _i in range(5)), concurrency=2, sink=_sink, compiled=True
+        )
+        self.assertEqual(_stat['success'], 5)
+        with open(_sink, 'r', encoding='utf-8') as _f:
+            _lines = [json.loads(_line) for _line in _f]
+        self.assertEqual(sorted(_line['last_result'] for _line in _lines), [0, 2, 4, 6, 8])
+
+    def test_json_array(self):
+        # 按块解析json数组, 元素跨越读取块时结果不变
+        _records = [
+            12345, {'val': 1, 'text': '], [{"x": 1},'}, [1, [2, 3]], 'a\\"b', None, True, 1.5e3, {}, []
+        ]
+        _file = os.path.join(self.path, 'source.json')
+        with open(_file, 'w', encoding='utf-8') as _f:
+            _f.write(' \n' + json.dumps(_records, indent=2) + '\n')
+        for _chunk_size in (1, 2, 3, 7, 65536):
+            self.assertEqual(list(StreamTool.read_json_array(_file, chunk_size=_chunk_size)), _records)
+        self.assertEqual(list(StreamTool.get_source(_file)), _records)
+
+        for _text, _expect in (('[]', []), (' [ ] ', []), ('[1,2]', [1, 2])):
+            with open(_file, 'w', encoding='utf-8') as _f:
+                _f.write(_text)
+            self.assertEqual(list(StreamTool.read_json_array(_file, chunk_size=1)), _expect)
+
+        # 格式错误时抛出异常
+        for _text in ('{"val": 1}', '[1, 2', '[1 2]', '[1, }', ''):
+            with open(_file, 'w', encoding='utf-8') as _f:
+                _f.write(_text)
+            with self.assertRaises(RuntimeError):
+                list(StreamTool.read_json_array(_file, chunk_size=2))
+
+        # json文件来源执行, 结果不支持输出为json文件(只支持jsonl)
+        with open(_file, 'w', encoding='utf-8') as _f:
+            _f.write(json.dumps([{'val': _i} for _i in range(3)]))
+        self.assertEqual(self.robot.run_predef_stream('double', _file)['success'], 3)
+        with self.assertRaises(RuntimeError):
+            StreamTool.get_sink(os.path.join(self.path, 'result.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import os
+import time
+import unittest
+import numpy as np
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HandLessRobot.lib.var_store import RunVarStore
+
+
+class Test(unittest.TestCase):
+
+    def test_keep_finished(self):
+        _store = RunVarStore(keep_finished=2)
+        _store.set_var('shared', 'a', 1)
+        for _i in range(4):
+            _store.begin_run('r%d' % _i)
+            _store.set_var('r%d' % _i, 'x', _i)
+
+        # 嵌套运行, 外层结束前不淘汰
+        _store.begin_run('r0')
+        _store.end_run('r0')
+        self.assertTrue(_store.is_active('r0'))
+        for _i in range(4):
+            _store.end_run('r%d' % _i)
+
+        self.assertEqual(sorted(_store.keys()), ['*', 'r2', 'r3', 'shared'])
+        self.assertEqual(_store.get_var('r3', 'x'), 3)
+        self.assertEqual(_store.get_var('r0', 'x', default_value=-1), -1)
+        self.assertEqual(_store.stats()['evicted'], 2)
+
+    def test_ttl_and_bytes(self):
+        _store = RunVarStore(keep_finished=None, ttl=0.2)
+        _store.begin_run('r1')
+        _store.end_run('r1')
+        time.sleep(0.3)
+        _store.begin_run('r2')
+        _store.end_run('r2')
+        self.assertNotIn('r1', _store)
+        self.assertIn('r2', _store)
+
+        _store = RunVarStore(keep_finished=None, max_bytes=1500000)
+        for _i in range(3):
+            _store.begin_run('img%d' % _i)
+            _store.set_var('img%d' % _i, 'screen', np.zeros((1000, 1000), dtype=np.uint8))
+            _store.end_run('img%d' % _i)
+
+        self.assertEqual(sorted(_store.keys()), ['*', 'img2'])
+        self.assertGreaterEqual(_store.stats()['finished_bytes'], 1000000)
+
+
+if __name__ == '__main__':
+    unittest.main()